@@ -1,7 +1,6 @@
 from django.conf import settings
 from Account.models import roles
 from CRLBM.encryption import dec
-import Db
 from .db_utils import callproc
 from django.utils import timezone
 def logged_in_user(request):
@@ -62,4 +61,9 @@ def logged_in_user(request):
         # Get top level items (parent_id = -1 or your specific root indicator)
         menu_items = [item for item in items if item['parent_id'] == -1]
 
-    return {'username':username,'full_name':full_name,'role_name':role_name,'session_timeout_minutes':session_timeout_minutes,'reports':reports, 'menu_items': menu_items}
\ No newline at end of file
+    return {'username':username,'full_name':full_name,'role_name':role_name,'session_timeout_minutes':session_timeout_minutes,'reports':reports, 'menu_items': menu_items}
+
+
+def demo_apps(request):
+    # Layout partials only link to the theme demo pages when they are routed.
+    return {'demo_apps': settings.DEMO_APPS_ENABLED}
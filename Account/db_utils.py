@@ -1,6 +1,16 @@
 # myapp/db_utils.py
 
-from django.db import connections
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+from CRLBM import db_router
+from CRLBM.request_context import current_request_id, current_user_id
+
+logger = logging.getLogger(__name__)
 
 class Db:
     @staticmethod
@@ -8,7 +18,7 @@ class Db:
         """
         Get the database connection based on the alias provided ('default').
         """
-        return connections["default"]
+        return connections[database_alias]
 
     @staticmethod
     def close_connection(database_alias='default'):
@@ -17,11 +27,15 @@ class Db:
         """
         connection = connections["default"]
         
-def callproc(procedure_name, params=None):
+def callproc(procedure_name, params=None, read_only=False, using=None):
     """
     Calls the specified stored procedure on the selected database.
+    read_only=True sends it to the read replica when one is configured and
+    usable (see CRLBM.db_router); only use it for procedures that never write.
     """
-    connection = Db.get_connection()
+    if using is None:
+        using = db_router.read_alias() if read_only else 'default'
+    connection = Db.get_connection(using)
     try:
         fetched_data=[]
         with connection.cursor() as cursor:
@@ -32,8 +46,40 @@ def callproc(procedure_name, params=None):
             return fetched_data
     except Exception as e:
         connection.rollback()
-        print(f"Error: {e}")
+        logger.error("callproc %s failed (user=%s, request=%s): %s",
+                     procedure_name, current_user_id(), current_request_id(), e)
         raise
     finally:
         Db.close_connection()
 
+
+_callproc_executor = None
+
+
+def _get_callproc_executor():
+    global _callproc_executor
+    if _callproc_executor is None:
+        _callproc_executor = ThreadPoolExecutor(
+            max_workers=settings.CALLPROC_MAX_WORKERS, thread_name_prefix='callproc')
+    return _callproc_executor
+
+
+def _pooled_callproc(procedure_name, params=None, **kwargs):
+    # Pool threads live outside the request cycle, so apply the same
+    # connection housekeeping Django does at request start/end.
+    close_old_connections()
+    try:
+        return callproc(procedure_name, params, **kwargs)
+    finally:
+        close_old_connections()
+
+
+async def acallproc(procedure_name, params=None, **kwargs):
+    """
+    Async variant of callproc for async views. The procedure runs on a bounded
+    thread pool (CALLPROC_MAX_WORKERS) so a burst of requests cannot open an
+    unbounded number of DB connections.
+    """
+    return await sync_to_async(
+        _pooled_callproc, thread_sensitive=False, executor=_get_callproc_executor()
+    )(procedure_name, params, **kwargs)
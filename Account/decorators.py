@@ -0,0 +1,35 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.http import HttpResponseNotAllowed
+
+
+async def ais_authenticated(request):
+    """
+    Resolve request.user off the event loop. The lazy user does a session and
+    user lookup, which Django forbids inside async code.
+    """
+    return await sync_to_async(lambda: request.user.is_authenticated)()
+
+
+def async_login_required(view_func):
+    """login_required for async views (Django 4.2's decorator is sync only)."""
+    @wraps(view_func)
+    async def _wrapped_view(request, *args, **kwargs):
+        if not await ais_authenticated(request):
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+def async_require_http_methods(request_method_list):
+    """require_http_methods for async views."""
+    def decorator(view_func):
+        @wraps(view_func)
+        async def _wrapped_view(request, *args, **kwargs):
+            if request.method not in request_method_list:
+                return HttpResponseNotAllowed(request_method_list)
+            return await view_func(request, *args, **kwargs)
+        return _wrapped_view
+    return decorator
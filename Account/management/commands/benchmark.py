@@ -0,0 +1,233 @@
+import json
+import os
+import resource
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        "Drive the hot endpoints in process with N concurrent threads and report "
+        "req/s, p50/p95/p99 latency, queries per request and peak RSS. "
+        "Results are saved as JSON and compared against a stored baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', required=True, help="Email of the user the requests run as.")
+        parser.add_argument('--password', default='', help="Also benchmark the login POST with this password.")
+        parser.add_argument('--threads', type=int, default=4)
+        parser.add_argument('--iterations', type=int, default=50, help="Requests per scenario.")
+        parser.add_argument('--warmup', type=int, default=2, help="Untimed requests per scenario.")
+        parser.add_argument('--only', nargs='*', default=None, help="Run only these scenario names.")
+        parser.add_argument('--report-entity', default='', help="Entity for common_html/partial_report/report_xlsx.")
+        parser.add_argument('--masters-entity', default='em')
+        parser.add_argument('--vendor-id', type=int, default=None, help="Vendor used for the wizard step renders.")
+        parser.add_argument('--output', default=None)
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks', 'baseline.json'))
+        parser.add_argument('--save-baseline', action='store_true')
+        parser.add_argument('--tolerance', type=float, default=10.0, help="Allowed regression in percent.")
+        parser.add_argument('--no-fail', action='store_true', help="Report regressions without failing.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            user = User.objects.get(email=options['user'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['user']} does not exist")
+
+        # The test client talks to the application as 'testserver'.
+        if 'testserver' not in settings.ALLOWED_HOSTS and '*' not in settings.ALLOWED_HOSTS:
+            settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + ['testserver']
+
+        scenarios = self.get_scenarios(user, options)
+        if options['only']:
+            scenarios = [s for s in scenarios if s['name'] in options['only']]
+        if not scenarios:
+            raise CommandError("No scenarios selected")
+
+        results = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'threads': options['threads'],
+            'iterations': options['iterations'],
+            'scenarios': {},
+        }
+        for scenario in scenarios:
+            self.stdout.write(f"Running {scenario['name']} ...")
+            stats = self.run_scenario(scenario, user, options)
+            results['scenarios'][scenario['name']] = stats
+            self.stdout.write(
+                f"  {stats['rps']:.1f} req/s  p50 {stats['p50_ms']:.1f} ms  p95 {stats['p95_ms']:.1f} ms  "
+                f"p99 {stats['p99_ms']:.1f} ms  {stats['queries_per_request']:.1f} q/req  "
+                f"errors {stats['errors']}  peak RSS {stats['peak_rss_mb']:.1f} MB"
+            )
+        results['peak_rss_mb'] = self.peak_rss_mb()
+
+        output = options['output'] or os.path.join(
+            settings.BASE_DIR, 'benchmarks', f"results-{datetime.now():%Y%m%d-%H%M%S}.json"
+        )
+        self.write_json(output, results)
+        self.stdout.write(f"Results written to {output}")
+
+        if options['save_baseline']:
+            self.write_json(options['baseline'], results)
+            self.stdout.write(self.style.SUCCESS(f"Baseline saved to {options['baseline']}"))
+            return
+
+        if os.path.exists(options['baseline']):
+            with open(options['baseline']) as f:
+                baseline = json.load(f)
+            regressions = self.compare(baseline, results, options['tolerance'])
+            if regressions:
+                for line in regressions:
+                    self.stdout.write(self.style.ERROR(line))
+                if not options['no_fail']:
+                    raise CommandError(f"{len(regressions)} regression(s) against {options['baseline']}")
+            else:
+                self.stdout.write(self.style.SUCCESS("No regressions against baseline"))
+        else:
+            self.stdout.write(self.style.WARNING(f"No baseline at {options['baseline']}, use --save-baseline"))
+
+    def get_scenarios(self, user, options):
+        entity = options['report_entity']
+        report_params = {'entity': entity, 'columnName': '', 'filterid': '', 'subFilterId': '', 'sft': ''}
+        scenarios = [
+            {'name': 'login_page', 'method': 'get', 'url': reverse('Login'), 'anonymous': True},
+            {'name': 'common_html', 'method': 'get', 'url': reverse('common_html'), 'data': {'entity': entity}},
+            {'name': 'partial_report', 'method': 'get', 'url': reverse('partial_report'), 'data': report_params},
+            {'name': 'report_xlsx', 'method': 'post', 'url': reverse('report_xlsx'), 'data': report_params},
+            {'name': 'masters', 'method': 'get', 'url': reverse('masters'), 'data': {'entity': options['masters_entity'], 'type': 'i'}},
+            {'name': 'customer_list_view', 'method': 'get', 'url': reverse('cms:customer_list')},
+            {'name': 'EnquiryListView', 'method': 'get', 'url': reverse('crm:enquiry_list')},
+            {'name': 'vendor_dashboard', 'method': 'get', 'url': reverse('vendors:vendor_dashboard')},
+        ]
+        if options['password']:
+            scenarios.insert(1, {
+                'name': 'login_post', 'method': 'post', 'url': reverse('Login'), 'anonymous': True,
+                'data': {'username': user.email, 'password': options['password']},
+            })
+        if options['vendor_id']:
+            for step in range(1, 15):
+                scenarios.append({
+                    'name': f'vendor_wizard_step_{step}', 'method': 'get',
+                    'url': reverse('vendors:vendor_wizard_step', args=[step, options['vendor_id']]),
+                })
+        else:
+            scenarios.append({
+                'name': 'vendor_wizard_step_1', 'method': 'get',
+                'url': reverse('vendors:vendor_wizard_step', args=[1]),
+            })
+        return scenarios
+
+    def run_scenario(self, scenario, user, options):
+        local = threading.local()
+        lock = threading.Lock()
+        latencies, queries, statuses = [], [], {}
+
+        def get_client():
+            if not hasattr(local, 'client'):
+                local.client = Client()
+                if not scenario.get('anonymous'):
+                    local.client.force_login(user)
+            return local.client
+
+        def do_request(timed):
+            client = get_client()
+            method = getattr(client, scenario['method'])
+            with CaptureQueriesContext(connections['default']) as ctx:
+                start = time.perf_counter()
+                try:
+                    response = method(scenario['url'], scenario.get('data', {}))
+                    status = response.status_code
+                except Exception:
+                    status = 'exception'
+                elapsed = time.perf_counter() - start
+            if timed:
+                with lock:
+                    latencies.append(elapsed)
+                    queries.append(len(ctx.captured_queries))
+                    statuses[status] = statuses.get(status, 0) + 1
+
+        def worker(count, timed):
+            try:
+                for _ in range(count):
+                    do_request(timed)
+            finally:
+                connections.close_all()
+
+        threads = max(1, options['threads'])
+        per_thread = [options['iterations'] // threads] * threads
+        for i in range(options['iterations'] % threads):
+            per_thread[i] += 1
+
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda n: worker(n, False), [options['warmup']] * threads))
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            list(pool.map(lambda n: worker(n, True), per_thread))
+        wall = time.perf_counter() - start
+
+        latencies_ms = sorted(x * 1000 for x in latencies)
+        errors = sum(c for s, c in statuses.items() if s == 'exception' or s >= 500)
+        return {
+            'url': scenario['url'],
+            'requests': len(latencies_ms),
+            'rps': len(latencies_ms) / wall if wall else 0.0,
+            'p50_ms': self.percentile(latencies_ms, 50),
+            'p95_ms': self.percentile(latencies_ms, 95),
+            'p99_ms': self.percentile(latencies_ms, 99),
+            'mean_ms': statistics.fmean(latencies_ms) if latencies_ms else 0.0,
+            'queries_per_request': statistics.fmean(queries) if queries else 0.0,
+            'statuses': {str(k): v for k, v in statuses.items()},
+            'errors': errors,
+            'peak_rss_mb': self.peak_rss_mb(),
+        }
+
+    @staticmethod
+    def percentile(values, pct):
+        if not values:
+            return 0.0
+        k = (len(values) - 1) * pct / 100
+        lo, hi = int(k), min(int(k) + 1, len(values) - 1)
+        return values[lo] + (values[hi] - values[lo]) * (k - lo)
+
+    @staticmethod
+    def peak_rss_mb():
+        # ru_maxrss is reported in kilobytes on Linux.
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+    @staticmethod
+    def write_json(path, data):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+
+    @staticmethod
+    def compare(baseline, current, tolerance):
+        """Return a line per metric that is worse than the baseline by more than tolerance percent."""
+        regressions = []
+        limit = 1 + tolerance / 100
+        for name, cur in current['scenarios'].items():
+            base = baseline.get('scenarios', {}).get(name)
+            if not base:
+                continue
+            for metric in ('p50_ms', 'p95_ms', 'p99_ms', 'queries_per_request'):
+                if base[metric] and cur[metric] > base[metric] * limit:
+                    regressions.append(f"{name}: {metric} {base[metric]:.1f} -> {cur[metric]:.1f}")
+            if base['rps'] and cur['rps'] * limit < base['rps']:
+                regressions.append(f"{name}: rps {base['rps']:.1f} -> {cur['rps']:.1f}")
+            if cur['errors'] > base['errors']:
+                regressions.append(f"{name}: errors {base['errors']} -> {cur['errors']}")
+        if baseline.get('peak_rss_mb') and current['peak_rss_mb'] > baseline['peak_rss_mb'] * limit:
+            regressions.append(f"peak RSS {baseline['peak_rss_mb']:.1f} -> {current['peak_rss_mb']:.1f} MB")
+        return regressions
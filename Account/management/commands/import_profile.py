@@ -0,0 +1,98 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+# What a worker imports before it can serve its first request.
+BOOT_SCRIPT = (
+    "import os, resource, time; t = time.perf_counter(); "
+    "import django; django.setup(); "
+    "from django.conf import settings; import importlib; importlib.import_module(settings.ROOT_URLCONF); "
+    "from django.urls import get_resolver; get_resolver().url_patterns; "
+    "t = time.perf_counter() - t; "
+    # ru_maxrss survives exec, so a child of a large process (the test
+    # runner) would report its parent's peak; VmHWM starts fresh. Both in kB.
+    "hwm = [l.split()[1] for l in open('/proc/self/status') if l.startswith('VmHWM')] "
+    "if os.path.exists('/proc/self/status') else []; "
+    "print('BOOT', t, hwm[0] if hwm else resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)"
+)
+
+
+def cold_start(settings_module=None, importtime=False):
+    """
+    Boot Django and import the URLconf in a fresh interpreter.
+    Returns (seconds, peak_rss_mb, importtime_lines).
+    """
+    env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings_module or os.environ.get(
+        'DJANGO_SETTINGS_MODULE', 'CRLBM.settings'))
+    args = [sys.executable] + (['-X', 'importtime'] if importtime else []) + ['-c', BOOT_SCRIPT]
+    proc = subprocess.run(args, cwd=settings.BASE_DIR, env=env, capture_output=True, text=True)
+    boot = [line for line in proc.stdout.splitlines() if line.startswith('BOOT ')]
+    if proc.returncode != 0 or not boot:
+        raise CommandError(f"Cold start failed:\n{proc.stderr[-2000:]}")
+    _, seconds, maxrss = boot[-1].split()
+    return float(seconds), int(maxrss) / 1024, proc.stderr.splitlines()
+
+
+def parse_importtime(lines):
+    """
+    Returns ({module: cumulative_us}, {top_level_package: self_us}) from
+    `python -X importtime` output.
+    """
+    cumulative, packages = {}, defaultdict(int)
+    for line in lines:
+        m = IMPORTTIME_RE.match(line)
+        if not m:
+            continue
+        self_us, cumulative_us, _, module = m.groups()
+        cumulative[module] = max(cumulative.get(module, 0), int(cumulative_us))
+        packages[module.split('.')[0]] += int(self_us)
+    return cumulative, dict(packages)
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile worker boot: import Django and the URLconf in a fresh interpreter "
+        "with -X importtime and report the cumulative import cost per module and package."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=25)
+        parser.add_argument('--prefix', default='', help="Only report modules starting with this prefix.")
+        parser.add_argument('--settings-module', default=None, help="Profile a different settings module.")
+        parser.add_argument('--json', action='store_true', help="Print machine readable output.")
+
+    def handle(self, *args, **options):
+        seconds, rss_mb, lines = cold_start(options['settings_module'], importtime=True)
+        cumulative, packages = parse_importtime(lines)
+        modules = sorted(
+            ((m, us) for m, us in cumulative.items() if m.startswith(options['prefix'])),
+            key=lambda item: item[1], reverse=True,
+        )[:options['limit']]
+        top_packages = sorted(packages.items(), key=lambda item: item[1], reverse=True)[:options['limit']]
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'boot_seconds': seconds,
+                'peak_rss_mb': rss_mb,
+                'modules_ms': {m: us / 1000 for m, us in modules},
+                'packages_ms': {p: us / 1000 for p, us in top_packages},
+            }, indent=2))
+            return
+
+        # Boot time is measured without -X importtime, which adds overhead.
+        seconds, rss_mb, _ = cold_start(options['settings_module'])
+        self.stdout.write(f"Cold start: {seconds * 1000:.0f} ms, peak RSS {rss_mb:.1f} MB\n")
+        self.stdout.write("Cumulative import time by module:")
+        for module, us in modules:
+            self.stdout.write(f"  {us / 1000:9.1f} ms  {module}")
+        self.stdout.write("\nSelf import time by top-level package:")
+        for package, us in top_packages:
+            self.stdout.write(f"  {us / 1000:9.1f} ms  {package}")
@@ -0,0 +1,90 @@
+import json
+import os
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Hot application URLs plus a miss, which has to walk every pattern.
+DEFAULT_PATHS = [
+    '/home', '/masters/', '/common_html', '/get_filter', '/get_sub_filter',
+    '/menu_admin', '/cms/dashboard', '/cms/customers/', '/cms/customers/42/',
+    '/vendors/', '/vendors/list/', '/crm/dashboard/', '/crm/enquiries/',
+    '/download/abc/', '/no/such/page',
+]
+
+# Runs in a fresh interpreter so INSTALLED_APPS and the URLconf follow DEMO_APPS_ENABLED.
+CHILD_SCRIPT = '''
+import json, resource, sys, time
+import django
+django.setup()
+from django.urls import Resolver404, get_resolver
+paths, rounds = json.loads(sys.argv[1]), int(sys.argv[2])
+resolver = get_resolver()
+
+def count(patterns):
+    return sum(count(p.url_patterns) if hasattr(p, 'url_patterns') else 1 for p in patterns)
+
+def resolve(path):
+    try:
+        resolver.resolve(path)
+    except Resolver404:
+        pass
+
+for path in paths:
+    resolve(path)
+started = time.perf_counter()
+for _ in range(rounds):
+    for path in paths:
+        resolve(path)
+elapsed = time.perf_counter() - started
+print(json.dumps({
+    'patterns': count(resolver.url_patterns),
+    'resolve_us': elapsed / (rounds * len(paths)) * 1e6,
+    'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+}))
+'''
+
+
+def run_profile(demo_apps, paths, rounds):
+    env = dict(os.environ, DEMO_APPS_ENABLED=str(demo_apps))
+    env.setdefault('DJANGO_SETTINGS_MODULE', 'CRLBM.settings')
+    proc = subprocess.run(
+        [sys.executable, '-c', CHILD_SCRIPT, json.dumps(paths), str(rounds)],
+        cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise CommandError(f"Benchmark process failed:\n{proc.stderr[-2000:]}")
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare URL resolution time, pattern count and per-worker RSS with and "
+        "without the bootstrap demo apps (DEMO_APPS_ENABLED)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rounds', type=int, default=2000, help="Times each path is resolved.")
+        parser.add_argument('--path', action='append', dest='paths', help="Path to resolve (repeatable).")
+        parser.add_argument('--json', action='store_true', help="Print machine readable output.")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        results = {
+            'with_demo_apps': run_profile(True, paths, options['rounds']),
+            'production': run_profile(False, paths, options['rounds']),
+        }
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'profile':<16}{'patterns':>10}{'resolve (us)':>14}{'RSS (MB)':>10}")
+        for name, r in results.items():
+            self.stdout.write(f"{name:<16}{r['patterns']:>10}{r['resolve_us']:>14.1f}{r['peak_rss_mb']:>10.1f}")
+        demo, prod = results['with_demo_apps'], results['production']
+        self.stdout.write(
+            f"\nProduction profile: {(1 - prod['resolve_us'] / demo['resolve_us']) * 100:.0f}% faster resolve, "
+            f"{demo['peak_rss_mb'] - prod['peak_rss_mb']:.1f} MB less RSS per worker"
+        )
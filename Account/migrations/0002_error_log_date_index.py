@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Account', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='error_log',
+            index=models.Index(fields=['error_date'], name='error_log_date_idx'),
+        ),
+    ]
@@ -135,6 +135,10 @@ class error_log(models.Model):
     
     class Meta:
         db_table = 'error_log'
+        indexes = [
+            # Retention (`manage.py archive_logs`) reads and deletes by date.
+            models.Index(fields=['error_date'], name='error_log_date_idx'),
+        ]
 
 class common_model(models.Model):
     name = models.CharField(max_length=255)
@@ -1,3 +1,320 @@
-from django.test import TestCase
+import asyncio
+import contextvars
+import importlib.util
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock, skipUnless
+
+from asgiref.sync import async_to_sync, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.http import HttpResponse
+from django.template.loader import render_to_string
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils.module_loading import import_string
+
+from CRLBM import request_context
+from CRLBM.middleware import RequestContextMiddleware
 
 # Create your tests here.
+
+
+class FakeUser:
+    is_authenticated = True
+    is_active = True
+
+    def __init__(self, user_id):
+        self.id = self.pk = user_id
+        self.role_id = user_id * 10
+
+
+class RequestContextConcurrencyTests(SimpleTestCase):
+    """Views must never see another request's user when served from parallel threads."""
+
+    threads = 8
+    requests_per_thread = 25
+
+    def setUp(self):
+        self.factory = RequestFactory()
+        # A context variable (not a thread local) so the expectation follows
+        # async views into the callproc executor threads.
+        self.expected_user = contextvars.ContextVar('expected_user')
+        self.leaks = []
+        self.lock = threading.Lock()
+
+    def fake_callproc(self, name, params=None):
+        # Yield to the other threads between reading the user and using it,
+        # which is exactly where module globals used to get overwritten.
+        time.sleep(0.0005)
+        expected = self.expected_user.get()
+        if params and name in ('stp_get_saved_filters', 'stp_get_sub_filter', 'stp_get_masters'):
+            if params[-1] != expected:
+                with self.lock:
+                    self.leaks.append((name, expected, params[-1]))
+        return [('value', 'label')]
+
+    def fake_render(self, request, template, context=None, *args, **kwargs):
+        if context and 'role_id' in context and context['role_id'] != self.expected_user.get() * 10:
+            with self.lock:
+                self.leaks.append((template, self.expected_user.get() * 10, context['role_id']))
+        return HttpResponse()
+
+    def serve(self, view, user_id, path, data):
+        self.expected_user.set(user_id)
+        request = self.factory.get(path, data)
+        request.user = FakeUser(user_id)
+        request.session = {}
+        response = RequestContextMiddleware(view)(request)
+        if asyncio.iscoroutine(response):
+            response = async_to_sync(self.await_response)(response)
+        return response
+
+    @staticmethod
+    async def await_response(coroutine):
+        return await coroutine
+
+    def test_no_user_leaks_between_parallel_requests(self):
+        from Masters import views as masters_views
+        from MenuManager import views as menu_views
+        from Reports import views as reports_views
+        from vendors import views as vendor_views
+
+        def wizard(request):
+            vendor_views._build_wizard_context(1, {1: ('Basic Information', None)}, None, None, request)
+            return self.fake_render(request, 'wizard', {'role_id': request_context.current_role_id()})
+
+        views = [
+            (reports_views.common_html, '/common_html', {'entity': 'r'}),
+            (reports_views.get_sub_filter, '/get_sub_filter', {'filter_id': '1'}),
+            (masters_views.masters, '/masters', {'entity': 'em', 'type': 'i'}),
+            (menu_views.menu_admin, '/menu_admin', {'entity': 'menu', 'type': 'i'}),
+            (wizard, '/vendors/new/step/1/', {}),
+        ]
+
+        def worker(user_id):
+            for i in range(self.requests_per_thread):
+                view, path, data = views[(user_id + i) % len(views)]
+                self.serve(view, user_id, path, data)
+                self.assertIsNone(request_context.get_context())
+
+        patches = [
+            mock.patch(f'{module}.callproc', side_effect=self.fake_callproc)
+            for module in ('Account.db_utils', 'Reports.views', 'Masters.views', 'MenuManager.views')
+        ] + [
+            mock.patch(f'{module}.render', side_effect=self.fake_render)
+            for module in ('Reports.views', 'Masters.views', 'MenuManager.views')
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+        with ThreadPoolExecutor(max_workers=self.threads) as pool:
+            list(pool.map(worker, range(1, self.threads + 1)))
+
+        self.assertEqual(self.leaks, [])
+
+    def test_context_is_unbound_outside_requests(self):
+        self.assertIsNone(request_context.current_user_id())
+        with request_context.request_scope(user_id=5, role_id=2):
+            self.assertEqual(request_context.current_user_id(), 5)
+            self.assertEqual(request_context.current_role_id(), 2)
+        self.assertIsNone(request_context.current_user_id())
+
+
+class ReplicaRouterTests(SimpleTestCase):
+    """Routing decisions of CRLBM.db_router with a primary and a 'replica' alias."""
+
+    def setUp(self):
+        from CRLBM import db_router
+        self.db_router = db_router
+        self.router = db_router.ReplicaRouter()
+        for target, value in (('replica_alias', 'replica'), ('replica_healthy', True)):
+            patcher = mock.patch.object(db_router, target, return_value=value)
+            setattr(self, target, patcher.start())
+            self.addCleanup(patcher.stop)
+
+    def read_db(self):
+        from CMS.models import CustomerMaster
+        return self.router.db_for_read(CustomerMaster)
+
+    def test_reads_stay_on_primary_outside_replica_block(self):
+        self.assertIsNone(self.read_db())
+
+    def test_replica_reads_use_replica(self):
+        with self.db_router.replica_reads():
+            self.assertEqual(self.read_db(), 'replica')
+
+    def test_session_and_user_tables_never_use_replica(self):
+        from django.contrib.sessions.models import Session
+        from Account.models import CustomUser
+        with self.db_router.replica_reads():
+            self.assertIsNone(self.router.db_for_read(Session))
+            self.assertIsNone(self.router.db_for_read(CustomUser))
+
+    def test_lagging_or_down_replica_falls_back_to_primary(self):
+        self.replica_healthy.return_value = False
+        with self.db_router.replica_reads():
+            self.assertEqual(self.read_db(), 'default')
+
+    def test_read_your_writes_window(self):
+        request = RequestFactory().post('/')
+        request.session = {}
+        self.db_router.mark_write(request)
+        with request_context.request_scope(request), self.db_router.replica_reads():
+            self.assertEqual(self.read_db(), 'default')
+            request.session[self.db_router.SESSION_WRITE_KEY] -= 3600
+            self.assertEqual(self.read_db(), 'replica')
+
+    def test_read_only_callproc_uses_read_alias(self):
+        from Account import db_utils
+        with mock.patch.object(db_utils.Db, 'get_connection') as get_connection:
+            get_connection.return_value.cursor.return_value.__enter__.return_value.stored_results.return_value = []
+            db_utils.callproc('stp_get_execute_report_query', ['select 1'], read_only=True)
+            get_connection.assert_called_with('replica')
+            db_utils.callproc('stp_error_log', ['f', 'e', 1])
+            get_connection.assert_called_with('default')
+
+    def test_report_filter_writes_over_get_mark_the_session(self):
+        from Reports import views
+        request = RequestFactory().get('/delete_filters', {'entity': 'customer', 'save_filter_name': '3'})
+        request.session, request.user = {}, FakeUser(1)
+        with mock.patch.object(views, 'callproc', return_value=[('success',)]):
+            self.assertEqual(json.loads(views.delete_filters(request).content), {'result': 'success'})
+        self.assertIn(self.db_router.SESSION_WRITE_KEY, request.session)
+
+    def test_write_marks_session_only_with_replica(self):
+        from CRLBM.middleware import ReplicaStickinessMiddleware
+        request = RequestFactory().post('/')
+        request.session = {}
+        ReplicaStickinessMiddleware(lambda r: HttpResponse())(request)
+        self.assertIn(self.db_router.SESSION_WRITE_KEY, request.session)
+        self.replica_alias.return_value = None
+        request.session = {}
+        ReplicaStickinessMiddleware(lambda r: HttpResponse())(request)
+        self.assertEqual(request.session, {})
+
+
+@skipUnless('replica' in settings.DATABASES, "needs a second 'replica' database alias")
+class ReplicaAliasTests(TestCase):
+    databases = {'default', 'replica'} if 'replica' in settings.DATABASES else {'default'}
+
+    def test_queries_run_on_replica_alias(self):
+        from CMS.models import CountryMaster
+        from CRLBM import db_router
+        with mock.patch.object(db_router, 'replica_healthy', return_value=True):
+            with db_router.replica_reads():
+                self.assertEqual(CountryMaster.objects.all().db, 'replica')
+                list(CountryMaster.objects.all())
+            self.assertEqual(CountryMaster.objects.all().db, 'default')
+
+
+class StartupBudgetTests(SimpleTestCase):
+    """Worker boot (django.setup() + URLconf) must stay light; see `manage.py import_profile`."""
+
+    def test_cold_start_within_budget(self):
+        from Account.management.commands.import_profile import cold_start, parse_importtime
+        seconds, rss_mb, lines = cold_start(importtime=True)
+        cumulative, _ = parse_importtime(lines)
+        heavy = sorted(m for m in settings.STARTUP_FORBIDDEN_MODULES if m in cumulative)
+        self.assertEqual(heavy, [], "heavy modules imported at boot; import them inside the view")
+
+        # Timed again without -X importtime, best of three to ride out a noisy host.
+        seconds, rss_mb = min(cold_start()[:2] for _ in range(3))
+        self.assertLess(seconds * 1000, settings.STARTUP_IMPORT_BUDGET_MS)
+        self.assertLess(rss_mb, settings.STARTUP_RSS_BUDGET_MB)
+
+
+class AsyncViewTests(TestCase):
+    """The AJAX views are async; under ASGI they must run on the event loop, not in a thread."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='async@example.com', password='x')
+        self.async_client.force_login(self.user)
+
+    def test_middleware_chain_is_async_capable(self):
+        sync_only = [path for path in settings.MIDDLEWARE
+                     if not getattr(import_string(path), 'async_capable', False)]
+        self.assertEqual(sync_only, [])
+
+    async def test_get_filter(self):
+        with mock.patch('Reports.views.acallproc', mock.AsyncMock(return_value=[(1, 'State')])):
+            response = await self.async_client.get('/get_filter', {'entity': 'customer'})
+        self.assertEqual(response.json(), [{'id1': 1, 'name': 'State'}])
+
+    async def test_get_assigned_values(self):
+        with mock.patch('MenuManager.views.acallproc', mock.AsyncMock(return_value=[[3]])):
+            response = await self.async_client.post('/get_assigned_values', {'type': 'role', 'id': '1'})
+        self.assertEqual(response.json(), {'result': 'success', 'menu_array': [[3]]})
+
+    async def test_vendor_quick_stats(self):
+        response = await self.async_client.get('/vendors/api/quick-stats/')
+        self.assertEqual(response.json(), {'total': 0, 'active': 0, 'pending_review': 0, 'approved': 0})
+
+    async def test_check_customer_name(self):
+        response = await self.async_client.post('/cms/check-name/', {'name': 'Bharat Forge'})
+        self.assertEqual(response.json(), {'exists': False, 'name': 'Bharat Forge'})
+
+    async def test_idle_session_is_logged_out(self):
+        def expire():
+            session = self.async_client.session
+            session['django_auto_logout_last_request'] = '2000-01-01T00:00:00+00:00'
+            session.save()
+        await sync_to_async(expire)()
+        response = await self.async_client.get('/get_filter', {'entity': 'customer'})
+        self.assertEqual(response.status_code, 302)
+
+
+def production_urlconf():
+    """CRLBM.urls as a worker imports it with DEMO_APPS_ENABLED=False."""
+    spec = importlib.util.find_spec('CRLBM.urls')
+    module = importlib.util.module_from_spec(spec)
+    with override_settings(DEMO_APPS_ENABLED=False):
+        spec.loader.exec_module(module)
+    return module
+
+
+class ProductionProfileTests(TestCase):
+    """Pages shared by every app must render when the demo apps are not routed."""
+
+    layouts = [
+        'bootstrap/vertical_base.html',
+        'bootstrap/horizontal_base.html',
+        'bootstrap/detached_base.html',
+        'bootstrap/base.html',
+        'bootstrap/account/base.html',
+        'Shared/Layout.html',
+    ]
+
+    def setUp(self):
+        override = override_settings(DEMO_APPS_ENABLED=False, ROOT_URLCONF=production_urlconf())
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email='layout@example.com', password='x')
+
+    def test_login_page(self):
+        response = self.client.get('/Login')
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, 'Sign Up')
+
+    def test_shared_layouts(self):
+        request = RequestFactory().get('/home')
+        SessionMiddleware(lambda r: None).process_request(request)
+        request.user = self.user
+        for template in self.layouts:
+            with self.subTest(template=template):
+                self.assertIn('</html>', render_to_string(template, request=request))
+
+
+class RegisterNewUserTests(TestCase):
+
+    def test_dropdowns_come_from_callproc(self):
+        self.client.force_login(get_user_model().objects.create_user(email='admin@example.com', password='x'))
+        with mock.patch('Account.views.callproc', return_value=[(1, 'Admin')]) as callproc:
+            response = self.client.get('/register_new_user', {'id': '0'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([call.args for call in callproc.call_args_list],
+                         [('stp_get_dropdown_values', ['roles']), ('stp_get_dropdown_values', ['category']),
+                          ('stp_get_dropdown_values', ['moduleL'])])
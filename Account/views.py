@@ -8,40 +8,29 @@ from django.contrib.auth import authenticate, login ,logout,get_user_model
 from Account.forms import RegistrationForm
 from Account.models import  CustomUser, password_storage
 # import mysql.connector as sql
-from Account.serializers import *
-import Db 
 import bcrypt
 from django.contrib.auth.decorators import login_required
 # from .models import SignUpModel
 # from .forms import SignUpForm
 from CRLBM.encryption import *
 from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph
 from Account.utils import decrypt_email, encrypt_email
 import traceback
-from rest_framework.views import APIView
-from rest_framework import status
-from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.contrib.auth.backends import ModelBackend
 from .db_utils import callproc
 from django.utils import timezone
 from Account.models import *
 from Masters.models import *
+from Masters import typeahead
 from MenuManager.models import *
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.urls import reverse
 from django.http import HttpResponseBadRequest
 import logging
-import requests
 from django.db import models
 
 # Set up logging
@@ -86,22 +75,11 @@ def logoutView(request):
     return redirect("Account")  
 
 def register_new_user(request):
-    Db.closeConnection()
-    m = Db.get_connection()
-    cursor=m.cursor()
     if request.method=="GET":
         id = request.GET.get('id', '')
-        cursor.callproc("stp_get_dropdown_values",['roles'])
-        for result in cursor.stored_results():
-            roles = list(result.fetchall())
-        
-        cursor.callproc("stp_get_dropdown_values",['category'])
-        for result in cursor.stored_results():
-            category = list(result.fetchall())
-            
-        cursor.callproc("stp_get_dropdown_values",['moduleL'])
-        for result in cursor.stored_results():
-            moduleL = list(result.fetchall())
+        roles = list(callproc("stp_get_dropdown_values",['roles']))
+        category = list(callproc("stp_get_dropdown_values",['category']))
+        moduleL = list(callproc("stp_get_dropdown_values",['moduleL']))
 
         if id != '0':
             id1 = dec(id)
@@ -158,12 +136,11 @@ def register_new_user(request):
                     assigned_menus = RoleMenuMaster.objects.filter(role_id=role_id)
 
                 # Insert assigned menus into userMenuMaster1
-                    for menu in assigned_menus:
-                        UserMenuDetails.objects.create(
-                            user_id=user.id,
-                            menu_id=menu.menu_id,
-                            role_id=role_id
-                    )
+                    UserMenuDetails.objects.bulk_create([
+                        UserMenuDetails(user_id=user.id, menu_id=menu.menu_id, role_id=role_id)
+                        for menu in assigned_menus
+                    ])
+                    typeahead.changed()
 
                     messages.success(request, "User registered successfully!")
 
@@ -194,26 +171,26 @@ def register_new_user(request):
                 user.module = module  
                 user.save()
 
-                UserMenuDetails.objects.filter(user_id=user.id).delete()
+                with transaction.atomic():
+                    UserMenuDetails.objects.filter(user_id=user.id).delete()
 
-                # Fetch the menus for the new role
-                assigned_menus = RoleMenuMaster.objects.filter(role_id=role_id)
+                    # Fetch the menus for the new role
+                    assigned_menus = RoleMenuMaster.objects.filter(role_id=role_id)
 
-                # Assign the new menus to the user
-                for menu in assigned_menus:
-                    UserMenuDetails.objects.create(
-                        user_id=user.id,
-                        menu_id=menu.menu_id,
-                        role_id=role_id
-                    )
+                    # Assign the new menus to the user
+                    UserMenuDetails.objects.bulk_create([
+                        UserMenuDetails(user_id=user.id, menu_id=menu.menu_id, role_id=role_id)
+                        for menu in assigned_menus
+                    ])
+                typeahead.changed()
 
                 messages.success(request, "User details updated successfully!")
 
         except Exception as e:
             tb = traceback.extract_tb(e.__traceback__)
             fun = tb[0].name
-            cursor.callproc("stp_error_log",[fun,str(e),request.user.id])  
-            print(f"error: {e}")
+            callproc("stp_error_log",[fun,str(e),request.user.id])  
+            logger.exception("error: %s", e)
             messages.error(request, 'Oops...! Something went wrong!')
             response = {'result': 'fail','messages ':'something went wrong !'}   
 
@@ -250,14 +227,28 @@ def home(request):
 @login_required
 def search(request):
     results = []
+    query = request.GET.get('q', '')
     try:
-        query = request.GET.get('q')
-        if query != "":
-           results = callproc("stp_get_application_search",[query])        
+        results = typeahead.suggest(request.user, query, limit=50)
     except Exception as e:
-        print("error-"+e)
+        tb = traceback.extract_tb(e.__traceback__)
+        fun = tb[0].name
+        callproc("stp_error_log",[fun,str(e),request.user.id])
     finally:
-        return render(request, 'Bootstrap/search_results.html', {'query': query, 'results': results})
+        return render(request, 'bootstrap/search_results.html', {'query': query, 'results': results})
+
+@login_required
+def search_suggest(request):
+    """Topbar typeahead: the best application_search matches for ?q= as JSON."""
+    try:
+        entries = typeahead.suggest(request.user, request.GET.get('q', ''))
+        results = [{'name': e.name, 'description': e.description, 'href': e.href} for e in entries]
+        return JsonResponse({'success': True, 'results': results})
+    except Exception as e:
+        tb = traceback.extract_tb(e.__traceback__)
+        fun = tb[0].name
+        callproc("stp_error_log",[fun,str(e),request.user.id])
+        return JsonResponse({'success': False, 'results': []}, status=500)
 
 @login_required       
 def change_password(request):
@@ -275,7 +266,7 @@ def change_password(request):
             tb = traceback.extract_tb(e.__traceback__)
             fun = tb[0].name
             callproc("stp_error_log",[fun,str(e),request.user.id])  
-            print(f"error: {e}")
+            logger.exception("error: %s", e)
             messages.error(request, 'Oops...! Something went wrong!')
             response = {'result': 'fail','messages ':'something went wrong !'}
     finally:
@@ -3,6 +3,7 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from .models import *
+from Masters import refdata
 import re
 
 class CustomerMasterForm(forms.ModelForm):
@@ -13,6 +14,7 @@ class CustomerMasterForm(forms.ModelForm):
     
     class Meta:
         model = CustomerMaster
+        formfield_callback = refdata.formfield
         fields = [
             'organization_type', 'name', 'is_active', 'date_of_establishment',
             'pan_number', 'msme_udyam_reg_no', 'tan_number', 'cin_number',
@@ -88,6 +90,7 @@ class CustomerMasterForm(forms.ModelForm):
 class CustomerAddressForm(forms.ModelForm):
     class Meta:
         model = CustomerAddress
+        formfield_callback = refdata.formfield
         fields = [
             'branch_category', 'address', 'state', 'country', 'pincode',
             'location', 'google_location', 'telephone', 'email', 'gst_number', 'is_primary', 'is_active'
@@ -151,21 +154,22 @@ class CustomerBankDetailsForm(forms.ModelForm):
         return account_number
 
 class CustomerDivisionForm(forms.Form):
-    divisions = forms.ModelMultipleChoiceField(
-        queryset=DivisionMaster.objects.filter(is_active=True),
+    divisions = refdata.RefDataMultipleChoiceField(
+        'division',
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
         required=False
     )
 
 class CustomerConcernPersonForm(forms.ModelForm):
-    concern_for = forms.ModelMultipleChoiceField(
-        queryset=ConcernCategory.objects.filter(is_active=True),
+    concern_for = refdata.RefDataMultipleChoiceField(
+        'concern_category',
         widget=forms.CheckboxSelectMultiple(attrs={'class': 'form-check-input'}),
         required=False
     )
     
     class Meta:
         model = CustomerConcernPerson
+        formfield_callback = refdata.formfield
         fields = [
             'customer', 'branch_category', 'address', 'concern_person', 'designation',
             'concern_for', 'country_1', 'mobile_1', 'country_2', 'mobile_2',
@@ -258,8 +262,8 @@ class CustomerSearchForm(forms.Form):
         'class': 'form-control',
         'placeholder': 'PAN Number'
     }))
-    organization_type = forms.ModelChoiceField(
-        queryset=TypeOfOrganization.objects.filter(is_active=True),
+    organization_type = refdata.RefDataChoiceField(
+        'organization_type',
         required=False,
         widget=forms.Select(attrs={'class': 'form-select'})
     )
@@ -276,7 +280,7 @@ class CustomerDocumentForm(forms.ModelForm):
         widgets = {
             'document_type': forms.Select(attrs={'class': 'form-select'}),
             'document_name': forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Enter document name'}),
-            'document_file': forms.FileInput(attrs={'class': 'form-control'}),
+            'document_file': forms.FileInput(attrs={'class': 'form-control', 'data-chunked-upload': ''}),
             'remarks': forms.Textarea(attrs={'class': 'form-control', 'rows': 2, 'placeholder': 'Enter any remarks'}),
         }
 
@@ -0,0 +1,244 @@
+# CMS/imports.py
+#
+# Bulk customer import (settings.IMPORTERS['customers'], see Masters/imports.py).
+# One spreadsheet row is a customer with its primary address, bank account,
+# concern person and divisions. Per chunk the importer runs a fixed number of
+# queries however many rows it holds: states, countries, organization types
+# and divisions are resolved from lookup maps built once, PAN numbers and
+# names are checked against the table with one query each, customer ids are
+# allocated as one block and every table is filled with bulk_create.
+
+import re
+from decimal import Decimal
+
+
+from Masters.imports import (
+    EMAIL_RE, GST_RE, MOBILE_RE, PAN_RE, BaseImporter, ImportAbort, cell, cell_text, lookup,
+)
+from Masters.models import import_batch
+from Search.index import update_index
+
+from .models import (
+    CountryMaster, CustomerAddress, CustomerBankDetails, CustomerConcernPerson, CustomerDivision,
+    CustomerMaster, DivisionMaster, StateUTMaster, TypeOfOrganization,
+)
+
+TAN_RE = r'[A-Z]{4}\d{5}[A-Z]'
+CIN_RE = r'[A-Z]\d{5}[A-Z]{2}\d{4}[A-Z]{3}\d{6}'
+IFSC_RE = r'[A-Z]{4}0[A-Z0-9]{6}'
+PINCODE_RE = r'\d{6}'
+
+CUSTOMER_COLUMNS = (
+    'name', 'organization_type', 'pan_number', 'date_of_establishment', 'msme_udyam_reg_no',
+    'tan_number', 'cin_number', 'ie_code', 'billing_currency', 'payment_terms', 'credit_limit',
+    'website', 'billing_contact_person', 'billing_contact_email', 'billing_contact_phone',
+)
+ADDRESS_COLUMNS = (
+    'branch_category', 'address', 'state', 'country', 'pincode', 'location', 'gst_number',
+    'telephone', 'email',
+)
+BANK_COLUMNS = ('bank_name', 'account_number', 'account_holder_name', 'bank_branch', 'ifsc_code', 'account_type')
+CONCERN_COLUMNS = ('concern_person', 'designation', 'mobile', 'concern_email')
+
+# Sheet column -> the CharField it is written to. bulk_create skips field
+# validation, so every one is length-checked against its model field.
+TEXT_FIELDS = {
+    'name': (CustomerMaster, 'name'),
+    'pan_number': (CustomerMaster, 'pan_number'),
+    'msme_udyam_reg_no': (CustomerMaster, 'msme_udyam_reg_no'),
+    'tan_number': (CustomerMaster, 'tan_number'),
+    'cin_number': (CustomerMaster, 'cin_number'),
+    'ie_code': (CustomerMaster, 'ie_code'),
+    'website': (CustomerMaster, 'website'),
+    'billing_contact_person': (CustomerMaster, 'billing_contact_person'),
+    'billing_contact_email': (CustomerMaster, 'billing_contact_email'),
+    'billing_contact_phone': (CustomerMaster, 'billing_contact_phone'),
+    'pincode': (CustomerAddress, 'pincode'),
+    'location': (CustomerAddress, 'location'),
+    'gst_number': (CustomerAddress, 'gst_number'),
+    'telephone': (CustomerAddress, 'telephone'),
+    'email': (CustomerAddress, 'email'),
+    'bank_name': (CustomerBankDetails, 'bank_name'),
+    'account_number': (CustomerBankDetails, 'account_number'),
+    'account_holder_name': (CustomerBankDetails, 'account_holder_name'),
+    'bank_branch': (CustomerBankDetails, 'branch_name'),
+    'ifsc_code': (CustomerBankDetails, 'ifsc_code'),
+    'concern_person': (CustomerConcernPerson, 'concern_person'),
+    'designation': (CustomerConcernPerson, 'designation'),
+    'mobile': (CustomerConcernPerson, 'mobile_1'),
+    'concern_email': (CustomerConcernPerson, 'email_company'),
+}
+
+
+class CustomerImporter(BaseImporter):
+    title = "Customers"
+    columns = CUSTOMER_COLUMNS + ADDRESS_COLUMNS + BANK_COLUMNS + CONCERN_COLUMNS + ('divisions',)
+
+    def __init__(self, batch):
+        super().__init__(batch)
+        if batch.created_by_id is None:
+            raise ImportAbort("Customer imports need a user (run_imports --user).")
+        self.user = batch.created_by_id
+        self.pans, self.names = set(), set()
+
+    def prepare(self, columns):
+        self.org_types = lookup(TypeOfOrganization.objects.filter(is_active=True), 'name')
+        self.org_type_names = dict(TypeOfOrganization.objects.values_list('pk', 'name'))
+        self.states = lookup(StateUTMaster.objects.filter(is_active=True), 'name', 'code')
+        self.countries = lookup(CountryMaster.objects.filter(is_active=True), 'name', 'code')
+        self.divisions = lookup(DivisionMaster.objects.filter(is_active=True), 'name')
+        self.branch_categories = {key.upper(): key for key, _ in CustomerAddress.BRANCH_CATEGORIES}
+        self.branch_categories.update({label.upper(): key for key, label in CustomerAddress.BRANCH_CATEGORIES})
+        self.account_types = {key.upper(): key for key, _ in CustomerBankDetails.ACCOUNT_TYPES}
+        self.account_types.update({label.upper(): key for key, label in CustomerBankDetails.ACCOUNT_TYPES})
+
+    def validate(self, frame, checks):
+        for column, (model, field) in TEXT_FIELDS.items():
+            checks.max_length(column, model._meta.get_field(field).max_length)
+        # display_name is the name followed by the organization type.
+        room = CustomerMaster._meta.get_field('display_name').max_length
+        org_type = checks.text('organization_type').str.upper().map(
+            lambda v: len(self.org_type_names.get(self.org_types.get(v), '')))
+        checks.fail(checks.frame['name'].map(cell_text).str.len() + 1 + org_type > room, 'name',
+                    f"Name and organization type together must be at most {room} characters")
+        checks.required('name', 'organization_type', 'pan_number')
+        checks.exists('organization_type', self.org_types)
+        checks.matches('pan_number', PAN_RE, "Invalid PAN format", upper=True)
+        checks.unique('pan_number', self.pans)
+        checks.unique('name', self.names)
+        self._taken(checks, 'pan_number', "A customer with this PAN number already exists")
+        self._taken(checks, 'name', "A customer with this name already exists")
+        frame['date_of_establishment'] = checks.dates('date_of_establishment')
+        checks.matches('tan_number', TAN_RE, "Invalid TAN format", upper=True)
+        checks.matches('cin_number', CIN_RE, "Invalid CIN format", upper=True)
+        checks.one_of('billing_currency', [key for key, _ in CustomerMaster.CURRENCY_CHOICES])
+        checks.one_of('payment_terms', [key for key, _ in CustomerMaster.PAYMENT_TERMS])
+        frame['credit_limit'] = checks.decimals('credit_limit')
+        checks.matches('billing_contact_email', EMAIL_RE, "Invalid email")
+
+        # A child record is imported when any of its columns is filled in.
+        has_address = checks.filled(*ADDRESS_COLUMNS)
+        checks.required_with(has_address, ('branch_category', 'address', 'state', 'country', 'pincode', 'location'),
+                             "Required for the address")
+        checks.exists('branch_category', self.branch_categories)
+        checks.exists('state', self.states)
+        checks.exists('country', self.countries)
+        checks.matches('pincode', PINCODE_RE, "Pincode must be 6 digits")
+        checks.matches('gst_number', GST_RE, "Invalid GST format", upper=True)
+        checks.matches('email', EMAIL_RE, "Invalid email")
+
+        checks.required_with(checks.filled(*BANK_COLUMNS), ('bank_name', 'account_number', 'bank_branch', 'ifsc_code'),
+                             "Required for the bank account")
+        checks.matches('ifsc_code', IFSC_RE, "Invalid IFSC code format", upper=True)
+        checks.exists('account_type', self.account_types)
+
+        # The concern person's mobile country is the address country.
+        checks.required_with(checks.filled(*CONCERN_COLUMNS), ('concern_person', 'mobile', 'country'),
+                             "Required for the concern person")
+        checks.matches('mobile', MOBILE_RE, "Mobile number must be 10 digits")
+        checks.matches('concern_email', EMAIL_RE, "Invalid email")
+
+        unknown = checks.text('divisions').map(lambda v: any(d not in self.divisions for d in _names(v)))
+        checks.fail(unknown, 'divisions', "Unknown division")
+
+    def _taken(self, checks, column, message):
+        """One query for the whole chunk instead of one per row."""
+        text = checks.text(column)
+        values = text.str.upper()
+        present = {v for v in [*text.unique(), *values.unique()] if v}
+        taken = CustomerMaster.objects.filter(**{f'{column}__in': present}).values_list(column, flat=True)
+        # Upper-cased on both sides: names compare case-insensitively in MySQL.
+        checks.fail(values.isin({v.upper() for v in taken}), column, message)
+
+    def load(self, frame):
+        records = [{k: cell(v) for k, v in record.items()} for record in frame.to_dict('records')]
+        customer_ids = CustomerMaster.allocate_customer_ids(len(records))
+
+        customers = []
+        for customer_id, row in zip(customer_ids, records):
+            org_type = self.org_types[cell_text(row['organization_type']).upper()]
+            customers.append(CustomerMaster(
+                customer_id=customer_id,
+                organization_type_id=org_type,
+                name=cell_text(row['name']),
+                display_name=f"{cell_text(row['name'])} {self.org_type_names[org_type]}".strip(),
+                date_of_establishment=row['date_of_establishment'],
+                pan_number=cell_text(row['pan_number']).upper(),
+                msme_udyam_reg_no=cell_text(row['msme_udyam_reg_no']),
+                tan_number=cell_text(row['tan_number']).upper(),
+                cin_number=cell_text(row['cin_number']).upper(),
+                ie_code=cell_text(row['ie_code']),
+                billing_currency=row['billing_currency'] or 'INR',
+                payment_terms=row['payment_terms'] or 'net_30',
+                credit_limit=row['credit_limit'] or Decimal('0.00'),
+                website=cell_text(row['website']),
+                billing_contact_person=cell_text(row['billing_contact_person']),
+                billing_contact_email=cell_text(row['billing_contact_email']),
+                billing_contact_phone=cell_text(row['billing_contact_phone']),
+                created_by_id=self.user,
+            ))
+        CustomerMaster.objects.bulk_create(customers, batch_size=1000)
+        # MySQL does not return the new primary keys from a multi-row INSERT.
+        pks = dict(CustomerMaster.objects.filter(customer_id__in=customer_ids).values_list('customer_id', 'pk'))
+
+        addresses, banks, concerns, divisions = [], [], [], []
+        for customer_id, row in zip(customer_ids, records):
+            customer = pks[customer_id]
+            category = self.branch_categories.get(cell_text(row['branch_category']).upper(), '')
+            if row['address']:
+                addresses.append(CustomerAddress(
+                    customer_id=customer,
+                    branch_category=category,
+                    branch_id=f"{category[:3].upper()}001",
+                    address=cell_text(row['address']),
+                    state_id=self.states[cell_text(row['state']).upper()],
+                    country_id=self.countries[cell_text(row['country']).upper()],
+                    pincode=cell_text(row['pincode']),
+                    location=cell_text(row['location']),
+                    gst_number=cell_text(row['gst_number']).upper(),
+                    telephone=cell_text(row['telephone']),
+                    email=cell_text(row['email']),
+                    is_primary=True,
+                ))
+            if row['account_number']:
+                banks.append(CustomerBankDetails(
+                    customer_id=customer,
+                    bank_name=cell_text(row['bank_name']),
+                    account_number=cell_text(row['account_number']),
+                    account_holder_name=cell_text(row['account_holder_name']) or cell_text(row['name']),
+                    branch_name=cell_text(row['bank_branch']),
+                    ifsc_code=cell_text(row['ifsc_code']).upper(),
+                    account_type=self.account_types.get(cell_text(row['account_type']).upper(), 'current'),
+                    is_primary=True,
+                ))
+            if row['concern_person']:
+                concerns.append(CustomerConcernPerson(
+                    customer_id=customer,
+                    branch_category=category,
+                    concern_person=cell_text(row['concern_person']),
+                    designation=cell_text(row['designation']),
+                    country_1_id=self.countries[cell_text(row['country']).upper()],
+                    mobile_1=cell_text(row['mobile']),
+                    email_company=cell_text(row['concern_email']),
+                    is_primary_contact=True,
+                    created_by_id=self.user,
+                ))
+            for name in dict.fromkeys(_names(cell_text(row['divisions']))):
+                divisions.append(CustomerDivision(customer_id=customer, division_id=self.divisions[name],
+                                                  assigned_by_id=self.user))
+
+        CustomerAddress.objects.bulk_create(addresses, batch_size=1000)
+        CustomerBankDetails.objects.bulk_create(banks, batch_size=1000)
+        CustomerConcernPerson.objects.bulk_create(concerns, batch_size=1000)
+        CustomerDivision.objects.bulk_create(divisions, batch_size=1000)
+        update_index(CustomerMaster, pks.values())
+        return len(customers)
+
+    def finish(self):
+        inserted = import_batch.objects.values_list('inserted_rows', flat=True).get(pk=self.batch.pk)
+        return f"{inserted} customers imported."
+
+
+def _names(value):
+    """Comma- or semicolon-separated division names, upper-cased."""
+    return [n.strip().upper() for n in re.split(r'[,;]', value or '') if n.strip()]
@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:45
+
+import DMS.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CMS', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerdocument',
+            name='document_file',
+            field=models.FileField(storage=DMS.storage.document_storage, upload_to='customer_documents/%Y/%m/'),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CMS', '0002_alter_customerdocument_document_file'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='customerconcernperson',
+            index=models.Index(fields=['customer', 'is_primary_contact'], name='cms_concern_primary_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customermaster',
+            index=models.Index(fields=['status', 'name'], name='cms_customer_status_name_idx'),
+        ),
+    ]
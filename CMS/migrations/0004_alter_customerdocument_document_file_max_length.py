@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:05
+
+import DMS.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('CMS', '0003_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='customerdocument',
+            name='document_file',
+            field=models.FileField(max_length=255, storage=DMS.storage.document_storage, upload_to='customer_documents/%Y/%m/'),
+        ),
+    ]
@@ -1,8 +1,12 @@
 # models.py
 from django.db import models
+from django.db.models import Count, IntegerField, Max, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce, Length
 from django.core.validators import RegexValidator, MinValueValidator
 from django.utils import timezone
 from django.contrib.auth.models import User
+from DMS.storage import document_storage
+from Masters.models import id_sequence
 
 class TypeOfOrganization(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -88,6 +92,19 @@ class ConcernCategory(models.Model):
     def __str__(self):
         return self.name
 
+class CustomerQuerySet(models.QuerySet):
+
+    def with_stats(self):
+        """Annotate concern person counts (total/active) from one correlated subquery each."""
+        persons = (CustomerConcernPerson.objects.filter(customer=OuterRef('pk'))
+                   .order_by().values('customer'))
+        return self.annotate(
+            n_concern_persons=Coalesce(Subquery(persons.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), 0),
+            n_active_concern_persons=Coalesce(Subquery(
+                persons.annotate(n=Count('pk', filter=Q(is_active=True))).values('n'), output_field=IntegerField()), 0),
+        )
+
+
 class CustomerMaster(models.Model):
     CUSTOMER_STATUS = [
         ('active', 'Active'),
@@ -153,6 +170,8 @@ class CustomerMaster(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     created_by = models.ForeignKey('Account.CustomUser', on_delete=models.PROTECT, related_name='created_customers')
+
+    objects = CustomerQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Customer"
@@ -163,14 +182,29 @@ class CustomerMaster(models.Model):
             models.Index(fields=['customer_id']),
             models.Index(fields=['pan_number']),
             models.Index(fields=['is_active']),
+            # List filtered by status, ordered by name.
+            models.Index(fields=['status', 'name'], name='cms_customer_status_name_idx'),
         ]
     
+    @classmethod
+    def allocate_customer_ids(cls, count):
+        """`count` consecutive CUST###### ids; save() and the bulk import both take theirs here."""
+        start = id_sequence.reserve('customer_id', count, cls._first_customer_number)
+        return [f"CUST{str(n).zfill(6)}" for n in range(start, start + count)]
+
+    @classmethod
+    def _first_customer_number(cls):
+        # Seeds the sequence once, above every id issued before it existed.
+        last = cls.objects.aggregate(last=Max('id'))['last'] or 0
+        last_id = (cls.objects.filter(customer_id__regex=r'^CUST[0-9]+$')
+                   .order_by(Length('customer_id').desc(), '-customer_id')
+                   .values_list('customer_id', flat=True).first())
+        return max(last, int(last_id[4:]) if last_id else 0) + 1
+
     def save(self, *args, **kwargs):
         if not self.customer_id:
             # Generate customer ID: CUST + 6 digit number
-            last_customer = CustomerMaster.objects.order_by('-id').first()
-            last_id = last_customer.id if last_customer else 0
-            self.customer_id = f"CUST{str(last_id + 1).zfill(6)}"
+            self.customer_id = self.allocate_customer_ids(1)[0]
         
         # Generate display name
         org_type_name = self.organization_type.name if self.organization_type else ""
@@ -189,12 +223,18 @@ class CustomerMaster(models.Model):
     def available_credit(self):
         return self.credit_limit - self.current_balance
     
+    # Lists annotate these with CustomerMaster.objects.with_stats(); a lone
+    # instance counts on demand.
     @property
     def total_concern_persons(self):
+        if hasattr(self, 'n_concern_persons'):
+            return self.n_concern_persons
         return self.concern_persons.count()
     
     @property
     def active_concern_persons(self):
+        if hasattr(self, 'n_active_concern_persons'):
+            return self.n_active_concern_persons
         return self.concern_persons.filter(is_active=True).count()
 
 class CustomerAddress(models.Model):
@@ -353,6 +393,7 @@ class CustomerConcernPerson(models.Model):
             models.Index(fields=['concern_person']),
             models.Index(fields=['is_active']),
             models.Index(fields=['customer', 'is_active']),
+            models.Index(fields=['customer', 'is_primary_contact'], name='cms_concern_primary_idx'),
         ]
     
     def save(self, *args, **kwargs):
@@ -390,7 +431,7 @@ class CustomerDocument(models.Model):
     customer = models.ForeignKey(CustomerMaster, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=50, choices=DOCUMENT_TYPES)
     document_name = models.CharField(max_length=255)
-    document_file = models.FileField(upload_to='customer_documents/%Y/%m/')
+    document_file = models.FileField(max_length=255, upload_to='customer_documents/%Y/%m/', storage=document_storage)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     uploaded_by = models.ForeignKey('Account.CustomUser', on_delete=models.PROTECT)
     is_verified = models.BooleanField(default=False)
@@ -1,3 +1,347 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+
+from CRLBM.pagination import FastCountPaginator, KeysetPaginator
+from Masters import imports, refdata
+from Masters.testing import workbook
+
+from .imports import CustomerImporter
+from .models import (
+    CountryMaster, CustomerAddress, CustomerBankDetails, CustomerConcernPerson, CustomerDivision,
+    CustomerMaster, DivisionMaster, StateUTMaster, TypeOfOrganization,
+)
+
+
+def pan(n):
+    return f"ABCDE{n:04d}F"
+
+
+@override_settings(IMPORT_CHUNK_ROWS=10)
+class CustomerImportTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email='importer@example.com', password='x')
+        self.org_type = TypeOfOrganization.objects.create(name='Pvt Ltd')
+        StateUTMaster.objects.create(name='Maharashtra', code='MH')
+        CountryMaster.objects.create(name='India', code='IN', currency='Rupee', currency_code='INR')
+        DivisionMaster.objects.create(name='Security')
+        DivisionMaster.objects.create(name='Facility')
+
+    def row(self, n, **values):
+        return {
+            'name': f'Customer {n}', 'organization_type': 'pvt ltd', 'pan_number': pan(n),
+            'branch_category': 'registered_office', 'address': f'{n} MG Road', 'state': 'MH', 'country': 'India',
+            'pincode': '411001', 'location': 'Pune', 'bank_name': 'HDFC', 'account_number': 5000 + n,
+            'bank_branch': 'Camp', 'ifsc_code': 'hdfc0001234', 'concern_person': 'A Person',
+            'mobile': 9800000000 + n, 'divisions': 'Security, facility', **values,
+        }
+
+    def run_batch(self, rows):
+        imports.create_batch('customers', workbook(CustomerImporter.columns, rows), self.user)
+        return imports.run_import(imports.claim())
+
+    def test_customers_are_imported_with_child_records(self):
+        CustomerMaster.objects.create(organization_type=self.org_type, name='Existing', pan_number=pan(99),
+                                      created_by=self.user)
+        rows = [self.row(n) for n in range(25)]
+        rows[3]['pan_number'] = pan(99)     # already a customer
+        rows[5]['pan_number'] = pan(4)      # duplicate in the file
+        rows[8]['state'] = 'Atlantis'
+        rows[11]['mobile'] = '12345'
+        rows[14] = {'name': 'Customer 14', 'organization_type': 'Pvt Ltd', 'pan_number': pan(14)}  # no children
+        rows[17]['divisions'] = 'Security, Unknown'
+
+        batch = self.run_batch(rows)
+
+        self.assertEqual(batch.status, 'done', batch.message)
+        self.assertEqual((batch.processed_rows, batch.inserted_rows, batch.error_rows), (25, 20, 5))
+        self.assertEqual(
+            list(batch.errors.values_list('row_number', 'column_name', 'message')),
+            [(5, 'pan_number', 'A customer with this PAN number already exists'),
+             (7, 'pan_number', 'Duplicate in file'),
+             (10, 'state', 'Not found'),
+             (13, 'mobile', 'Mobile number must be 10 digits'),
+             (19, 'divisions', 'Unknown division')],
+        )
+        customer = CustomerMaster.objects.get(pan_number=pan(0))
+        self.assertEqual(customer.display_name, 'Customer 0 Pvt Ltd')
+        self.assertEqual(customer.created_by, self.user)
+        address = customer.addresses.get()
+        self.assertEqual((address.branch_id, address.state.code, address.is_primary), ('REG001', 'MH', True))
+        self.assertEqual(customer.bank_details.get().ifsc_code, 'HDFC0001234')
+        self.assertEqual(customer.concern_persons.get().mobile_1, '9800000000')
+        self.assertEqual(customer.divisions.count(), 2)
+        self.assertFalse(CustomerMaster.objects.get(pan_number=pan(14)).addresses.exists())
+        self.assertEqual(
+            (CustomerAddress.objects.count(), CustomerBankDetails.objects.count(),
+             CustomerConcernPerson.objects.count(), CustomerDivision.objects.count()),
+            (19, 19, 19, 38),
+        )
+        # One block per chunk, above the customer created through the form.
+        ids = sorted(CustomerMaster.objects.exclude(name='Existing').values_list('customer_id', flat=True))
+        self.assertEqual(ids, [f"CUST{n:06d}" for n in range(2, 22)])
+
+    def test_over_long_cells_are_row_errors(self):
+        rows = [self.row(n) for n in range(3)]
+        rows[1]['ie_code'] = 'IE' * 6
+        rows[2]['website'] = 'https://example.com/' + 'a' * 200
+        batch = self.run_batch(rows)
+        self.assertEqual(batch.status, 'done', batch.message)
+        self.assertEqual((batch.inserted_rows, batch.error_rows), (1, 2))
+        self.assertEqual(list(batch.errors.values_list('row_number', 'column_name', 'message')),
+                         [(3, 'ie_code', 'At most 10 characters'), (4, 'website', 'At most 200 characters')])
+
+    def test_queries_do_not_grow_with_the_chunk(self):
+        counts = []
+        for size, offset in ((5, 0), (10, 100)):
+            importer = CustomerImporter(imports.create_batch(
+                'customers', workbook(CustomerImporter.columns, [self.row(n) for n in range(offset, offset + size)]), self.user))
+            importer.prepare(CustomerImporter.columns)
+            frame = next(imports.read_chunks(importer.batch.file.open('rb'), 100)[2])
+            checks = imports.Checks(frame)
+            with CaptureQueriesContext(connection) as queries:
+                importer.validate(frame, checks)
+                importer.load(checks.valid())
+            # The search index insert is split every BATCH_SIZE postings.
+            index_insert = f"INSERT INTO {connection.ops.quote_name('search_gram')}"
+            counts.append(len([q for q in queries if not q['sql'].startswith(index_insert)]))
+        self.assertEqual(counts[0], counts[1])
+        self.assertEqual(CustomerMaster.objects.count(), 15)
+
+    def test_import_needs_a_user(self):
+        imports.create_batch('customers', workbook(CustomerImporter.columns, [self.row(1)]), None)
+        batch = imports.run_import(imports.claim())
+        self.assertEqual(batch.status, 'failed')
+        self.assertFalse(CustomerMaster.objects.exists())
+
+    def test_form_saves_continue_after_an_imported_block(self):
+        CustomerMaster.objects.create(organization_type=self.org_type, name='Seeded', pan_number=pan(90),
+                                      customer_id='CUST000040', created_by=self.user)
+        self.assertEqual(self.run_batch([self.row(1), self.row(2)]).status, 'done')
+        self.assertEqual(sorted(CustomerMaster.objects.exclude(name='Seeded').values_list('customer_id', flat=True)),
+                         ['CUST000041', 'CUST000042'])
+        customer = CustomerMaster.objects.create(organization_type=self.org_type, name='From the form',
+                                                 pan_number=pan(91), created_by=self.user)
+        self.assertEqual(customer.customer_id, 'CUST000043')
+
+    def test_template_has_the_importer_columns(self):
+        import openpyxl
+        self.client.force_login(self.user)
+        response = self.client.get('/cms/customers/import-template/')
+        sheet = openpyxl.load_workbook(BytesIO(response.content)).active
+        header = [imports.normalize_header(cell.value) for cell in sheet[1]]
+        self.assertEqual(header, list(CustomerImporter.columns))
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class CustomerExportTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='export@example.com', password='x')
+        org_type = TypeOfOrganization.objects.create(name='Pvt Ltd')
+        for n, name in enumerate(['Bharat Forge', 'Forge Works', 'Tata Motors', 'Forgeline', 'Kalyani']):
+            CustomerMaster.objects.create(organization_type=org_type, name=name, pan_number=pan(n),
+                                          status='inactive' if n == 3 else 'active', created_by=self.user)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def test_csv_applies_the_list_filters(self):
+        response = self.client.get('/cms/export/customers/csv/', {'name': 'forge', 'status': 'active'})
+        self.assertTrue(response.streaming)
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], 'Customer ID,Name,Organization Type,PAN,Status,Credit Limit,Created Date')
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['Forge Works', 'Bharat Forge'])
+        self.assertEqual(lines[1].split(',')[2:5], ['Pvt Ltd', pan(1), 'Active'])
+
+    async def test_asgi_response_is_streamed(self):
+        response = await self.async_client.get('/cms/export/customers/csv/')
+        # An async iterator: Django would collect a sync one into a list first.
+        self.assertTrue(response.is_async)
+        blocks = [block async for block in response.streaming_content]
+        self.assertEqual(len(blocks), 4)  # header and 2 rows, 2 rows, 1 row, (empty) tail
+        self.assertEqual(len(b''.join(blocks).decode().splitlines()), 6)
+
+    def test_xlsx(self):
+        import openpyxl
+        response = self.client.get('/cms/export/customers/csv/', {'format': 'xlsx'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="customers.xlsx"')
+        sheet = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content))).active
+        rows = list(sheet.values)
+        self.assertEqual(rows[0][:2], ('Customer ID', 'Name'))
+        self.assertEqual([row[1] for row in rows[1:]], ['Kalyani', 'Forgeline', 'Tata Motors', 'Forge Works', 'Bharat Forge'])
+        self.assertEqual(rows[2][4], 'Inactive')
+
+
+@override_settings(PAGINATION_COUNT_CAP=5, PAGINATION_DEEP_OFFSET=1000)
+class FastCountPaginatorTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        user = get_user_model().objects.create_user(email='pages@example.com', password='x')
+        org_type = TypeOfOrganization.objects.create(name='Pvt Ltd')
+        CustomerMaster.objects.bulk_create([
+            CustomerMaster(organization_type=org_type, name=f'Customer {n:02d}', pan_number=pan(n),
+                           customer_id=f'CUST{n:06d}', created_by=user)
+            for n in range(12)
+        ])
+        self.customers = CustomerMaster.objects.order_by('name')
+
+    def names(self, page):
+        return [c.name for c in page]
+
+    def test_small_lists_are_counted_exactly(self):
+        paginator = FastCountPaginator(self.customers.filter(name__lt='Customer 04'), 3)
+        self.assertEqual((paginator.count, paginator.count_is_exact, paginator.num_pages), (4, True, 2))
+        page = paginator.page(2)
+        self.assertEqual((self.names(page), page.has_next(), page.start_index(), page.end_index()),
+                         (['Customer 03'], False, 4, 4))
+
+    def test_counts_are_capped_and_later_pages_stay_reachable(self):
+        paginator = FastCountPaginator(self.customers, 2)
+        self.assertEqual((paginator.count, paginator.count_is_exact, paginator.num_pages), (5, False, 3))
+        page = paginator.page(5)
+        self.assertEqual((self.names(page), page.has_next()), (['Customer 08', 'Customer 09'], True))
+        self.assertEqual(paginator.num_pages, 6)
+        last = paginator.page(6)
+        self.assertEqual((self.names(last), last.has_next()), (['Customer 10', 'Customer 11'], False))
+        self.assertEqual(paginator.get_page(50).number, 6)
+
+    def test_counts_are_cached(self):
+        FastCountPaginator(self.customers, 2).count
+        with self.assertNumQueries(0):
+            FastCountPaginator(self.customers.all(), 2).count
+
+    def test_deep_pages_are_read_by_key(self):
+        expected = self.names(FastCountPaginator(self.customers, 4).page(3))
+        with override_settings(PAGINATION_DEEP_OFFSET=0), CaptureQueriesContext(connection) as queries:
+            page = FastCountPaginator(self.customers, 4).page(3)
+        self.assertEqual(self.names(page), expected)
+        self.assertIn('OFFSET 8', queries[0]['sql'])
+        self.assertNotIn('"name"', queries[0]['sql'].split('FROM')[0])
+
+    def test_list_view(self):
+        self.client.force_login(get_user_model().objects.get())
+        response = self.client.get('/cms/customers/', {'page': 3})
+        self.assertEqual(response.status_code, 200)
+        page = response.context['page_obj']
+        self.assertEqual((page.number, len(page), page.has_next()), (1, 12, False))
+
+
+class KeysetPaginatorTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(email='keyset@example.com', password='x')
+        org_type = TypeOfOrganization.objects.create(name='Pvt Ltd')
+        # Repeated names: the primary key breaks the ties.
+        CustomerMaster.objects.bulk_create([
+            CustomerMaster(organization_type=org_type, name=f'Customer {n // 2:02d}', pan_number=pan(n),
+                           customer_id=f'CUST{n:06d}', created_by=self.user)
+            for n in range(11)
+        ])
+        self.customers = CustomerMaster.objects.all()
+        self.expected = list(self.customers.order_by('name', 'pk').values_list('pk', flat=True))
+
+    def pks(self, page):
+        return [c.pk for c in page]
+
+    def test_cursors_walk_the_list_both_ways(self):
+        paginator = KeysetPaginator(self.customers, 4)
+        page = paginator.get_page()
+        forward = [self.pks(page)]
+        while page.has_next():
+            with CaptureQueriesContext(connection) as queries:
+                page = paginator.get_page(cursor=page.next_cursor)
+            self.assertNotIn('OFFSET', queries[0]['sql'])
+            forward.append(self.pks(page))
+        self.assertEqual(sum(forward, []), self.expected)
+        self.assertEqual(page.number, 3)
+        self.assertIsNone(page.next_cursor)
+
+        backward = [self.pks(page)]
+        while page.has_previous():
+            page = paginator.get_page(cursor=page.previous_cursor)
+            backward.append(self.pks(page))
+        self.assertEqual(backward, forward[::-1])
+        self.assertEqual(page.number, 1)
+
+    def test_numbered_pages_carry_cursors(self):
+        paginator = KeysetPaginator(self.customers, 4)
+        page = paginator.get_page(2)
+        self.assertEqual(self.pks(paginator.get_page(cursor=page.next_cursor)), self.expected[8:])
+        self.assertEqual(self.pks(paginator.get_page(cursor=page.previous_cursor)), self.expected[:4])
+
+    def test_bad_cursor_shows_the_first_page(self):
+        paginator = KeysetPaginator(self.customers, 4)
+        self.assertEqual(paginator.get_page(cursor='tampered').number, 1)
+
+    def test_api(self):
+        org_type = TypeOfOrganization.objects.get()
+        CustomerMaster.objects.bulk_create([
+            CustomerMaster(organization_type=org_type, name=f'Customer {n:02d}', pan_number=pan(n),
+                           customer_id=f'CUST{n:06d}', created_by=self.user)
+            for n in range(11, 31)
+        ])
+        self.expected = list(self.customers.order_by('name', 'pk').values_list('pk', flat=True))
+        self.client.force_login(self.user)
+        first = self.client.get('/cms/api/customers/', {'status': 'active'}).json()
+        self.assertEqual(first['count'], 31)
+        second = self.client.get('/cms/api/customers/', {'status': 'active', 'cursor': first['next']}).json()
+        self.assertEqual([c['id'] for c in first['results'] + second['results']], self.expected)
+        self.assertIsNone(second['next'])
+        self.assertEqual(second['page'], 2)
+
+
+class CustomerStatsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(cache.clear)
+        self.user = get_user_model().objects.create_user(email='stats@example.com', password='x')
+        self.org_type = TypeOfOrganization.objects.create(name='Pvt Ltd')
+        self.india = CountryMaster.objects.create(name='India', code='IN', currency='Rupee', currency_code='INR')
+
+    def customers(self, first, last):
+        for n in range(first, last):
+            customer = CustomerMaster.objects.create(organization_type=self.org_type, name=f'Customer {n:02d}',
+                                                     pan_number=pan(n), created_by=self.user)
+            CustomerConcernPerson.objects.bulk_create([
+                CustomerConcernPerson(customer=customer, concern_person=f'Person {i}', country_1=self.india,
+                                      mobile_1='9876543210', is_active=i % 2 == 0, created_by=self.user)
+                for i in range(n % 4)
+            ])
+
+    def test_with_stats_matches_the_properties(self):
+        self.customers(0, 4)
+        for customer in CustomerMaster.objects.with_stats():
+            fresh = CustomerMaster.objects.get(pk=customer.pk)
+            self.assertEqual(customer.total_concern_persons, fresh.total_concern_persons)
+            self.assertEqual(customer.active_concern_persons, fresh.active_concern_persons)
+        self.assertEqual(CustomerMaster.objects.with_stats().get(name='Customer 03').active_concern_persons, 2)
+
+    def test_list_queries_do_not_grow_with_rows(self):
+        self.client.force_login(self.user)
+        self.customers(0, 3)
+        refdata.snapshot()  # loaded once per process, not per request
+        with CaptureQueriesContext(connection) as few:
+            self.assertEqual(self.client.get('/cms/customers/').status_code, 200)
+        self.customers(3, 12)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many:
+            response = self.client.get('/cms/customers/')
+        self.assertContains(response, '2/3')
+        self.assertEqual(len(many), len(few))
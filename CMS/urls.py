@@ -14,6 +14,8 @@ urlpatterns = [
     path('customers/<int:pk>/', views.customer_detail_view, name='customer_detail'),
     path('customers/<int:pk>/update/', views.customer_update_view, name='customer_update'),
     path('customers/<int:pk>/toggle-status/', views.customer_toggle_status, name='customer_toggle_status'),
+    path('customers/import-template/', views.customer_import_template, name='customer_import_template'),
+    path('api/customers/', views.customer_list_api, name='customer_list_api'),
     
     # Customer Address URLs
     path('customers/<int:customer_pk>/add-address/', views.add_customer_address, name='add_customer_address'),
@@ -3,7 +3,16 @@ from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.http import JsonResponse, HttpResponse
-from django.views.decorators.http import require_http_methods
+from Account.decorators import async_login_required, async_require_http_methods
+from CRLBM.db_router import use_replica
+from CRLBM.exports import Column, as_date, choice_label, stream_export
+from CRLBM.pagination import KeysetPaginator, page_json
+from DMS.pipeline import attach_document_text
+from DMS.uploads import claim_upload, use_chunked_upload
+from Masters import refdata
+from Search.index import search_filter
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from django.db.models import Q, Count, Sum, F, Avg
 from django.db.models.functions import TruncMonth, TruncYear, ExtractWeek
 from django.core.paginator import Paginator
@@ -14,6 +23,7 @@ from .models import *
 from .forms import *
 
 @login_required
+@use_replica
 def dashboard(request):
     """Customer Management System Dashboard"""
     # Basic statistics
@@ -45,14 +55,11 @@ def dashboard(request):
     }
     return render(request, 'cms/dashboard.html', context)
 
-@login_required
-def customer_list_view(request):
-    customers = CustomerMaster.objects.all().select_related('organization_type').prefetch_related('addresses', 'concern_persons')
-    
-    # Initialize search form
+def filtered_customers(request):
+    """The customers matching the list filters in request.GET, and the bound search form."""
+    customers = CustomerMaster.objects.all()
     search_form = CustomerSearchForm(request.GET or None)
-    
-    # Apply filters
+
     if search_form.is_valid():
         name = search_form.cleaned_data.get('name')
         customer_id = search_form.cleaned_data.get('customer_id')
@@ -61,30 +68,51 @@ def customer_list_view(request):
         status = search_form.cleaned_data.get('status')
         
         if name:
-            customers = customers.filter(name__icontains=name)
+            customers = search_filter(customers, 'customers', name, fields=['name'])
         if customer_id:
-            customers = customers.filter(customer_id__icontains=customer_id)
+            customers = search_filter(customers, 'customers', customer_id, fields=['customer_id'])
         if pan_number:
-            customers = customers.filter(pan_number__icontains=pan_number)
+            customers = search_filter(customers, 'customers', pan_number, fields=['pan_number'])
         if organization_type:
             customers = customers.filter(organization_type=organization_type)
         if status:
             customers = customers.filter(status=status)
+    return customers, search_form
+
+@login_required
+def customer_list_view(request):
+    customers, search_form = filtered_customers(request)
+    customers = customers.select_related('organization_type').with_stats()
     
-    # Pagination
-    paginator = Paginator(customers, 25)  # 25 customers per page
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination: ?page= numbers or ?cursor= from the Previous/Next links
+    paginator = KeysetPaginator(customers, 25)  # 25 customers per page
+    page_obj = paginator.get_page(request.GET.get('page'), cursor=request.GET.get('cursor'))
     
     context = {
         'customers': page_obj,
         'search_form': search_form,
-        'organization_types': TypeOfOrganization.objects.filter(is_active=True),
+        'organization_types': refdata.active('organization_type'),
         'title': 'Customer Management',
         'page_obj': page_obj,
     }
     return render(request, 'cms/customer_list.html', context)
 
+@login_required
+@use_replica
+def customer_list_api(request):
+    """GET: one page of the filtered customer list as JSON, with next/previous cursors."""
+    customers, _ = filtered_customers(request)
+    paginator = KeysetPaginator(customers.select_related('organization_type'), 25)
+    page = paginator.get_page(request.GET.get('page'), cursor=request.GET.get('cursor'))
+    return page_json(page, [{
+        'id': customer.pk,
+        'customer_id': customer.customer_id,
+        'name': customer.name,
+        'organization_type': customer.organization_type.name,
+        'pan_number': customer.pan_number,
+        'status': customer.status,
+    } for customer in page])
+
 from django.forms import formset_factory, modelformset_factory
 
 @login_required
@@ -177,8 +205,8 @@ def customer_create_view(request):
         'bank_forms': bank_formset,
         'concern_forms': concern_formset,
         'division_form': division_form,
-        'states': StateUTMaster.objects.filter(is_active=True),
-        'countries': CountryMaster.objects.filter(is_active=True),
+        'states': refdata.active('state'),
+        'countries': refdata.active('country'),
         'title': 'Create New Customer',
     }
     return render(request, 'cms/customer_form.html', context)
@@ -258,8 +286,8 @@ def customer_create_view1(request):
         'bank_forms': bank_formset,
         'concern_forms': concern_formset,
         'division_form': division_form,
-        'states': StateUTMaster.objects.filter(is_active=True),
-        'countries': CountryMaster.objects.filter(is_active=True),
+        'states': refdata.active('state'),
+        'countries': refdata.active('country'),
         'title': 'Create New Customer',
     }
     return render(request, 'cms/customer_form.html', context)
@@ -389,8 +417,8 @@ def customer_update_view(request, pk):
         'concern_forms': concern_formset,
         'division_form': division_form,
         'customer': customer,
-        'states': StateUTMaster.objects.filter(is_active=True),
-        'countries': CountryMaster.objects.filter(is_active=True),
+        'states': refdata.active('state'),
+        'countries': refdata.active('country'),
         'title': f'Update {customer.name}',
     }
     return render(request, 'cms/customer_form.html', context)
@@ -541,8 +569,8 @@ def customer_update_view1(request, pk):
         'concern_forms': concern_formset,
         'division_form': division_form,
         'customer': customer,
-        'states': StateUTMaster.objects.filter(is_active=True),
-        'countries': CountryMaster.objects.filter(is_active=True),
+        'states': refdata.active('state'),
+        'countries': refdata.active('country'),
         'title': f'Update {customer.name}',
     }
     return render(request, 'cms/customer_form.html', context)
@@ -554,7 +582,11 @@ def customer_detail_view(request, pk):
     bank_details = customer.bank_details.all()
     divisions = customer.divisions.select_related('division')
     concern_persons = customer.concern_persons.select_related('country_1', 'country_2', 'address').prefetch_related('concern_for')
-    documents = customer.documents.all()
+    documents = attach_document_text(
+        customer.documents.all(), 'document_file',
+        pan_numbers=[customer.pan_number],
+        gst_numbers=[address.gst_number for address in addresses],
+    )
     notes = customer.notes.all()
     
     # Forms for inline additions
@@ -590,16 +622,16 @@ def customer_toggle_status(request, pk):
     
     return redirect('customer_detail', pk=customer.pk)
 
-@login_required
-@require_http_methods(["POST"])
-def check_customer_name(request):
+@async_login_required
+@async_require_http_methods(["POST"])
+async def check_customer_name(request):
     name = request.POST.get('name', '')
     customer_id = request.POST.get('customer_id', '')
     
     if customer_id:  # Update case
-        exists = CustomerMaster.objects.filter(name=name).exclude(pk=customer_id).exists()
+        exists = await CustomerMaster.objects.filter(name=name).exclude(pk=customer_id).aexists()
     else:  # Create case
-        exists = CustomerMaster.objects.filter(name=name).exists()
+        exists = await CustomerMaster.objects.filter(name=name).aexists()
     
     return JsonResponse({'exists': exists, 'name': name})
 
@@ -939,16 +971,25 @@ def add_customer_document(request, customer_pk):
     
     if request.method == 'POST':
         form = CustomerDocumentForm(request.POST, request.FILES)
+        # Large files arrive through the chunked upload API (DMS/uploads.py)
+        upload_id = use_chunked_upload(request, form, 'document_file')
         if form.is_valid():
             document = form.save(commit=False)
             document.customer = customer
             document.uploaded_by = request.user
-            document.save()
-            messages.success(request, 'Document uploaded successfully!')
-            
-            if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
-                return JsonResponse({'success': True, 'message': 'Document uploaded successfully!'})
-        else:
+            try:
+                with transaction.atomic():
+                    if upload_id:
+                        document.document_file.name = claim_upload(request.user, upload_id)
+                    document.save()
+            except ValidationError as e:
+                form.add_error('document_file', e)
+            else:
+                messages.success(request, 'Document uploaded successfully!')
+
+                if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+                    return JsonResponse({'success': True, 'message': 'Document uploaded successfully!'})
+        if form.errors:
             if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
                 return JsonResponse({'success': False, 'errors': form.errors})
     
@@ -1038,33 +1079,47 @@ def delete_customer_note(request, pk):
     
     return redirect('customer_detail', pk=customer_pk)
 
+@login_required
+def customer_import_template(request):
+    """Blank workbook with the columns CMS.imports.CustomerImporter reads."""
+    import openpyxl
+    from openpyxl.styles import Font
+    from .imports import CustomerImporter
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Customers'
+    sheet.append([column.replace('_', ' ').title() for column in CustomerImporter.columns])
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+        sheet.column_dimensions[cell.column_letter].width = len(str(cell.value)) + 4
+
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = 'attachment; filename="Customer Import Template.xlsx"'
+    workbook.save(response)
+    return response
+
+
 # Export and Reporting Views
+CUSTOMER_EXPORT_COLUMNS = [
+    Column('Customer ID', 'customer_id'),
+    Column('Name', 'name'),
+    Column('Organization Type', 'organization_type__name'),
+    Column('PAN', 'pan_number'),
+    Column('Status', 'status', choice_label(CustomerMaster, 'status')),
+    Column('Credit Limit', 'credit_limit'),
+    Column('Created Date', 'created_at', as_date),
+]
+
 @login_required
+@use_replica
 def export_customers_csv(request):
-    import csv
-    from django.http import HttpResponse
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="customers.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow(['Customer ID', 'Name', 'Organization Type', 'PAN', 'Status', 'Credit Limit', 'Created Date'])
-    
-    customers = CustomerMaster.objects.all().select_related('organization_type')
-    for customer in customers:
-        writer.writerow([
-            customer.customer_id,
-            customer.name,
-            customer.organization_type.name,
-            customer.pan_number,
-            customer.get_status_display(),
-            customer.credit_limit,
-            customer.created_at.strftime('%Y-%m-%d')
-        ])
-    
-    return response
+    """The filtered customer list, streamed as CSV (or XLSX with ?format=xlsx)."""
+    customers, _ = filtered_customers(request)
+    return stream_export(request, customers, CUSTOMER_EXPORT_COLUMNS, 'customers')
 
 @login_required
+@use_replica
 def customer_reports(request):
     # Basic report data
     customers_by_status = CustomerMaster.objects.values('status').annotate(
@@ -0,0 +1,18 @@
+from django.apps import AppConfig
+from django.conf import settings
+from django.contrib.staticfiles.apps import StaticFilesConfig as BaseStaticFilesConfig
+
+
+class CRLBMConfig(AppConfig):
+    name = 'CRLBM'
+    verbose_name = 'CRLBM'
+
+    def ready(self):
+        # Slow query log, when QUERY_LOG_MIN_MS is set
+        from CRLBM import querylog
+        querylog.install()
+
+
+class StaticFilesConfig(BaseStaticFilesConfig):
+    # Files collectstatic leaves out of STATIC_ROOT (see STATICFILES_EXCLUDE).
+    ignore_patterns = BaseStaticFilesConfig.ignore_patterns + list(settings.STATICFILES_EXCLUDE)
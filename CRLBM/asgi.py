@@ -3,6 +3,11 @@ ASGI config for CRLBM project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Served with gunicorn + uvicorn workers (see host-conf.txt). The AJAX
+endpoints (get_filter, get_sub_filter, get_assigned_values, crm ajax views,
+vendors api views, check_customer_name) are async views, so one worker can
+hold many of them in flight while they wait on the database.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
@@ -0,0 +1,163 @@
+# CRLBM/db_router.py
+#
+# Sends read-only workloads (report execution, dashboard counts, exports) to a
+# replica. Reads only go to the replica inside a replica_reads() block or for
+# callproc(..., read_only=True); everything else stays on 'default'.
+#
+# A user who has just written is pinned to the primary for
+# REPLICA_STICKY_SECONDS so they always read their own writes, and the primary
+# is used whenever the replica is down or lagging more than
+# REPLICA_MAX_LAG_SECONDS.
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from CRLBM.request_context import get_context
+
+logger = logging.getLogger(__name__)
+
+SESSION_WRITE_KEY = '_db_last_write'
+
+_replica_reads = ContextVar('crlbm_replica_reads', default=False)
+
+_health = {}
+_health_lock = threading.Lock()
+
+
+def replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE_ALIAS', 'replica')
+    return alias if alias in settings.DATABASES else None
+
+
+def _replica_lag(alias):
+    """Seconds the replica is behind, or None if replication is not running."""
+    connection = connections[alias]
+    with connection.cursor() as cursor:
+        if connection.vendor != 'mysql':
+            cursor.execute("SELECT 1")
+            return 0
+        cursor.execute("SHOW SLAVE STATUS")
+        row = cursor.fetchone()
+        if row is None:
+            # Not configured as a replica (e.g. a local copy): treat as current.
+            return 0
+        columns = [col[0] for col in cursor.description]
+        return dict(zip(columns, row)).get('Seconds_Behind_Master')
+
+
+def replica_healthy(alias):
+    """Cached per process for REPLICA_HEALTH_CHECK_INTERVAL seconds."""
+    now = time.monotonic()
+    interval = getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 5)
+    checked_at, healthy = _health.get(alias, (None, False))
+    if checked_at is not None and now - checked_at < interval:
+        return healthy
+    with _health_lock:
+        try:
+            lag = _replica_lag(alias)
+            healthy = lag is not None and lag <= getattr(settings, 'REPLICA_MAX_LAG_SECONDS', 10)
+            if not healthy:
+                logger.warning("Replica %s lagging (%s s), reading from primary", alias, lag)
+        except Exception as e:
+            healthy = False
+            logger.warning("Replica %s unavailable, reading from primary: %s", alias, e)
+        _health[alias] = (now, healthy)
+    return healthy
+
+
+def recently_wrote(request):
+    if request is None or not hasattr(request, 'session'):
+        return False
+    last_write = request.session.get(SESSION_WRITE_KEY)
+    return last_write is not None and time.time() - last_write < settings.REPLICA_STICKY_SECONDS
+
+
+def mark_write(request):
+    """Pin the user to the primary for the stickiness window."""
+    if hasattr(request, 'session'):
+        request.session[SESSION_WRITE_KEY] = time.time()
+
+
+def read_alias():
+    """Alias a read-only workload should use right now."""
+    alias = replica_alias()
+    if alias is None:
+        return DEFAULT_DB_ALIAS
+    ctx = get_context()
+    if ctx is not None and recently_wrote(ctx.request):
+        return DEFAULT_DB_ALIAS
+    if not replica_healthy(alias):
+        return DEFAULT_DB_ALIAS
+    return alias
+
+
+@contextmanager
+def replica_reads():
+    """Route ORM reads inside the block to the replica when it is usable."""
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def use_replica(view_func):
+    """View decorator for read-only pages (dashboards, exports, reports)."""
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def _async_view(*args, **kwargs):
+            with replica_reads():
+                return await view_func(*args, **kwargs)
+        return _async_view
+
+    @wraps(view_func)
+    def _wrapped_view(*args, **kwargs):
+        with replica_reads():
+            response = view_func(*args, **kwargs)
+            # Lazy template responses query while rendering.
+            if hasattr(response, 'render') and callable(response.render):
+                response.render()
+            return response
+    return _wrapped_view
+
+
+def writes_on_get(view_func):
+    """
+    View decorator for views that write through a GET (the saved report
+    filters). ReplicaStickinessMiddleware only marks unsafe methods, so pin
+    the user to the primary here; their next read-only page sees the write.
+    """
+    @wraps(view_func)
+    def _wrapped_view(request, *args, **kwargs):
+        response = view_func(request, *args, **kwargs)
+        if response.status_code < 500 and replica_alias():
+            mark_write(request)
+        return response
+    return _wrapped_view
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Sessions, users and lockouts are request plumbing that must always
+        # be current, so they never go to the replica.
+        if _replica_reads.get() and model._meta.app_label not in settings.REPLICA_EXCLUDED_APPS:
+            return read_alias()
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Both aliases hold the same data.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
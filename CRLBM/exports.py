@@ -0,0 +1,225 @@
+# CRLBM/exports.py
+#
+# Streamed list exports. A view passes the queryset its list page shows (same
+# filters) and the columns to write; rows are read straight from
+# values_list() - no model instances - in keyset chunks of EXPORT_CHUNK_SIZE
+# and written as CSV or XLSX while the response is sent, so memory stays flat
+# whatever the row count.
+#
+# Keyset chunks rather than .iterator(): mysqlclient buffers a whole result
+# set client-side, so one big query would hold every row in memory anyway.
+#
+# The XLSX is written by hand (inline strings, no styles) into a zip stream;
+# zipfile writes to an unseekable sink with data descriptors, so each chunk of
+# rows leaves as soon as it is compressed.
+#
+# Reads are pinned to the database alias chosen while the view runs: a
+# use_replica block has ended by the time the response body is iterated.
+#
+# Under ASGI, Django 4.2 reads a sync streaming body with sync_to_async(list),
+# holding all of it in memory; streaming_response() hands it over as an async
+# iterator there instead, one block per thread hop.
+
+import csv
+import re
+import zipfile
+from collections import namedtuple
+from datetime import date, datetime
+from decimal import Decimal
+from xml.sax.saxutils import escape
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+# `format` turns the stored value into the exported one (choice labels, dates).
+Column = namedtuple('Column', 'header field format', defaults=(None,))
+
+CSV_TYPE = 'text/csv'
+XLSX_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+ILLEGAL_XML_RE = re.compile(r'[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+
+def choice_label(model, field_name):
+    """Column format showing a choice field's label instead of its stored value."""
+    labels = {str(k): str(v) for k, v in model._meta.get_field(field_name).flatchoices}
+    return lambda value: labels.get(str(value), value)
+
+
+def as_date(value):
+    if isinstance(value, datetime):
+        if timezone.is_aware(value):
+            value = timezone.localtime(value)
+        value = value.date()
+    return value.strftime('%Y-%m-%d') if isinstance(value, date) else value
+
+
+def export_rows(queryset, columns, chunk_size=None):
+    """Lists of formatted values, newest first, read in keyset chunks."""
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.prefetch_related(None).order_by('-pk').values_list('pk', *[c.field for c in columns])
+    formats = [c.format for c in columns]
+    last = None
+    while True:
+        chunk = list((queryset if last is None else queryset.filter(pk__lt=last))[:chunk_size])
+        for row in chunk:
+            yield [fmt(value) if fmt and value is not None else value for fmt, value in zip(formats, row[1:])]
+        if len(chunk) < chunk_size:
+            return
+        last = chunk[-1][0]
+
+
+class _Echo:
+    def write(self, value):
+        return value
+
+
+def csv_stream(header, rows, chunk_size):
+    writer = csv.writer(_Echo())
+    buffer = [writer.writerow(header)]
+    for row in rows:
+        buffer.append(writer.writerow(['' if value is None else value for value in row]))
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    yield ''.join(buffer)
+
+
+class _Sink:
+    """Unseekable file object handing zipfile's output back to the generator."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def take(self):
+        data = b''.join(self.parts)
+        self.parts = []
+        return data
+
+
+def _column_letter(index):
+    letters = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def _xlsx_row(number, values):
+    cells = []
+    for index, value in enumerate(values):
+        if value is None or value == '':
+            continue
+        ref = f'{_column_letter(index)}{number}'
+        if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+            cells.append(f'<c r="{ref}"><v>{value}</v></c>')
+        else:
+            text = escape(ILLEGAL_XML_RE.sub('', str(value)))
+            cells.append(f'<c r="{ref}" t="inlineStr"><is><t xml:space="preserve">{text}</t></is></c>')
+    return f'<row r="{number}">{"".join(cells)}</row>'
+
+
+XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="{title}" sheetId="1" r:id="rId1"/></sheets></workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def xlsx_stream(header, rows, chunk_size, title='Sheet1'):
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+        for name, content in XLSX_PARTS.items():
+            archive.writestr(name, content.replace('{title}', escape(title[:31])))
+        with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                        b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>')
+            sheet.write(_xlsx_row(1, header).encode())
+            buffer = []
+            for number, row in enumerate(rows, start=2):
+                buffer.append(_xlsx_row(number, row))
+                if len(buffer) >= chunk_size:
+                    sheet.write(''.join(buffer).encode())
+                    buffer = []
+                    yield sink.take()
+            sheet.write(''.join(buffer).encode())
+            sheet.write(b'</sheetData></worksheet>')
+    yield sink.take()
+
+
+async def _async_blocks(blocks):
+    # thread_sensitive: every block is read on the request's one sync thread,
+    # so the chunked queries keep using the same database connection.
+    take = sync_to_async(next, thread_sensitive=True)
+    done = object()
+    while True:
+        block = await take(blocks, done)
+        if block is done:
+            return
+        yield block
+
+
+def streaming_response(request, blocks, **kwargs):
+    """StreamingHttpResponse over the iterator `blocks`, streamed under both WSGI and ASGI."""
+    if isinstance(request, ASGIRequest):
+        blocks = _async_blocks(iter(blocks))
+    return StreamingHttpResponse(blocks, **kwargs)
+
+
+def stream_export(request, queryset, columns, filename):
+    """
+    Streaming response with `queryset` as `filename`.csv, or .xlsx when the
+    request asks for ?format=xlsx.
+    """
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.using(router.db_for_read(queryset.model))
+    header = [c.header for c in columns]
+    rows = export_rows(queryset, columns, chunk_size)
+    if request.GET.get('format') == 'xlsx':
+        response = streaming_response(request, xlsx_stream(header, rows, chunk_size, title=filename),
+                                      content_type=XLSX_TYPE)
+        extension = 'xlsx'
+    else:
+        response = streaming_response(request, csv_stream(header, rows, chunk_size), content_type=CSV_TYPE)
+        extension = 'csv'
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{extension}"'
+    return response
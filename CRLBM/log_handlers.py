@@ -0,0 +1,222 @@
+# CRLBM/log_handlers.py
+#
+# Logging that stays off the request path.
+#
+# QueuedFileHandler is what LOGGING points at. It formats each record (JSON,
+# with the request id and timing RequestContextFilter stamped on it) and puts
+# it on an in-memory queue; one QueueListener thread per process writes the
+# queue out through a SharedRotatingFileHandler. A full queue drops records
+# (counted in `dropped`) instead of blocking the request.
+#
+# SharedRotatingFileHandler rotates by size and at the first write of a new
+# day and gzips what it rotates out, keeping backup_count archives. All
+# gunicorn workers append to the same file: rotation is done under an
+# exclusive lock on <file>.lock, and a process that finds the file replaced
+# under it (another worker rotated) just reopens. Workers forked after
+# logging was configured (gunicorn --preload) restart their listener thread,
+# which does not survive the fork.
+
+import datetime
+import glob
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import threading
+import weakref
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines: no cross-process lock
+    fcntl = None
+
+from CRLBM import request_context
+
+# Attributes every LogRecord has; anything else came in through `extra`.
+RESERVED_ATTRS = frozenset(vars(logging.LogRecord('', 0, '', 0, '', (), None))) | {'message', 'asctime'}
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamp the current request's id, method, path and elapsed time on the record."""
+
+    def filter(self, record):
+        ctx = request_context.get_context()
+        if ctx is not None:
+            record.request_id = ctx.request_id
+            record.elapsed_ms = round(ctx.elapsed_ms, 1)
+            request = ctx.request
+            if request is not None:
+                record.method = getattr(request, 'method', None)
+                record.path = getattr(request, 'path', None)
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, plus context and `extra` fields."""
+
+    def format(self, record):
+        data = {
+            'time': datetime.datetime.fromtimestamp(record.created).astimezone().isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'process': record.process,
+        }
+        for key, value in vars(record).items():
+            if key not in RESERVED_ATTRS and not key.startswith('_'):
+                data[key] = value
+        if record.exc_info:
+            data['exception'] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            data['exception'] = record.exc_text
+        return json.dumps(data, default=str)
+
+
+class SharedRotatingFileHandler(logging.FileHandler):
+
+    def __init__(self, filename, max_bytes=0, backup_count=30, rotate_daily=True, encoding='utf-8'):
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.rotate_daily = rotate_daily
+        self._day = None
+        super().__init__(filename, mode='a', encoding=encoding, delay=True)
+
+    def _open(self):
+        os.makedirs(os.path.dirname(self.baseFilename), exist_ok=True)
+        stream = super()._open()
+        stat = os.fstat(stream.fileno())
+        self._inode = (stat.st_dev, stat.st_ino)
+        # A file last written on an earlier day is rotated on the first write of today.
+        self._day = datetime.date.fromtimestamp(stat.st_mtime) if stat.st_size else datetime.date.today()
+        return stream
+
+    def _moved(self):
+        try:
+            stat = os.stat(self.baseFilename)
+        except FileNotFoundError:
+            return True
+        return (stat.st_dev, stat.st_ino) != self._inode
+
+    def _reopen(self):
+        if self.stream is not None:
+            self.stream.close()
+        self.stream = self._open()
+
+    def emit(self, record):
+        try:
+            if self.stream is None:
+                self.stream = self._open()
+            elif self._moved():
+                self._reopen()
+            if self._should_rotate(record):
+                self._rotate()
+        except Exception:
+            self.handleError(record)
+            return
+        super().emit(record)
+
+    def _should_rotate(self, record):
+        if self.rotate_daily and self._day != datetime.date.today():
+            return True
+        if self.max_bytes:
+            size = os.fstat(self.stream.fileno()).st_size
+            return size > 0 and size + len(record.getMessage()) + 1 > self.max_bytes
+        return False
+
+    def _rotate(self):
+        with open(self.baseFilename + '.lock', 'a') as lock:
+            if fcntl is not None:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                if self._moved():
+                    # Another process rotated first.
+                    self._reopen()
+                    return
+                rotated = self._rotated_name(self._day)
+                self.stream.close()
+                os.rename(self.baseFilename, rotated)
+                self.stream = self._open()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        # Compressed outside the lock; the uncompressed name stays reserved until then.
+        with open(rotated, 'rb') as source, gzip.open(rotated + '.gz', 'wb') as target:
+            shutil.copyfileobj(source, target)
+        os.remove(rotated)
+        self._prune()
+
+    def _rotated_name(self, day):
+        number = 1
+        while True:
+            name = f'{self.baseFilename}.{day:%Y-%m-%d}.{number}'
+            if not os.path.exists(name) and not os.path.exists(name + '.gz'):
+                return name
+            number += 1
+
+    def _prune(self):
+        archives = sorted(glob.glob(glob.escape(self.baseFilename) + '.*.gz'), key=os.path.getmtime)
+        for name in archives[:max(len(archives) - self.backup_count, 0)]:
+            try:
+                os.remove(name)
+            except FileNotFoundError:
+                pass
+
+
+class QueuedFileHandler(logging.handlers.QueueHandler):
+    """
+    Queue in front of a SharedRotatingFileHandler written by a background
+    thread. Takes the SharedRotatingFileHandler arguments plus queue_size.
+    """
+
+    def __init__(self, filename, max_bytes=0, backup_count=30, rotate_daily=True, queue_size=10000):
+        self.target = SharedRotatingFileHandler(filename, max_bytes, backup_count, rotate_daily)
+        self.queue_size = queue_size
+        self.dropped = 0
+        super().__init__(queue.Queue(queue_size))
+        self._start()
+        if hasattr(os, 'register_at_fork'):
+            ref = weakref.ref(self)
+            os.register_at_fork(after_in_child=lambda: ref() and ref()._after_fork())
+
+    def _start(self):
+        self.listener = _Listener(self.queue, self.target)
+        self.listener.start()
+
+    def _after_fork(self):
+        # The listener thread is not copied into the child; the queue and the
+        # inherited file object are replaced rather than shared with the parent.
+        self.queue = queue.Queue(self.queue_size)
+        self.target.stream = None
+        self._start()
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def flush(self):
+        # Wait for what is queued so far to be written (tests, shutdown).
+        if self.listener._thread is not None:
+            written = threading.Event()
+            self.queue.put(written)
+            written.wait(5)
+        self.target.flush()
+
+    def close(self):
+        if self.listener._thread is not None:
+            self.listener.stop()
+        self.target.close()
+        super().close()
+
+
+class _Listener(logging.handlers.QueueListener):
+
+    def handle(self, record):
+        if isinstance(record, threading.Event):  # flush(): everything before it is written
+            record.set()
+        else:
+            super().handle(record)
@@ -0,0 +1,121 @@
+import gzip
+import os
+import re
+import time
+from datetime import datetime, timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from CRLBM.exports import Column, csv_stream, export_rows
+
+# <YYYY-MM>.upto-<pk>.csv.gz: the month's rows up to that primary key. A month
+# archived again (rows left by an interrupted run) gets a second file that
+# starts after the first one's pk.
+ARCHIVE_NAME_RE = re.compile(r'^(\d{4}-\d{2})\.upto-(\d+)\.csv\.gz$')
+
+
+def month_start(value):
+    return timezone.localtime(value).replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value):
+    return timezone.make_aware(datetime(value.year + value.month // 12, value.month % 12 + 1, 1))
+
+
+def archived_upto(directory, month):
+    """Highest primary key already written to an archive file of `month`, 0 if none."""
+    upto = 0
+    if os.path.isdir(directory):
+        for name in os.listdir(directory):
+            match = ARCHIVE_NAME_RE.match(name)
+            if match and match.group(1) == month:
+                upto = max(upto, int(match.group(2)))
+    return upto
+
+
+def write_archive(queryset, path):
+    """Write every column of `queryset` to `path` as gzipped CSV; returns the row count."""
+    fields = [f.attname for f in queryset.model._meta.concrete_fields]
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    written = 0
+
+    def counted(rows):
+        nonlocal written
+        for row in rows:
+            written += 1
+            yield row
+
+    partial = path + '.partial'
+    with gzip.open(partial, 'wt', encoding='utf-8', newline='') as archive:
+        for block in csv_stream(fields, counted(export_rows(queryset, [Column(f, f) for f in fields], chunk_size)),
+                                chunk_size):
+            archive.write(block)
+    # Only a complete file gets the name archived_upto() trusts.
+    os.replace(partial, path)
+    return written
+
+
+def purge(queryset, chunk_size, pause):
+    """Delete `queryset` chunk_size rows per statement; returns the row count."""
+    deleted = 0
+    while True:
+        pks = list(queryset.order_by('pk').values_list('pk', flat=True)[:chunk_size])
+        if not pks:
+            return deleted
+        deleted += queryset.model._default_manager.filter(pk__in=pks).delete()[0]
+        time.sleep(pause)
+
+
+class Command(BaseCommand):
+    help = (
+        "Apply LOG_RETENTION: write each whole month older than keep_days to "
+        "LOG_ARCHIVE_DIR/<log>/<month>.upto-<id>.csv.gz, then delete it in small chunks."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('logs', nargs='*', help="LOG_RETENTION names (default: all).")
+        parser.add_argument('--keep-days', type=int, default=None, help="Override keep_days.")
+        parser.add_argument('--no-export', action='store_true', help="Delete without writing archive files.")
+        parser.add_argument('--dry-run', action='store_true', help="Report the months without changing anything.")
+
+    def handle(self, *args, **options):
+        unknown = set(options['logs']) - set(settings.LOG_RETENTION)
+        if unknown:
+            raise CommandError(f"Unknown log(s): {', '.join(sorted(unknown))}")
+        for name in options['logs'] or settings.LOG_RETENTION:
+            config = settings.LOG_RETENTION[name]
+            keep_days = options['keep_days'] if options['keep_days'] is not None else config['keep_days']
+            self.archive(name, apps.get_model(config['model']), config['date_field'], keep_days, options)
+
+    def archive(self, name, model, date_field, keep_days, options):
+        rows = model._default_manager.all()
+        boundary = month_start(timezone.now() - timedelta(days=keep_days))
+        first = rows.filter(**{f'{date_field}__lt': boundary}).aggregate(first=Min(date_field))['first']
+        if first is None:
+            self.stdout.write(f"{name}: nothing older than {boundary:%Y-%m-%d}")
+            return
+        directory = os.path.join(settings.LOG_ARCHIVE_DIR, name)
+        month = month_start(first)
+        while month < boundary:
+            end = next_month(month)
+            label = f'{month:%Y-%m}'
+            in_month = rows.filter(**{f'{date_field}__gte': month, f'{date_field}__lt': end})
+            upto = in_month.aggregate(upto=Max('pk'))['upto']
+            month = end
+            if upto is None:
+                continue
+            in_month = in_month.filter(pk__lte=upto)
+            if options['dry_run']:
+                self.stdout.write(f"{name} {label}: {in_month.count()} rows to archive")
+                continue
+            done = archived_upto(directory, label)
+            written = 0
+            if not options['no_export'] and upto > done:
+                os.makedirs(directory, exist_ok=True)
+                written = write_archive(in_month.filter(pk__gt=done), os.path.join(directory, f'{label}.upto-{upto}.csv.gz'))
+            deleted = purge(in_month, settings.LOG_ARCHIVE_DELETE_CHUNK, settings.LOG_ARCHIVE_PAUSE_SECONDS)
+            self.stdout.write(self.style.SUCCESS(f"{name} {label}: {written} rows archived, {deleted} deleted"))
@@ -0,0 +1,238 @@
+import json
+import re
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DatabaseError, connections
+
+SPACE_RE = re.compile(r'\s+')
+IN_LIST_RE = re.compile(r'\bIN\s*\(\s*%s(?:\s*,\s*%s)*\s*\)', re.I)
+# FROM/JOIN `table` [AS] alias - backticks on MySQL, double quotes elsewhere.
+TABLE_RE = re.compile(r'\b(?:FROM|JOIN)\s+[`"](\w+)[`"](?:\s+(?:AS\s+)?[`"]?(?!ON\b|WHERE\b|INNER\b|LEFT\b|ORDER\b|GROUP\b|HAVING\b|LIMIT\b|UNION\b)(\w+)[`"]?)?', re.I)
+# LIKE is left out: Django's contains/icontains lead with a wildcard no index serves.
+PREDICATE_RE = re.compile(r'[`"](\w+)[`"]\.[`"](\w+)[`"]\s*(=|IN\b|IS\b|<=|>=|<|>|BETWEEN\b)', re.I)
+ORDER_RE = re.compile(r'[`"](\w+)[`"]\.[`"](\w+)[`"](\s+DESC)?', re.I)
+SQLITE_SCAN_RE = re.compile(r'^SCAN (\w+)(?: AS (\w+))?(?: USING (COVERING )?INDEX \w+)?')
+POSTGRES_SCAN_RE = re.compile(r'Seq Scan on (\w+)(?: (\w+))?')
+
+
+def fingerprint(sql):
+    """The statement with IN lists folded, so calls differing only in list length group together."""
+    return SPACE_RE.sub(' ', IN_LIST_RE.sub('IN (...)', sql)).strip()
+
+
+def read_log(path, min_ms=0):
+    """Statements from the slow query log, grouped by fingerprint."""
+    statements = {}
+    skipped = 0
+    try:
+        log = open(path, encoding='utf-8', errors='replace')
+    except OSError as e:
+        raise CommandError(f"Cannot read {path}: {e}")
+    with log:
+        for line in log:
+            start = line.find('{')
+            try:
+                entry = json.loads(line[start:]) if start >= 0 else None
+                sql, ms = entry['sql'], float(entry['ms'])
+            except (ValueError, KeyError, TypeError):
+                skipped += 1
+                continue
+            if ms < min_ms:
+                continue
+            key = fingerprint(sql)
+            stats = statements.get(key)
+            if stats is None:
+                stats = statements[key] = {
+                    'sql': sql, 'params': entry.get('params') or [], 'alias': entry.get('alias') or 'default',
+                    'calls': 0, 'total_ms': 0.0, 'max_ms': 0.0, 'paths': set(),
+                }
+            stats['calls'] += 1
+            stats['total_ms'] += ms
+            stats['max_ms'] = max(stats['max_ms'], ms)
+            if entry.get('path'):
+                stats['paths'].add(entry['path'])
+    return list(statements.values()), skipped
+
+
+def table_aliases(sql):
+    aliases = {}
+    for table, alias in TABLE_RE.findall(sql):
+        aliases[table] = table
+        if alias:
+            aliases[alias] = table
+    return aliases
+
+
+def explain(connection, sql, params):
+    """(scans, notes): tables read in full as (table or alias, kind, estimated rows), and other plan notes."""
+    scans, notes = [], []
+    with connection.cursor() as cursor:
+        if connection.vendor == 'mysql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            columns = [c[0].lower() for c in cursor.description]
+            for row in cursor.fetchall():
+                row = dict(zip(columns, row))
+                extra = row.get('extra') or ''
+                if row.get('type') == 'ALL':
+                    scans.append((row['table'], 'full table scan', row.get('rows')))
+                elif row.get('type') == 'index':
+                    scans.append((row['table'], 'full index scan', row.get('rows')))
+                for note in ('Using filesort', 'Using temporary'):
+                    if note in extra:
+                        notes.append(f"{row['table']}: {note.lower()}")
+        elif connection.vendor == 'sqlite':
+            cursor.execute('EXPLAIN QUERY PLAN ' + sql, params)
+            for row in cursor.fetchall():
+                detail = row[-1]
+                match = SQLITE_SCAN_RE.match(detail)
+                if match:
+                    kind = 'full index scan' if 'INDEX' in detail else 'full table scan'
+                    scans.append((match.group(2) or match.group(1), kind, None))
+                elif detail.startswith('USE TEMP B-TREE'):
+                    notes.append(detail.lower())
+        elif connection.vendor == 'postgresql':
+            cursor.execute('EXPLAIN ' + sql, params)
+            for (line,) in cursor.fetchall():
+                match = POSTGRES_SCAN_RE.search(line)
+                if match:
+                    rows = re.search(r'rows=(\d+)', line)
+                    scans.append((match.group(2) or match.group(1), 'full table scan',
+                                  int(rows.group(1)) if rows else None))
+                elif line.strip().startswith('Sort Key'):
+                    notes.append(line.strip().lower())
+        else:
+            notes.append(f'EXPLAIN is not supported on {connection.vendor}')
+    return scans, notes
+
+
+def candidate_columns(sql, aliases, table):
+    """Columns of `table` worth indexing for `sql`: equality predicates, then one range, then the sort."""
+    equality, ranges, order = [], [], []
+    for alias, column, op in PREDICATE_RE.findall(sql):
+        if aliases.get(alias) != table:
+            continue
+        op = op.upper()
+        target = equality if op in ('=', 'IN', 'IS') else ranges
+        if column not in equality and column not in target:
+            target.append(column)
+    position = sql.upper().rfind(' ORDER BY ')
+    if position >= 0:
+        for alias, column, desc in ORDER_RE.findall(sql[position:]):
+            if aliases.get(alias) == table:
+                order.append((column, bool(desc)))
+    columns = [(c, False) for c in equality]
+    if ranges:
+        columns.append((ranges[0], False))
+    elif order:
+        columns.extend(c for c in order if c[0] not in equality)
+    return columns
+
+
+def existing_index(connection, table, columns):
+    """Name of an index whose leading columns are `columns`, if there is one."""
+    names = [c for c, _ in columns]
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(cursor, table)
+    for name, info in constraints.items():
+        if (info.get('index') or info.get('primary_key') or info.get('unique')) and info['columns'][:len(names)] == names:
+            return name
+    return None
+
+
+def model_index(table, columns):
+    """'app.Model: models.Index(fields=[...])' for a table the project owns, else the raw columns."""
+    model = next((m for m in apps.get_models() if m._meta.db_table == table), None)
+    if model is None:
+        return f"{table} ({', '.join(c for c, _ in columns)})"
+    fields = {f.column: f.name for f in model._meta.concrete_fields}
+    names = [('-' if desc else '') + fields.get(column, column) for column, desc in columns]
+    return f"{model._meta.label}: models.Index(fields={names!r})"
+
+
+class Command(BaseCommand):
+    help = (
+        "Read the slow query log (QUERY_LOG_FILE), run EXPLAIN on the heaviest "
+        "statements and report full scans and missing-index candidates."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('log', nargs='?', default=None, help="Query log to read (default: QUERY_LOG_FILE).")
+        parser.add_argument('--top', type=int, default=20, help="Statements to EXPLAIN, by total time.")
+        parser.add_argument('--min-ms', type=float, default=0, help="Ignore log entries faster than this.")
+        parser.add_argument('--database', default=None, help="Run EXPLAIN here instead of the logged alias.")
+        parser.add_argument('--json', action='store_true', help="Print the report as JSON.")
+
+    def handle(self, *args, **options):
+        statements, skipped = read_log(options['log'] or settings.QUERY_LOG_FILE, options['min_ms'])
+        # EXPLAIN is only run on reads.
+        statements = [s for s in statements if s['sql'].lstrip().upper().startswith(('SELECT', 'WITH'))]
+        statements.sort(key=lambda s: s['total_ms'], reverse=True)
+        report, candidates = [], defaultdict(lambda: {'total_ms': 0.0, 'statements': 0})
+
+        for stats in statements[:options['top']]:
+            alias = options['database'] or (stats['alias'] if stats['alias'] in connections else 'default')
+            connection = connections[alias]
+            item = {
+                'sql': stats['sql'], 'calls': stats['calls'], 'total_ms': round(stats['total_ms'], 1),
+                'avg_ms': round(stats['total_ms'] / stats['calls'], 1), 'max_ms': stats['max_ms'],
+                'paths': sorted(stats['paths']), 'scans': [], 'notes': [], 'suggestions': [],
+            }
+            report.append(item)
+            try:
+                scans, item['notes'] = explain(connection, stats['sql'], stats['params'])
+            except DatabaseError as e:
+                item['notes'] = [f'EXPLAIN failed: {e}']
+                continue
+            aliases = table_aliases(stats['sql'])
+            for name, kind, rows in scans:
+                table = aliases.get(name, name)
+                item['scans'].append({'table': table, 'kind': kind, 'rows': rows})
+                columns = candidate_columns(stats['sql'], aliases, table)
+                if not columns:
+                    continue
+                index = existing_index(connection, table, columns)
+                if index:
+                    # A full index scan is usually that index being walked for the sort.
+                    if kind == 'full table scan':
+                        item['suggestions'].append(f"{table}: index {index} matches but was not used")
+                    continue
+                suggestion = model_index(table, columns)
+                item['suggestions'].append(suggestion)
+                candidates[suggestion]['total_ms'] += stats['total_ms']
+                candidates[suggestion]['statements'] += 1
+
+        if options['json']:
+            self.stdout.write(json.dumps({
+                'statements': report,
+                'candidates': [{'index': k, **v} for k, v in sorted(candidates.items(), key=lambda c: -c[1]['total_ms'])],
+                'skipped_lines': skipped,
+            }, indent=2, default=str))
+            return
+        self.write_report(report, candidates, skipped)
+
+    def write_report(self, report, candidates, skipped):
+        if not report:
+            self.stdout.write("No SELECT statements in the log.")
+        for number, item in enumerate(report, start=1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{number}  {item['calls']} calls, {item['total_ms']} ms total, "
+                f"{item['avg_ms']} ms avg, {item['max_ms']} ms max"))
+            self.stdout.write(f"  {item['sql'][:300]}{'...' if len(item['sql']) > 300 else ''}")
+            if item['paths']:
+                self.stdout.write(f"  from: {', '.join(item['paths'][:5])}")
+            for scan in item['scans']:
+                rows = f" (~{scan['rows']} rows)" if scan['rows'] is not None else ''
+                self.stdout.write(self.style.WARNING(f"  {scan['kind']}: {scan['table']}{rows}"))
+            for note in item['notes']:
+                self.stdout.write(f"  {note}")
+            for suggestion in item['suggestions']:
+                self.stdout.write(self.style.SUCCESS(f"  candidate: {suggestion}"))
+        if candidates:
+            self.stdout.write(self.style.MIGRATE_HEADING("\nMissing-index candidates, by time spent:"))
+            for suggestion, info in sorted(candidates.items(), key=lambda c: -c[1]['total_ms']):
+                self.stdout.write(f"  {info['total_ms']:.1f} ms over {info['statements']} statement(s)  {suggestion}")
+        if skipped:
+            self.stdout.write(f"\n{skipped} unreadable log line(s) skipped.")
@@ -1,35 +1,106 @@
 # your_app/middleware.py
 
-import time
+import logging
 from django.conf import settings
-from django.contrib import messages
-from django.contrib.auth import logout
-from django.shortcuts import redirect
-from django.urls import reverse
+from django.utils.deprecation import MiddlewareMixin
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 
+from CRLBM import db_router, request_context
 
-# class AutoLogoutMiddleware:
-#     def __init__(self, get_response):
-#         self.get_response = get_response
-#         self.idle_time = settings.AUTO_LOGOUT.get('IDLE_TIME', 600)
+request_logger = logging.getLogger('CRLBM.requests')
 
-#     def __call__(self, request):
-#         if not request.user.is_authenticated:
-#             return self.get_response(request)
 
-#         current_time = int(time.time())
-#         last_activity = request.session.get('last_activity', current_time)
-#         elapsed_time = current_time - last_activity
+class AutoLogoutMiddleware:
+    """
+    django_auto_logout's auto_logout (settings.AUTO_LOGOUT), usable natively
+    under ASGI: the library's middleware is sync only, which makes Django run
+    the whole chain, async views included, in a thread. Here only the session
+    check itself hops to a thread. Must come after MessageMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
 
-#         if elapsed_time > self.idle_time:
-#             logout(request)
-#             request.session.flush()
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
 
-#             if settings.AUTO_LOGOUT.get('REDIRECT_TO_LOGIN_IMMEDIATELY', True):
-#                 message = settings.AUTO_LOGOUT.get('MESSAGE', '')
-#                 if message:
-#                     messages.warning(request, message)
-#                 return redirect(f"{settings.LOGIN_URL}?next={request.path}")
+    @staticmethod
+    def _wants_check(request):
+        # Without a session cookie there is no user to log out.
+        return hasattr(settings, 'AUTO_LOGOUT') and settings.SESSION_COOKIE_NAME in request.COOKIES
 
-#         request.session['last_activity'] = current_time
-#         return self.get_response(request)
+    @staticmethod
+    def _check(request):
+        # The library module resolves the user model on import.
+        from django_auto_logout.middleware import _auto_logout
+        if not request.user.is_anonymous:
+            _auto_logout(request, settings.AUTO_LOGOUT)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if self._wants_check(request):
+            self._check(request)
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        if self._wants_check(request):
+            await sync_to_async(self._check)(request)
+        return await self.get_response(request)
+
+
+class RequestContextMiddleware:
+    """
+    Binds CRLBM.request_context for the lifetime of each request and logs one
+    line per request (status and duration) to CRLBM.requests.
+    Must come after AuthenticationMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def _bind(self, request):
+        return request_context.bind(request, request_id=request.META.get('HTTP_X_REQUEST_ID'))
+
+    def _finish(self, request, response):
+        response['X-Request-ID'] = request_context.current_request_id()
+        if request_logger.isEnabledFor(logging.INFO):
+            request_logger.info('%s %s %s', request.method, request.path, response.status_code,
+                                extra={'status': response.status_code,
+                                       'duration_ms': round(request_context.get_context().elapsed_ms, 1)})
+        return response
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self._bind(request)
+        try:
+            return self._finish(request, self.get_response(request))
+        finally:
+            request_context.reset(token)
+
+    async def __acall__(self, request):
+        token = self._bind(request)
+        try:
+            return self._finish(request, await self.get_response(request))
+        finally:
+            request_context.reset(token)
+
+
+class ReplicaStickinessMiddleware(MiddlewareMixin):
+    """
+    Remembers when a user last wrote (any unsafe method) so that
+    CRLBM.db_router keeps their reads on the primary for a short window.
+    Must come after SessionMiddleware.
+    """
+
+    def process_response(self, request, response):
+        if (request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE')
+                and response.status_code < 500 and db_router.replica_alias()):
+            db_router.mark_write(request)
+        return response
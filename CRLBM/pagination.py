@@ -0,0 +1,292 @@
+# CRLBM/pagination.py
+#
+# FastCountPaginator: a drop-in Paginator (and ListView.paginator_class) for
+# lists that have outgrown an exact COUNT(*) on every page view.
+#
+# - Counts are cached per query for PAGINATION_COUNT_CACHE_SECONDS.
+# - An unfiltered list over a big table takes the row estimate from the table
+#   statistics (MySQL information_schema.TABLES) instead of counting.
+# - Anything else is counted up to PAGINATION_COUNT_CAP rows; past that the
+#   paginator only knows "at least that many" (count_is_exact is False).
+# - Every page reads one row more than it shows, so "next" is always right
+#   and pages beyond the counted (or cached) ones stay reachable.
+# - Pages deeper than PAGINATION_DEEP_OFFSET rows read just the primary keys
+#   at the offset, which the database can walk on an index, and then fetch
+#   those rows by key, instead of building and discarding every skipped
+#   joined row.
+#
+# KeysetPaginator adds seek pagination on top: every page carries opaque
+# next/previous cursors (the signed ordering values of its last/first row and
+# the page number they lead to), and a cursor page is read with
+# WHERE (ordering) < (cursor values) ... LIMIT per_page + 1 on the matching
+# composite index, so page 10,000 costs what page 1 does. Numbered links
+# still work through the offset path. The ordering must be on non-null
+# columns of the model itself; the primary key is appended as a tie-break.
+
+import hashlib
+from datetime import date, datetime, time
+from functools import reduce
+from math import ceil
+from operator import or_
+
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, ValidationError
+from django.core.paginator import EmptyPage, InvalidPage, Page, PageNotAnInteger, Paginator
+from django.db import connections
+from django.db.models import Q, QuerySet
+from django.http import JsonResponse
+from django.utils.functional import cached_property
+from django.utils.translation import gettext_lazy as _
+
+
+def table_row_estimate(model, using):
+    """Row count from the table statistics, or None where the database keeps none."""
+    connection = connections[using]
+    if connection.vendor != 'mysql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s",
+            [model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+
+class FastPage(Page):
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+    def start_index(self):
+        return (self.number - 1) * self.paginator.per_page + 1 if self.object_list else 0
+
+    def end_index(self):
+        return (self.number - 1) * self.paginator.per_page + len(self.object_list)
+
+
+class FastCountPaginator(Paginator):
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, count_cap=None):
+        super().__init__(object_list, per_page, orphans, allow_empty_first_page)
+        self.count_cap = count_cap or settings.PAGINATION_COUNT_CAP
+        self.count_is_exact = True
+        self._last_seen_page = 1
+
+    def _is_queryset(self):
+        return isinstance(self.object_list, QuerySet)
+
+    @cached_property
+    def count(self):
+        if not self._is_queryset():
+            return super().count
+        queryset = self.object_list.order_by()
+        try:
+            sql, params = queryset.query.sql_with_params()
+        except EmptyResultSet:
+            return 0
+        key = 'pagination-count:' + hashlib.md5(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+        cached = cache.get(key)
+        if cached is None:
+            cached = self._count(queryset)
+            cache.set(key, cached, settings.PAGINATION_COUNT_CACHE_SECONDS)
+        count, self.count_is_exact = cached
+        return count
+
+    def _count(self, queryset):
+        query = queryset.query
+        if not query.where and not query.distinct and query.group_by is None and not query.is_sliced:
+            estimate = table_row_estimate(queryset.model, queryset.db)
+            if estimate is not None and estimate > self.count_cap:
+                return estimate, False
+        count = queryset[:self.count_cap + 1].count()
+        if count > self.count_cap:
+            return self.count_cap, False
+        return count, True
+
+    @property
+    def num_pages(self):
+        if not self._is_queryset():
+            return super().num_pages
+        return max(ceil(self.count / self.per_page), self._last_seen_page)
+
+    def validate_number(self, number):
+        if not self._is_queryset():
+            return super().validate_number(number)
+        # No upper bound: the count may be capped, estimated or stale, so
+        # page() finds out from the rows whether a page exists.
+        try:
+            if isinstance(number, float) and not number.is_integer():
+                raise ValueError
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(_('That page number is not an integer'))
+        if number < 1:
+            raise EmptyPage(_('That page number is less than 1'))
+        return number
+
+    def _rows(self, bottom, top):
+        queryset = self.object_list
+        if bottom < settings.PAGINATION_DEEP_OFFSET or queryset.query.distinct:
+            return list(queryset[bottom:top])
+        pks = list(queryset.values_list('pk', flat=True)[bottom:top])
+        objects = queryset.order_by().in_bulk(pks)
+        return [objects[pk] for pk in pks if pk in objects]
+
+    def page(self, number):
+        if not self._is_queryset():
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = self._rows(bottom, bottom + self.per_page + 1)
+        if not rows and number > 1:
+            raise EmptyPage(_('That page contains no results'))
+        has_more = len(rows) > self.per_page
+        self._last_seen_page = max(self._last_seen_page, number + has_more)
+        return FastPage(rows[:self.per_page], number, self, has_more)
+
+    def get_page(self, number):
+        try:
+            return super().get_page(number)
+        except EmptyPage:
+            pass
+        # Past the last row: show the last page, or the first when the count
+        # was too high (rows deleted since it was cached).
+        try:
+            return self.page(self.num_pages)
+        except EmptyPage:
+            return self.page(1)
+
+
+CURSOR_SALT = 'CRLBM.pagination.cursor'
+
+
+class KeysetPage(FastPage):
+
+    def __init__(self, object_list, number, paginator, has_more, has_previous):
+        super().__init__(object_list, number, paginator, has_more)
+        self._has_previous = has_previous
+
+    def has_previous(self):
+        return self._has_previous
+
+    @cached_property
+    def next_cursor(self):
+        if not self.has_next():
+            return None
+        return self.paginator.cursor('next', self.number + 1, self.object_list[-1])
+
+    @cached_property
+    def previous_cursor(self):
+        if not self.has_previous():
+            return None
+        return self.paginator.cursor('previous', self.number - 1, self.object_list[0])
+
+
+class KeysetPaginator(FastCountPaginator):
+    """FastCountPaginator whose pages can also be reached by cursor (get_page(cursor=...))."""
+
+    def __init__(self, object_list, per_page, orphans=0, allow_empty_first_page=True, count_cap=None):
+        query = object_list.query
+        ordering = list(query.order_by or (query.get_meta().ordering if query.default_ordering else []))
+        if not all(isinstance(name, str) for name in ordering):
+            raise ValueError("KeysetPaginator needs the list ordered by field names.")
+        if not any(name.lstrip('-') in ('pk', object_list.model._meta.pk.name) for name in ordering):
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        self.fields = [object_list.model._meta.pk if name == 'pk' else object_list.model._meta.get_field(name)
+                       for name, _descending in self.keys]
+        super().__init__(object_list.order_by(*ordering), per_page, orphans, allow_empty_first_page, count_cap)
+
+    def _values(self, obj):
+        return [getattr(obj, field.attname) for field in self.fields]
+
+    def cursor(self, direction, number, obj):
+        values = [v.isoformat() if isinstance(v, (date, datetime, time)) else v if isinstance(v, (int, float)) else str(v)
+                  for v in self._values(obj)]
+        return signing.dumps([direction, number, values], salt=CURSOR_SALT, compress=True)
+
+    def _seek(self, values, backwards):
+        """Rows after `values` in the list order (before them when backwards)."""
+        clauses = []
+        for i, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backwards else 'gt'
+            clause = Q(**{f'{name}__{lookup}': values[i]})
+            for (equal_name, _descending), value in zip(self.keys[:i], values):
+                clause &= Q(**{equal_name: value})
+            clauses.append(clause)
+        # The redundant bound on the leading column gives the database an
+        # index range to scan.
+        name, descending = self.keys[0]
+        bound = Q(**{f"{name}__{'lte' if descending != backwards else 'gte'}": values[0]})
+        return bound & reduce(or_, clauses)
+
+    def page(self, number):
+        page = super().page(number)
+        return KeysetPage(page.object_list, page.number, self, page.has_more, page.number > 1)
+
+    def cursor_page(self, cursor):
+        try:
+            direction, number, raw = signing.loads(cursor, salt=CURSOR_SALT)
+            values = [field.to_python(value) for field, value in zip(self.fields, raw)]
+        except (signing.BadSignature, ValidationError, TypeError, ValueError):
+            raise InvalidPage('Invalid cursor')
+        if len(values) != len(self.keys):
+            raise InvalidPage('Invalid cursor')
+        backwards = direction == 'previous'
+        queryset = self.object_list.filter(self._seek(values, backwards))
+        if backwards:
+            queryset = queryset.reverse()
+        rows = list(queryset[:self.per_page + 1])
+        more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        if not rows:
+            raise EmptyPage('That page contains no results')
+        if backwards:
+            rows.reverse()
+            number = max(number, 1)
+            page = KeysetPage(rows, number, self, True, more)
+        else:
+            page = KeysetPage(rows, number, self, more, True)
+        self._last_seen_page = max(self._last_seen_page, number + page.has_next())
+        return page
+
+    def get_page(self, number=None, cursor=None):
+        if cursor:
+            try:
+                return self.cursor_page(cursor)
+            except InvalidPage:
+                pass
+        return super().get_page(number)
+
+
+class KeysetPaginationMixin:
+    """ListView pagination by ?cursor= as well as ?page= (KeysetPaginator)."""
+    paginator_class = KeysetPaginator
+
+    def paginate_queryset(self, queryset, page_size):
+        cursor = self.request.GET.get('cursor')
+        if not cursor:
+            return super().paginate_queryset(queryset, page_size)
+        paginator = self.get_paginator(queryset, page_size)
+        page = paginator.get_page(1, cursor=cursor)
+        return (paginator, page, page.object_list, page.has_other_pages())
+
+
+def page_json(page, results):
+    """JSON body for one page of a list API."""
+    return JsonResponse({
+        'success': True,
+        'results': results,
+        'page': page.number,
+        'count': page.paginator.count,
+        'count_is_exact': page.paginator.count_is_exact,
+        'next': page.next_cursor,
+        'previous': page.previous_cursor,
+    })
@@ -0,0 +1,56 @@
+# CRLBM/querylog.py
+#
+# Opt-in slow query log. With QUERY_LOG_MIN_MS set, every database connection
+# gets an execute wrapper that times each statement and writes the ones that
+# took at least that long to the 'CRLBM.queries' logger, one JSON object per
+# line:
+#
+#   {"ms": 12.4, "alias": "default", "sql": "SELECT ...", "params": [...],
+#    "path": "/cms/customers/", "request_id": "..."}
+#
+# `manage.py index_advisor` reads the log back, runs EXPLAIN on the heaviest
+# statements and reports full scans and missing-index candidates.
+#
+# Parameters are logged as bound (stringified where JSON can't hold them), so
+# only enable the log where the database contents may be written to disk.
+
+import json
+import logging
+import time
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+
+from CRLBM import request_context
+
+logger = logging.getLogger('CRLBM.queries')
+
+
+def log_query(execute, sql, params, many, context):
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        ms = (time.perf_counter() - started) * 1000
+        if ms >= settings.QUERY_LOG_MIN_MS and not many and sql.lstrip()[:7].upper() != 'EXPLAIN':
+            ctx = request_context.get_context()
+            request = ctx.request if ctx is not None else None
+            logger.info(json.dumps({
+                'ms': round(ms, 2),
+                'alias': context['connection'].alias,
+                'sql': sql,
+                'params': list(params or ()),
+                'path': getattr(request, 'path', None),
+                'request_id': ctx.request_id if ctx is not None else None,
+            }, default=str))
+
+
+def _wrap(sender, connection, **kwargs):
+    if log_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(log_query)
+
+
+def install():
+    """Log slow statements from every connection opened from now on (no-op when QUERY_LOG_MIN_MS is unset)."""
+    if settings.QUERY_LOG_MIN_MS is not None:
+        connection_created.connect(_wrap, dispatch_uid='CRLBM.querylog')
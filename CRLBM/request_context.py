@@ -0,0 +1,90 @@
+# CRLBM/request_context.py
+#
+# Request-scoped state kept in contextvars instead of module globals, so that
+# views are safe under threaded (gthread) and async workers. Each thread and
+# each asyncio task sees only the request it is serving.
+
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+_current = ContextVar('crlbm_request_context', default=None)
+
+
+class RequestContext:
+    """State of the request currently being served."""
+
+    __slots__ = ('request', 'request_id', 'started_at', '_user_id', '_role_id', 'extra')
+
+    def __init__(self, request=None, user_id=None, role_id=None, request_id=None):
+        self.request = request
+        self.request_id = request_id or uuid.uuid4().hex
+        self.started_at = time.perf_counter()
+        self._user_id = user_id
+        self._role_id = role_id
+        self.extra = {}
+
+    def _user(self):
+        # request.user is resolved lazily so binding the context never
+        # forces a session lookup (which is not allowed in async code).
+        user = getattr(self.request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return user
+        return None
+
+    @property
+    def user_id(self):
+        if self._user_id is None:
+            user = self._user()
+            self._user_id = user.id if user is not None else None
+        return self._user_id
+
+    @property
+    def role_id(self):
+        if self._role_id is None:
+            user = self._user()
+            self._role_id = getattr(user, 'role_id', None) if user is not None else None
+        return self._role_id
+
+    @property
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started_at) * 1000
+
+
+def get_context():
+    return _current.get()
+
+
+def current_user_id():
+    ctx = _current.get()
+    return ctx.user_id if ctx is not None else None
+
+
+def current_role_id():
+    ctx = _current.get()
+    return ctx.role_id if ctx is not None else None
+
+
+def current_request_id():
+    ctx = _current.get()
+    return ctx.request_id if ctx is not None else None
+
+
+def bind(request=None, **kwargs):
+    """Bind a new context and return the token needed to reset it."""
+    return _current.set(RequestContext(request, **kwargs))
+
+
+def reset(token):
+    _current.reset(token)
+
+
+@contextmanager
+def request_scope(request=None, **kwargs):
+    """Bind a context for the duration of a block (commands, tests, threads)."""
+    token = bind(request, **kwargs)
+    try:
+        yield _current.get()
+    finally:
+        reset(token)
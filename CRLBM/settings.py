@@ -53,10 +53,96 @@ DATABASES = {
     },
 }
 
+# Optional read replica for reports, dashboards and exports (see CRLBM/db_router.py).
+# Set REPLICA_DB_HOST in .env to enable it; without it everything reads from 'default'.
+REPLICA_DATABASE_ALIAS = 'replica'
+if config('REPLICA_DB_HOST', default=''):
+    DATABASES[REPLICA_DATABASE_ALIAS] = {
+        **DATABASES['default'],
+        'HOST': config('REPLICA_DB_HOST'),
+        'PORT': config('REPLICA_DB_PORT', default=DATABASES['default']['PORT']),
+        'USER': config('REPLICA_DB_USER', default=DATABASES['default']['USER']),
+        'PASSWORD': config('REPLICA_DB_PASSWORD', default=DATABASES['default']['PASSWORD']),
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['CRLBM.db_router.ReplicaRouter']
+REPLICA_STICKY_SECONDS = 10  # read-your-writes window after a user writes
+REPLICA_MAX_LAG_SECONDS = 10  # fall back to the primary beyond this lag
+REPLICA_HEALTH_CHECK_INTERVAL = 5
+REPLICA_EXCLUDED_APPS = ['sessions', 'auth', 'Account', 'axes', 'contenttypes']
+
 
 # File upload settings
 MAX_UPLOAD_SIZE = 5 * 1024 * 1024  # 5MB
 ALLOWED_FILE_EXTENSIONS = ['pdf', 'jpg', 'jpeg', 'png', 'doc', 'docx']
+# Chunked, resumable uploads (DMS/uploads.py) are not held to MAX_UPLOAD_SIZE.
+CHUNKED_UPLOAD_MAX_SIZE = config('CHUNKED_UPLOAD_MAX_SIZE', default=100 * 1024 * 1024, cast=int)
+CHUNKED_UPLOAD_CHUNK_SIZE = 2 * 1024 * 1024
+CHUNKED_UPLOAD_EXPIRY_HOURS = 24  # unfinished or unclaimed uploads are removed by blob_gc
+
+# Bulk spreadsheet imports (Masters/imports.py), run by `manage.py run_imports --loop`.
+IMPORTERS = {
+    'masters': 'Masters.imports.MasterImporter',
+    'customers': 'CMS.imports.CustomerImporter',
+    'vendors': 'vendors.imports.VendorImporter',
+}
+IMPORT_CHUNK_ROWS = 5000
+IMPORT_MAX_ERRORS = 10000  # row errors kept per batch
+# Master tables MasterImporter merges into, per entity: the table and, for
+# every sample_xlsx column (normalized), the table column it is written to.
+# Entities left out cannot be imported, e.g.
+#   'em': {'table': '<employee table>', 'columns': {'employee_name': 'name', 'email_id': 'email', ...}},
+MASTER_IMPORT_TABLES = {}
+EXPORT_CHUNK_SIZE = 2000  # rows per query and per streamed block (CRLBM/exports.py)
+
+# Log retention (`manage.py archive_logs`): whole months older than keep_days
+# are written to LOG_ARCHIVE_DIR/<name>/ as gzipped CSV, then deleted
+# LOG_ARCHIVE_DELETE_CHUNK rows at a time.
+LOG_RETENTION = {
+    'error_log': {'model': 'Account.error_log', 'date_field': 'error_date', 'keep_days': 90},
+    'vendor_approval_log': {'model': 'vendors.VendorApprovalLog', 'date_field': 'performed_at', 'keep_days': 730},
+}
+LOG_ARCHIVE_DIR = config('LOG_ARCHIVE_DIR', default='/home/ubuntu/CRLBM Logs/archive')
+LOG_ARCHIVE_DELETE_CHUNK = 1000
+LOG_ARCHIVE_PAUSE_SECONDS = 0.1  # between delete chunks
+
+# List pagination (CRLBM/pagination.py).
+PAGINATION_COUNT_CAP = 10000  # rows counted exactly before showing "at least"
+PAGINATION_COUNT_CACHE_SECONDS = 60
+PAGINATION_DEEP_OFFSET = 5000  # past this offset pages are read by primary key
+
+# List searches (Search/index.py): kind -> model, {field: ranking weight} and
+# the detail URL name. A field may follow one foreign key.
+SEARCH_INDEXES = {
+    'customers': {
+        'model': 'CMS.CustomerMaster',
+        'fields': {'customer_id': 3, 'pan_number': 3, 'name': 2},
+        'url': 'cms:customer_detail',
+    },
+    'vendors': {
+        'model': 'vendors.Vendor',
+        'fields': {'vendor_code': 3, 'pan_number': 3, 'company_name': 2, 'display_name': 1},
+        'url': 'vendors:vendor_detail',
+    },
+    'enquiries': {
+        'model': 'crm.Enquiry',
+        'fields': {'enquiry_number': 3, 'customer__name': 2, 'subject': 1, 'contact_person__concern_person': 1},
+        'url': 'crm:enquiry_detail',
+    },
+    'sites': {
+        'model': 'crm.Site',
+        'fields': {'site_id': 3, 'name': 2, 'site_location': 1},
+        'url': 'crm:site_detail',
+    },
+}
+SEARCH_MAX_RESULTS = 1000  # ranked matches returned by search(); search_filter() is not capped
+
+# Topbar autocomplete over application_search (Masters/typeahead.py).
+TYPEAHEAD_LIMIT = 8
+TYPEAHEAD_CHECK_SECONDS = config('TYPEAHEAD_CHECK_SECONDS', default=2, cast=float)
+
+# Lookup tables served from memory to forms (Masters/refdata.py).
+REFDATA_CHECK_SECONDS = config('REFDATA_CHECK_SECONDS', default=2, cast=float)
 
 # http://django-crispy-forms.readthedocs.io/en/latest/install.html#template-packs
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -69,6 +155,21 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 MEDIA_ROOT = os.path.join(BASE_DIR, '/home/ubuntu/Documents/')
 MEDIA_URL = '/media/'
 
+# Document downloads (DMS/sendfile.py). In production nginx serves the bytes
+# from an internal location mapped to MEDIA_ROOT (deploy/nginx-protected-media.conf).
+DOCUMENT_ACCEL_REDIRECT = config('DOCUMENT_ACCEL_REDIRECT', default=False, cast=bool)
+DOCUMENT_ACCEL_PREFIX = '/protected-media/'
+
+# Text extraction / OCR of uploaded documents (DMS/pipeline.py), run by
+# `manage.py extract_documents --loop` outside the web workers.
+DOCUMENT_TEXT_SOURCES = {
+    'vendors.VendorDocument': 'file',
+    'CMS.CustomerDocument': 'document_file',
+}
+DOCUMENT_TEXT_MAX_PAGES = 50
+DOCUMENT_OCR_TIMEOUT = 120  # seconds per page
+TESSERACT_CMD = config('TESSERACT_CMD', default='')  # e.g. C:\Program Files\Tesseract-OCR\tesseract.exe
+
 SECURE_CROSS_ORIGIN_OPENER_POLICY = None
 
 # Quick-start development settings - unsuitable for production
@@ -125,7 +226,7 @@ DJANGO_APPS = [
     # "django.contrib.sites",
     'django.contrib.humanize',
     "django.contrib.messages",
-    "django.contrib.staticfiles",
+    "CRLBM.apps.StaticFilesConfig",  # django.contrib.staticfiles with STATICFILES_EXCLUDE
     # "django.contrib.humanize", # Handy template tags
     "django.contrib.admin",
     "django.forms",
@@ -136,7 +237,11 @@ THIRD_PARTY_APPS = [
     "widget_tweaks"
 ]
 
-LOCAL_APPS = [
+# Theme demo pages (/apps/, /ui/, /charts/, /dashboard/ ...). Production sets
+# DEMO_APPS_ENABLED=False in .env so workers neither load these apps nor route
+# their URLs; the shared layouts in Template/bootstrap/ keep working without them.
+DEMO_APPS_ENABLED = config('DEMO_APPS_ENABLED', default=True, cast=bool)
+DEMO_APPS = [
     "bootstrap.apps.apps.AppsConfig",
     "bootstrap.charts.apps.ChartsConfig",
     "bootstrap.crm.apps.CrmConfig",
@@ -150,6 +255,9 @@ LOCAL_APPS = [
     "bootstrap.pages.apps.PagesConfig",
     "bootstrap.tables.apps.TablesConfig",
     "bootstrap.ui.apps.UiConfig",
+]
+
+LOCAL_APPS = (DEMO_APPS if DEMO_APPS_ENABLED else []) + [
     'axes',
     'corsheaders',
     'Account',
@@ -159,6 +267,9 @@ LOCAL_APPS = [
     'CMS',
     'crm.apps.CrmConfig',
     'vendors.apps.VendorsConfig',
+    'DMS',
+    'Search',
+    'CRLBM.apps.CRLBMConfig',  # project-wide commands (index_advisor) and the slow query log
 ]
 # https://docs.djangoproject.com/en/dev/ref/settings/#installed-apps
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
@@ -174,12 +285,13 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'CRLBM.middleware.RequestContextMiddleware',
+    'CRLBM.middleware.ReplicaStickinessMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    'django_auto_logout.middleware.auto_logout',
+    'CRLBM.middleware.AutoLogoutMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'axes.middleware.AxesMiddleware',
-    # 'CRLBM.middleware.AutoLogoutMiddleware',
 ]
 CORS_ALLOWED_ORIGINS = [
     'http://15.207.169.98',
@@ -200,28 +312,87 @@ STATICFILES_DIRS = [
     BASE_DIR / "static",
    
 ]
+STATIC_ROOT = BASE_DIR / "staticfiles"
+# collectstatic writes content-hashed names plus .gz (zopfli) and .br siblings.
+# nginx serves them directly (deploy/nginx-static.conf); CRLBM.static_serve is
+# the fallback when Django has to serve them itself (SERVE_STATIC=True).
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "CRLBM.storage.CompressedManifestStaticFilesStorage"},
+    # Uploaded documents, deduplicated by SHA-256 (DMS/storage.py).
+    "documents": {"BACKEND": "DMS.storage.ContentAddressedStorage"},
+}
+SERVE_STATIC = config('SERVE_STATIC', default=False, cast=bool)
+# Not referenced by any template: source maps, scss sources, the pdf.js demo
+# and debugger, and a duplicate vendor bundle.
+STATICFILES_EXCLUDE = [
+    '*.map',
+    'scss',
+    '*.scss',
+    'js/vendor.min-min.js',
+    'pdfjs/web/compressed.tracemonkey-pldi-09.pdf',
+    'pdfjs/web/debugger.*',
+]
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
+# Logging (CRLBM/log_handlers.py): records are formatted as JSON lines with the
+# request id and timing, queued, and written by a background thread, so no
+# request waits on the disk. Files rotate at LOG_MAX_BYTES and daily, old
+# ones gzipped (LOG_BACKUP_COUNT kept); gunicorn workers share the files.
+# LOG_DIR = 'D:/Python Project/CRLBM Logs'
+LOG_DIR = config('LOG_DIR', default='/home/ubuntu/CRLBM Logs')
+LOG_MAX_BYTES = config('LOG_MAX_BYTES', default=50 * 1024 * 1024, cast=int)
+LOG_BACKUP_COUNT = config('LOG_BACKUP_COUNT', default=30, cast=int)
+LOG_REQUESTS = config('LOG_REQUESTS', default=True, cast=bool)  # one INFO line per request (CRLBM.requests)
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {'()': 'CRLBM.log_handlers.RequestContextFilter'},
+    },
+    'formatters': {
+        'json': {'()': 'CRLBM.log_handlers.JsonFormatter'},
+        'message': {'format': '%(message)s'},
+    },
     'handlers': {
         'file': {
-            'level': 'WARNING',
-            'class': 'logging.FileHandler',
-            # 'filename': os.path.join(BASE_DIR, 'D:/Python Project/CRLBM Logs', 'django.log'),  
-            'filename': os.path.join(BASE_DIR, '/home/ubuntu/CRLBM Logs', 'django.log'),  
+            'level': 'INFO',
+            'class': 'CRLBM.log_handlers.QueuedFileHandler',
+            'filename': os.path.join(LOG_DIR, 'django.log'),
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'filters': ['request_context'],
+            'formatter': 'json',
+        },
+        'queries': {
+            'level': 'INFO',
+            'class': 'CRLBM.log_handlers.QueuedFileHandler',
+            'filename': config('QUERY_LOG_FILE', default=os.path.join(LOG_DIR, 'queries.log')),
+            'max_bytes': LOG_MAX_BYTES,
+            'backup_count': LOG_BACKUP_COUNT,
+            'formatter': 'message',  # already JSON (CRLBM/querylog.py)
         },
     },
+    'root': {
+        'handlers': ['file'],
+        'level': 'WARNING',
+    },
     'loggers': {
-        'django': {
-            'handlers': ['file'],
-            'level': 'WARNING',
-            'propagate': True,
+        'CRLBM.requests': {
+            'level': 'INFO' if LOG_REQUESTS else 'WARNING',
+        },
+        'CRLBM.queries': {
+            'handlers': ['queries'],
+            'level': 'INFO',
+            'propagate': False,
         },
     },
 }
+# Slow query log (CRLBM/querylog.py): statements taking at least this many ms
+# are written to QUERY_LOG_FILE for `manage.py index_advisor`. Unset: off.
+QUERY_LOG_MIN_MS = config('QUERY_LOG_MIN_MS', default=None, cast=lambda v: float(v) if v not in (None, '') else None)
+QUERY_LOG_FILE = LOGGING['handlers']['queries']['filename']
 AUTHENTICATION_BACKENDS = [
     'django.contrib.auth.backends.ModelBackend',
     # Add any additional authentication backends if needed
@@ -244,6 +415,7 @@ TEMPLATES = [
                 'django.contrib.messages.context_processors.messages',
                 'django_auto_logout.context_processors.auto_logout_client',
                 'Account.context_processors.logged_in_user',
+                'Account.context_processors.demo_apps',
                 "django.template.context_processors.i18n",
                 "django.template.context_processors.media",
                 "django.template.context_processors.static",
@@ -254,6 +426,18 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = 'CRLBM.wsgi.application'
+ASGI_APPLICATION = 'CRLBM.asgi.application'
+
+# Threads used by async views to run stored procedures (Account.db_utils.acallproc).
+# Each thread holds its own DB connection, so keep this below max_connections / workers.
+CALLPROC_MAX_WORKERS = config('CALLPROC_MAX_WORKERS', default=16, cast=int)
+
+# Worker boot budget checked by Account.tests.StartupBudgetTests (see `manage.py import_profile`).
+# Heavy libraries (pandas, openpyxl, xlsxwriter, xhtml2pdf, reportlab) are imported
+# inside the views that use them so they stay out of every worker's boot.
+STARTUP_IMPORT_BUDGET_MS = config('STARTUP_IMPORT_BUDGET_MS', default=1000, cast=int)
+STARTUP_RSS_BUDGET_MB = config('STARTUP_RSS_BUDGET_MB', default=120, cast=int)
+STARTUP_FORBIDDEN_MODULES = ['pandas', 'openpyxl', 'xlwt', 'xlsxwriter', 'reportlab', 'xhtml2pdf', 'flask', 'rest_framework']
 
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
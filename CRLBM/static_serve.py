@@ -0,0 +1,81 @@
+# CRLBM/static_serve.py
+#
+# Fallback for serving collected static files from Django (SERVE_STATIC=True),
+# e.g. when nginx is not in front. Serves the precompressed .br/.gz sibling the
+# client accepts and marks content-hashed files as cacheable forever.
+
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^./]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def accepted_encodings(header):
+    """Content-codings of an Accept-Encoding header mapped to their q-value."""
+    accepted = {}
+    for item in header.split(','):
+        coding, *params = item.split(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+def preferred_encoding(header, available):
+    """
+    The coding (of ENCODINGS, limited to `available`) the client rates
+    highest, br before gzip on a tie; None if it accepts neither. q=0 refuses.
+    """
+    accepted = accepted_encodings(header)
+    best, best_quality = None, 0.0
+    for name, _ in ENCODINGS:
+        quality = accepted.get(name, accepted.get('*', 0.0))
+        if name in available and quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def serve_precompressed(request, path):
+    try:
+        fullpath = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(fullpath):
+        raise Http404
+
+    stat = os.stat(fullpath)
+    if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+        response = HttpResponseNotModified()
+    else:
+        content_type, _ = mimetypes.guess_type(fullpath)
+        suffixes = {name: suffix for name, suffix in ENCODINGS if os.path.isfile(fullpath + suffix)}
+        encoding = preferred_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), suffixes)
+        served = fullpath + suffixes[encoding] if encoding else fullpath
+        response = FileResponse(open(served, 'rb'), content_type=content_type or 'application/octet-stream')
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+
+    response['Vary'] = 'Accept-Encoding'
+    response['Cache-Control'] = IMMUTABLE if HASHED_NAME_RE.search(path) else REVALIDATE
+    return response
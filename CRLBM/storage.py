@@ -0,0 +1,90 @@
+# CRLBM/storage.py
+
+import gzip
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.css', '.js', '.mjs', '.json', '.svg', '.html', '.txt', '.xml',
+    '.ttf', '.eot', '.otf', '.ico', '.wasm', '.bcmap', '.ftl',
+)
+MIN_COMPRESS_SIZE = 1024
+# Keep a compressed variant only if it saves at least this much.
+MIN_COMPRESS_RATIO = 0.95
+
+
+def _gzip(data):
+    try:
+        import zopfli.gzip
+        return zopfli.gzip.compress(data)
+    except ImportError:
+        return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _brotli(data):
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli.compress(data, quality=11)
+
+
+def compress_file(path):
+    """Write .gz and .br siblings of path. Returns the suffixes written."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    written = []
+    for suffix, compress in (('.gz', _gzip), ('.br', _brotli)):
+        target = path + suffix
+        # Hashed names change with content, so an existing sibling is current.
+        if os.path.exists(target):
+            continue
+        compressed = compress(data)
+        if compressed is None or len(compressed) > len(data) * MIN_COMPRESS_RATIO:
+            continue
+        with open(target, 'wb') as f:
+            f.write(compressed)
+        written.append(suffix)
+    return written
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hashed static files (app.min.css -> app.min.3f2a9c1d0b7e.css)
+    plus precompressed .gz (zopfli) and .br siblings, written by collectstatic
+    so neither nginx nor Django compresses at request time.
+    """
+    manifest_strict = False
+
+    def hashed_name(self, name, content=None, filename=None):
+        # Vendor CSS references a few images that were never shipped, and a
+        # fresh checkout (tests, benchmarks) has nothing collected yet. Leave
+        # such references unhashed instead of failing the build or the page.
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if self.manifest_strict or content is not None:
+                raise
+            return name
+
+    def stored_name(self, name):
+        # Templates use both {% static 'css/x.css' %} and {% static '/css/x.css' %};
+        # plain static storage accepted the leading slash, so keep accepting it.
+        return super().stored_name(name.lstrip('/'))
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        to_compress = [
+            self.path(name) for name in set(self.hashed_files.values())
+            if name.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+            and self.exists(name) and self.size(name) >= MIN_COMPRESS_SIZE
+        ]
+        # zopfli and brotli at max quality are CPU bound; use all cores.
+        with ProcessPoolExecutor() as pool:
+            for path, written in zip(to_compress, pool.map(compress_file, to_compress, chunksize=8)):
+                if written:
+                    yield os.path.relpath(path, self.location), path, True
@@ -0,0 +1,238 @@
+import csv
+import gzip
+import json
+import logging
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+import brotli
+from django.core.files.storage import FileSystemStorage
+from django.core.management import call_command
+from django.db import connection
+from django.http import Http404
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+
+from CRLBM import querylog, request_context, static_serve
+from CRLBM.log_handlers import JsonFormatter, QueuedFileHandler, RequestContextFilter
+from CRLBM.storage import CompressedManifestStaticFilesStorage, compress_file
+
+CSS = (b'.logo { background: url("../img/logo.png"); }\n'
+       b'.gone { background: url("../img/missing.png"); }\n') + b'.row { margin: 0 auto; }\n' * 60
+
+
+class TempDirMixin:
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        return path
+
+
+class StaticStorageTests(TempDirMixin, SimpleTestCase):
+
+    def test_compress_file(self):
+        path = self.write('css/app.css', CSS)
+        self.assertEqual(compress_file(path), ['.gz', '.br'])
+        with open(path + '.gz', 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), CSS)
+        with open(path + '.br', 'rb') as f:
+            self.assertEqual(brotli.decompress(f.read()), CSS)
+        # Hashed names change with content, so existing siblings are kept.
+        self.assertEqual(compress_file(path), [])
+
+        # Not worth it: the compressed copy would be about as large.
+        noise = self.write('img/noise.svg', os.urandom(4096))
+        self.assertEqual(compress_file(noise), [])
+        self.assertFalse(os.path.exists(noise + '.gz'))
+
+    def test_post_process(self):
+        self.write('css/app.css', CSS)
+        self.write('img/logo.png', b'\x89PNG logo')
+        storage = CompressedManifestStaticFilesStorage(location=self.root, base_url='/static/')
+        source = FileSystemStorage(location=self.root)
+        paths = {name: (source, name) for name in ('css/app.css', 'img/logo.png')}
+        for name, hashed, processed in storage.post_process(paths):
+            self.assertNotIsInstance(processed, Exception)
+
+        css = storage.stored_name('css/app.css')
+        logo = storage.stored_name('img/logo.png')
+        self.assertRegex(css, r'^css/app\.[0-9a-f]{12}\.css$')
+        self.assertRegex(logo, r'^img/logo\.[0-9a-f]{12}\.png$')
+        self.assertEqual(storage.stored_name('/css/app.css'), css)
+        self.assertTrue(static_serve.HASHED_NAME_RE.search(css))
+        self.assertTrue(storage.exists(storage.manifest_name))
+
+        with storage.open(css) as f:
+            content = f.read().decode()
+        self.assertIn(f'url("../{logo}")', content)
+        # A reference to a file that was never shipped stays as written.
+        self.assertIn('url("../img/missing.png")', content)
+        self.assertTrue(storage.exists(css + '.gz'))
+        self.assertTrue(storage.exists(css + '.br'))
+        self.assertFalse(storage.exists(logo + '.gz'))
+
+
+class ServePrecompressedTests(TempDirMixin, SimpleTestCase):
+    hashed = 'css/app.0123456789ab.css'
+
+    def setUp(self):
+        super().setUp()
+        override = override_settings(STATIC_ROOT=self.root)
+        override.enable()
+        self.addCleanup(override.disable)
+        for suffix, data in (('', b'plain'), ('.gz', b'gzipped'), ('.br', b'brotli')):
+            self.write(self.hashed + suffix, data)
+        self.write('css/app.css', b'plain')
+
+    def get(self, path, accept=None):
+        headers = {'HTTP_ACCEPT_ENCODING': accept} if accept is not None else {}
+        response = static_serve.serve_precompressed(RequestFactory().get('/static/' + path, **headers), path)
+        self.addCleanup(response.close)
+        return response
+
+    def test_encoding_follows_accept_encoding(self):
+        cases = [
+            (None, None, b'plain'),
+            ('gzip, deflate, br', 'br', b'brotli'),
+            ('gzip, br;q=0', 'gzip', b'gzipped'),
+            ('br;q=0.5, gzip', 'gzip', b'gzipped'),
+            ('BR;Q=0.8, gzip;q=0.9', 'gzip', b'gzipped'),
+            ('*', 'br', b'brotli'),
+            ('gzip;q=0, *;q=0.1', 'br', b'brotli'),
+            ('gzip;q=0, br;q=0', None, b'plain'),
+            ('identity', None, b'plain'),
+            ('brotli', None, b'plain'),
+        ]
+        for accept, encoding, body in cases:
+            with self.subTest(accept=accept):
+                response = self.get(self.hashed, accept)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertEqual(b''.join(response.streaming_content), body)
+                self.assertEqual(response['Content-Type'], 'text/css')
+                self.assertEqual(response['Vary'], 'Accept-Encoding')
+
+    def test_falls_back_to_the_siblings_that_exist(self):
+        os.remove(os.path.join(self.root, self.hashed + '.br'))
+        response = self.get(self.hashed, 'br, gzip;q=0.5')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(b''.join(response.streaming_content), b'gzipped')
+        self.assertNotIn('Content-Encoding', self.get('css/app.css', 'br, gzip'))
+
+    def test_cache_control(self):
+        self.assertEqual(self.get(self.hashed)['Cache-Control'], static_serve.IMMUTABLE)
+        self.assertEqual(self.get('css/app.css')['Cache-Control'], static_serve.REVALIDATE)
+
+    def test_not_found(self):
+        for path in ('css/missing.css', '../settings.py', 'css'):
+            with self.subTest(path=path), self.assertRaises(Http404):
+                self.get(path)
+
+
+@override_settings(QUERY_LOG_MIN_MS=0)
+class IndexAdvisorTests(TestCase):
+
+    def test_logged_full_scan_gets_a_candidate(self):
+        from CMS.models import CustomerMaster
+        with self.assertLogs('CRLBM.queries', 'INFO') as logs, connection.execute_wrapper(querylog.log_query):
+            for _ in range(2):
+                list(CustomerMaster.objects.filter(billing_contact_email='a@b.com'))
+            list(CustomerMaster.objects.filter(status='active').order_by('name'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['params'], ['a@b.com'])
+
+        fd, path = tempfile.mkstemp(suffix='.log')
+        self.addCleanup(os.remove, path)
+        with os.fdopen(fd, 'w') as log:
+            log.writelines(record.getMessage() + '\n' for record in logs.records)
+        out = StringIO()
+        call_command('index_advisor', path, '--json', stdout=out)
+        report = json.loads(out.getvalue())
+
+        by_email, by_status = sorted(report['statements'], key=lambda s: 'billing_contact_email' not in s['sql'])
+        self.assertEqual(by_email['calls'], 2)
+        self.assertEqual(by_email['scans'][0]['table'], 'CMS_customermaster')
+        self.assertEqual(report['candidates'][0]['index'],
+                         "CMS.CustomerMaster: models.Index(fields=['billing_contact_email', 'name'])")
+        # (status, name) is served by cms_customer_status_name_idx.
+        self.assertEqual(by_status['scans'], [])
+
+
+class ArchiveLogsTests(TestCase):
+
+    def setUp(self):
+        self.archive_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.archive_dir)
+
+    def test_old_months_are_archived_then_deleted(self):
+        from datetime import datetime, timedelta
+        from django.utils import timezone
+        from Account.models import error_log
+        old = timezone.make_aware(datetime(2020, 3, 15, 10, 0))
+        for n in range(5):
+            error_log.objects.create(method='view', error=f'boom {n}', user_id='1')
+        error_log.objects.filter(error__in=['boom 0', 'boom 1', 'boom 2']).update(error_date=old)
+        error_log.objects.filter(error='boom 3').update(error_date=old + timedelta(days=31))
+
+        out = StringIO()
+        with override_settings(LOG_ARCHIVE_DIR=self.archive_dir, LOG_ARCHIVE_DELETE_CHUNK=2, LOG_ARCHIVE_PAUSE_SECONDS=0):
+            call_command('archive_logs', 'error_log', stdout=out)
+            call_command('archive_logs', 'error_log', stdout=out)
+
+        self.assertEqual(list(error_log.objects.values_list('error', flat=True)), ['boom 4'])
+        files = sorted(os.listdir(os.path.join(self.archive_dir, 'error_log')))
+        self.assertEqual([f.split('.')[0] for f in files], ['2020-03', '2020-04'])
+        with gzip.open(os.path.join(self.archive_dir, 'error_log', files[0]), 'rt') as archive:
+            rows = list(csv.DictReader(archive))
+        self.assertEqual(sorted(row['error'] for row in rows), ['boom 0', 'boom 1', 'boom 2'])
+        self.assertIn('2020-03: 3 rows archived, 3 deleted', out.getvalue())
+
+
+class QueuedLoggingTests(SimpleTestCase):
+
+    def setUp(self):
+        self.log_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.log_dir)
+        self.logger = logging.getLogger('CRLBM.tests.queued')
+        self.logger.propagate = False
+        self.addCleanup(setattr, self.logger, 'propagate', True)
+
+    def attach(self, **kwargs):
+        handler = QueuedFileHandler(os.path.join(self.log_dir, 'app.log'), **kwargs)
+        handler.addFilter(RequestContextFilter())
+        handler.setFormatter(JsonFormatter())
+        self.logger.addHandler(handler)
+        self.addCleanup(handler.close)
+        self.addCleanup(self.logger.removeHandler, handler)
+        return handler
+
+    def test_records_are_written_as_json_with_request_id(self):
+        handler = self.attach()
+        token = request_context.bind(RequestFactory().get('/crm/'), request_id='abc123')
+        try:
+            self.logger.warning('slow %s', 'thing', extra={'rows': 3})
+        finally:
+            request_context.reset(token)
+        handler.flush()
+        with open(os.path.join(self.log_dir, 'app.log')) as log:
+            record = json.loads(log.readline())
+        self.assertEqual(record['message'], 'slow thing')
+        self.assertEqual((record['request_id'], record['path'], record['rows']), ('abc123', '/crm/', 3))
+        self.assertIn('elapsed_ms', record)
+
+    def test_size_rotation_compresses_old_file(self):
+        handler = self.attach(max_bytes=200, backup_count=2)
+        for n in range(20):
+            self.logger.warning('line %s %s', n, 'x' * 40)
+        handler.flush()
+        archives = [name for name in os.listdir(self.log_dir) if name.endswith('.gz')]
+        self.assertEqual(len(archives), 2)
+        with gzip.open(os.path.join(self.log_dir, archives[0]), 'rt') as archive:
+            self.assertTrue(json.loads(archive.readline())['message'].startswith('line '))
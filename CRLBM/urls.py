@@ -15,7 +15,7 @@ Including another URLconf
     2. Add a URL to urlpatterns:  path('blog/', include('blog.urls'))
 """
 from django.contrib import admin
-from django.urls import path,include
+from django.urls import path,include,re_path
 from django.conf import settings
 from django.conf.urls.static import static
 from django.views import defaults as default_views
@@ -24,26 +24,11 @@ from Account.views import *
 from Masters.views import *
 from Reports.views import *
 from MenuManager.views import *
+from CRLBM.static_serve import serve_precompressed
 urlpatterns = [
     
 
     # path('admin/', admin.site.urls),
-    # User management
-    # path("users/", include("bootstrap.users.urls", namespace="users")),
-    path("apps/", include("bootstrap.apps.urls", namespace="apps")),
-    path("apps/crm/", include("bootstrap.crm.urls", namespace="bootstrap_crm")),
-    path("apps/ecommerce/", include("bootstrap.ecommerce.urls", namespace="ecommerce")),
-    path("pages/", include("bootstrap.pages.urls", namespace="pages")),
-    path("ui/", include("bootstrap.ui.urls", namespace="ui")),
-    path("extended/", include("bootstrap.extended.urls", namespace="extended")),
-    path("icons/", include("bootstrap.icons.urls", namespace="icons")),
-    path("charts/", include("bootstrap.charts.urls", namespace="charts")),
-    path("forms/", include("bootstrap.form.urls", namespace="form")),
-    path("tables/", include("bootstrap.tables.urls", namespace="tables")),
-    path("maps/", include("bootstrap.maps.urls", namespace="maps")),
-    path("layouts/", include("bootstrap.layouts.urls", namespace="layouts")),
-    path("dashboard/", include("bootstrap.dashboard.urls", namespace="dashboard")),
-    path("landing", view=TemplateView.as_view(template_name="bootstrap/landing.html"), name="landing"),
     # path("", view=TemplateView.as_view(template_name="bootstrap/landing.html"), name="landing"),
 
     # Account
@@ -54,6 +39,7 @@ urlpatterns = [
     path("logout",logoutView,name='logout'),
     path("forgot_password",forgot_password,name='forgot_password'),
     path('search/', search, name='search'),
+    path('search/suggest/', search_suggest, name='search_suggest'),
     path("register_new_user",register_new_user, name="register_new_user"),
     path("reset_password",reset_password, name="reset_password"),
     path("change_password",change_password, name="change_password"),
@@ -62,6 +48,10 @@ urlpatterns = [
    
     # Masters
     path('masters/', masters, name='masters'),
+    path('sample_xlsx', sample_xlsx, name='sample_xlsx'),
+    path('imports/', import_upload, name='import_upload'),
+    path('imports/<int:batch_id>/', import_status, name='import_status'),
+    path('imports/<int:batch_id>/errors.csv', import_errors, name='import_errors'),
 
     #Reports 
     path('common_html', common_html, name='common_html'),
@@ -93,11 +83,41 @@ urlpatterns = [
     # Customer Relationship Management (CRM)
     path('crm/', include('crm.urls', namespace='crm')),
 
+    # DMS - Document downloads
+    path('documents/', include('DMS.urls', namespace='dms')),
+
+    # Ranked search over the n-gram index (Search/index.py)
+    path('search/', include('Search.urls', namespace='search')),
+
     # Media files
     *static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT),
 
 
 ]
 
+# Theme demo pages, left out of production workers (DEMO_APPS_ENABLED=False).
+if settings.DEMO_APPS_ENABLED:
+    urlpatterns += [
+        # User management
+        # path("users/", include("bootstrap.users.urls", namespace="users")),
+        path("apps/", include("bootstrap.apps.urls", namespace="apps")),
+        path("apps/crm/", include("bootstrap.crm.urls", namespace="bootstrap_crm")),
+        path("apps/ecommerce/", include("bootstrap.ecommerce.urls", namespace="ecommerce")),
+        path("pages/", include("bootstrap.pages.urls", namespace="pages")),
+        path("ui/", include("bootstrap.ui.urls", namespace="ui")),
+        path("extended/", include("bootstrap.extended.urls", namespace="extended")),
+        path("icons/", include("bootstrap.icons.urls", namespace="icons")),
+        path("charts/", include("bootstrap.charts.urls", namespace="charts")),
+        path("forms/", include("bootstrap.form.urls", namespace="form")),
+        path("tables/", include("bootstrap.tables.urls", namespace="tables")),
+        path("maps/", include("bootstrap.maps.urls", namespace="maps")),
+        path("layouts/", include("bootstrap.layouts.urls", namespace="layouts")),
+        path("dashboard/", include("bootstrap.dashboard.urls", namespace="dashboard")),
+        path("landing", view=TemplateView.as_view(template_name="bootstrap/landing.html"), name="landing"),
+    ]
+
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
+    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
+
+if settings.SERVE_STATIC:
+    urlpatterns += [re_path(r'^static/(?P<path>.*)$', serve_precompressed)]
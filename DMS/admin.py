@@ -0,0 +1,18 @@
+# admin.py
+from django.contrib import admin
+from .models import *
+
+@admin.register(StoredBlob)
+class StoredBlobAdmin(admin.ModelAdmin):
+    list_display = ['sha256', 'size', 'content_type', 'ref_count', 'created_at']
+    search_fields = ['sha256']
+    readonly_fields = ['sha256', 'size', 'content_type', 'ref_count', 'created_at', 'last_referenced_at']
+
+
+@admin.register(DocumentText)
+class DocumentTextAdmin(admin.ModelAdmin):
+    list_display = ['blob', 'status', 'method', 'pages', 'ocr_pages', 'pan_numbers', 'gst_numbers', 'processed_at']
+    list_filter = ['status', 'method']
+    search_fields = ['blob__sha256']
+    readonly_fields = ['blob', 'method', 'pages', 'ocr_pages', 'text', 'pan_numbers', 'gst_numbers',
+                       'error', 'attempts', 'created_at', 'updated_at', 'processed_at']
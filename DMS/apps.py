@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+class DmsConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'DMS'
+    verbose_name = 'Document Management System'
+
+    def ready(self):
+        # Keep blob reference counts in step with the models that use them
+        import DMS.signals
@@ -0,0 +1,155 @@
+# DMS/extraction.py
+#
+# Text extraction and previews for stored documents, run in worker processes
+# by DMS.pipeline (manage.py extract_documents), never in a request. A PDF page
+# keeps its embedded text layer (PyMuPDF); a page with too little text, i.e. a
+# scanned page, is rendered and OCR'd with tesseract. Images are OCR'd
+# directly. Every function here takes and returns plain values so it can run
+# in a ProcessPoolExecutor without Django.
+#
+# PyMuPDF renders the page itself, so poppler/pdf2image (OCR Packages.txt) is
+# not needed.
+
+import os
+import re
+import tempfile
+
+OCR_DPI = 300
+OCR_MIN_CHARS = 25  # a page with less embedded text than this is treated as scanned
+
+PAN_RE = re.compile(r'(?<![A-Z0-9])[A-Z0-9]{10}(?![A-Z0-9])')
+GST_RE = re.compile(r'(?<![A-Z0-9])[A-Z0-9]{15}(?![A-Z0-9])')
+PAN_SHAPE = 'LLLLLDDDDL'
+GST_SHAPE = 'DDLLLLLDDDDLXLX'
+PAN_VALID = re.compile(r'^[A-Z]{5}[0-9]{4}[A-Z]$')
+GST_VALID = re.compile(r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z][1-9A-Z]Z[0-9A-Z]$')
+
+# Characters tesseract commonly confuses, by the class the position expects.
+TO_DIGIT = str.maketrans('OQDILZSBG', '000112586')
+TO_LETTER = str.maketrans('0125867', 'OIZSBGT')
+
+_ocr = {}
+
+
+def init_worker(tesseract_cmd='', ocr_timeout=0):
+    """ProcessPoolExecutor initializer."""
+    # One tesseract thread per process: the pool already uses every core.
+    os.environ.setdefault('OMP_THREAD_LIMIT', '1')
+    _ocr['cmd'] = tesseract_cmd
+    _ocr['timeout'] = ocr_timeout
+
+
+def _tesseract(image):
+    import pytesseract
+    if _ocr.get('cmd'):
+        pytesseract.pytesseract.tesseract_cmd = _ocr['cmd']
+    return pytesseract.image_to_string(image, lang='eng', timeout=_ocr.get('timeout', 0))
+
+
+def pdf_page_count(path):
+    import pymupdf
+    with pymupdf.open(path) as doc:
+        return doc.page_count
+
+
+def extract_pdf_page(path, page_number):
+    """Returns (text, ocr_used) for one page."""
+    import pymupdf
+    with pymupdf.open(path) as doc:
+        page = doc.load_page(page_number)
+        text = page.get_text('text')
+        if len(text.strip()) >= OCR_MIN_CHARS:
+            return text, False
+        pix = page.get_pixmap(dpi=OCR_DPI, colorspace=pymupdf.csGRAY)
+    from PIL import Image
+    image = Image.frombytes('L', (pix.width, pix.height), pix.samples)
+    return _tesseract(image), True
+
+
+def extract_image(path):
+    from PIL import Image
+    with Image.open(path) as image:
+        image.load()
+        return _tesseract(image.convert('L')), True
+
+
+def _write_png(image, target, mode):
+    """Write atomically: a reader never sees half a preview."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix='.preview-')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            image.save(f, format='PNG', optimize=True)
+        # mkstemp creates 0600; nginx has to read previews like the blobs.
+        os.chmod(tmp_path, mode)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def render_previews(path, kind, targets, mode=0o644):
+    """
+    PNG previews of the first page (PDF) or the image itself.
+    `targets` maps output path -> maximum width; existing files are kept.
+    """
+    targets = {target: width for target, width in targets.items() if not os.path.exists(target)}
+    if not targets:
+        return
+    from PIL import Image, ImageOps
+    if kind == 'pdf':
+        import pymupdf
+        with pymupdf.open(path) as doc:
+            page = doc.load_page(0)
+            # Render once at the largest size; smaller ones are downscaled.
+            zoom = min(max(targets.values()) / page.rect.width, 4)
+            pix = page.get_pixmap(matrix=pymupdf.Matrix(zoom, zoom), alpha=False)
+        image = Image.frombytes('RGB', (pix.width, pix.height), pix.samples)
+    else:
+        with Image.open(path) as original:
+            image = ImageOps.exif_transpose(original)
+            image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'P') else 'RGB')
+
+    for target, width in sorted(targets.items(), key=lambda item: -item[1]):
+        if image.width > width:
+            image = image.resize((width, max(round(image.height * width / image.width), 1)), Image.LANCZOS)
+        _write_png(image, target, mode)
+
+
+def _fix(token, shape):
+    """Undo OCR digit/letter swaps position by position ('X' takes either)."""
+    fixed = []
+    for char, kind in zip(token, shape):
+        if kind == 'D':
+            char = char.translate(TO_DIGIT)
+        elif kind == 'L':
+            char = char.translate(TO_LETTER)
+        fixed.append(char)
+    return ''.join(fixed)
+
+
+def _unique(values):
+    return list(dict.fromkeys(values))
+
+
+def find_identifiers(text):
+    """PAN and GSTIN numbers in extracted text: (pan_numbers, gst_numbers)."""
+    text = (text or '').upper()
+    gst_numbers = []
+    for token in GST_RE.findall(text):
+        token = _fix(token, GST_SHAPE)
+        if GST_VALID.match(token):
+            gst_numbers.append(token)
+
+    pan_numbers = []
+    for token in PAN_RE.findall(text):
+        # Words like GOVERNMENT fit the shape after correction; a PAN read
+        # by OCR keeps at least one real digit.
+        if not any(c.isdigit() for c in token):
+            continue
+        token = _fix(token, PAN_SHAPE)
+        if PAN_VALID.match(token):
+            pan_numbers.append(token)
+    # Characters 3-12 of a GSTIN are the holder's PAN.
+    pan_numbers.extend(gst[2:12] for gst in gst_numbers)
+    return _unique(pan_numbers), _unique(gst_numbers)
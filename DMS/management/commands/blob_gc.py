@@ -0,0 +1,100 @@
+import os
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from DMS.models import StoredBlob, UploadSession
+from DMS.signals import blob_fields
+from DMS.uploads import discard
+from DMS.storage import BLOB_DIR, document_storage, parse_blob_name
+
+ORPHAN_MIN_AGE_SECONDS = 24 * 3600
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount StoredBlob references from every content-addressed file field, "
+        "then delete blobs nothing points at, expired chunked uploads and files left by interrupted uploads."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report without changing anything.")
+
+    def handle(self, *args, **options):
+        dry_run = options['dry_run']
+        storage = document_storage()
+
+        # Chunked uploads that were never finished or never attached to a document.
+        expired = UploadSession.objects.filter(
+            updated_at__lt=timezone.now() - timedelta(hours=settings.CHUNKED_UPLOAD_EXPIRY_HOURS))
+        expired_count = expired.count()
+        if not dry_run:
+            for session in expired.iterator():
+                discard(session)
+
+        # Blobs created or referenced since the cutoff are left alone: the
+        # document pointing at them may not have been counted below.
+        cutoff = timezone.now() - timedelta(seconds=ORPHAN_MIN_AGE_SECONDS)
+        counts = Counter()
+        for model in apps.get_models():
+            for field_name in blob_fields(model):
+                names = (model._default_manager.exclude(Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}))
+                         .values_list(field_name, flat=True).iterator(chunk_size=2000))
+                for name in names:
+                    parsed = parse_blob_name(name)
+                    if parsed:
+                        counts[parsed[0]] += 1
+
+        fixed = removed = 0
+        blobs = StoredBlob.objects.filter(created_at__lt=cutoff, last_referenced_at__lt=cutoff)
+        for blob in blobs.iterator(chunk_size=2000):
+            actual = counts.get(blob.sha256, 0)
+            if actual == blob.ref_count:
+                continue
+            if dry_run:
+                if actual == 0:
+                    removed += 1
+                else:
+                    fixed += 1
+                continue
+            # Re-read under the row lock: a reference taken since the blob was
+            # read changes ref_count and last_referenced_at, and wins.
+            with transaction.atomic():
+                locked = StoredBlob.objects.select_for_update().filter(
+                    sha256=blob.sha256, ref_count=blob.ref_count, last_referenced_at=blob.last_referenced_at).first()
+                if locked is None:
+                    continue
+                if actual == 0:
+                    removed += 1
+                    locked.delete()
+                    storage.delete_blob_files(blob.sha256)
+                else:
+                    fixed += 1
+                    StoredBlob.objects.filter(sha256=blob.sha256).update(ref_count=actual)
+
+        # Files on disk without a StoredBlob row, and temp files of failed
+        # uploads. Recent files may belong to an upload still in progress.
+        orphans = 0
+        known = set(StoredBlob.objects.values_list('sha256', flat=True))
+        mtime_cutoff = cutoff.timestamp()
+        for dirpath, _, filenames in os.walk(storage.path(BLOB_DIR)):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                # <sha256> or one of its previews, <sha256>.thumb.png
+                if filename.split('.', 1)[0] in known or os.path.getmtime(path) > mtime_cutoff:
+                    continue
+                orphans += 1
+                if not dry_run:
+                    os.unlink(path)
+
+        prefix = "Would fix" if dry_run else "Fixed"
+        self.stdout.write(self.style.SUCCESS(
+            f"{prefix} {fixed} reference counts, removed {removed} unreferenced blobs, "
+            f"{orphans} orphaned files and {expired_count} expired uploads."
+        ))
@@ -0,0 +1,65 @@
+import multiprocessing
+import os
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from DMS import extraction, pipeline
+
+
+class Command(BaseCommand):
+    help = (
+        "Extract text from queued vendor and customer documents (PDF text layer, "
+        "tesseract OCR for scanned pages and images) in a process pool, detect PAN/GST numbers "
+        "and render thumbnail and first-page previews."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                            help="Worker processes (default: one per CPU).")
+        parser.add_argument('--batch-size', type=int, default=0,
+                            help="Documents claimed at a time (default: 4 per worker).")
+        parser.add_argument('--loop', action='store_true', help="Keep polling for new documents.")
+        parser.add_argument('--sleep', type=float, default=5, help="Seconds between polls with --loop.")
+        parser.add_argument('--backfill', action='store_true',
+                            help="First queue documents uploaded before extraction was enabled.")
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        batch_size = options['batch_size'] or workers * 4
+
+        if options['backfill']:
+            self.stdout.write(f"Queued {pipeline.backfill()} documents.")
+        requeued = pipeline.requeue_stale()
+        if requeued:
+            self.stdout.write(f"Requeued {requeued} documents left processing by a stopped worker.")
+
+        totals = Counter()
+        started = time.monotonic()
+        with ProcessPoolExecutor(
+            max_workers=workers,
+            # Spawned, not forked: a forked child would share (and on exit
+            # close) this process's database connection.
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=extraction.init_worker,
+            initargs=(settings.TESSERACT_CMD, settings.DOCUMENT_OCR_TIMEOUT),
+        ) as pool:
+            jobs = pipeline.submit(pool, pipeline.claim(batch_size))
+            while jobs or options['loop']:
+                # Queue the next batch first so the pool stays busy while
+                # this one is written back.
+                next_jobs = pipeline.submit(pool, pipeline.claim(batch_size))
+                totals.update(pipeline.collect(jobs))
+                jobs = next_jobs
+                if not jobs and options['loop']:
+                    time.sleep(options['sleep'])
+                    jobs = pipeline.submit(pool, pipeline.claim(batch_size))
+
+        summary = ', '.join(f"{count} {status}" for status, count in sorted(totals.items())) or "nothing to do"
+        self.stdout.write(self.style.SUCCESS(
+            f"Processed {sum(totals.values())} documents with {workers} workers "
+            f"in {time.monotonic() - started:.1f}s: {summary}."
+        ))
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:53
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DMS', '0002_uploadsession'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DocumentText',
+            fields=[
+                ('blob', models.OneToOneField(db_column='sha256', on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='document_text', serialize=False, to='DMS.storedblob')),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('processing', 'Processing'), ('done', 'Done'), ('skipped', 'Skipped'), ('failed', 'Failed')], default='pending', max_length=10)),
+                ('method', models.CharField(blank=True, choices=[('text', 'Text layer'), ('ocr', 'OCR'), ('mixed', 'Text layer and OCR')], max_length=10)),
+                ('pages', models.PositiveIntegerField(default=0)),
+                ('ocr_pages', models.PositiveIntegerField(default=0)),
+                ('text', models.TextField(blank=True)),
+                ('pan_numbers', models.JSONField(blank=True, default=list)),
+                ('gst_numbers', models.JSONField(blank=True, default=list)),
+                ('error', models.TextField(blank=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Document Text',
+                'verbose_name_plural': 'Document Texts',
+                'db_table': 'dms_document_text',
+                'indexes': [models.Index(fields=['status', 'created_at'], name='dms_documen_status_ced58b_idx')],
+            },
+        ),
+    ]
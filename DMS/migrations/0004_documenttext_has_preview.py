@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DMS', '0003_documenttext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='documenttext',
+            name='has_preview',
+            field=models.BooleanField(default=False),
+        ),
+    ]
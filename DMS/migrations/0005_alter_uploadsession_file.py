@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:05
+
+import DMS.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('DMS', '0004_documenttext_has_preview'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='uploadsession',
+            name='file',
+            field=models.FileField(blank=True, max_length=255, storage=DMS.storage.document_storage, upload_to='uploads/'),
+        ),
+    ]
@@ -0,0 +1,104 @@
+import uuid
+
+from django.conf import settings
+from django.db import models
+
+from .storage import document_storage
+
+
+class StoredBlob(models.Model):
+    """
+    One physical file under MEDIA_ROOT/blobs/, shared by every document
+    field that uploaded the same bytes (see DMS.storage).
+    """
+    sha256 = models.CharField(max_length=64, primary_key=True)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    last_referenced_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dms_stored_blob'
+        verbose_name = "Stored Blob"
+        verbose_name_plural = "Stored Blobs"
+
+    def __str__(self):
+        return f"{self.sha256[:12]} ({self.ref_count} refs)"
+
+
+class UploadSession(models.Model):
+    """
+    A chunked upload in progress (DMS.uploads). Chunks are appended to
+    MEDIA_ROOT/blobs/.uploads/<id>.part; finalize moves the file into the
+    blob store and `file` holds the reference until a document claims it.
+    """
+    STATUS_CHOICES = [
+        ('open', 'Open'),
+        ('complete', 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    received = models.BigIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='open')
+    file = models.FileField(max_length=255, upload_to='uploads/', storage=document_storage, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dms_upload_session'
+        verbose_name = "Upload Session"
+        verbose_name_plural = "Upload Sessions"
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+
+class DocumentText(models.Model):
+    """
+    Text and previews extracted from a stored blob (DMS.pipeline), keyed by
+    its SHA-256 so a file uploaded for several vendors or customers is
+    processed once.
+    """
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('processing', 'Processing'),
+        ('done', 'Done'),
+        ('skipped', 'Skipped'),
+        ('failed', 'Failed'),
+    ]
+    METHOD_CHOICES = [
+        ('text', 'Text layer'),
+        ('ocr', 'OCR'),
+        ('mixed', 'Text layer and OCR'),
+    ]
+
+    blob = models.OneToOneField(StoredBlob, on_delete=models.CASCADE, primary_key=True,
+                                db_column='sha256', related_name='document_text')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    method = models.CharField(max_length=10, choices=METHOD_CHOICES, blank=True)
+    pages = models.PositiveIntegerField(default=0)
+    ocr_pages = models.PositiveIntegerField(default=0)
+    text = models.TextField(blank=True)
+    pan_numbers = models.JSONField(default=list, blank=True)
+    gst_numbers = models.JSONField(default=list, blank=True)
+    has_preview = models.BooleanField(default=False)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'dms_document_text'
+        verbose_name = "Document Text"
+        verbose_name_plural = "Document Texts"
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.blob_id[:12]} ({self.status})"
@@ -0,0 +1,196 @@
+# DMS/pipeline.py
+#
+# Background text extraction for the document fields listed in
+# DOCUMENT_TEXT_SOURCES. Saving a document queues its blob as a pending
+# DocumentText row, one row per SHA-256, so a file uploaded again for another
+# vendor or customer is never queued or processed a second time.
+#
+# `manage.py extract_documents` claims pending rows in batches and fans every
+# page of every document in a batch out over a process pool (DMS.extraction),
+# together with one task rendering the thumbnail and first-page preview; the
+# next batch is submitted before the current one is collected so the workers
+# never wait on the database.
+
+from collections import Counter
+from datetime import timedelta
+
+from django.apps import apps
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from . import extraction
+from .models import DocumentText, StoredBlob
+from .storage import PREVIEW_SIZES, blob_path, document_storage, parse_blob_name, preview_path
+
+MAX_ATTEMPTS = 3
+ENQUEUE_CHUNK = 1000
+
+
+def source_fields():
+    """(model, field name) for every document field whose text is extracted."""
+    return [(apps.get_model(label), field_name) for label, field_name in settings.DOCUMENT_TEXT_SOURCES.items()]
+
+
+def enqueue(*names):
+    """Queue the blobs behind stored names; already known blobs are left alone."""
+    shas = {parsed[0] for parsed in map(parse_blob_name, names) if parsed}
+    if not shas:
+        return 0
+    shas = list(StoredBlob.objects.filter(pk__in=shas).values_list('pk', flat=True))
+    DocumentText.objects.bulk_create([DocumentText(blob_id=sha) for sha in shas], ignore_conflicts=True)
+    return len(shas)
+
+
+def backfill():
+    """Queue documents stored before extraction (or previews) existed."""
+    queued = 0
+    for model, field_name in source_fields():
+        names = (model._default_manager.exclude(Q(**{field_name: ''}) | Q(**{f'{field_name}__isnull': True}))
+                 .values_list(field_name, flat=True).iterator(chunk_size=ENQUEUE_CHUNK))
+        chunk = []
+        for name in names:
+            chunk.append(name)
+            if len(chunk) == ENQUEUE_CHUNK:
+                queued += enqueue(*chunk)
+                chunk = []
+        queued += enqueue(*chunk)
+    # Text already extracted is kept; only the previews are rendered.
+    queued += DocumentText.objects.filter(status='done', has_preview=False).update(status='pending')
+    return queued
+
+
+def requeue_stale(minutes=60):
+    """Rows left 'processing' by a worker that died go back to the queue."""
+    stale = DocumentText.objects.filter(status='processing', updated_at__lt=timezone.now() - timedelta(minutes=minutes))
+    stale.filter(attempts__gte=MAX_ATTEMPTS).update(status='failed', error="Worker stopped while processing.")
+    return stale.update(status='pending')
+
+
+def claim(limit):
+    """Mark up to `limit` pending rows as processing; safe with several runners."""
+    candidates = (DocumentText.objects.filter(status='pending').order_by('created_at')
+                  .values_list('pk', flat=True)[:limit])
+    return [
+        pk for pk in list(candidates)
+        if DocumentText.objects.filter(pk=pk, status='pending')
+        .update(status='processing', attempts=F('attempts') + 1)
+    ]
+
+
+def _finish(item, **fields):
+    for key, value in fields.items():
+        setattr(item, key, value)
+    item.save(update_fields=[*fields, 'updated_at'])
+
+
+def _fail(item, error, **fields):
+    status = 'failed' if item.attempts >= MAX_ATTEMPTS else 'pending'
+    _finish(item, status=status, error=str(error)[:2000], **fields)
+
+
+def _kind(content_type):
+    if content_type == 'application/pdf':
+        return 'pdf'
+    if content_type.startswith('image/'):
+        return 'image'
+    return None
+
+
+def submit(pool, pks):
+    """
+    Submit one task per page still to be read, plus one for missing previews.
+    Returns [(DocumentText, page futures or None, preview future or None)];
+    both are None for a document already marked skipped or failed.
+    """
+    storage = document_storage()
+    jobs = []
+    for item in DocumentText.objects.filter(pk__in=pks).select_related('blob'):
+        path = storage.path(blob_path(item.pk))
+        kind = _kind(item.blob.content_type)
+        if kind is None:
+            _finish(item, status='skipped', processed_at=timezone.now(),
+                    error=f"No text extraction for {item.blob.content_type or 'unknown type'}.")
+            jobs.append((item, None, None))
+            continue
+        pages = preview = None
+        try:
+            # processed_at is only set once the text is stored.
+            if item.processed_at is None:
+                if kind == 'pdf':
+                    count = min(extraction.pdf_page_count(path), settings.DOCUMENT_TEXT_MAX_PAGES)
+                    pages = [pool.submit(extraction.extract_pdf_page, path, n) for n in range(count)]
+                else:
+                    pages = [pool.submit(extraction.extract_image, path)]
+            if not item.has_preview:
+                targets = {storage.path(preview_path(item.pk, size)): width for size, width in PREVIEW_SIZES.items()}
+                preview = pool.submit(extraction.render_previews, path, kind, targets,
+                                      storage.file_permissions_mode or 0o644)
+        except Exception as e:
+            _fail(item, e)
+            pages = preview = None
+        jobs.append((item, pages, preview))
+    return jobs
+
+
+def collect(jobs):
+    """Wait for submitted tasks and store the results. Returns a Counter of statuses."""
+    counts = Counter()
+    for item, pages, preview in jobs:
+        if pages is None and preview is None:
+            counts[item.status] += 1
+            continue
+        fields = {}
+        try:
+            if pages is not None:
+                results = [future.result() for future in pages]
+                # Form feed between pages, as pdftotext does; MySQL rejects NUL.
+                text = '\f'.join(page_text for page_text, _ in results).replace('\x00', '')
+                ocr_pages = sum(1 for _, ocr_used in results if ocr_used)
+                pan_numbers, gst_numbers = extraction.find_identifiers(text)
+                fields.update(
+                    text=text,
+                    pages=len(results),
+                    ocr_pages=ocr_pages,
+                    method='ocr' if ocr_pages == len(results) else 'mixed' if ocr_pages else 'text',
+                    pan_numbers=pan_numbers,
+                    gst_numbers=gst_numbers,
+                    processed_at=timezone.now(),
+                )
+            if preview is not None:
+                preview.result()
+                fields['has_preview'] = True
+        except Exception as e:
+            # Text already read is kept; the retry only redoes the rest.
+            _fail(item, e, **fields)
+            counts[item.status] += 1
+            continue
+        _finish(item, status='done', error='', **fields)
+        counts['done'] += 1
+    return counts
+
+
+def attach_document_text(documents, field_name, pan_numbers=(), gst_numbers=()):
+    """
+    Set `extracted` (DocumentText or None) on each document with one query,
+    and `identifiers_match`: True when a detected PAN/GST number is one of the
+    given ones, False when numbers were detected but none match, else None.
+    """
+    documents = list(documents)
+    by_sha = {}
+    for document in documents:
+        document.extracted = document.identifiers_match = None
+        parsed = parse_blob_name(getattr(document, field_name).name)
+        if parsed:
+            by_sha.setdefault(parsed[0], []).append(document)
+    if not by_sha:
+        return documents
+
+    known = {n.strip().upper() for n in [*pan_numbers, *gst_numbers] if n}
+    for text in DocumentText.objects.filter(pk__in=by_sha).defer('text'):
+        detected = {*text.pan_numbers, *text.gst_numbers}
+        for document in by_sha[text.pk]:
+            document.extracted = text
+            if detected:
+                document.identifiers_match = bool(detected & known)
+    return documents
@@ -0,0 +1,109 @@
+# DMS/sendfile.py
+#
+# Download responses that never stream file bytes through a Python worker in
+# production: with DOCUMENT_ACCEL_REDIRECT=True nginx serves the file from an
+# internal location (deploy/nginx-protected-media.conf) and handles Range.
+# Without nginx (development) the file is served here, with Range support.
+#
+# django-sendfile 0.3.x from requirements.txt predates Django 4 (it imports
+# smart_text/force_text), so the X-Accel-Redirect response is built here.
+
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import content_disposition_header, http_date, quote_etag
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def file_etag(path, sha256=None):
+    """Strong ETag for content-addressed blobs, weak size/mtime ETag otherwise."""
+    if sha256:
+        return quote_etag(sha256)
+    stat = os.stat(path)
+    return f'W/"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def _accel_url(path):
+    relpath = os.path.relpath(path, settings.MEDIA_ROOT)
+    if relpath.startswith('..'):
+        raise Http404("File not found.")
+    return settings.DOCUMENT_ACCEL_PREFIX.rstrip('/') + '/' + quote(relpath.replace(os.sep, '/'))
+
+
+def _range_response(request, path, size, content_type):
+    """206 for a single satisfiable 'bytes=a-b' range, 416 if unsatisfiable, else None."""
+    header = request.META.get('HTTP_RANGE', '')
+    m = RANGE_RE.match(header.strip())
+    if not m or not any(m.groups()):
+        return None
+    start, end = m.groups()
+    if start == '':
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    f = open(path, 'rb')
+    f.seek(start)
+    length = end - start + 1
+
+    def chunks(remaining=length):
+        with f:
+            while remaining > 0:
+                data = f.read(min(64 * 1024, remaining))
+                if not data:
+                    break
+                remaining -= len(data)
+                yield data
+
+    response = StreamingHttpResponse(chunks(), status=206, content_type=content_type)
+    response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    response['Content-Length'] = str(length)
+    return response
+
+
+def send_file(request, path, filename=None, as_attachment=True, sha256=None):
+    """
+    Response for a file under MEDIA_ROOT, after the caller has checked access.
+    Handles If-None-Match / If-Modified-Since and Range.
+    """
+    if not os.path.isfile(path):
+        raise Http404("File not found.")
+    filename = filename or os.path.basename(path)
+    stat = os.stat(path)
+    etag = file_etag(path, sha256)
+
+    not_modified = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if not_modified is not None:
+        return not_modified
+
+    content_type = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    if settings.DOCUMENT_ACCEL_REDIRECT:
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = _accel_url(path)
+    else:
+        # If-Range: only honour Range when the client's copy is current.
+        if_range = request.META.get('HTTP_IF_RANGE')
+        response = None
+        if not if_range or if_range == etag:
+            response = _range_response(request, path, stat.st_size, content_type)
+        if response is None:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            response['Content-Length'] = str(stat.st_size)
+
+    response['Content-Disposition'] = content_disposition_header(as_attachment, filename)
+    response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    # Blob URLs contain the hash, so their content never changes.
+    response['Cache-Control'] = 'private, max-age=31536000, immutable' if sha256 else 'private, no-cache'
+    return response
@@ -0,0 +1,61 @@
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import FileField
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .storage import ContentAddressedStorage, parse_blob_name
+
+
+@lru_cache(maxsize=None)
+def blob_fields(model):
+    """Names of the model's file fields that use the content-addressed storage."""
+    return tuple(
+        f.name for f in model._meta.concrete_fields
+        if isinstance(f, FileField) and isinstance(f.storage, ContentAddressedStorage)
+    )
+
+
+def _release_on_commit(model, field_name, name):
+    if name:
+        storage = model._meta.get_field(field_name).storage
+        transaction.on_commit(lambda: storage.release(name))
+
+
+@receiver(pre_save)
+def remember_previous_files(sender, instance, raw=False, **kwargs):
+    fields = blob_fields(sender)
+    if raw or not fields or instance.pk is None or instance._state.adding:
+        return
+    previous = sender._default_manager.filter(pk=instance.pk).values(*fields).first()
+    instance._dms_previous_files = previous or {}
+
+
+@receiver(post_save)
+def release_replaced_files(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_dms_previous_files', None)
+    if raw or not previous:
+        return
+    for field_name, old_name in previous.items():
+        if old_name and old_name != getattr(instance, field_name).name:
+            _release_on_commit(sender, field_name, old_name)
+    instance._dms_previous_files = None
+
+
+@receiver(post_delete)
+def release_deleted_files(sender, instance, **kwargs):
+    for field_name in blob_fields(sender):
+        _release_on_commit(sender, field_name, getattr(instance, field_name).name)
+
+
+@receiver(post_save)
+def queue_text_extraction(sender, instance, raw=False, **kwargs):
+    field_name = settings.DOCUMENT_TEXT_SOURCES.get(sender._meta.label)
+    if raw or not field_name:
+        return
+    name = getattr(instance, field_name).name
+    if parse_blob_name(name):
+        from .pipeline import enqueue
+        transaction.on_commit(lambda: enqueue(name))
@@ -0,0 +1,187 @@
+# DMS/storage.py
+#
+# Content-addressed storage for uploaded documents. Bytes are stored once per
+# SHA-256 under MEDIA_ROOT/blobs/ab/cd/<sha256>, however often the same PAN or
+# GST certificate is uploaded. The name saved in the FileField is
+# blobs/ab/cd/<sha256>/<original filename>, so the upload keeps its filename
+# while sharing the blob. StoredBlob.ref_count tracks how many fields point at
+# a blob; DMS.signals releases references and the file is removed when the
+# last one lets go (`manage.py blob_gc` repairs counts after crashes).
+#
+# Previews rendered by `manage.py extract_documents` sit next to the blob as
+# <sha256>.thumb.png and <sha256>.page.png; the hash in the name means they
+# are only rendered again for different bytes.
+#
+# Names written before this storage existed (vendor_docs/2024/05/x.pdf) are
+# served from MEDIA_ROOT as before.
+
+import hashlib
+import mimetypes
+import os
+import re
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+BLOB_DIR = 'blobs'
+BLOB_NAME_RE = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<sha256>[0-9a-f]{64})/(?P<filename>[^/]+)$')
+CHUNK_SIZE = 64 * 1024
+# Preview kind -> maximum width in pixels.
+PREVIEW_SIZES = {'thumb': 240, 'page': 1000}
+
+
+def document_storage():
+    """Callable for FileField(storage=...); resolved from STORAGES['documents']."""
+    return storages['documents']
+
+
+def blob_path(sha256):
+    return os.path.join(BLOB_DIR, sha256[:2], sha256[2:4], sha256)
+
+
+def preview_path(sha256, kind):
+    return f'{blob_path(sha256)}.{kind}.png'
+
+
+def fit_filename(filename, max_length):
+    """
+    `filename` shortened, extension kept, so that the stored name
+    blobs/ab/cd/<sha256>/<filename> fits in a FileField of `max_length`.
+    """
+    room = max_length - len(blob_path('0' * 64)) - 1
+    if len(filename) <= room:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return stem[:room - len(ext)] + ext if len(ext) < room else filename[:room]
+
+
+def parse_blob_name(name):
+    """Returns (sha256, filename) for a content-addressed name, else None."""
+    m = BLOB_NAME_RE.match(name or '')
+    return (m.group('sha256'), m.group('filename')) if m else None
+
+
+class ContentAddressedStorage(FileSystemStorage):
+
+    def _physical(self, name):
+        parsed = parse_blob_name(name)
+        return blob_path(parsed[0]) if parsed else name
+
+    def path(self, name):
+        return super().path(self._physical(name))
+
+    def exists(self, name):
+        return super().exists(self._physical(name))
+
+    def size(self, name):
+        return super().size(self._physical(name))
+
+    def get_modified_time(self, name):
+        return super().get_modified_time(self._physical(name))
+
+    def _open(self, name, mode='rb'):
+        return super()._open(self._physical(name), mode)
+
+    def url(self, name):
+        parsed = parse_blob_name(name)
+        if parsed is None:
+            return super().url(name)
+        return reverse('dms:download', args=parsed)
+
+    def get_available_name(self, name, max_length=None):
+        # The final name comes from the content, not from upload_to; only the
+        # filename part is kept, trimmed to what fits next to the blob path.
+        if max_length is None:
+            return name
+        return os.path.join(os.path.dirname(name), fit_filename(os.path.basename(name), max_length))
+
+    def _save(self, name, content):
+        blobs_root = os.path.join(self.location, BLOB_DIR)
+        os.makedirs(blobs_root, exist_ok=True)
+
+        # Hash while writing to a temp file on the same filesystem, then move
+        # it into place; identical uploads simply drop the temp file.
+        digest, size = hashlib.sha256(), 0
+        fd, tmp_path = tempfile.mkstemp(dir=blobs_root, prefix='.upload-')
+        try:
+            with os.fdopen(fd, 'wb') as tmp:
+                for chunk in content.chunks(CHUNK_SIZE):
+                    digest.update(chunk)
+                    tmp.write(chunk)
+                    size += len(chunk)
+            return self.store_file(tmp_path, os.path.basename(name), digest.hexdigest(), size)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+
+    def store_file(self, tmp_path, filename, sha256, size, max_length=None):
+        """
+        Move an already hashed file (on the same filesystem) into the blob
+        store and take a reference. Returns the name to keep in a FileField
+        (of `max_length`, when given).
+        """
+        filename = get_valid_filename(filename) or 'file'
+        if max_length is not None:
+            filename = fit_filename(filename, max_length)
+        # The blob row is locked while the file is moved into place so a
+        # concurrent delete of the last reference cannot remove it under us.
+        with transaction.atomic():
+            self.add_reference(sha256, size, mimetypes.guess_type(filename)[0] or '')
+            target = super().path(blob_path(sha256))
+            if os.path.exists(target):
+                os.unlink(tmp_path)
+            else:
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                if self.file_permissions_mode is not None:
+                    os.chmod(tmp_path, self.file_permissions_mode)
+                os.replace(tmp_path, target)
+        return f"{blob_path(sha256)}/{filename}".replace(os.sep, '/')
+
+    def add_reference(self, sha256, size=0, content_type=''):
+        from DMS.models import StoredBlob
+        # update() skips auto_now; blob_gc reads last_referenced_at as the blob's age.
+        if StoredBlob.objects.select_for_update().filter(sha256=sha256).exists():
+            StoredBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') + 1,
+                                                            last_referenced_at=timezone.now())
+            return
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(sha256=sha256, size=size, content_type=content_type, ref_count=1)
+        except IntegrityError:
+            # Same bytes uploaded concurrently.
+            StoredBlob.objects.select_for_update().filter(sha256=sha256).update(ref_count=F('ref_count') + 1,
+                                                                                last_referenced_at=timezone.now())
+
+    def delete(self, name):
+        # References are released by DMS.signals when the row changes or goes
+        # away; FieldFile.delete() followed by save() must not release twice.
+        if parse_blob_name(name) is None:
+            super().delete(name)
+
+    def release(self, name):
+        """Drop one reference; the blob file goes with the last one."""
+        parsed = parse_blob_name(name)
+        if parsed is None:
+            return
+        from DMS.models import StoredBlob
+        sha256 = parsed[0]
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(sha256=sha256).first()
+            if blob is None:
+                return
+            if blob.ref_count > 1:
+                StoredBlob.objects.filter(sha256=sha256).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+            self.delete_blob_files(sha256)
+
+    def delete_blob_files(self, sha256):
+        super().delete(blob_path(sha256))
+        for kind in PREVIEW_SIZES:
+            super().delete(preview_path(sha256, kind))
@@ -0,0 +1,309 @@
+import hashlib
+import importlib.util
+import shutil
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from io import StringIO
+from types import SimpleNamespace
+from unittest import skipUnless
+
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.test import RequestFactory, TestCase, override_settings
+from django.utils import timezone
+
+from . import pipeline
+from .extraction import find_identifiers, render_previews
+from .models import DocumentText, StoredBlob, UploadSession
+from .sendfile import send_file
+from .storage import ContentAddressedStorage, blob_path, parse_blob_name, preview_path
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+        self.data = b'%PDF-1.4 PAN certificate'
+        self.sha256 = hashlib.sha256(self.data).hexdigest()
+
+    def test_identical_uploads_share_one_blob(self):
+        first = self.storage.save('vendor_docs/pan/2025/01/pan.pdf', ContentFile(self.data))
+        second = self.storage.save('customer_documents/2025/02/PAN copy.pdf', ContentFile(self.data))
+
+        self.assertEqual(parse_blob_name(first), (self.sha256, 'pan.pdf'))
+        self.assertEqual(parse_blob_name(second), (self.sha256, 'PAN_copy.pdf'))
+        self.assertEqual(self.storage.path(first), self.storage.path(second))
+        self.assertEqual(StoredBlob.objects.get(sha256=self.sha256).ref_count, 2)
+        with self.storage.open(second) as f:
+            self.assertEqual(f.read(), self.data)
+
+    def test_blob_removed_with_last_reference(self):
+        first = self.storage.save('a.pdf', ContentFile(self.data))
+        second = self.storage.save('b.pdf', ContentFile(self.data))
+        self.storage.release(first)
+        self.assertTrue(self.storage.exists(second))
+        self.storage.release(second)
+        self.assertFalse(StoredBlob.objects.filter(sha256=self.sha256).exists())
+        self.assertFalse(self.storage.exists(blob_path(self.sha256)))
+
+    def test_legacy_names_use_media_root(self):
+        self.assertIsNone(parse_blob_name('vendor_docs/2024/05/pan.pdf'))
+        self.assertTrue(self.storage.url('vendor_docs/2024/05/pan.pdf').startswith('/media/'))
+
+
+class SendFileTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+        self.data = bytes(range(256)) * 40
+        name = self.storage.save('report.pdf', ContentFile(self.data))
+        self.sha256, _ = parse_blob_name(name)
+        self.path = self.storage.path(name)
+        self.factory = RequestFactory()
+
+    @override_settings(DOCUMENT_ACCEL_REDIRECT=True)
+    def test_nginx_sends_the_bytes(self):
+        with self.settings(MEDIA_ROOT=self.media_root):
+            response = send_file(self.factory.get('/'), self.path, 'report.pdf', sha256=self.sha256)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + blob_path(self.sha256))
+        self.assertEqual(response['ETag'], f'"{self.sha256}"')
+        self.assertEqual(response.content, b'')
+
+    @override_settings(DOCUMENT_ACCEL_REDIRECT=False)
+    def test_conditional_and_range_requests(self):
+        request = self.factory.get('/', HTTP_IF_NONE_MATCH=f'"{self.sha256}"')
+        self.assertEqual(send_file(request, self.path, sha256=self.sha256).status_code, 304)
+
+        request = self.factory.get('/', HTTP_RANGE='bytes=100-199')
+        response = send_file(request, self.path, sha256=self.sha256)
+        self.assertEqual(response.status_code, 206)
+        self.assertEqual(response['Content-Range'], f'bytes 100-199/{len(self.data)}')
+        self.assertEqual(b''.join(response.streaming_content), self.data[100:200])
+
+        request = self.factory.get('/', HTTP_RANGE=f'bytes={len(self.data)}-')
+        self.assertEqual(send_file(request, self.path, sha256=self.sha256).status_code, 416)
+
+
+class ChunkedUploadTests(TestCase):
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, CHUNKED_UPLOAD_CHUNK_SIZE=1000)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email='uploader@example.com', password='x')
+        self.client.force_login(self.user)
+        self.data = bytes(range(256)) * 10
+
+    def init(self, filename='gst.pdf', size=None):
+        return self.client.post('/documents/uploads/', {'filename': filename, 'size': size or len(self.data)})
+
+    def chunk(self, upload_id, offset, data):
+        return self.client.post(f'/documents/uploads/{upload_id}/chunk?offset={offset}', data,
+                                content_type='application/octet-stream')
+
+    def test_resumable_upload_into_blob_store(self):
+        upload_id = self.init().json()['upload_id']
+        self.assertEqual(self.chunk(upload_id, 0, self.data[:1000]).json()['offset'], 1000)
+
+        # A retried chunk at a stale offset is told where to resume.
+        response = self.chunk(upload_id, 0, self.data[:1000])
+        self.assertEqual((response.status_code, response.json()['offset']), (409, 1000))
+        self.assertEqual(self.client.get(f'/documents/uploads/{upload_id}/').json()['offset'], 1000)
+
+        self.chunk(upload_id, 1000, self.data[1000:2000])
+        self.assertFalse(self.client.post(f'/documents/uploads/{upload_id}/finalize').json()['success'])
+        self.chunk(upload_id, 2000, self.data[2000:])
+        result = self.client.post(f'/documents/uploads/{upload_id}/finalize').json()
+
+        self.assertEqual(result['sha256'], hashlib.sha256(self.data).hexdigest())
+        self.assertEqual(StoredBlob.objects.get(sha256=result['sha256']).ref_count, 1)
+
+    def test_bytes_before_a_disconnect_are_kept(self):
+        from .uploads import write_chunk
+        upload_id = self.init().json()['upload_id']
+
+        class Disconnecting:
+            parts = [self.data[:500]]
+
+            def read(self, size):
+                if self.parts:
+                    return self.parts.pop()
+                raise OSError("Connection reset by peer")
+
+        with self.assertRaises(OSError):
+            write_chunk(UploadSession.objects.get(pk=upload_id), 0, Disconnecting(), 1000)
+        self.assertEqual(self.client.get(f'/documents/uploads/{upload_id}/').json()['offset'], 500)
+        self.assertEqual(self.chunk(upload_id, 500, self.data[500:]).json()['offset'], len(self.data))
+
+    def test_extension_and_size_checked_before_upload(self):
+        self.assertEqual(self.init(filename='setup.exe').status_code, 400)
+        with override_settings(CHUNKED_UPLOAD_MAX_SIZE=100):
+            self.assertEqual(self.init().status_code, 400)
+        upload_id = self.init(size=10).json()['upload_id']
+        self.assertEqual(self.chunk(upload_id, 0, self.data[:11]).status_code, 400)
+
+    def test_claimed_upload_moves_reference_to_document(self):
+        from .uploads import claim_upload
+        from .models import UploadSession
+        upload_id = self.init(size=500).json()['upload_id']
+        self.chunk(upload_id, 0, self.data[:500])
+        sha256 = self.client.post(f'/documents/uploads/{upload_id}/finalize').json()['sha256']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            name = claim_upload(self.user, upload_id)
+        self.assertEqual(parse_blob_name(name)[0], sha256)
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
+        self.assertEqual(StoredBlob.objects.get(sha256=sha256).ref_count, 1)
+
+
+class FindIdentifiersTests(TestCase):
+
+    def test_pan_and_gst_numbers_with_ocr_slips(self):
+        text = "GOVERNMENT OF INDIA\nGSTIN: 27AAPFU0939F1ZV\nPermanent Account Number ABCDEI234F"
+        pan_numbers, gst_numbers = find_identifiers(text)
+        self.assertEqual(gst_numbers, ['27AAPFU0939F1ZV'])
+        # The O/I read as digits is corrected; the GSTIN contributes its PAN.
+        self.assertEqual(pan_numbers, ['ABCDE1234F', 'AAPFU0939F'])
+
+    def test_plain_words_are_not_pan_numbers(self):
+        self.assertEqual(find_identifiers("CERTIFIED GOVERNMENT REGISTERED"), ([], []))
+
+
+class ExtractionPipelineTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+
+    def run_pipeline(self):
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            return pipeline.collect(pipeline.submit(pool, pipeline.claim(10)))
+
+    def test_duplicate_uploads_are_queued_once(self):
+        first = self.storage.save('vendor/gst.docx', ContentFile(b'PK docx'))
+        second = self.storage.save('customer/gst copy.docx', ContentFile(b'PK docx'))
+        pipeline.enqueue(first)
+        pipeline.enqueue(second)
+        self.assertEqual(DocumentText.objects.count(), 1)
+
+        self.assertEqual(self.run_pipeline(), {'skipped': 1})
+        self.assertEqual(pipeline.claim(10), [])
+
+    @skipUnless(importlib.util.find_spec('pymupdf'), "PyMuPDF is not installed")
+    def test_pdf_text_layer_and_identifiers(self):
+        import pymupdf
+        pdf = pymupdf.open()
+        for line in ("Form GST REG-06", "GSTIN 27AAPFU0939F1ZV"):
+            pdf.new_page().insert_text((72, 72), line + " Registration Certificate issued under the GST Act")
+        name = self.storage.save('gst.pdf', ContentFile(pdf.tobytes()))
+        pipeline.enqueue(name)
+
+        self.assertEqual(self.run_pipeline(), {'done': 1})
+        text = DocumentText.objects.get()
+        self.assertEqual((text.pages, text.ocr_pages, text.method), (2, 0, 'text'))
+        self.assertEqual(text.gst_numbers, ['27AAPFU0939F1ZV'])
+        self.assertTrue(text.has_preview)
+        self.assertTrue(self.storage.exists(preview_path(text.pk, 'thumb')))
+
+    def test_detected_numbers_checked_against_record(self):
+        name = self.storage.save('pan.pdf', ContentFile(b'%PDF-1.4 scanned'))
+        DocumentText.objects.create(blob_id=parse_blob_name(name)[0], status='done', pan_numbers=['ABCDE1234F'])
+        documents = [SimpleNamespace(file=SimpleNamespace(name=name)) for _ in range(2)]
+
+        pipeline.attach_document_text(documents[:1], 'file', pan_numbers=['ABCDE1234F'])
+        pipeline.attach_document_text(documents[1:], 'file', pan_numbers=['ZZZZZ9999Z'])
+        self.assertEqual([d.identifiers_match for d in documents], [True, False])
+        self.assertEqual(documents[0].extracted.pan_numbers, ['ABCDE1234F'])
+
+
+class PreviewTests(TestCase):
+
+    def setUp(self):
+        from io import BytesIO
+        from PIL import Image
+        from django.contrib.auth import get_user_model
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root, DOCUMENT_ACCEL_REDIRECT=False)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.storage = ContentAddressedStorage(location=self.media_root)
+        png = BytesIO()
+        Image.new('RGB', (1600, 2000), 'white').save(png, format='PNG')
+        self.name = self.storage.save('scan.png', ContentFile(png.getvalue()))
+        self.sha256 = parse_blob_name(self.name)[0]
+        self.client.force_login(get_user_model().objects.create_user(email='reviewer@example.com', password='x'))
+
+    def test_previews_rendered_next_to_blob_and_served(self):
+        thumb = self.storage.path(preview_path(self.sha256, 'thumb'))
+        render_previews(self.storage.path(self.name), 'image', {thumb: 240})
+
+        from PIL import Image
+        with Image.open(thumb) as image:
+            self.assertEqual(image.size, (240, 300))
+        response = self.client.get(f'/documents/preview/{self.sha256}/thumb.png')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(self.client.get(f'/documents/preview/{self.sha256}/other.png').status_code, 404)
+
+        # Previews go with the last reference to the blob.
+        self.storage.release(self.name)
+        self.assertFalse(self.storage.exists(preview_path(self.sha256, 'thumb')))
+
+
+class LongFilenameTests(TestCase):
+
+    def setUp(self):
+        from django.contrib.auth import get_user_model
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email='longname@example.com', password='x')
+
+    def test_long_filenames_are_trimmed_to_the_field(self):
+        data = b'%PDF-1.4 GST registration certificate'
+        session = UploadSession.objects.create(user=self.user, filename='gst.pdf', size=len(data))
+        session.file.save('GST registration certificate ' + 'annexure ' * 30 + '.pdf', ContentFile(data))
+
+        name = UploadSession.objects.get(pk=session.pk).file.name
+        self.assertEqual(len(name), UploadSession._meta.get_field('file').max_length)
+        sha256, filename = parse_blob_name(name)
+        self.assertEqual(sha256, hashlib.sha256(data).hexdigest())
+        self.assertTrue(filename.startswith('GST_registration_certificate_annexure'))
+        self.assertTrue(filename.endswith('.pdf'))
+
+
+class BlobGcTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_recently_referenced_blobs_are_kept(self):
+        old = timezone.now() - timedelta(days=2)
+        for sha256 in ('a' * 64, 'b' * 64, 'c' * 64):
+            StoredBlob.objects.create(sha256=sha256, size=1, ref_count=1)
+        StoredBlob.objects.exclude(sha256='c' * 64).update(created_at=old, last_referenced_at=old)
+        # A document is taking 'b' while the command runs; 'c' was only just uploaded.
+        ContentAddressedStorage(location=self.media_root).add_reference('b' * 64)
+
+        call_command('blob_gc', stdout=StringIO())
+        self.assertEqual(sorted(StoredBlob.objects.values_list('sha256', 'ref_count')),
+                         [('b' * 64, 2), ('c' * 64, 1)])
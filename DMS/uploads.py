@@ -0,0 +1,205 @@
+# DMS/uploads.py
+#
+# Chunked, resumable uploads. The client creates a session with the file name
+# and size, sends the bytes in chunks at explicit offsets, and finalizes:
+#
+#   POST documents/uploads/                     {filename, size} -> {upload_id, chunk_size}
+#   POST documents/uploads/<id>/chunk?offset=N  raw bytes        -> {offset}
+#   GET  documents/uploads/<id>/                                 -> {offset, size, status}
+#   POST documents/uploads/<id>/finalize                         -> {upload_id, name, sha256}
+#
+# After a disconnect the client asks for the status and continues from the
+# returned offset. Chunks are streamed from the request straight to
+# MEDIA_ROOT/blobs/.uploads/<id>.part and hashed as they arrive, so finalize
+# only moves the file into the blob store. A form then names the upload with
+# an `upload_id` field instead of a multipart file (claim_upload).
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from .models import UploadSession
+from .storage import BLOB_DIR, document_storage, parse_blob_name
+
+READ_SIZE = 64 * 1024
+UPLOAD_DIR = os.path.join(BLOB_DIR, '.uploads')
+
+# Running SHA-256 per session, so consecutive chunks handled by this process
+# do not re-read the file. A chunk served by another worker (or a resumed
+# upload) invalidates it and finalize hashes the file from disk instead.
+_hashers = OrderedDict()
+_hashers_lock = threading.Lock()
+MAX_HASHERS = 256
+
+
+class OffsetMismatch(Exception):
+    def __init__(self, expected):
+        super().__init__(f"Expected offset {expected}")
+        self.expected = expected
+
+
+def part_path(session):
+    return document_storage().path(os.path.join(UPLOAD_DIR, f'{session.pk}.part'))
+
+
+def validate_upload(filename, size):
+    """Extension and size checks made before any byte is accepted."""
+    extension = os.path.splitext(filename)[1].lstrip('.').lower()
+    if extension not in settings.ALLOWED_FILE_EXTENSIONS:
+        raise ValidationError(
+            f"File type .{extension or '?'} is not allowed. "
+            f"Allowed: {', '.join(settings.ALLOWED_FILE_EXTENSIONS)}"
+        )
+    if size <= 0:
+        raise ValidationError("File is empty.")
+    if size > settings.CHUNKED_UPLOAD_MAX_SIZE:
+        raise ValidationError(
+            f"File is larger than {settings.CHUNKED_UPLOAD_MAX_SIZE // (1024 * 1024)} MB."
+        )
+
+
+def create_session(user, filename, size):
+    filename = os.path.basename(filename or '')
+    validate_upload(filename, size)
+    session = UploadSession.objects.create(user=user, filename=filename, size=size)
+    path = part_path(session)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    open(path, 'wb').close()
+    return session
+
+
+def _take_hasher(session_id, offset):
+    with _hashers_lock:
+        entry = _hashers.pop(session_id, None)
+    if offset == 0:
+        return hashlib.sha256()
+    if entry and entry[1] == offset:
+        return entry[0]
+    return None
+
+
+def _keep_hasher(session_id, hasher, offset):
+    if hasher is None:
+        return
+    with _hashers_lock:
+        _hashers[session_id] = (hasher, offset)
+        while len(_hashers) > MAX_HASHERS:
+            _hashers.popitem(last=False)
+
+
+def write_chunk(session, offset, stream, length):
+    """
+    Append `length` bytes read from `stream` at `offset`. The offset must be
+    where the previous chunk ended; bytes received before a disconnect are
+    kept, so the client resumes from the offset returned by the status call.
+    Returns the new offset.
+    """
+    if session.status != 'open':
+        raise ValidationError("Upload is already finalized.")
+    if length <= 0 or length > settings.CHUNKED_UPLOAD_CHUNK_SIZE:
+        raise ValidationError(f"Chunk size must be between 1 and {settings.CHUNKED_UPLOAD_CHUNK_SIZE} bytes.")
+    if offset + length > session.size:
+        raise ValidationError("Chunk goes past the declared file size.")
+
+    failure = None
+    with transaction.atomic():
+        # One writer per session, on every platform: a retried chunk waits
+        # on the row lock for the stalled one.
+        received = UploadSession.objects.select_for_update().values_list('received', flat=True).get(pk=session.pk)
+        if offset != received:
+            raise OffsetMismatch(received)
+
+        hasher = _take_hasher(session.pk, offset)
+        written = 0
+        with open(part_path(session), 'r+b') as f:
+            f.seek(offset)
+            f.truncate()
+            try:
+                while written < length:
+                    data = stream.read(min(READ_SIZE, length - written))
+                    if not data:
+                        break
+                    f.write(data)
+                    if hasher is not None:
+                        hasher.update(data)
+                    written += len(data)
+            except Exception as e:
+                # Keep what arrived before the client went away; re-raised
+                # once the new offset is committed.
+                failure = e
+        new_offset = offset + written
+        UploadSession.objects.filter(pk=session.pk).update(received=new_offset)
+    session.received = new_offset
+    _keep_hasher(session.pk, hasher, new_offset)
+    if failure is not None:
+        raise failure
+    return new_offset
+
+
+def finalize(session):
+    """Move the assembled file into the blob store. Returns the stored name."""
+    if session.status == 'complete':
+        return session.file.name
+    if session.received != session.size:
+        raise ValidationError(f"Upload incomplete: {session.received} of {session.size} bytes received.")
+    validate_upload(session.filename, session.received)
+
+    path = part_path(session)
+    if os.path.getsize(path) != session.size:
+        raise ValidationError("Upload is corrupt, please upload the file again.")
+    hasher = _take_hasher(session.pk, session.size)
+    if hasher is None:
+        hasher = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for data in iter(lambda: f.read(READ_SIZE), b''):
+                hasher.update(data)
+
+    name = document_storage().store_file(path, session.filename, hasher.hexdigest(), session.size,
+                                         UploadSession._meta.get_field('file').max_length)
+    session.file.name = name
+    session.status = 'complete'
+    session.save(update_fields=['file', 'status', 'updated_at'])
+    return name
+
+
+def use_chunked_upload(request, form, field_name):
+    """
+    Let `form` validate without a multipart file when the POST names a
+    finalized upload. Returns the upload id, or None for a normal upload.
+    """
+    upload_id = request.POST.get('upload_id')
+    if upload_id:
+        form.fields[field_name].required = False
+    return upload_id or None
+
+
+def claim_upload(user, upload_id):
+    """
+    Hand a finalized upload over to a document: returns the stored name to
+    assign to its FileField (name only, the bytes are already stored).
+    """
+    try:
+        session = UploadSession.objects.get(pk=upload_id, user=user, status='complete')
+    except (UploadSession.DoesNotExist, ValidationError, ValueError):
+        raise ValidationError("Uploaded file not found, please upload it again.")
+    name = session.file.name
+    with transaction.atomic():
+        # The document takes its own reference; the session's is released
+        # when the session row goes.
+        document_storage().add_reference(parse_blob_name(name)[0])
+        session.delete()
+    return name
+
+
+def discard(session):
+    path = part_path(session)
+    if os.path.exists(path):
+        os.unlink(path)
+    with _hashers_lock:
+        _hashers.pop(session.pk, None)
+    session.delete()
@@ -0,0 +1,17 @@
+# urls.py
+from django.urls import path
+from . import views
+
+app_name = 'dms'
+
+urlpatterns = [
+    # Chunked uploads (DMS/uploads.py)
+    path('uploads/', views.upload_init, name='upload_init'),
+    path('uploads/<uuid:upload_id>/', views.upload_status, name='upload_status'),
+    path('uploads/<uuid:upload_id>/chunk', views.upload_chunk, name='upload_chunk'),
+    path('uploads/<uuid:upload_id>/finalize', views.upload_finalize, name='upload_finalize'),
+    path('uploads/<uuid:upload_id>/cancel', views.upload_cancel, name='upload_cancel'),
+
+    path('preview/<str:sha256>/<str:kind>.png', views.preview, name='preview'),
+    path('<str:sha256>/<str:filename>', views.download, name='download'),
+]
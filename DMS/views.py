@@ -0,0 +1,111 @@
+import json
+
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.core.exceptions import ValidationError
+from django.http import Http404, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_GET, require_POST
+
+from . import uploads
+from .models import StoredBlob, UploadSession
+from .sendfile import send_file
+from .storage import PREVIEW_SIZES, blob_path, document_storage, parse_blob_name, preview_path
+
+
+@login_required
+@require_GET
+def download(request, sha256, filename):
+    """Serve a stored document; the bytes go out through nginx (X-Accel-Redirect)."""
+    if not StoredBlob.objects.filter(sha256=sha256, ref_count__gt=0).exists():
+        raise Http404("File not found.")
+    path = document_storage().path(blob_path(sha256))
+    as_attachment = request.GET.get('inline') != '1'
+    return send_file(request, path, filename, as_attachment=as_attachment, sha256=sha256)
+
+
+@login_required
+@require_GET
+def preview(request, sha256, kind):
+    """Thumbnail or first-page PNG rendered by extract_documents; cached for good."""
+    if kind not in PREVIEW_SIZES or not StoredBlob.objects.filter(sha256=sha256, ref_count__gt=0).exists():
+        raise Http404("Preview not found.")
+    path = document_storage().path(preview_path(sha256, kind))
+    return send_file(request, path, f'{sha256[:12]}-{kind}.png', as_attachment=False, sha256=sha256)
+
+
+def _session_json(session):
+    return {
+        'upload_id': str(session.pk),
+        'filename': session.filename,
+        'size': session.size,
+        'offset': session.received,
+        'status': session.status,
+        'chunk_size': settings.CHUNKED_UPLOAD_CHUNK_SIZE,
+    }
+
+
+def _error(message, status=400, **extra):
+    return JsonResponse({'success': False, 'message': message, **extra}, status=status)
+
+
+@login_required
+@require_POST
+def upload_init(request):
+    try:
+        data = json.loads(request.body or b'{}') if request.content_type == 'application/json' else request.POST
+        session = uploads.create_session(request.user, data.get('filename', ''), int(data.get('size') or 0))
+    except (ValueError, TypeError):
+        return _error("filename and size are required.")
+    except ValidationError as e:
+        return _error(' '.join(e.messages))
+    return JsonResponse({'success': True, **_session_json(session)}, status=201)
+
+
+@login_required
+@require_GET
+def upload_status(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    return JsonResponse({'success': True, **_session_json(session)})
+
+
+@login_required
+@require_POST
+def upload_chunk(request, upload_id):
+    """Raw chunk bytes in the body (not multipart), written at ?offset=."""
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        offset = int(request.GET.get('offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+        new_offset = uploads.write_chunk(session, offset, request, length)
+    except ValueError:
+        return _error("offset and Content-Length are required.")
+    except uploads.OffsetMismatch as e:
+        return _error("Offset mismatch, resume from the given offset.", status=409, offset=e.expected)
+    except ValidationError as e:
+        return _error(' '.join(e.messages))
+    return JsonResponse({'success': True, 'offset': new_offset, 'size': session.size})
+
+
+@login_required
+@require_POST
+def upload_finalize(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    try:
+        name = uploads.finalize(session)
+    except ValidationError as e:
+        return _error(' '.join(e.messages), offset=session.received)
+    return JsonResponse({
+        'success': True,
+        'upload_id': str(session.pk),
+        'name': name,
+        'sha256': parse_blob_name(name)[0],
+    })
+
+
+@login_required
+@require_POST
+def upload_cancel(request, upload_id):
+    session = get_object_or_404(UploadSession, pk=upload_id, user=request.user)
+    uploads.discard(session)
+    return JsonResponse({'success': True})
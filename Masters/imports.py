@@ -0,0 +1,486 @@
+# Masters/imports.py
+#
+# Bulk spreadsheet imports. An upload (or `manage.py run_imports --file`)
+# creates an import_batch; `manage.py run_imports --loop` runs queued batches
+# outside the web workers. The workbook is streamed with openpyxl in
+# read-only mode, IMPORT_CHUNK_ROWS rows at a time. Each chunk is checked as a
+# pandas DataFrame (vectorized checks; an import_error row per failed cell)
+# and its valid rows are loaded with multi-row INSERTs in one transaction per
+# chunk, so progress is visible while a 100k-row file runs.
+#
+# An importer (settings.IMPORTERS) declares its columns and implements
+# validate(frame, checks), load(frame) and finish(). One that sets
+# accepts_bundle also takes a .zip holding the workbook and the files its
+# rows name (documents); they are read from the zip with bundle_member().
+
+import logging
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+from contextlib import ExitStack
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from Account.db_utils import callproc
+from Masters.models import import_batch, import_error
+
+logger = logging.getLogger(__name__)
+
+EMAIL_RE = r'[^@\s]+@[^@\s]+\.[A-Za-z]{2,}'
+MOBILE_RE = r'\d{10}'
+PAN_RE = r'[A-Z]{5}\d{4}[A-Z]'
+GST_RE = r'\d{2}[A-Z]{5}\d{4}[A-Z][1-9A-Z]Z[0-9A-Z]'
+
+
+class ImportAbort(Exception):
+    """The file cannot be imported at all (wrong sheet, missing columns)."""
+
+
+def normalize_header(value):
+    return re.sub(r'[^0-9a-z]+', '_', str(value or '').strip().lower()).strip('_')
+
+
+def read_chunks(file, chunk_rows, sheet_name=None):
+    """
+    Stream a workbook from an open binary file: returns (columns, estimated
+    data rows, iterator of DataFrames). Frames are indexed by spreadsheet row
+    number and use normalized header names; blank rows are dropped.
+    """
+    import openpyxl
+    import pandas as pd
+
+    # A file object, not a path: stored blobs have no .xlsx extension.
+    workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    sheet = workbook[sheet_name] if sheet_name else workbook.worksheets[0]
+    rows = sheet.iter_rows(values_only=True)
+    header = next(rows, None)
+    if not header:
+        workbook.close()
+        raise ImportAbort("The sheet is empty.")
+    columns = [normalize_header(value) or f'column_{n}' for n, value in enumerate(header, 1)]
+    total = (sheet.max_row - 1) if sheet.max_row else None
+
+    def chunks():
+        try:
+            numbers, values = [], []
+            for number, row in enumerate(rows, 2):
+                if not any(v not in (None, '') for v in row):
+                    continue
+                numbers.append(number)
+                values.append(tuple(row[:len(columns)]) + (None,) * (len(columns) - len(row)))
+                if len(values) == chunk_rows:
+                    yield pd.DataFrame(values, index=numbers, columns=columns, dtype=object)
+                    numbers, values = [], []
+            if values:
+                yield pd.DataFrame(values, index=numbers, columns=columns, dtype=object)
+        finally:
+            workbook.close()
+
+    return columns, total, chunks()
+
+
+class Checks:
+    """
+    Vectorized row checks for one chunk. Every check takes a boolean mask
+    over the frame; only failing rows are turned into error records.
+    """
+
+    def __init__(self, frame):
+        self.frame = frame
+        self.errors = []
+        self._bad = set()
+
+    def text(self, column):
+        """Column as stripped strings, '' for blanks."""
+        return self.frame[column].map(lambda v: '' if v is None else str(v).strip())
+
+    def fail(self, mask, column, message):
+        for row_number in self.frame.index[mask.to_numpy(dtype=bool)]:
+            self.errors.append((int(row_number), column, message))
+            self._bad.add(row_number)
+
+    def required(self, *columns):
+        for column in columns:
+            self.fail(self.text(column) == '', column, "Required")
+
+    def matches(self, column, pattern, message, upper=False):
+        values = self.text(column)
+        if upper:
+            values = values.str.upper()
+        self.fail((values != '') & ~values.str.fullmatch(pattern), column, message)
+
+    def max_length(self, column, limit):
+        """Fails values longer than `limit` as written to the model (cell_text)."""
+        self.fail(self.frame[column].map(cell_text).str.len() > limit, column, f"At most {limit} characters")
+
+    def one_of(self, column, choices, message=None):
+        values = self.text(column)
+        self.fail((values != '') & ~values.isin(list(choices)), column,
+                  message or f"Must be one of: {', '.join(map(str, choices))}")
+
+    def dates(self, column):
+        """Fails unparseable dates; returns the column as date objects (None for blanks)."""
+        parsed = self.frame[column].map(_parse_date)
+        self.fail((self.text(column) != '') & parsed.isna(), column, "Invalid date")
+        return parsed
+
+    def unique(self, column, seen, message="Duplicate in file"):
+        """Blank-insensitive duplicates within the chunk and against earlier chunks (`seen`)."""
+        values = self.text(column).str.upper()
+        present = values != ''
+        self.fail(present & (values.duplicated() | values.isin(seen)), column, message)
+        seen.update(values[present])
+
+    def exists(self, column, known, message="Not found"):
+        values = self.text(column).str.upper()
+        self.fail((values != '') & ~values.isin(known), column, message)
+
+    def decimals(self, column, limit=Decimal('1e13'), message="Must be a number of 0 or more"):
+        """Fails non-numbers, negatives and values of `limit` or more; returns the column as Decimals."""
+        parsed = self.text(column).map(lambda v: _parse_decimal(v, limit))
+        self.fail((self.text(column) != '') & parsed.isna(), column, message)
+        return parsed
+
+    def filled(self, *columns):
+        """Mask of rows with any of the columns filled in."""
+        mask = self.text(columns[0]) != ''
+        for column in columns[1:]:
+            mask |= self.text(column) != ''
+        return mask
+
+    def required_with(self, mask, columns, message):
+        """Columns required on the rows in `mask`, e.g. when an optional section is used."""
+        for column in columns:
+            self.fail(mask & (self.text(column) == ''), column, message)
+
+    def valid(self):
+        return self.frame.loc[~self.frame.index.isin(list(self._bad))]
+
+
+def _parse_date(value):
+    if value is None or value == '':
+        return None
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    for fmt in ('%d-%m-%Y', '%d/%m/%Y', '%Y-%m-%d', '%d.%m.%Y'):
+        try:
+            return datetime.strptime(str(value).strip(), fmt).date()
+        except ValueError:
+            continue
+    return None
+
+
+def _parse_decimal(value, limit):
+    if value == '':
+        return None
+    try:
+        number = Decimal(value.replace(',', ''))
+    except InvalidOperation:
+        return None
+    return number if number.is_finite() and 0 <= number < limit else None
+
+
+def lookup(queryset, *fields):
+    """{upper-cased value: pk} over the given fields, e.g. state name and code."""
+    known = {}
+    for row in queryset.values('pk', *fields):
+        for field in fields:
+            if row[field]:
+                known.setdefault(str(row[field]).strip().upper(), row['pk'])
+    return known
+
+
+def cell(value):
+    """A DataFrame cell as a model value: blanks and NaN -> None."""
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    return value
+
+
+def cell_text(value):
+    """A cell for a CharField: '' for blanks, whole numbers without '.0'."""
+    value = cell(value)
+    if value is None:
+        return ''
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def clean(value):
+    """A DataFrame cell as a model/JSON value: blanks -> None, dates -> ISO."""
+    if value is None:
+        return None
+    if isinstance(value, float) and value != value:
+        return None
+    if isinstance(value, str):
+        return value.strip() or None
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+class BaseImporter:
+    """Subclass per import kind and list it in settings.IMPORTERS."""
+    title = "Import"
+    columns = ()
+    sheet_name = None
+    accepts_bundle = False
+
+    def __init__(self, batch):
+        self.batch = batch
+        self.options = batch.options or {}
+        self.bundle = None  # zipfile.ZipFile when a .zip was uploaded
+        self._members = None
+
+    def bundle_member(self, filename):
+        """The bundle's ZipInfo for a file named in the sheet (folders and case ignored), or None."""
+        if self.bundle is None or not filename:
+            return None
+        if self._members is None:
+            self._members = {
+                os.path.basename(info.filename).lower(): info
+                for info in self.bundle.infolist() if not info.is_dir()
+            }
+        return self._members.get(os.path.basename(str(filename).replace('\\', '/')).lower())
+
+    def expected_columns(self):
+        return list(self.columns)
+
+    def prepare(self, columns):
+        """Called once with the sheet's columns, before the first chunk."""
+
+    def validate(self, frame, checks):
+        raise NotImplementedError
+
+    def load(self, frame):
+        """Insert the valid rows of a chunk; returns the number of rows inserted."""
+        raise NotImplementedError
+
+    def finish(self):
+        """After the last chunk; returns a summary message."""
+        return ''
+
+
+def importer_for(batch):
+    try:
+        return import_string(settings.IMPORTERS[batch.kind])(batch)
+    except KeyError:
+        raise ImportAbort(f"Unknown import type {batch.kind!r}.")
+
+
+def create_batch(kind, uploaded_file, user=None, **options):
+    if kind not in settings.IMPORTERS:
+        raise ImportAbort(f"Unknown import type {kind!r}.")
+    name = uploaded_file.name.lower()
+    if import_string(settings.IMPORTERS[kind]).accepts_bundle:
+        if not name.endswith(('.xlsx', '.zip')):
+            raise ImportAbort("Upload the filled-in .xlsx template, or a .zip with the template and its documents.")
+    elif not name.endswith('.xlsx'):
+        raise ImportAbort("Upload the filled-in .xlsx template.")
+    return import_batch.objects.create(
+        kind=kind, options=options, file_name=uploaded_file.name, file=uploaded_file,
+        created_by=user if user and user.is_authenticated else None,
+    )
+
+
+def claim(batch_id=None):
+    """Next queued batch, marked running; None when the queue is empty."""
+    queued = import_batch.objects.filter(status='queued').order_by('created_at')
+    if batch_id is not None:
+        queued = queued.filter(pk=batch_id)
+    for pk in queued.values_list('pk', flat=True)[:5]:
+        if import_batch.objects.filter(pk=pk, status='queued').update(status='running', started_at=timezone.now()):
+            return import_batch.objects.get(pk=pk)
+    return None
+
+
+def _open_bundle(importer, file, stack):
+    """Open an uploaded .zip as the importer's bundle; returns its workbook as a temporary file."""
+    try:
+        importer.bundle = stack.enter_context(zipfile.ZipFile(file))
+    except zipfile.BadZipFile:
+        raise ImportAbort("The .zip file is damaged.")
+    workbooks = [
+        info for info in importer.bundle.infolist()
+        if info.filename.lower().endswith('.xlsx') and not os.path.basename(info.filename).startswith(('~$', '.'))
+    ]
+    if len(workbooks) != 1:
+        raise ImportAbort("The .zip must hold exactly one .xlsx workbook.")
+    # openpyxl seeks all over the workbook; a member of a zip only seeks by re-reading.
+    workbook = stack.enter_context(tempfile.TemporaryFile())
+    with importer.bundle.open(workbooks[0]) as member:
+        shutil.copyfileobj(member, workbook)
+    workbook.seek(0)
+    return workbook
+
+
+def run_import(batch, progress=None):
+    """Process a claimed batch. `progress(batch)` is called after every chunk."""
+    stack = ExitStack()
+    try:
+        importer = importer_for(batch)
+        file = stack.enter_context(batch.file.open('rb'))
+        if batch.file_name.lower().endswith('.zip'):
+            file = _open_bundle(importer, file, stack)
+        columns, total, chunks = read_chunks(file, settings.IMPORT_CHUNK_ROWS, importer.sheet_name)
+        missing = [c for c in importer.expected_columns() if c not in columns]
+        if missing:
+            raise ImportAbort(f"Missing columns: {', '.join(missing)}. Download the template again.")
+        import_batch.objects.filter(pk=batch.pk).update(total_rows=total)
+        importer.prepare(columns)
+
+        for frame in chunks:
+            checks = Checks(frame)
+            importer.validate(frame, checks)
+            valid = checks.valid()
+            with transaction.atomic():
+                inserted = importer.load(valid) if len(valid) else 0
+                room = settings.IMPORT_MAX_ERRORS - batch.error_rows
+                if room > 0 and checks.errors:
+                    import_error.objects.bulk_create([
+                        import_error(batch=batch, row_number=row, column_name=column, message=message)
+                        for row, column, message in checks.errors[:room]
+                    ], batch_size=1000)
+                bad_rows = len(frame) - len(valid)
+                import_batch.objects.filter(pk=batch.pk).update(
+                    processed_rows=F('processed_rows') + len(frame),
+                    inserted_rows=F('inserted_rows') + inserted,
+                    error_rows=F('error_rows') + bad_rows,
+                )
+            batch.refresh_from_db()
+            if progress:
+                progress(batch)
+
+        message = importer.finish()
+        status = 'done'
+    except ImportAbort as e:
+        message, status = str(e), 'failed'
+    except Exception as e:
+        logger.exception("Import %s failed", batch.pk)
+        message, status = f"Import stopped: {e}", 'failed'
+    finally:
+        stack.close()
+    import_batch.objects.filter(pk=batch.pk).update(status=status, message=message, finished_at=timezone.now())
+    batch.refresh_from_db()
+    return batch
+
+
+class MasterImporter(BaseImporter):
+    """
+    Employee, Worksite, Company and Roster masters ('em', 'sm', 'cm', 'r').
+    Their tables are not models in this tree, so an entity is imported only
+    once settings.MASTER_IMPORT_TABLES names its table and maps every
+    sample_xlsx column (normalized) to a table column. Each chunk is then
+    merged with multi-row INSERT ... ON DUPLICATE KEY UPDATE statements keyed
+    on the template's first column, which needs a unique index; a template
+    column without a mapped table column stops the import before the first
+    chunk instead of being dropped.
+    """
+    ENTITIES = {'em': 'Employee Master', 'sm': 'Worksite Master', 'cm': 'Company Master', 'r': 'Roster'}
+    AUDIT_COLUMNS = ('created_by', 'created_at', 'updated_by', 'updated_at')
+
+    def __init__(self, batch):
+        super().__init__(batch)
+        self.entity = self.options.get('entity')
+        if self.entity not in self.ENTITIES:
+            raise ImportAbort(f"Unknown master {self.entity!r}.")
+        self.title = self.ENTITIES[self.entity]
+        config = settings.MASTER_IMPORT_TABLES.get(self.entity)
+        if not config:
+            raise ImportAbort(f"{self.title} import is not configured (settings.MASTER_IMPORT_TABLES).")
+        self.table, self.mapping = config['table'], config['columns']
+        self.user = batch.created_by_id
+        self.template = None
+        self.seen = set()
+        self.updated = 0
+
+    def expected_columns(self):
+        if self.template is None:
+            self.template = [normalize_header(c) for c in sample_columns(self.entity, 'i', self.user)]
+            if not self.template:
+                raise ImportAbort(f"stp_get_masters has no template columns for {self.title}.")
+        return self.template
+
+    def prepare(self, columns):
+        self.fields = self.expected_columns()
+        self.key = self.fields[0]
+        unmapped = [c for c in self.fields if c not in self.mapping]
+        if unmapped:
+            raise ImportAbort(f"No {self.table} column is configured for: {', '.join(unmapped)}.")
+        self.targets = [self.mapping[c] for c in self.fields]
+        with connection.cursor() as cursor:
+            if self.table not in connection.introspection.table_names(cursor):
+                raise ImportAbort(f"The {self.title} table {self.table!r} does not exist.")
+            table_columns = {c.name for c in connection.introspection.get_table_description(cursor, self.table)}
+            constraints = connection.introspection.get_constraints(cursor, self.table).values()
+        missing = [c for c in self.targets if c not in table_columns]
+        if missing:
+            raise ImportAbort(f"{self.table} has no column {', '.join(missing)}.")
+        if not any(c['unique'] and c['columns'] == [self.targets[0]] for c in constraints):
+            raise ImportAbort(f"{self.table}.{self.targets[0]} needs a unique index to merge the import on.")
+        self.audit = [c for c in self.AUDIT_COLUMNS if c in table_columns and c not in self.targets]
+        self.email_columns = [c for c in self.fields if 'email' in c]
+        self.mobile_columns = [c for c in self.fields if 'mobile' in c or 'phone' in c]
+        self.date_columns = [c for c in self.fields if 'date' in c or c.endswith('_dob')]
+
+    def validate(self, frame, checks):
+        checks.required(self.key)
+        checks.unique(self.key, self.seen)
+        for column in self.email_columns:
+            checks.matches(column, EMAIL_RE, "Invalid email")
+        for column in self.mobile_columns:
+            checks.matches(column, MOBILE_RE, "Mobile number must be 10 digits")
+        for column in self.date_columns:
+            frame[column] = checks.dates(column)
+
+    def load(self, frame):
+        """Merge one chunk; run_import holds the chunk's transaction."""
+        quote = connection.ops.quote_name
+        now = timezone.now()
+        audit = {'created_by': self.user, 'updated_by': self.user, 'created_at': now, 'updated_at': now}
+        columns = self.targets + self.audit
+        key_column = quote(columns[0])
+        updates = [c for c in columns[1:] if c not in ('created_by', 'created_at')] or [columns[0]]
+        rows = [[cell_text(record[0])] + [cell(v) for v in record[1:]] + [audit[c] for c in self.audit]
+                for record in frame[self.fields].itertuples(index=False)]
+        keys = [row[0] for row in rows]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT {key_column} FROM {quote(self.table)} "
+                f"WHERE {key_column} IN ({', '.join(['%s'] * len(keys))})", keys)
+            existing = {str(key).strip().upper() for key, in cursor.fetchall()}
+            placeholders = f"({', '.join(['%s'] * len(columns))})"
+            for start in range(0, len(rows), 1000):
+                batch = rows[start:start + 1000]
+                cursor.execute(
+                    f"INSERT INTO {quote(self.table)} ({', '.join(quote(c) for c in columns)}) "
+                    f"VALUES {', '.join([placeholders] * len(batch))} "
+                    f"ON DUPLICATE KEY UPDATE {', '.join(f'{quote(c)} = VALUES({quote(c)})' for c in updates)}",
+                    [value for row in batch for value in row])
+        updated = sum(str(key).strip().upper() in existing for key in keys)
+        self.updated += updated
+        return len(rows) - updated
+
+    def finish(self):
+        return f"{self.title}: {self.batch.inserted_rows} inserted, {self.updated} updated."
+
+
+def sample_columns(entity, type, user):
+    """Template columns for a master, as stp_get_masters returns them for sample_xlsx."""
+    columns = callproc("stp_get_masters", [entity, type, 'sample_xlsx', user])
+    if columns and columns[0]:
+        return [col[0] for col in columns[0]]
+    return []
@@ -0,0 +1,69 @@
+import os
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.files import File
+from django.core.management.base import BaseCommand, CommandError
+
+from Masters import imports
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued spreadsheet imports (see Masters/imports.py), or import one file directly "
+        "with --file and --kind."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help="Keep polling for uploaded imports.")
+        parser.add_argument('--sleep', type=float, default=5, help="Seconds between polls with --loop.")
+        parser.add_argument('--file', help="Import this .xlsx instead of the queue.")
+        parser.add_argument('--kind', help="Import type for --file, a key of settings.IMPORTERS.")
+        parser.add_argument('--option', action='append', default=[], metavar='KEY=VALUE',
+                            help="Importer option for --file, e.g. entity=em.")
+        parser.add_argument('--user', help="Email of the user the import runs as.")
+
+    def progress(self, batch):
+        total = f"/{batch.total_rows:,}" if batch.total_rows else ''
+        self.stdout.write(
+            f"  #{batch.id}: {batch.processed_rows:,}{total} rows, "
+            f"{batch.inserted_rows:,} loaded, {batch.error_rows:,} with errors")
+
+    def run(self, batch):
+        started = time.monotonic()
+        self.stdout.write(f"Import #{batch.id} ({batch.kind}, {batch.file_name})")
+        batch = imports.run_import(batch, progress=self.progress)
+        style = self.style.SUCCESS if batch.status == 'done' else self.style.ERROR
+        self.stdout.write(style(f"Import #{batch.id} {batch.status} in {time.monotonic() - started:.1f}s. {batch.message or ''}"))
+
+    def handle(self, *args, **options):
+        if options['file']:
+            user = None
+            if options['user']:
+                user = get_user_model().objects.filter(email=options['user']).first()
+                if user is None:
+                    raise CommandError(f"No user {options['user']}.")
+            try:
+                extra = dict(option.split('=', 1) for option in options['option'])
+            except ValueError:
+                raise CommandError("--option takes KEY=VALUE.")
+            with open(options['file'], 'rb') as f:
+                try:
+                    batch = imports.create_batch(options['kind'] or '', File(f, name=os.path.basename(options['file'])),
+                                                 user, **extra)
+                except imports.ImportAbort as e:
+                    raise CommandError(str(e))
+            batch = imports.claim(batch.id)
+            if batch is None:
+                raise CommandError("The import was picked up by a running `run_imports --loop`.")
+            self.run(batch)
+            return
+
+        while True:
+            batch = imports.claim()
+            if batch is not None:
+                self.run(batch)
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['sleep'])
@@ -0,0 +1,71 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:59
+
+import DMS.storage
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('Masters', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='import_batch',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('kind', models.CharField(max_length=50)),
+                ('options', models.JSONField(blank=True, default=dict)),
+                ('file_name', models.TextField(blank=True, null=True)),
+                ('file', models.FileField(storage=DMS.storage.document_storage, upload_to='imports/%Y/%m/')),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('total_rows', models.IntegerField(blank=True, null=True)),
+                ('processed_rows', models.IntegerField(default=0)),
+                ('inserted_rows', models.IntegerField(default=0)),
+                ('error_rows', models.IntegerField(default=0)),
+                ('message', models.TextField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('started_at', models.DateTimeField(blank=True, null=True)),
+                ('finished_at', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(blank=True, db_column='created_by', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='import_batches', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'import_batch',
+            },
+        ),
+        migrations.CreateModel(
+            name='master_import_row',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(max_length=20)),
+                ('row_number', models.IntegerField()),
+                ('data', models.JSONField()),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='master_rows', to='Masters.import_batch')),
+            ],
+            options={
+                'db_table': 'master_import_row',
+            },
+        ),
+        migrations.CreateModel(
+            name='import_error',
+            fields=[
+                ('id', models.AutoField(primary_key=True, serialize=False)),
+                ('row_number', models.IntegerField()),
+                ('column_name', models.TextField(blank=True, null=True)),
+                ('message', models.TextField()),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errors', to='Masters.import_batch')),
+            ],
+            options={
+                'db_table': 'import_error',
+                'ordering': ['row_number', 'id'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='import_batch',
+            index=models.Index(fields=['status', 'created_at'], name='import_batc_status_b888d9_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Masters', '0002_import_batch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='cache_version',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('version', models.PositiveIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'cache_version',
+            },
+        ),
+    ]
@@ -0,0 +1,16 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:12
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Masters', '0003_cache_version'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='master_import_row',
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Masters', '0004_delete_master_import_row'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='id_sequence',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False)),
+                ('next_value', models.PositiveBigIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'db_table': 'id_sequence',
+            },
+        ),
+    ]
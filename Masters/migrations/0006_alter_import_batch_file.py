@@ -0,0 +1,19 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:06
+
+import DMS.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Masters', '0005_id_sequence'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='import_batch',
+            name='file',
+            field=models.FileField(max_length=255, storage=DMS.storage.document_storage, upload_to='imports/%Y/%m/'),
+        ),
+    ]
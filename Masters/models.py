@@ -1,6 +1,7 @@
 from django.db import models
-from django.db import models
+from django.db import models, transaction
 from Account.models import *
+from DMS.storage import document_storage
 class application_search(models.Model):
     id = models.AutoField(primary_key=True)
     name =models.TextField(null=True,blank=True)
@@ -63,3 +64,94 @@ class document_master(models.Model):
     class Meta:
         db_table = 'document_master'
 
+class import_batch(models.Model):
+    # One uploaded spreadsheet and its progress (Masters/imports.py).
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    id = models.AutoField(primary_key=True)
+    kind = models.CharField(max_length=50)
+    options = models.JSONField(default=dict, blank=True)
+    file_name = models.TextField(null=True, blank=True)
+    file = models.FileField(max_length=255, upload_to='imports/%Y/%m/', storage=document_storage)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    total_rows = models.IntegerField(null=True, blank=True)
+    processed_rows = models.IntegerField(default=0)
+    inserted_rows = models.IntegerField(default=0)
+    error_rows = models.IntegerField(default=0)
+    message = models.TextField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    created_by = models.ForeignKey('Account.CustomUser', on_delete=models.SET_NULL, related_name='import_batches', blank=True, null=True, db_column='created_by')
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'import_batch'
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+class import_error(models.Model):
+    id = models.AutoField(primary_key=True)
+    batch = models.ForeignKey(import_batch, on_delete=models.CASCADE, related_name='errors')
+    row_number = models.IntegerField()
+    column_name = models.TextField(null=True, blank=True)
+    message = models.TextField()
+
+    class Meta:
+        db_table = 'import_error'
+        ordering = ['row_number', 'id']
+class cache_version(models.Model):
+    # Bumped when the data behind an in-process cache changes, so every
+    # worker notices and reloads (Masters/typeahead.py).
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'cache_version'
+
+    @classmethod
+    def current(cls, name):
+        return cls.objects.filter(name=name).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, name):
+        if not cls.objects.filter(name=name).update(version=models.F('version') + 1):
+            cls.objects.get_or_create(name=name, defaults={'version': 1})
+
+    def __str__(self):
+        return f"{self.name} v{self.version}"
+class id_sequence(models.Model):
+    # Next number of a numbered series, e.g. CUST###### customer ids or one
+    # year's V<year>#### vendor codes. Numbers are handed out in blocks under
+    # a row lock, so form saves and imports running side by side never take
+    # the same ones.
+    name = models.CharField(max_length=50, primary_key=True)
+    next_value = models.PositiveBigIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'id_sequence'
+
+    @classmethod
+    def reserve(cls, name, count, first=None):
+        """
+        First of `count` consecutive numbers reserved in series `name`.
+        `first()` gives the series' first number when its row does not exist
+        yet (e.g. above numbers issued before the series was kept here). Called
+        inside a transaction, the row stays locked until it commits, and a
+        rollback gives the block back.
+        """
+        cls.objects.get_or_create(name=name, defaults={'next_value': first or 1})
+        with transaction.atomic():
+            start = cls.objects.select_for_update().values_list('next_value', flat=True).get(name=name)
+            cls.objects.filter(name=name).update(next_value=start + count)
+        return start
+
+    def __str__(self):
+        return f"{self.name} -> {self.next_value}"
@@ -0,0 +1,229 @@
+# Masters/refdata.py
+#
+# Reference data: the small lookup tables that nearly every form offers as
+# choices (states, countries, organisation types, divisions, ...). Each
+# process loads them once into immutable Tables and serves form fields,
+# widgets and view context from memory, so rendering or validating a form
+# runs no lookup queries.
+#
+#   refdata.active('state')            active rows, in the model's ordering
+#   refdata.get('country', pk)         one row by primary key (inactive too)
+#   RefDataChoiceField('division')     a ModelChoiceField served from here
+#   formfield_callback = refdata.formfield
+#                                      the same for a ModelForm's foreign keys
+#
+# The snapshot is stamped with the 'refdata' cache_version; Masters.signals
+# bumps it whenever a row of one of these tables is saved or deleted. The
+# writing process reloads on its next read, the others within
+# REFDATA_CHECK_SECONDS. The rows are shared model instances: read them,
+# never modify them.
+
+import threading
+import time
+from types import MappingProxyType
+
+from django import forms
+from django.apps import apps
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.forms.models import ModelChoiceIterator
+
+from .models import cache_version
+
+VERSION_NAME = 'refdata'
+
+TABLES = {
+    'organization_type': 'CMS.TypeOfOrganization',
+    'branch_category': 'CMS.BranchCategory',
+    'state': 'CMS.StateUTMaster',
+    'country': 'CMS.CountryMaster',
+    'division': 'CMS.DivisionMaster',
+    'concern_category': 'CMS.ConcernCategory',
+    'region': 'crm.Region',
+    'status': 'Masters.status_master',
+}
+
+
+def model(name):
+    return apps.get_model(TABLES[name])
+
+
+def table_name(model_class):
+    """The TABLES name of `model_class`, or None if it is not reference data."""
+    return {label: name for name, label in TABLES.items()}.get(model_class._meta.label)
+
+
+class Table:
+    """One table's rows in the model's ordering (pk if it has none); `active` are the is_active ones."""
+
+    __slots__ = ('model', 'rows', 'active', '_by_pk')
+
+    def __init__(self, model_class, rows):
+        self.model = model_class
+        self.rows = tuple(rows)
+        self.active = tuple(row for row in self.rows if row.is_active)
+        self._by_pk = MappingProxyType({row.pk: row for row in self.rows})
+
+    def get(self, pk):
+        return self._by_pk.get(pk)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __len__(self):
+        return len(self.rows)
+
+
+class Snapshot:
+
+    def __init__(self, version):
+        self.version = version
+        tables = {}
+        for name in TABLES:
+            rows = model(name)._default_manager.all()
+            tables[name] = Table(rows.model, rows if rows.ordered else rows.order_by('pk'))
+        self.tables = MappingProxyType(tables)
+
+
+_lock = threading.Lock()
+_snapshot = None
+_checked_at = 0.0
+
+
+def snapshot():
+    """The process's snapshot, reloaded first if the version stamp has moved."""
+    global _snapshot, _checked_at
+    if _snapshot is not None and time.monotonic() - _checked_at < settings.REFDATA_CHECK_SECONDS:
+        return _snapshot
+    with _lock:
+        if _snapshot is None or time.monotonic() - _checked_at >= settings.REFDATA_CHECK_SECONDS:
+            version = cache_version.current(VERSION_NAME)
+            if _snapshot is None or _snapshot.version != version:
+                _snapshot = Snapshot(version)
+            _checked_at = time.monotonic()
+    return _snapshot
+
+
+def table(name):
+    return snapshot().tables[name]
+
+
+def rows(name):
+    return table(name).rows
+
+
+def active(name):
+    return table(name).active
+
+
+def get(name, pk):
+    return table(name).get(pk)
+
+
+def invalidate():
+    """Drop this process's snapshot; the next read loads the tables again."""
+    global _snapshot
+    _snapshot = None
+
+
+def changed():
+    """
+    Record a change to one of the tables. The save/delete signals call this;
+    bulk writes, which send none, call it themselves.
+    """
+    # Dropped at once so this process sees its own write, and again on
+    # commit so a snapshot read inside the transaction does not outlive it.
+    cache_version.bump(VERSION_NAME)
+    invalidate()
+    transaction.on_commit(invalidate)
+
+
+class RefDataIterator(ModelChoiceIterator):
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ('', self.field.empty_label)
+        for row in self.field.ref_rows():
+            yield self.choice(row)
+
+    def __len__(self):
+        return len(self.field.ref_rows()) + (self.field.empty_label is not None)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.ref_rows())
+
+
+class RefDataFieldMixin:
+    """
+    Choices and validation from the reference data instead of the queryset.
+    `active_only` offers and accepts is_active rows only.
+    """
+    iterator = RefDataIterator
+
+    def __init__(self, table, queryset=None, *, active_only=True, **kwargs):
+        self.table = table
+        self.active_only = active_only
+        queryset = model(table)._default_manager.all()
+        super().__init__(queryset.filter(is_active=True) if active_only else queryset, **kwargs)
+
+    def ref_rows(self):
+        rows = table(self.table)
+        return rows.active if self.active_only else rows.rows
+
+    def ref_lookup(self, value):
+        """The row `value` (a pk or an instance) names, or None if it is not a choice."""
+        model_class = self.queryset.model
+        if isinstance(value, model_class):
+            value = value.pk
+        try:
+            row = get(self.table, model_class._meta.pk.to_python(value))
+        except ValidationError:
+            return None
+        if row is None or (self.active_only and not row.is_active):
+            return None
+        return row
+
+
+class RefDataChoiceField(RefDataFieldMixin, forms.ModelChoiceField):
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        row = self.ref_lookup(value)
+        if row is None:
+            raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice',
+                                  params={'value': value})
+        return row
+
+
+class RefDataMultipleChoiceField(RefDataFieldMixin, forms.ModelMultipleChoiceField):
+    """Cleans to a list of rows (in table order) rather than a queryset."""
+
+    def _check_values(self, value):
+        try:
+            value = frozenset(value)
+        except TypeError:
+            raise ValidationError(self.error_messages['invalid_list'], code='invalid_list')
+        chosen = set()
+        for pk in value:
+            row = self.ref_lookup(pk)
+            if row is None:
+                raise ValidationError(self.error_messages['invalid_choice'], code='invalid_choice',
+                                      params={'value': pk})
+            chosen.add(row)
+        return [row for row in self.ref_rows() if row in chosen]
+
+
+def formfield(db_field, **kwargs):
+    """
+    ModelForm formfield_callback: foreign keys and many-to-many fields to a
+    reference table get a RefData field offering all of its rows, as the
+    default field would.
+    """
+    name = table_name(db_field.related_model) if db_field.is_relation and db_field.related_model else None
+    if name is not None and isinstance(db_field, models.ForeignKey):
+        return db_field.formfield(form_class=RefDataChoiceField, table=name, active_only=False, **kwargs)
+    if name is not None and isinstance(db_field, models.ManyToManyField):
+        return db_field.formfield(form_class=RefDataMultipleChoiceField, table=name, active_only=False, **kwargs)
+    return db_field.formfield(**kwargs)
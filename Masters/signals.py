@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from MenuManager.models import UserMenuDetails
+
+from . import refdata, typeahead
+from .models import application_search
+
+
+@receiver([post_save, post_delete], sender=application_search)
+@receiver([post_save, post_delete], sender=UserMenuDetails)
+def application_search_changed(sender, **kwargs):
+    typeahead.changed()
+
+
+def reference_data_changed(sender, **kwargs):
+    refdata.changed()
+
+
+for _name in refdata.TABLES:
+    for _signal in (post_save, post_delete):
+        _signal.connect(reference_data_changed, sender=refdata.model(_name), dispatch_uid=f'refdata_{_name}')
@@ -1,3 +1,4 @@
+import os
 import builtins
 from django import template
 
@@ -365,4 +366,9 @@ def center(number):
     try:
         return range(int(number))
     except (ValueError, TypeError):
-        return range(0)
\ No newline at end of file
+        return range(0)
+
+@register.filter
+def basename(value):
+    """Filename part of a stored file name (e.g. vendor_docs/2024/05/pan.pdf -> pan.pdf)"""
+    return os.path.basename(str(value or ''))
@@ -0,0 +1,25 @@
+# Masters/testing.py
+#
+# Helpers for the import tests (Masters, CMS, vendors).
+
+from io import BytesIO
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+
+
+def workbook_bytes(columns, rows):
+    """An .xlsx with a header row for `columns`; rows are lists or {column: value} dicts."""
+    import openpyxl
+    book = openpyxl.Workbook()
+    sheet = book.active
+    sheet.append([column.replace('_', ' ').title() for column in columns])
+    for row in rows:
+        sheet.append([row.get(column) for column in columns] if isinstance(row, dict) else row)
+    data = BytesIO()
+    book.save(data)
+    return data.getvalue()
+
+
+def workbook(columns, rows, name='import.xlsx'):
+    """workbook_bytes() as an upload."""
+    return SimpleUploadedFile(name, workbook_bytes(columns, rows))
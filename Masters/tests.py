@@ -1,3 +1,289 @@
-from django.test import TestCase
+import shutil
+import tempfile
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from CMS.forms import CustomerAddressForm, CustomerDivisionForm
+from CMS.models import CountryMaster, DivisionMaster, StateUTMaster
+from Masters import imports, refdata, typeahead
+from Masters.models import application_search, cache_version, id_sequence, import_batch
+from Masters.testing import workbook
+from MenuManager.models import MenuMaster, UserMenuDetails
+
+
+class RowImporter(imports.BaseImporter):
+    columns = ('name', 'email', 'joining_date')
+    loaded = {}  # row number -> record, across batches; cleared by the tests
+
+    def prepare(self, columns):
+        self.seen = set()
+
+    def validate(self, frame, checks):
+        checks.required('name')
+        checks.unique('name', self.seen)
+        checks.matches('email', imports.EMAIL_RE, "Invalid email")
+        frame['joining_date'] = checks.dates('joining_date')
+
+    def load(self, frame):
+        for number, record in frame.to_dict('index').items():
+            self.loaded[int(number)] = {k: imports.clean(v) for k, v in record.items()}
+        return len(frame)
+
+    def finish(self):
+        return "Finished."
+
+
+@override_settings(IMPORTERS={'test': 'Masters.tests.RowImporter'}, IMPORT_CHUNK_ROWS=10)
+class BulkImportTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email='importer@example.com', password='x')
+        RowImporter.loaded.clear()
+
+    def rows(self):
+        rows = [[f'Employee {n}', f'e{n}@example.com', '01-04-2024'] for n in range(25)]
+        rows[3][1] = 'not-an-email'
+        rows[7][2] = '31-02-2024'
+        rows[12][0] = 'Employee 1'
+        rows[20] = [None, None, None]  # blank rows are skipped
+        return rows
+
+    def test_chunks_are_validated_and_loaded(self):
+        batch = imports.create_batch('test', workbook(['Name', 'Email', 'Joining Date'], self.rows()), self.user)
+        seen = []
+        batch = imports.run_import(imports.claim(), progress=lambda b: seen.append(b.processed_rows))
+
+        self.assertEqual(batch.status, 'done', batch.message)
+        self.assertEqual(seen, [10, 20, 24])
+        self.assertEqual((batch.processed_rows, batch.inserted_rows, batch.error_rows), (24, 21, 3))
+        self.assertEqual(
+            list(batch.errors.values_list('row_number', 'column_name', 'message')),
+            [(5, 'email', 'Invalid email'), (9, 'joining_date', 'Invalid date'), (14, 'name', 'Duplicate in file')],
+        )
+        self.assertEqual(RowImporter.loaded[2]['joining_date'], '2024-04-01')
+
+    def test_missing_columns_fail_the_batch(self):
+        imports.create_batch('test', workbook(['Name', 'Email'], self.rows()), self.user)
+        batch = imports.run_import(imports.claim())
+        self.assertEqual(batch.status, 'failed')
+        self.assertIn('joining_date', batch.message)
+        self.assertEqual(RowImporter.loaded, {})
+
+    def test_upload_and_status_views(self):
+        self.client.force_login(self.user)
+        response = self.client.post('/imports/', {'kind': 'test', 'file': workbook(['Name', 'Email', 'Joining Date'], self.rows())})
+        self.assertEqual(response.status_code, 201)
+        batch_id = response.json()['batch_id']
+        self.assertEqual(import_batch.objects.get(pk=batch_id).status, 'queued')
+
+        imports.run_import(imports.claim())
+        status = self.client.get(response.json()['status_url']).json()
+        self.assertEqual((status['status'], status['error_rows']), ('done', 3))
+        csv = b''.join(self.client.get(status['errors_url']).streaming_content).decode()
+        self.assertIn('5,email,Invalid email', csv)
+
+        other = get_user_model().objects.create_user(email='other@example.com', password='x')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(response.json()['status_url']).status_code, 404)
+
+
+@override_settings(IMPORTERS={'masters': 'Masters.imports.MasterImporter'}, IMPORT_CHUNK_ROWS=3,
+                   MASTER_IMPORT_TABLES={'em': {'table': 'test_employee_master', 'columns': {
+                       'name': 'employee_name', 'email': 'email', 'joining_date': 'joining_date'}}})
+class MasterImportTests(TransactionTestCase):
+    # The master tables are not models, so the test builds one; DDL commits,
+    # hence TransactionTestCase.
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email='importer@example.com', password='x')
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "CREATE TABLE test_employee_master (id INTEGER AUTO_INCREMENT PRIMARY KEY, "
+                "employee_name VARCHAR(100) NOT NULL UNIQUE, email VARCHAR(100), joining_date DATE, "
+                "created_by INTEGER, updated_by INTEGER)")
+            cursor.execute("INSERT INTO test_employee_master (employee_name, email) VALUES ('Employee 2', 'old@example.com')")
+        self.addCleanup(self.drop_table)
+        patcher = mock.patch('Masters.imports.sample_columns', return_value=['Name', 'Email', 'Joining Date'])
+        self.sample_columns = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def drop_table(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TABLE test_employee_master")
+
+    def table(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT employee_name, email, joining_date, created_by, updated_by FROM test_employee_master ORDER BY id")
+            return cursor.fetchall()
+
+    def test_chunks_are_merged_with_every_column(self):
+        rows = [[f'Employee {n}', f'e{n}@example.com', '01-04-2024'] for n in range(8)]
+        rows[3][1] = 'not-an-email'
+        rows[7][2] = '31-02-2024'
+        imports.create_batch('masters', workbook(['Name', 'Email', 'Joining Date'], rows), self.user, entity='em')
+        seen = []
+        batch = imports.run_import(imports.claim(), progress=lambda b: seen.append((b.processed_rows, b.inserted_rows)))
+
+        self.assertEqual(batch.status, 'done', batch.message)
+        self.assertEqual(seen, [(3, 2), (6, 4), (8, 5)])
+        self.assertEqual((batch.processed_rows, batch.inserted_rows, batch.error_rows), (8, 5, 2))
+        self.assertEqual(batch.message, "Employee Master: 5 inserted, 1 updated.")
+        joined = date(2024, 4, 1)
+        self.assertEqual(self.table(), [
+            ('Employee 2', 'e2@example.com', joined, None, self.user.pk),
+            ('Employee 0', 'e0@example.com', joined, self.user.pk, self.user.pk),
+            ('Employee 1', 'e1@example.com', joined, self.user.pk, self.user.pk),
+            ('Employee 4', 'e4@example.com', joined, self.user.pk, self.user.pk),
+            ('Employee 5', 'e5@example.com', joined, self.user.pk, self.user.pk),
+            ('Employee 6', 'e6@example.com', joined, self.user.pk, self.user.pk),
+        ])
+        self.assertEqual(self.sample_columns.call_count, 1)
+
+    def test_template_columns_the_table_lacks_stop_the_import(self):
+        with mock.patch('Masters.imports.sample_columns', return_value=['Name', 'Email', 'Mobile']):
+            imports.create_batch('masters', workbook(['Name', 'Email', 'Mobile'], [['Employee 9', '', '']]),
+                                 self.user, entity='em')
+            batch = imports.run_import(imports.claim())
+        self.assertEqual(batch.status, 'failed')
+        self.assertIn('mobile', batch.message)
+        self.assertEqual(len(self.table()), 1)
+
+    def test_unconfigured_entities_are_not_imported(self):
+        with override_settings(MASTER_IMPORT_TABLES={}):
+            imports.create_batch('masters', workbook(['Name'], [['Employee 9']]), self.user, entity='em')
+            batch = imports.run_import(imports.claim())
+        self.assertEqual(batch.status, 'failed')
+        self.assertIn('not configured', batch.message)
+        self.assertEqual(len(self.table()), 1)
+
+    def test_an_empty_template_stops_the_import(self):
+        self.sample_columns.return_value = []
+        imports.create_batch('masters', workbook(['Name'], [['Employee 9']]), self.user, entity='em')
+        batch = imports.run_import(imports.claim())
+        self.assertEqual(batch.status, 'failed')
+        self.assertIn('no template columns', batch.message)
+
+
+class IdSequenceTests(TestCase):
+
+    def test_blocks_follow_each_other_and_the_series_is_seeded_once(self):
+        first = mock.Mock(return_value=41)
+        self.assertEqual(id_sequence.reserve('test', 3, first), 41)
+        self.assertEqual(id_sequence.reserve('test', 2, first), 44)
+        self.assertEqual(id_sequence.reserve('other', 1), 1)
+        first.assert_called_once_with()
+        self.assertEqual(id_sequence.objects.get(name='test').next_value, 46)
+
+
+@override_settings(TYPEAHEAD_CHECK_SECONDS=60)
+class TypeaheadTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='search@example.com', password='x')
+        for name, description, menu in [
+            ('Customer List', 'All customers', '3'),
+            ('New Customer', 'Create a customer', '3'),
+            ('Vendor List', 'Vendors and their documents', '4'),
+            ('Customer Reports', 'Sales by customer', '9'),
+            ('Change Password', '', ''),
+            ('Old Page', 'Customer archive', '3'),
+        ]:
+            application_search.objects.create(name=name, description=description, href='/' + name.lower(),
+                                              menu_id=menu, is_active=name != 'Old Page')
+        for menu_id in (3, 4, 9):
+            MenuMaster.objects.create(menu_id=menu_id, menu_name=f'Menu {menu_id}')
+        UserMenuDetails.objects.create(user=self.user, menu_id=3)
+        UserMenuDetails.objects.create(user=self.user, menu_id=4)
+        typeahead.invalidate()
+        self.addCleanup(typeahead.invalidate)
+
+    def names(self, query, user=None):
+        return [e.name for e in typeahead.suggest(user or self.user, query)]
+
+    def test_prefix_and_infix_matches_are_ranked(self):
+        self.assertEqual(self.names('cust'), ['Customer List', 'New Customer'])
+        self.assertEqual(self.names('CUSTOMER li'), ['Customer List'])
+        self.assertEqual(self.names('stome'), ['New Customer', 'Customer List'])
+        self.assertEqual(self.names('documents'), ['Vendor List'])
+        self.assertEqual(self.names('pass'), ['Change Password'])
+        self.assertEqual(self.names('zzz'), [])
+        self.assertEqual(self.names('  '), [])
+
+    def test_menus_limit_the_results(self):
+        admin = get_user_model().objects.create_superuser(email='admin@example.com', password='x')
+        self.assertEqual(self.names('customer', admin), ['Customer List', 'Customer Reports', 'New Customer'])
+        self.assertNotIn('Customer Reports', self.names('reports'))
+
+    def test_changes_reload_the_index(self):
+        typeahead.suggest(self.user, 'cust')
+        version = cache_version.current(typeahead.VERSION_NAME)
+        with self.captureOnCommitCallbacks(execute=True):
+            application_search.objects.filter(name='Customer List').get().delete()
+            UserMenuDetails.objects.create(user=self.user, menu_id=9)
+        self.assertEqual(cache_version.current(typeahead.VERSION_NAME), version + 2)
+        self.assertEqual(self.names('cust'), ['Customer Reports', 'New Customer'])
+
+    def test_no_queries_per_keystroke(self):
+        typeahead.suggest(self.user, 'c')
+        with self.assertNumQueries(0):
+            for query in ('cu', 'cus', 'cust', 'custo'):
+                typeahead.suggest(self.user, query)
+
+    def test_suggest_view(self):
+        self.client.force_login(self.user)
+        response = self.client.get('/search/suggest/', {'q': 'vend'})
+        self.assertEqual(response.json(), {'success': True, 'results': [
+            {'name': 'Vendor List', 'description': 'Vendors and their documents', 'href': '/vendor list'},
+        ]})
+
+
+@override_settings(REFDATA_CHECK_SECONDS=60)
+class RefDataTests(TestCase):
+
+    def setUp(self):
+        self.security = DivisionMaster.objects.create(name='Security')
+        self.facility = DivisionMaster.objects.create(name='Facility')
+        self.closed = DivisionMaster.objects.create(name='Closed', is_active=False)
+        self.state = StateUTMaster.objects.create(name='Maharashtra', code='MH')
+        self.india = CountryMaster.objects.create(name='India', code='IN', currency='Rupee', currency_code='INR')
+        self.addCleanup(refdata.invalidate)
+
+    def test_forms_render_and_validate_without_queries(self):
+        refdata.snapshot()
+        with self.assertNumQueries(0):
+            html = str(CustomerDivisionForm()) + str(CustomerAddressForm())
+            division_form = CustomerDivisionForm({'divisions': [self.security.pk, self.facility.pk]})
+            self.assertTrue(division_form.is_valid())
+            self.assertFalse(CustomerDivisionForm({'divisions': [self.closed.pk]}).is_valid())
+            state = CustomerAddressForm().fields['state'].clean(str(self.state.pk))
+        self.assertIn('Facility', html)
+        self.assertNotIn('Closed', html)
+        self.assertIn('Maharashtra', html)
+        self.assertEqual(division_form.cleaned_data['divisions'], [self.facility, self.security])
+        self.assertEqual(state, self.state)
+        with self.assertRaises(ValidationError):
+            CustomerAddressForm().fields['country'].clean('x')
+
+    def test_writes_reload_the_tables(self):
+        self.assertEqual([d.name for d in refdata.active('division')], ['Facility', 'Security'])
+        version = cache_version.current(refdata.VERSION_NAME)
+        DivisionMaster.objects.create(name='Audit')
+        self.closed.delete()
+        self.assertEqual(cache_version.current(refdata.VERSION_NAME), version + 2)
+        self.assertEqual([d.name for d in refdata.active('division')], ['Audit', 'Facility', 'Security'])
+        self.assertEqual(len(refdata.rows('division')), 3)
@@ -0,0 +1,179 @@
+# Masters/typeahead.py
+#
+# Autocomplete for the topbar search over application_search (the pages of
+# the app: name, description, href and the menu_id that grants them). The
+# active rows are held in an in-process index:
+#
+#   prefixes  every prefix (up to MAX_PREFIX characters) of every word -> rows
+#   grams     every trigram of every word -> rows, for matches inside a word
+#
+# A query word matches a row when it starts one of the row's words (one dict
+# lookup) or occurs inside one (the rows sharing all its trigrams, checked).
+# Rows must match every query word and be reachable through the user's menus
+# (UserMenuDetails); the best `limit` are returned, ranked by where the words
+# matched. Nothing touches the database per keystroke.
+#
+# The index is stamped with the 'application_search' cache_version and
+# reloaded when it changes; Masters.signals bumps it whenever a search row or
+# a user's menu assignment is saved or deleted. Workers check the stamp at
+# most every TYPEAHEAD_CHECK_SECONDS.
+
+import heapq
+import re
+import threading
+import time
+from collections import defaultdict, namedtuple
+
+from django.conf import settings
+from django.db import transaction
+
+from MenuManager.models import UserMenuDetails
+
+from .models import application_search, cache_version
+
+VERSION_NAME = 'application_search'
+GRAM = 3
+MAX_PREFIX = 12
+WORD_RE = re.compile(r'[^\W_]+')
+MENU_RE = re.compile(r'\d+')
+
+Entry = namedtuple('Entry', 'id name description href menus name_key name_words text')
+
+
+def words(text):
+    return WORD_RE.findall(str(text or '').casefold())
+
+
+class TypeaheadIndex:
+
+    def __init__(self, rows, version):
+        self.version = version
+        self.entries = []
+        prefixes, grams = defaultdict(set), defaultdict(set)
+        for pk, name, description, href, menu_id in rows:
+            name_words = tuple(words(name))
+            all_words = set(name_words) | set(words(description))
+            if not all_words:
+                continue
+            position = len(self.entries)
+            self.entries.append(Entry(
+                pk, name or '', description or '', href or '', frozenset(int(m) for m in MENU_RE.findall(menu_id or '')),
+                ' '.join(name_words), name_words, ' '.join(sorted(all_words)),
+            ))
+            for word in all_words:
+                for end in range(1, min(len(word), MAX_PREFIX) + 1):
+                    prefixes[word[:end]].add(position)
+                for start in range(len(word) - GRAM + 1):
+                    grams[word[start:start + GRAM]].add(position)
+        self.prefixes = {key: frozenset(value) for key, value in prefixes.items()}
+        self.grams = {key: frozenset(value) for key, value in grams.items()}
+        self._menus = {}
+
+    def _matches(self, word):
+        hits = self.prefixes.get(word[:MAX_PREFIX], frozenset())
+        if len(word) > MAX_PREFIX:
+            hits = {p for p in hits if (' ' + word) in (' ' + self.entries[p].text)}
+        if len(word) < GRAM:
+            return hits
+        candidates = None
+        for start in range(len(word) - GRAM + 1):
+            posting = self.grams.get(word[start:start + GRAM], frozenset())
+            candidates = posting if candidates is None else candidates & posting
+            if not candidates:
+                return hits
+        return hits | {p for p in candidates if word in self.entries[p].text}
+
+    @staticmethod
+    def _score(entry, query_words, phrase):
+        score = 100 if entry.name_key.startswith(phrase) else 0
+        for word in query_words:
+            if word in entry.name_words:
+                score += 15
+            elif any(w.startswith(word) for w in entry.name_words):
+                score += 10
+            elif word in entry.name_key:
+                score += 4
+            elif (' ' + word) in (' ' + entry.text):
+                score += 2
+            else:
+                score += 1
+        return score
+
+    def menus_for(self, user):
+        """Menu ids `user` may open, or None for no restriction; cached until the next reload."""
+        if user.is_superuser:
+            return None
+        menus = self._menus.get(user.pk)
+        if menus is None:
+            menus = self._menus[user.pk] = frozenset(
+                UserMenuDetails.objects.filter(user=user).values_list('menu_id', flat=True))
+        return menus
+
+    def search(self, query, menus=None, limit=10):
+        """The best `limit` entries matching every word of `query`, within `menus` (None: all)."""
+        query_words = words(query)
+        if not query_words:
+            return []
+        candidates = None
+        for word in dict.fromkeys(query_words):
+            hits = self._matches(word)
+            candidates = hits if candidates is None else candidates & hits
+            if not candidates:
+                return []
+        phrase = ' '.join(query_words)
+        ranked = []
+        for p in candidates:
+            entry = self.entries[p]
+            # Rows without a menu are open to every signed-in user.
+            if menus is not None and entry.menus and not entry.menus & menus:
+                continue
+            ranked.append((-self._score(entry, query_words, phrase), len(entry.name), entry.name_key, p))
+        return [self.entries[key[-1]] for key in heapq.nsmallest(limit, ranked)]
+
+
+_lock = threading.Lock()
+_index = None
+_checked_at = 0.0
+
+
+def load(version):
+    rows = (application_search.objects.exclude(is_active=False)
+            .values_list('id', 'name', 'description', 'href', 'menu_id'))
+    return TypeaheadIndex(rows, version)
+
+
+def get_index():
+    """The process's index, reloaded first if the version stamp has moved."""
+    global _index, _checked_at
+    if _index is not None and time.monotonic() - _checked_at < settings.TYPEAHEAD_CHECK_SECONDS:
+        return _index
+    with _lock:
+        if _index is None or time.monotonic() - _checked_at >= settings.TYPEAHEAD_CHECK_SECONDS:
+            version = cache_version.current(VERSION_NAME)
+            if _index is None or _index.version != version:
+                _index = load(version)
+            _checked_at = time.monotonic()
+    return _index
+
+
+def invalidate():
+    """Make this process check the version stamp on its next search."""
+    global _checked_at
+    _checked_at = 0.0
+
+
+def changed():
+    """
+    Record a change to the search rows or menu assignments. The save/delete
+    signals call this; bulk writes, which send none, call it themselves.
+    """
+    # The stamp moves with the write (and rolls back with it); this process
+    # rereads it as soon as the write is committed, the others within
+    # TYPEAHEAD_CHECK_SECONDS.
+    cache_version.bump(VERSION_NAME)
+    transaction.on_commit(invalidate)
+
+
+def suggest(user, query, limit=None):
+    index = get_index()
+    return index.search(query, index.menus_for(user), limit or settings.TYPEAHEAD_LIMIT)
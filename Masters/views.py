@@ -1,3 +1,4 @@
+import csv
 import json
 import pydoc
 import re
@@ -8,45 +9,37 @@ from django.contrib.auth import authenticate, login ,logout,get_user_model
 from Account.forms import RegistrationForm
 from Account.models import *
 from Masters.models import *
-import Db 
 import bcrypt
 from django.contrib.auth.decorators import login_required
 from CRLBM.encryption import *
 from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph
 from Account.utils import decrypt_email, encrypt_email
-import requests
 import traceback
-import pandas as pd
 from django.core.files.storage import FileSystemStorage
 from django.conf import settings
 from django.contrib import messages
-import openpyxl
-from openpyxl.styles import Font, Border, Side
 import calendar
 from datetime import datetime, timedelta
 from django.utils import timezone
 from datetime import timedelta
 from django.db.models import Q, Count
 
-from rest_framework.views import APIView
-from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
-from rest_framework_simplejwt.tokens import AccessToken
 from django.utils import timezone
 from Account.models import *
 from Masters.models import *
 from Account.db_utils import callproc
+from Masters.imports import ImportAbort, create_batch, sample_columns
+from CRLBM.exports import streaming_response
+from CRLBM.request_context import current_user_id
 from django.views.decorators.csrf import csrf_exempt
 import os
 from django.urls import reverse
 from CRLBM.settings import *
 import logging
 from django.http import FileResponse, Http404
+from django.views.decorators.http import require_GET, require_POST
 import mimetypes
+from itertools import chain
 
 logger = logging.getLogger(__name__)
 
@@ -57,10 +50,7 @@ def masters(request):
     entity = type = name = id = text_name = dpl = dp = em = mb = forms = sf = ''
 
     try:
-        if request.user.is_authenticated ==True:                
-                global user,role_id
-                user = request.user.id    
-                role_id = request.user.role_id 
+        user = current_user_id()
         if request.method=="GET":
             entity = request.GET.get('entity', '')
             sf = request.GET.get('sf', '')
@@ -122,7 +112,6 @@ def masters(request):
         callproc("stp_error_log",[fun,str(e),user])  
         messages.error(request, 'Oops...! Something went wrong!')
     finally:
-        Db.closeConnection()
         if request.method=="GET":
              return render(request,'Master/index.html',
               {'entity':entity,'forms':forms,'sf':sf,'type':type,'name':name,'header':header,'data':data,
@@ -131,12 +120,15 @@ def masters(request):
             new_url = f'/masters?entity={entity}&type=i'
             return redirect(new_url) 
  
+@login_required
 def sample_xlsx(request):
     pre_url = request.META.get('HTTP_REFERER')
     response =''
-    global user
-    user  = request.session.get('user_id', '')
+    user = current_user_id()
     try:
+        import openpyxl
+        from openpyxl.styles import Font, Border, Side
+
         workbook = openpyxl.Workbook()
         sheet = workbook.active
         sheet.title = 'Sample Format'
@@ -148,9 +140,7 @@ def sample_xlsx(request):
             entity = request.POST.get('entity', '')
             type = request.POST.get('type', '')
         file_name = {'em': 'Employee Master','sm': 'Worksite Master','cm': 'Company Master','r': 'Roster'}[entity]
-        columns = callproc("stp_get_masters", [entity, type, 'sample_xlsx',user])
-        if columns and columns[0]:
-            columns = [col[0] for col in columns[0]]
+        columns = sample_columns(entity, type, user)
 
         black_border = Border(
             left=Side(border_style="thin", color="000000"),
@@ -185,3 +175,69 @@ def sample_xlsx(request):
         messages.error(request, 'Oops...! Something went wrong!')
     finally:
         return response      
+
+
+@login_required
+@require_POST
+def import_upload(request):
+    """Queue an uploaded .xlsx for `manage.py run_imports`; the page polls import_status."""
+    user = current_user_id()
+    try:
+        options = {k: v for k, v in request.POST.items() if k not in ('csrfmiddlewaretoken', 'kind')}
+        batch = create_batch(request.POST.get('kind', ''), request.FILES['file'], request.user, **options)
+    except KeyError:
+        return JsonResponse({'success': False, 'message': 'Choose a file to import.'}, status=400)
+    except ImportAbort as e:
+        return JsonResponse({'success': False, 'message': str(e)}, status=400)
+    except Exception as e:
+        tb = traceback.extract_tb(e.__traceback__)
+        fun = tb[0].name
+        callproc("stp_error_log",[fun,str(e),user])
+        return JsonResponse({'success': False, 'message': 'Oops...! Something went wrong!'}, status=500)
+    return JsonResponse({'success': True, 'batch_id': batch.id,
+                         'status_url': reverse('import_status', args=[batch.id])}, status=201)
+
+
+def _own_batch(request, batch_id):
+    batches = import_batch.objects.all()
+    if not request.user.is_superuser:
+        batches = batches.filter(created_by=request.user)
+    return get_object_or_404(batches, pk=batch_id)
+
+
+@login_required
+@require_GET
+def import_status(request, batch_id):
+    batch = _own_batch(request, batch_id)
+    errors = batch.errors.values_list('row_number', 'column_name', 'message')[:50]
+    return JsonResponse({
+        'success': True,
+        'batch_id': batch.id,
+        'status': batch.status,
+        'total_rows': batch.total_rows,
+        'processed_rows': batch.processed_rows,
+        'inserted_rows': batch.inserted_rows,
+        'error_rows': batch.error_rows,
+        'message': batch.message,
+        'errors': [{'row': r, 'column': c, 'message': m} for r, c, m in errors],
+        'errors_url': reverse('import_errors', args=[batch.id]) if batch.error_rows else None,
+    })
+
+
+@login_required
+@require_GET
+def import_errors(request, batch_id):
+    """Every row error of a batch as CSV, streamed."""
+
+    class Echo:
+        def write(self, value):
+            return value
+
+    batch = _own_batch(request, batch_id)
+    writer = csv.writer(Echo())
+    rows = batch.errors.values_list('row_number', 'column_name', 'message').iterator(chunk_size=2000)
+    response = streaming_response(
+        request, (writer.writerow(row) for row in chain([('Row', 'Column', 'Error')], rows)),
+        content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="import-{batch.id}-errors.csv"'
+    return response
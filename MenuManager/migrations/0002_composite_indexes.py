@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('MenuManager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='rolemenumaster',
+            index=models.Index(fields=['role_id', 'menu_id'], name='role_menu_role_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='usermenudetails',
+            index=models.Index(fields=['user_id', 'menu_id'], name='user_menu_user_idx'),
+        ),
+    ]
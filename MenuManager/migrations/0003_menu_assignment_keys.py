@@ -0,0 +1,32 @@
+# Typed keys for role_menu_master and user_menu_details, step 1 of 3: add
+# nullable integer columns next to the CharField ids. Adding nullable columns
+# is an in-place (on MySQL 8, instant) change; 0004 fills them in batches and
+# 0005 swaps them in as foreign keys.
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Account', '0001_initial'),
+        ('MenuManager', '0002_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rolemenumaster',
+            name='role_ref',
+            field=models.IntegerField(blank=True, null=True, db_column='role_ref'),
+        ),
+        migrations.AddField(
+            model_name='usermenudetails',
+            name='user_ref',
+            field=models.BigIntegerField(blank=True, null=True, db_column='user_ref'),
+        ),
+        migrations.AddField(
+            model_name='usermenudetails',
+            name='role_ref',
+            field=models.IntegerField(blank=True, null=True, db_column='role_ref'),
+        ),
+    ]
@@ -0,0 +1,119 @@
+# Typed keys, step 2 of 3: copy the CharField ids into the integer columns.
+#
+# Runs outside a migration-wide transaction, BATCH_SIZE rows at a time by
+# primary key, each batch committed on its own with a short pause between
+# batches, so live traffic is never held behind a long lock. It only touches
+# rows not yet filled in, so it can be stopped and re-run (0005 runs it again
+# to catch rows written in between).
+#
+# Rows the foreign keys could not hold are deleted: ids that are not numbers
+# or no longer exist (the user, role or menu was deleted). A user_menu_details
+# row whose role is gone keeps the menu with no role. Duplicate (role, menu)
+# and (user, menu) rows, which assign_menu used to create, are reduced to the
+# oldest one ahead of the unique constraints.
+
+import time
+
+from django.db import migrations, transaction
+from django.db.models import Count, Min
+
+BATCH_SIZE = 2000
+PAUSE_SECONDS = 0.05
+
+
+def _int(value):
+    value = str(value if value is not None else '').strip()
+    return int(value) if value.isdigit() else None
+
+
+def _existing(queryset, ids):
+    ids = {i for i in ids if i is not None}
+    return set(queryset.filter(pk__in=ids).values_list('pk', flat=True)) if ids else set()
+
+
+def _batches(queryset):
+    last = 0
+    while True:
+        rows = list(queryset.filter(pk__gt=last).order_by('pk')[:BATCH_SIZE])
+        if not rows:
+            return
+        yield rows
+        last = rows[-1].pk
+        time.sleep(PAUSE_SECONDS)
+
+
+def _save(queryset, keep, fields, drop):
+    with transaction.atomic(using=queryset.db):
+        queryset.bulk_update(keep, fields)
+        if drop:
+            queryset.filter(pk__in=[row.pk for row in drop]).delete()
+
+
+def _dedupe(queryset, key):
+    """Delete all but the oldest row of each (key, menu) pair."""
+    groups = list(queryset.values(key, 'menu_id').order_by()
+                  .annotate(n=Count('pk'), first=Min('pk')).filter(n__gt=1))
+    for group in groups:
+        queryset.filter(**{key: group[key], 'menu_id': group['menu_id']}).exclude(pk=group['first']).delete()
+
+
+def backfill(apps, schema_editor):
+    alias = schema_editor.connection.alias
+    roles = apps.get_model('Account', 'roles').objects.using(alias)
+    users = apps.get_model('Account', 'CustomUser').objects.using(alias)
+    menus = apps.get_model('MenuManager', 'MenuMaster').objects.using(alias)
+    role_menus = apps.get_model('MenuManager', 'RoleMenuMaster').objects.using(alias)
+    user_menus = apps.get_model('MenuManager', 'UserMenuDetails').objects.using(alias)
+
+    for rows in _batches(role_menus.filter(role_ref__isnull=True).only('pk', 'role_id', 'menu_id')):
+        known_roles = _existing(roles, (_int(row.role_id) for row in rows))
+        known_menus = _existing(menus, (row.menu_id for row in rows))
+        keep, drop = [], []
+        for row in rows:
+            row.role_ref = _int(row.role_id)
+            (keep if row.role_ref in known_roles and row.menu_id in known_menus else drop).append(row)
+        _save(role_menus, keep, ['role_ref'], drop)
+
+    for rows in _batches(user_menus.filter(user_ref__isnull=True).only('pk', 'user_id', 'role_id', 'menu_id')):
+        known_users = _existing(users, (_int(row.user_id) for row in rows))
+        known_roles = _existing(roles, (_int(row.role_id) for row in rows))
+        known_menus = _existing(menus, (row.menu_id for row in rows))
+        keep, drop = [], []
+        for row in rows:
+            row.user_ref = _int(row.user_id)
+            role = _int(row.role_id)
+            row.role_ref = role if role in known_roles else None
+            (keep if row.user_ref in known_users and row.menu_id in known_menus else drop).append(row)
+        _save(user_menus, keep, ['user_ref', 'role_ref'], drop)
+
+    _dedupe(role_menus, 'role_ref')
+    _dedupe(user_menus, 'user_ref')
+
+
+def restore(apps, schema_editor):
+    """Reverse: write the integer keys back into the CharField ids (re-added empty by reversing 0005)."""
+    alias = schema_editor.connection.alias
+    role_menus = apps.get_model('MenuManager', 'RoleMenuMaster').objects.using(alias)
+    user_menus = apps.get_model('MenuManager', 'UserMenuDetails').objects.using(alias)
+
+    for rows in _batches(role_menus.filter(role_id__isnull=True, role_ref__isnull=False)):
+        for row in rows:
+            row.role_id = str(row.role_ref)
+        _save(role_menus, rows, ['role_id'], [])
+    for rows in _batches(user_menus.filter(user_id__isnull=True, user_ref__isnull=False)):
+        for row in rows:
+            row.user_id = str(row.user_ref)
+            row.role_id = str(row.role_ref) if row.role_ref is not None else None
+        _save(user_menus, rows, ['user_id', 'role_id'], [])
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('MenuManager', '0003_menu_assignment_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, restore),
+    ]
@@ -0,0 +1,101 @@
+# Typed keys, step 3 of 3: drop the CharField ids and turn the integer
+# columns into foreign keys under the old column names (role_id, user_id,
+# menu_id), with unique (role, menu) and (user, menu) constraints.
+#
+# 0004 has already removed every row that would violate the keys, so on
+# MySQL foreign_key_checks is switched off for this migration: InnoDB then
+# adds the constraints in place instead of copying the table. The unique
+# constraints come before the foreign keys so those reuse their indexes.
+
+import importlib
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def foreign_key_checks(value):
+    def run(apps, schema_editor):
+        if schema_editor.connection.vendor == 'mysql':
+            schema_editor.execute(f'SET foreign_key_checks = {value}')
+    return run
+
+
+def catch_up(apps, schema_editor):
+    """Fill rows written since 0004 ran."""
+    importlib.import_module('MenuManager.migrations.0004_backfill_menu_assignment_keys').backfill(apps, schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('Account', '0001_initial'),
+        ('MenuManager', '0004_backfill_menu_assignment_keys'),
+    ]
+
+    operations = [
+        migrations.RunPython(foreign_key_checks(0), foreign_key_checks(1)),
+        migrations.RunPython(catch_up, migrations.RunPython.noop),
+        migrations.RemoveIndex(model_name='rolemenumaster', name='role_menu_role_idx'),
+        migrations.RemoveIndex(model_name='usermenudetails', name='user_menu_user_idx'),
+        migrations.RemoveField(model_name='rolemenumaster', name='role_id'),
+        migrations.RemoveField(model_name='usermenudetails', name='user_id'),
+        migrations.RemoveField(model_name='usermenudetails', name='role_id'),
+        migrations.RenameField(model_name='rolemenumaster', old_name='role_ref', new_name='role'),
+        migrations.RenameField(model_name='usermenudetails', old_name='user_ref', new_name='user'),
+        migrations.RenameField(model_name='usermenudetails', old_name='role_ref', new_name='role'),
+        # Pin menu_id's column before renaming the field to menu.
+        migrations.AlterField(
+            model_name='rolemenumaster',
+            name='menu_id',
+            field=models.IntegerField(blank=True, null=True, db_column='menu_id'),
+        ),
+        migrations.AlterField(
+            model_name='usermenudetails',
+            name='menu_id',
+            field=models.IntegerField(blank=True, null=True, db_column='menu_id'),
+        ),
+        migrations.RenameField(model_name='rolemenumaster', old_name='menu_id', new_name='menu'),
+        migrations.RenameField(model_name='usermenudetails', old_name='menu_id', new_name='menu'),
+        migrations.AddConstraint(
+            model_name='rolemenumaster',
+            constraint=models.UniqueConstraint(fields=('role', 'menu'), name='role_menu_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='usermenudetails',
+            constraint=models.UniqueConstraint(fields=('user', 'menu'), name='user_menu_unique'),
+        ),
+        migrations.AlterField(
+            model_name='rolemenumaster',
+            name='role',
+            field=models.ForeignKey(db_column='role_id', db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='menu_assignments', to='Account.roles'),
+        ),
+        migrations.AlterField(
+            model_name='rolemenumaster',
+            name='menu',
+            field=models.ForeignKey(db_column='menu_id', on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='role_assignments', to='MenuManager.menumaster'),
+        ),
+        migrations.AlterField(
+            model_name='usermenudetails',
+            name='user',
+            field=models.ForeignKey(db_column='user_id', db_index=False, on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='menu_assignments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='usermenudetails',
+            name='menu',
+            field=models.ForeignKey(db_column='menu_id', on_delete=django.db.models.deletion.CASCADE,
+                                    related_name='user_assignments', to='MenuManager.menumaster'),
+        ),
+        migrations.AlterField(
+            model_name='usermenudetails',
+            name='role',
+            field=models.ForeignKey(blank=True, db_column='role_id', null=True,
+                                    on_delete=django.db.models.deletion.SET_NULL,
+                                    related_name='user_menu_assignments', to='Account.roles'),
+        ),
+        migrations.RunPython(foreign_key_checks(1), foreign_key_checks(0)),
+    ]
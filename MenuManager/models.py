@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.db import models
 # Create your models here.
 
@@ -23,10 +24,15 @@ class MenuMaster(models.Model):
         db_table = 'menu_master'
 
 
+# role, user and menu keep their historical column names (role_id, user_id,
+# menu_id), which the stp_get_side_navbar_details / stp_get_assign_menu_values
+# procedures read; they were untyped CharFields up to migration 0003.
 class RoleMenuMaster(models.Model):
     role_menu_id = models.AutoField(primary_key=True)
-    role_id = models.CharField(max_length=50, null=True, blank=True)
-    menu_id = models.IntegerField(null=True, blank=True)
+    # Indexed by role_menu_unique (role first).
+    role = models.ForeignKey('Account.roles', on_delete=models.CASCADE, db_column='role_id', db_index=False,
+                             related_name='menu_assignments')
+    menu = models.ForeignKey(MenuMaster, on_delete=models.CASCADE, db_column='menu_id', related_name='role_assignments')
     created_at = models.DateTimeField(null=True, blank=True, auto_now_add=True)
     created_by = models.TextField(null=True, blank=True)
     updated_at = models.DateTimeField(null=True, blank=True, auto_now=True)
@@ -34,13 +40,20 @@ class RoleMenuMaster(models.Model):
     
     class Meta:
         db_table = 'role_menu_master'
+        constraints = [
+            models.UniqueConstraint(fields=['role', 'menu'], name='role_menu_unique'),
+        ]
 
 
 class UserMenuDetails(models.Model):
     user_menu_id = models.AutoField(primary_key=True)
-    user_id = models.CharField(max_length=50, null=True, blank=True)
-    menu_id = models.IntegerField(null=True, blank=True)
-    role_id = models.CharField(max_length=50, null=True, blank=True)
+    # Indexed by user_menu_unique (user first).
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, db_column='user_id', db_index=False,
+                             related_name='menu_assignments')
+    menu = models.ForeignKey(MenuMaster, on_delete=models.CASCADE, db_column='menu_id', related_name='user_assignments')
+    # The role the menu came from, if any.
+    role = models.ForeignKey('Account.roles', on_delete=models.SET_NULL, null=True, blank=True, db_column='role_id',
+                             related_name='user_menu_assignments')
     created_at = models.DateTimeField(null=True, blank=True, auto_now_add=True)
     created_by = models.TextField(null=True, blank=True)
     updated_at = models.DateTimeField(null=True, blank=True, auto_now=True)
@@ -48,3 +61,6 @@ class UserMenuDetails(models.Model):
     
     class Meta:
         db_table = 'user_menu_details'
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'menu'], name='user_menu_unique'),
+        ]
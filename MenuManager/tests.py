@@ -1,3 +1,111 @@
-from django.test import TestCase
+import importlib
+from unittest import mock
 
-# Create your tests here.
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+
+from Account.models import CustomUser, roles
+from MenuManager.models import MenuMaster, RoleMenuMaster, UserMenuDetails
+
+backfill_migration = importlib.import_module('MenuManager.migrations.0004_backfill_menu_assignment_keys')
+
+
+class MenuAssignmentBackfillTests(TransactionTestCase):
+    """0004 on the tables as they stand between 0004 and 0005: CharField ids next to the integer columns."""
+
+    migrate_to = [('MenuManager', '0004_backfill_menu_assignment_keys')]
+
+    def setUp(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(self.migrate_to)
+        self.addCleanup(self.migrate_forward)
+        self.apps = executor.loader.project_state(self.migrate_to).apps
+        # Small batches, so the rows span several.
+        for patcher in (mock.patch.object(backfill_migration, 'BATCH_SIZE', 2),
+                        mock.patch.object(backfill_migration, 'PAUSE_SECONDS', 0)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        model = self.apps.get_model
+        self.role_menus = model('MenuManager', 'RoleMenuMaster').objects
+        self.user_menus = model('MenuManager', 'UserMenuDetails').objects
+        self.role = model('Account', 'roles').objects.create(role_name='Sales')
+        self.user = model('Account', 'CustomUser').objects.create(email='menus@example.com', password='x')
+        menus = model('MenuManager', 'MenuMaster').objects
+        self.menu, self.other_menu = menus.create(menu_name='Customers'), menus.create(menu_name='Vendors')
+
+    def migrate_forward(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def run_migration(self, function):
+        with connection.schema_editor(atomic=False) as schema_editor:
+            function(self.apps, schema_editor)
+
+    def test_backfill(self):
+        role, menu, other = str(self.role.pk), self.menu.pk, self.other_menu.pk
+        first = self.role_menus.create(role_id=f' {role} ', menu_id=menu)
+        self.role_menus.create(role_id=role, menu_id=menu)              # duplicate
+        kept_other = self.role_menus.create(role_id=role, menu_id=other)
+        self.role_menus.create(role_id='admin', menu_id=menu)           # not an id
+        self.role_menus.create(role_id='999', menu_id=menu)             # role deleted
+        self.role_menus.create(role_id=role, menu_id=999)               # menu deleted
+
+        user = str(self.user.pk)
+        first_user = self.user_menus.create(user_id=user, role_id=role, menu_id=menu)
+        self.user_menus.create(user_id=user, role_id=role, menu_id=menu)    # duplicate
+        roleless = self.user_menus.create(user_id=user, role_id='999', menu_id=other)
+        self.user_menus.create(user_id='999', role_id=role, menu_id=menu)   # user deleted
+        self.user_menus.create(user_id='', role_id=role, menu_id=menu)
+
+        self.run_migration(backfill_migration.backfill)
+
+        self.assertEqual(list(self.role_menus.order_by('pk').values_list('pk', 'role_ref', 'menu_id')),
+                         [(first.pk, self.role.pk, menu), (kept_other.pk, self.role.pk, other)])
+        self.assertEqual(list(self.user_menus.order_by('pk').values_list('pk', 'user_ref', 'role_ref', 'menu_id')),
+                         [(first_user.pk, self.user.pk, self.role.pk, menu), (roleless.pk, self.user.pk, None, other)])
+
+        # Re-running (as 0005 does) leaves filled-in rows alone.
+        self.role_menus.filter(pk=first.pk).update(role_id='admin')
+        self.run_migration(backfill_migration.backfill)
+        self.assertEqual(self.role_menus.count(), 2)
+
+    def test_restore(self):
+        role_menu = self.role_menus.create(role_id=None, role_ref=self.role.pk, menu_id=self.menu.pk)
+        user_menu = self.user_menus.create(user_id=None, user_ref=self.user.pk, role_ref=self.role.pk,
+                                           menu_id=self.menu.pk)
+        roleless = self.user_menus.create(user_id=None, user_ref=self.user.pk, role_ref=None,
+                                          menu_id=self.other_menu.pk)
+
+        self.run_migration(backfill_migration.restore)
+
+        self.assertEqual(self.role_menus.get(pk=role_menu.pk).role_id, str(self.role.pk))
+        self.assertEqual(self.user_menus.values_list('user_id', 'role_id').get(pk=user_menu.pk),
+                         (str(self.user.pk), str(self.role.pk)))
+        self.assertEqual(self.user_menus.values_list('user_id', 'role_id').get(pk=roleless.pk),
+                         (str(self.user.pk), None))
+
+
+class AssignMenuTests(TestCase):
+
+    def setUp(self):
+        self.role = roles.objects.create(role_name='Sales')
+        self.user = CustomUser.objects.create_user(email='assign@example.com', password='x', role_id=self.role.pk)
+        self.menus = [MenuMaster.objects.create(menu_name=name) for name in ('Customers', 'Vendors')]
+        RoleMenuMaster.objects.create(role=self.role, menu=self.menus[0])
+        UserMenuDetails.objects.create(user=self.user, menu=self.menus[0], role=self.role)
+        self.client.force_login(self.user)
+
+    def assign(self, **data):
+        return self.client.post('/assign_menu', {'menu_list': [menu.pk for menu in self.menus], **data})
+
+    def test_failed_insert_keeps_the_role_menus(self):
+        with mock.patch.object(RoleMenuMaster.objects, 'bulk_create', side_effect=RuntimeError):
+            self.assign(type='role', role_id=self.role.pk)
+        self.assertQuerySetEqual(RoleMenuMaster.objects.values_list('menu_id', flat=True), [self.menus[0].pk])
+
+    def test_failed_insert_keeps_the_user_menus(self):
+        with mock.patch.object(UserMenuDetails.objects, 'bulk_create', side_effect=RuntimeError):
+            self.assign(type='user', user_id=self.user.pk)
+        self.assertQuerySetEqual(UserMenuDetails.objects.values_list('menu_id', flat=True), [self.menus[0].pk])
@@ -8,42 +8,35 @@ from django.contrib.auth import authenticate, login ,logout,get_user_model
 from Account.forms import RegistrationForm
 from Account.models import  CustomUser, password_storage
 # import mysql.connector as sql
-from Account.serializers import *
-import Db 
 import bcrypt
 from django.contrib.auth.decorators import login_required
 # from .models import SignUpModel
 # from .forms import SignUpForm
 from CRLBM.encryption import *
 from django.http import HttpResponse
-from reportlab.lib.pagesizes import letter
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.platypus import SimpleDocTemplate, Paragraph
 from Account.utils import decrypt_email, encrypt_email
 import traceback
-from rest_framework.views import APIView
-from rest_framework import status
-from rest_framework.response import Response
-from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth.hashers import check_password
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from django.views.decorators.csrf import csrf_exempt
-from rest_framework.permissions import IsAuthenticated
-from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.contrib.auth.backends import ModelBackend
-from Account.db_utils import callproc
+from Account.db_utils import acallproc, callproc
+from Account.decorators import async_login_required
+from CRLBM.request_context import current_user_id
 from django.utils import timezone
 from Account.models import *
 from Masters.models import *
 from MenuManager.models import *
-from django.db import IntegrityError
+from Masters import typeahead
+from django.db import IntegrityError, transaction
 from django.urls import reverse
 from django.http import HttpResponseBadRequest
 import logging
-import requests
 from django.db import models
 
+logger = logging.getLogger(__name__)
+
 @login_required
 def menu_admin(request):
     pre_url = request.META.get('HTTP_REFERER')
@@ -52,8 +45,7 @@ def menu_admin(request):
     name = ''
     entity = ''
     type = ''
-    global user
-    user  = request.session.get('user_id', '')
+    user = current_user_id()
     try:
        
         if request.method=="GET":
@@ -73,7 +65,7 @@ def menu_admin(request):
         tb = traceback.extract_tb(e.__traceback__)
         fun = tb[0].name
         callproc("stp_error_log",[fun,str(e),request.user.id])  
-        print(f"error: {e}")
+        logger.exception("error: %s", e)
         messages.error(request, 'Oops...! Something went wrong!')
         response = {'result': 'fail','messages ':'something went wrong !'}   
     finally:
@@ -97,7 +89,7 @@ def delete_menu(request):
     except Exception as e:
         tb = traceback.extract_tb(e.__traceback__)
         callproc("stp_error_log", [tb[0].name, str(e), request.user.id])
-        print(f"error: {e}")
+        logger.exception("error: %s", e)
         messages.error(request, 'Oops...! Something went wrong!')
         response = {'result': 'fail', 'messages': 'something went wrong!'}
 
@@ -115,7 +107,7 @@ def menu_master(request):
         
                 return JsonResponse({'success': True, 'message': 'Menu Successfully Deleted!'})
             except Exception as e:
-                print(f"An error occurred: {e}")
+                logger.exception("An error occurred: %s", e)
                 return JsonResponse({'success': False, 'message': 'An error occurred while deleting the menu.'})
 
 
@@ -162,7 +154,7 @@ def menu_master(request):
                         is_sub_menu2=sub_parent1, sub_menu2=sub_menu_id1, menu_order=menu_count,menu_icon=icon,created_by=user_id)
                     messages.success(request, "Menu Successfully Created!")
                 except Exception as e:
-                    print(f"An error occurred: {e}")
+                    logger.exception("An error occurred: %s", e)
             else:
                 try:
                     MenuMaster.objects.filter(menu_id=menu_id1).update(
@@ -179,13 +171,13 @@ def menu_master(request):
                     messages.success(request, "Menu Successfully Updated!")
 
                 except Exception as e:
-                    print(f"An error occurred: {e}")
+                    logger.exception("An error occurred: %s", e)
                     messages.error(request, "An error occurred while updating the menu.")
 
     except Exception as e:
         tb = traceback.extract_tb(e.__traceback__)
         callproc("stp_error_log", [tb[0].name, str(e), request.user.id])
-        print(f"error: {e}")
+        logger.exception("error: %s", e)
         messages.error(request, 'Oops...! Something went wrong!')
         response = {'result': 'fail', 'messages': 'something went wrong!'}
 
@@ -211,16 +203,15 @@ def assign_menu(request):
             menuIds = request.POST.getlist('menu_list')  
 
             try:
-                RoleMenuMaster.objects.filter(role_id=roleId).delete()
-                
-                for menu_id in menuIds:
-                    RoleMenuMaster.objects.create(
-                        role_id=roleId,
-                        menu_id=menu_id,
-                        created_by = user
-                    )
+                # Replaced as a whole, so a failed insert keeps the old menus.
+                with transaction.atomic():
+                    RoleMenuMaster.objects.filter(role_id=roleId).delete()
+                    RoleMenuMaster.objects.bulk_create([
+                        RoleMenuMaster(role_id=roleId, menu_id=menu_id, created_by=user)
+                        for menu_id in dict.fromkeys(menuIds)
+                    ])
             except Exception as e:
-                print(f"An error occurred: {e}")
+                logger.exception("An error occurred: %s", e)
                 messages.error(request, "An error occurred while updating menus.")
 
             try:
@@ -228,19 +219,17 @@ def assign_menu(request):
 
                 users = CustomUser.objects.filter(role_id=roleId)
 
-                for user in users:
-                    for menu_id in menuIds:
-                        UserMenuDetails.objects.create(
-                            user_id=user.id,
-                            menu_id=menu_id,
-                            role_id=roleId,
-                            created_by = user
-                        )
+                # Menus a user already has are kept as they are (user_menu_unique).
+                UserMenuDetails.objects.bulk_create([
+                    UserMenuDetails(user_id=user.id, menu_id=menu_id, role_id=roleId, created_by=user)
+                    for user in users for menu_id in dict.fromkeys(menuIds)
+                ], ignore_conflicts=True)
+                typeahead.changed()
                 
                 messages.success(request, "Menus successfully Assigned to Selected Role!")
             
             except Exception as e:
-                print(f"An error occurred: {e}")
+                logger.exception("An error occurred: %s", e)
                 messages.error(request, "An error occurred while updating menus.")
 
         if type == 'user':
@@ -257,25 +246,20 @@ def assign_menu(request):
                 user = CustomUser.objects.get(id=userId)
                 roleId = user.role_id
 
-                existing_count = UserMenuDetails.objects.filter(user_id=userId).count()
-
-                if existing_count > 0:
+                with transaction.atomic():
                     UserMenuDetails.objects.filter(user_id=userId).delete()
-                
-                for menu_id in menuIds:
-                    UserMenuDetails.objects.create(
-                        user_id=userId,
-                        menu_id=menu_id,
-                        role_id=roleId,
-                        created_by = user
-                    )
+                    UserMenuDetails.objects.bulk_create([
+                        UserMenuDetails(user_id=userId, menu_id=menu_id, role_id=roleId, created_by=user)
+                        for menu_id in dict.fromkeys(menuIds)
+                    ])
+                typeahead.changed()
 
                 messages.success(request, "User menu details successfully updated!")
 
             except CustomUser.DoesNotExist:
                 messages.error(request, "User does not exist.")
             except Exception as e:
-                print(f"An error occurred: {e}")
+                logger.exception("An error occurred: %s", e)
                 messages.error(request, "An error occurred while updating user menu details.")
 
             
@@ -283,7 +267,7 @@ def assign_menu(request):
     except Exception as e:
         tb = traceback.extract_tb(e.__traceback__)
         callproc("stp_error_log", [tb[0].name, str(e), request.user.id])
-        print(f"error: {e}")
+        logger.exception("error: %s", e)
         messages.error(request, 'Oops...! Something went wrong!')
         response = {'result': 'fail', 'messages': 'something went wrong!'}
 
@@ -291,21 +275,22 @@ def assign_menu(request):
         if request.method == "POST":
             return redirect('/menu_admin?entity=menu&type=i')
     
-@login_required    
-def get_assigned_values(request):
+@async_login_required
+async def get_assigned_values(request):
     menu_array = []
+    response = {'result': 'fail', 'message': 'Something went wrong!'}
     try:
         if request.method == "POST":
             data_type = request.POST.get('type','')
             selected_id = request.POST.get('id', '')
-            menu_array= callproc("stp_get_assign_menu_values", [selected_id, data_type])
+            menu_array= await acallproc("stp_get_assign_menu_values", [selected_id, data_type])
             response = {'result': 'success', 'menu_array': menu_array}
         else:
             response = {'result': 'fail', 'message': 'Invalid request method'}
     except Exception as e:
         tb = traceback.extract_tb(e.__traceback__)
-        callproc("stp_error_log", [tb[0].name, str(e), request.user.id])
-        print(f"error: {e}")
+        await acallproc("stp_error_log", [tb[0].name, str(e), current_user_id()])
+        logger.exception("error: %s", e)
         response = {'result': 'fail', 'message': 'Something went wrong!'}
     finally:
         return JsonResponse(response)
@@ -320,10 +305,6 @@ def menu_order(request):
     type = ''
     
     try:
-        if request.user.is_authenticated ==True:                
-                global user
-                user = request.user.id   
-
         if request.method=="GET":
             type = request.GET.get('type', '')
             menu_id = request.GET.get('menu_id', '')
@@ -342,7 +323,7 @@ def menu_order(request):
                         messages.success(request, "Menu Order Succesfully Updated!")
                         
                     except Exception as e:
-                        print(f"An error occurred: {e}")
+                        logger.exception("An error occurred: %s", e)
                         messages.error(request, "An error occurred while updating the menu.")
                  
     except Exception as e:
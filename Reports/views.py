@@ -6,22 +6,17 @@ import string
 from django.http import Http404, JsonResponse
 from django.shortcuts import render,redirect
 from django.contrib.auth.decorators import login_required
-import requests
 from Reports.models import *
 from Account.models import *
-import Db 
 import json
 from datetime import datetime, timedelta
 from dateutil.relativedelta import relativedelta
 from calendar import monthrange
 from mysql.connector.errors import InterfaceError
 import calendar
-import pandas as pd
-import xlwt
 from django.http import HttpResponse
 import os
 import time
-import xlsxwriter
 import io
 import os
 # Create your views here.
@@ -31,28 +26,20 @@ from django.template.loader import render_to_string
 from django.contrib import messages
 from django.shortcuts import render, get_object_or_404
 from django.http import HttpResponse
-from flask import Flask, render_template
 from django.shortcuts import render
 
 from CRLBM.settings import MEDIA_ROOT
-app = Flask(__name__)
 # Create your views here.
 
 from io import BytesIO
-from reportlab.lib import colors
-from reportlab.lib.pagesizes import letter, landscape
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Image, Paragraph
-from reportlab.lib.styles import getSampleStyleSheet
-from rest_framework import serializers
-from rest_framework import status
-from rest_framework.response import Response
-from rest_framework.views import APIView
-from rest_framework.decorators import api_view
 from django.http import FileResponse
-from xhtml2pdf import pisa
+from DMS.sendfile import send_file
 from django.template.loader import get_template
 import traceback
-from Account.db_utils import callproc
+from Account.db_utils import acallproc, callproc
+from Account.decorators import async_login_required
+from CRLBM.db_router import writes_on_get
+from CRLBM.request_context import current_user_id
 from django.utils import timezone
 from CRLBM.encryption import *
 # Report section
@@ -61,8 +48,7 @@ def common_html(request):
     title,note ='',''
     try:
         if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
+            user = current_user_id()
             entity =request.GET.get('entity', '')  
             title,note ='',''
             if request.method=="GET":       
@@ -90,28 +76,24 @@ def common_html(request):
     finally:
         return render(request,'Reports/common_reports.html', {'filter_name':filter_name,'column_name':column_name,'saved_names':saved_names,'entity':entity,'title':title,'note':note})
     
-@login_required      
-def get_filter(request):
+@async_login_required
+async def get_filter(request):
+    drop_down = 0
     try:
-        if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
-            if request.method=="GET":
-                entity =request.GET.get('entity', '')
-                data4 = callproc("stp_get_filter_names",[entity])
-                drop_down=[]
-                data5 = []
-                for items in data4:
-                    data5=[]
-                    data5=list(items)
-                    unit = common_model(id1=data5[0], name=data5[1])
-                    drop_down.append(common_dict(unit))
-                if len(drop_down) == 0:
-                    drop_down = 0
+        if request.method=="GET":
+            entity =request.GET.get('entity', '')
+            data4 = await acallproc("stp_get_filter_names",[entity])
+            drop_down=[]
+            for items in data4:
+                data5=list(items)
+                unit = common_model(id1=data5[0], name=data5[1])
+                drop_down.append(common_dict(unit))
+            if len(drop_down) == 0:
+                drop_down = 0
     except Exception  as e:
         tb = traceback.extract_tb(e.__traceback__)
         fun = tb[0].name
-        callproc("stp_error_log",[fun,str(e),request.user.id])  
+        await acallproc("stp_error_log",[fun,str(e),current_user_id()])
         messages.error(request, 'Oops...! Something went wrong!')
     finally:
         return JsonResponse(drop_down, safe=False)
@@ -124,38 +106,34 @@ def common_dict(unit):
         'name': unit.name,
     }  
     
-@login_required    
-def get_sub_filter(request):
+@async_login_required
+async def get_sub_filter(request):
+    drop_down = 0
     try:
-        if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id 
-            if request.method=="GET":
-                filter_id =request.GET.get('filter_id', '')
-                data4 = callproc("stp_get_sub_filter",[filter_id,user])
-                drop_down=[]
-                data5 = []
-                for items in data4:
-                    data5=[]
-                    data5=list(items)
-                    unit = common_model(id1=data5[0], name=data5[1])
-                    drop_down.append(common_dict(unit))
-                if len(drop_down) == 0:
-                    drop_down = 0 
+        user = current_user_id()
+        if request.method=="GET":
+            filter_id =request.GET.get('filter_id', '')
+            data4 = await acallproc("stp_get_sub_filter",[filter_id,user])
+            drop_down=[]
+            for items in data4:
+                data5=list(items)
+                unit = common_model(id1=data5[0], name=data5[1])
+                drop_down.append(common_dict(unit))
+            if len(drop_down) == 0:
+                drop_down = 0 
     except Exception  as e:
         tb = traceback.extract_tb(e.__traceback__)
         fun = tb[0].name
-        callproc("stp_error_log",[fun,str(e),request.user.id])  
+        await acallproc("stp_error_log",[fun,str(e),user])
         messages.error(request, 'Oops...! Something went wrong!')
     finally:
         return JsonResponse(drop_down, safe=False)  
 
 @login_required
+@writes_on_get
 def add_new_filter(request):
     try:
         if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
             if request.method == "GET":
                 filter_count =str(request.GET.get('filter_count', ''))
                 entity =str(request.GET.get('entity', ''))
@@ -177,8 +155,7 @@ def add_new_filter(request):
 def partial_report(request):
     try:
         if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
+            user = current_user_id()
             if request.method == "GET":
                 columnName =str(request.GET.get('columnName', ''))
                 filterid =str(request.GET.get('filterid', ''))
@@ -333,7 +310,7 @@ def common_fun(columnName,filterid,SubFilterId,sft,entity,user,is_export):
                 
         data_list= []
         if ch == 0:
-            result_data = callproc("stp_get_execute_report_query", [sql_query])
+            result_data = callproc("stp_get_execute_report_query", [sql_query], read_only=True)
             if result_data and result_data[0]:
                 data_list = preprocess_data_list(result_data,is_export)
       
@@ -367,15 +344,15 @@ def common_fun(columnName,filterid,SubFilterId,sft,entity,user,is_export):
     finally:
           return data
 
+@login_required
 def dl_file(request, file_id):
+    # form_file is the report attachment table; the bytes are sent by nginx.
     try:
-        form_file = form_file.objects.get(id=dec(file_id))
-        file_path = os.path.join(MEDIA_ROOT, form_file.file_path)
-        if not os.path.exists(file_path):
-            raise Http404("File not found.")
-        return FileResponse(open(file_path, 'rb'), as_attachment=True, filename=form_file.uploaded_name)
+        file_obj = form_file.objects.get(id=dec(file_id))
     except form_file.DoesNotExist:
         raise Http404("File not found.")
+    file_path = os.path.join(MEDIA_ROOT, file_obj.file_path)
+    return send_file(request, file_path, file_obj.uploaded_name)
 
 def preprocess_data_list(result_data, is_export):
     data_list = []
@@ -422,6 +399,8 @@ def preprocess_data_list(result_data, is_export):
 
 
 def render_to_pdf(html):
+    from xhtml2pdf import pisa
+
     result = BytesIO()
     pdf = pisa.pisaDocument(BytesIO(html.encode("UTF-8")), result)
     if pdf.err:
@@ -434,8 +413,7 @@ def report_pdf(request):
     html_string = ''
     try:
         if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
+            user = current_user_id()
             if request.method == "POST":
                 columnName = str(request.POST.get('columnName', ''))
                 filterid = str(request.POST.get('filterid', ''))
@@ -482,8 +460,7 @@ def report_xlsx(request):
     response = ''
     try:
         if request.user.is_authenticated:                
-            global user
-            user = request.user.id
+            user = current_user_id()
             if request.method == "POST":
                 columnName = str(request.POST.get('columnName', ''))
                 filterid = str(request.POST.get('filterid', ''))
@@ -506,6 +483,8 @@ def report_xlsx(request):
                     for items in result_data:  
                         title = items[0]
 
+                import xlsxwriter
+
                 output = io.BytesIO()
                 workbook = xlsxwriter.Workbook(output)
                 worksheet = workbook.add_worksheet(str(entity))
@@ -643,11 +622,11 @@ def add_page_number(canvas, doc):
     canvas.restoreState()    
 
 @login_required
+@writes_on_get
 def save_filters(request):
     try:
         if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
+            user = current_user_id()
             if request.method == "GET":
                 columnName =str(request.GET.get('columnName', ''))
                 filterid =str(request.GET.get('filterid', ''))
@@ -674,11 +653,11 @@ def save_filters(request):
         return JsonResponse(response_data,safe=False)
 
 @login_required
+@writes_on_get
 def delete_filters(request):
     try:
         if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
+            user = current_user_id()
             if request.method == "GET":
                 entity =str(request.GET.get('entity', ''))
                 saved_id =str(request.GET.get('save_filter_name', ''))
@@ -697,8 +676,7 @@ def delete_filters(request):
 def saved_filters(request):
     try:
         if request.user.is_authenticated ==True:                
-            global user
-            user = request.user.id
+            user = current_user_id()
             if request.method == "GET":
                 entity =str(request.GET.get('entity', ''))
                 saved_id =str(request.GET.get('saved_id', ''))
@@ -723,7 +701,7 @@ def saved_filters(request):
                     sub_fil_arr = sub_fil_arr[1:]
 
                 data_list= []
-                result_data  = callproc("stp_get_execute_report_query", [sql_query])
+                result_data  = callproc("stp_get_execute_report_query", [sql_query], read_only=True)
                 if result_data and result_data[0]:
                     for row in result_data:
                         data_list.append(list(row))
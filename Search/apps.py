@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+class SearchConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'Search'
+    verbose_name = 'Search'
+
+    def ready(self):
+        # Keep the n-gram index in step with the models in SEARCH_INDEXES
+        import Search.signals
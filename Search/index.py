@@ -0,0 +1,185 @@
+# Search/index.py
+#
+# An inverted trigram index for the list searches (customers, vendors,
+# enquiries, sites), kept in the search_gram table. SEARCH_INDEXES names,
+# per kind, the model and the fields to index with their ranking weight; a
+# field may follow one foreign key ('customer__name').
+#
+# Text is lower-cased and split into words; every word is indexed by the
+# trigrams of '  ' + word, so a query word of three or more characters
+# matches anywhere inside a word (like the icontains filters it replaces) and
+# a one- or two-character word matches the start of a word. A search looks
+# up the postings of the query's trigrams through the (kind, gram) index and
+# keeps objects that have all of them, ranked by the summed field weights:
+# one indexed GROUP BY instead of a leading-wildcard LIKE over every row.
+# Those grams may come from different words or fields ('acmx xcme' has every
+# gram of 'acme'), so the candidates are rechecked with an icontains per
+# query word, which then only runs over the few rows the index let through.
+#
+# Saves and deletes are indexed by Search.signals; bulk loads call
+# update_index(); `manage.py rebuild_search_index` (re)builds everything.
+
+import re
+from functools import lru_cache
+
+from django.apps import apps
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import SearchGram
+
+GRAM = 3
+MAX_FIELD_CHARS = 500  # long descriptions are indexed by their start only
+BATCH_SIZE = 2000
+WORD_RE = re.compile(r'[^\W_]+')
+
+
+def words(text):
+    return WORD_RE.findall(str(text or '').casefold()[:MAX_FIELD_CHARS])
+
+
+def index_grams(text):
+    """Every gram stored for a field value."""
+    grams = set()
+    for word in words(text):
+        padded = ' ' * (GRAM - 1) + word
+        grams.update(padded[i:i + GRAM] for i in range(len(padded) - GRAM + 1))
+    return grams
+
+
+def query_grams(query):
+    """(grams an object must have, grams that only add to its rank)."""
+    required, bonus = set(), set()
+    for word in words(query):
+        if len(word) >= GRAM:
+            required.update(word[i:i + GRAM] for i in range(len(word) - GRAM + 1))
+            # Starting a word ranks above matching inside one.
+            bonus.add(' ' + word[:GRAM - 1])
+        else:
+            required.add(' ' * (GRAM - len(word)) + word)
+    return required, bonus - required
+
+
+@lru_cache(maxsize=None)
+def indexes():
+    """{kind: (model, {field path: weight})} from settings.SEARCH_INDEXES."""
+    return {
+        kind: (apps.get_model(config['model']), dict(config['fields']))
+        for kind, config in settings.SEARCH_INDEXES.items()
+    }
+
+
+@lru_cache(maxsize=None)
+def kinds_for(model):
+    """Kinds indexing `model` itself."""
+    return tuple(kind for kind, (indexed, _) in indexes().items() if indexed is model)
+
+
+@lru_cache(maxsize=None)
+def dependents_of(model):
+    """(kind, foreign key name) for every kind with a field read through a foreign key to `model`."""
+    found = []
+    for kind, (indexed, fields) in indexes().items():
+        for path in fields:
+            if '__' not in path:
+                continue
+            fk = path.split('__', 1)[0]
+            if indexed._meta.get_field(fk).related_model is model and (kind, fk) not in found:
+                found.append((kind, fk))
+    return tuple(found)
+
+
+def _postings(kind, rows, fields):
+    for row in rows:
+        for path, weight in fields.items():
+            for gram in index_grams(row[path]):
+                yield SearchGram(kind=kind, object_id=row['pk'], field=path, gram=gram, weight=weight)
+
+
+def index_objects(kind, pks):
+    """(Re)index the given objects of a kind; objects that no longer exist are dropped."""
+    model, fields = indexes()[kind]
+    pks = list(pks)
+    for start in range(0, len(pks), BATCH_SIZE):
+        chunk = pks[start:start + BATCH_SIZE]
+        rows = model._default_manager.filter(pk__in=chunk).values('pk', *fields)
+        with transaction.atomic():
+            SearchGram.objects.filter(kind=kind, object_id__in=chunk).delete()
+            SearchGram.objects.bulk_create(_postings(kind, rows, fields), batch_size=BATCH_SIZE)
+
+
+def update_index(model, pks):
+    """Index rows written without signals (bulk_create, update())."""
+    for kind in kinds_for(model):
+        index_objects(kind, pks)
+
+
+def remove_objects(kind, pks):
+    SearchGram.objects.filter(kind=kind, object_id__in=list(pks)).delete()
+
+
+def rebuild(kind, progress=None):
+    """Index every object of a kind from scratch; returns the number indexed."""
+    model, fields = indexes()[kind]
+    SearchGram.objects.filter(kind=kind).delete()
+    done = 0
+    pks = model._default_manager.order_by('pk').values_list('pk', flat=True)
+    chunk = []
+    for pk in pks.iterator(chunk_size=BATCH_SIZE):
+        chunk.append(pk)
+        if len(chunk) == BATCH_SIZE:
+            index_objects(kind, chunk)
+            done += len(chunk)
+            chunk = []
+            if progress:
+                progress(done)
+    index_objects(kind, chunk)
+    return done + len(chunk)
+
+
+def _matches(kind, required, bonus, fields):
+    """Postings of the objects that have every `required` gram, grouped by object."""
+    postings = SearchGram.objects.filter(kind=kind, gram__in=required | bonus)
+    if fields:
+        postings = postings.filter(field__in=fields)
+    return (postings.values('object_id')
+            .annotate(matched=Count('gram', distinct=True, filter=Q(gram__in=required)))
+            .filter(matched=len(required)))
+
+
+def _recheck(queryset, kind, query, fields):
+    """`queryset` limited to rows holding every query word in one of the fields."""
+    fields = fields or indexes()[kind][1]
+    for word in words(query):
+        queryset = queryset.filter(Q(*[Q(**{f'{path}__icontains': word}) for path in fields], _connector=Q.OR))
+    return queryset
+
+
+def search(kind, query, fields=None, limit=None):
+    """
+    Primary keys of the best matches for `query`, best first. `fields`
+    restricts the match to some of the indexed fields.
+    """
+    required, bonus = query_grams(query)
+    if not required:
+        return []
+    model = indexes()[kind][0]
+    candidates = _recheck(model._default_manager.all(), kind, query, fields).values('pk')
+    return list(_matches(kind, required, bonus, fields)
+                .filter(object_id__in=candidates)
+                .annotate(score=Sum('weight'))
+                .order_by('-score', 'object_id')
+                .values_list('object_id', flat=True)[:limit or settings.SEARCH_MAX_RESULTS])
+
+
+def search_filter(queryset, kind, query, fields=None):
+    """
+    `queryset` narrowed to every match for `query` (unchanged for a blank
+    query), through a subquery on the index and a recheck of its candidates.
+    """
+    if not words(query):
+        return queryset
+    required, _ = query_grams(query)
+    queryset = queryset.filter(pk__in=_matches(kind, required, set(), fields).values('object_id'))
+    return _recheck(queryset, kind, query, fields)
@@ -0,0 +1,23 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Search import index
+
+
+class Command(BaseCommand):
+    help = "Build the n-gram search index (Search/index.py) from scratch, for all kinds or the ones given."
+
+    def add_arguments(self, parser):
+        parser.add_argument('kinds', nargs='*', help="SEARCH_INDEXES keys (default: all).")
+
+    def handle(self, *args, **options):
+        kinds = options['kinds'] or list(index.indexes())
+        unknown = [kind for kind in kinds if kind not in index.indexes()]
+        if unknown:
+            raise CommandError(f"Unknown search index: {', '.join(unknown)}.")
+        for kind in kinds:
+            started = time.monotonic()
+            count = index.rebuild(kind, progress=lambda done: self.stdout.write(f"  {kind}: {done:,} indexed"))
+            self.stdout.write(self.style.SUCCESS(
+                f"Indexed {count:,} {kind} in {time.monotonic() - started:.1f}s."))
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchGram',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(max_length=20)),
+                ('object_id', models.BigIntegerField()),
+                ('field', models.CharField(max_length=50)),
+                ('gram', models.CharField(max_length=3)),
+                ('weight', models.PositiveSmallIntegerField(default=1)),
+            ],
+            options={
+                'db_table': 'search_gram',
+                'indexes': [models.Index(fields=['kind', 'gram', 'object_id', 'field', 'weight'], name='search_gram_lookup'), models.Index(fields=['kind', 'object_id'], name='search_gram_object')],
+            },
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import models
+
+
+class SearchGram(models.Model):
+    """
+    One posting of the n-gram index (Search.index): `gram` occurs in `field`
+    of object `object_id` of the SEARCH_INDEXES entry `kind`. `weight` is the
+    field's weight, denormalized so ranking is a single GROUP BY.
+    """
+    kind = models.CharField(max_length=20)
+    object_id = models.BigIntegerField()
+    field = models.CharField(max_length=50)
+    gram = models.CharField(max_length=3)
+    weight = models.PositiveSmallIntegerField(default=1)
+
+    class Meta:
+        db_table = 'search_gram'
+        indexes = [
+            # Lookup: all postings of the query's grams, covering the GROUP BY.
+            models.Index(fields=['kind', 'gram', 'object_id', 'field', 'weight'], name='search_gram_lookup'),
+            # Reindexing and deletes of one object.
+            models.Index(fields=['kind', 'object_id'], name='search_gram_object'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id} {self.field} '{self.gram}'"
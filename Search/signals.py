@@ -0,0 +1,26 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import index
+
+
+@receiver(post_save)
+def index_saved_object(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    for kind in index.kinds_for(sender):
+        index.index_objects(kind, [instance.pk])
+    # Rows showing this object's fields (an enquiry shows its customer's
+    # name) are reindexed after the commit, off the saving transaction.
+    for kind, fk in index.dependents_of(sender):
+        model = index.indexes()[kind][0]
+        pk = instance.pk
+        transaction.on_commit(lambda kind=kind, model=model, fk=fk, pk=pk: index.index_objects(
+            kind, model._default_manager.filter(**{fk: pk}).values_list('pk', flat=True)))
+
+
+@receiver(post_delete)
+def unindex_deleted_object(sender, instance, **kwargs):
+    for kind in index.kinds_for(sender):
+        index.remove_objects(kind, [instance.pk])
@@ -0,0 +1,106 @@
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.test import TestCase
+
+from CMS.models import CustomerMaster, TypeOfOrganization
+from crm.models import Enquiry
+
+from . import index
+from .models import SearchGram
+
+
+class GramTests(TestCase):
+
+    def test_query_grams(self):
+        self.assertEqual(index.query_grams('Tata'), ({'tat', 'ata'}, {' ta'}))
+        self.assertEqual(index.query_grams('a'), ({'  a'}, set()))
+        self.assertEqual(index.query_grams(' ,- '), (set(), set()))
+
+    def test_every_query_gram_of_a_substring_is_indexed(self):
+        grams = index.index_grams('Bharat Forge Ltd.')
+        for query in ('arat', 'forge', 'lt', 'b', 'bharat ltd'):
+            required, bonus = index.query_grams(query)
+            self.assertTrue(required <= grams, query)
+
+
+class SearchTests(TestCase):
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(email='search@example.com', password='x')
+        self.org_type = TypeOfOrganization.objects.create(name='Pvt Ltd')
+
+    def customer(self, name, pan):
+        return CustomerMaster.objects.create(organization_type=self.org_type, name=name, pan_number=pan,
+                                             created_by=self.user)
+
+    def test_saved_customers_are_found_and_ranked(self):
+        forge = self.customer('Bharat Forge', 'AAAAA0001A')
+        forgings = self.customer('Kalyani Forgings', 'AAAAA0002A')
+        self.customer('Tata Motors', 'AAAAA0003A')
+
+        self.assertEqual(index.search('customers', 'forg'), [forge.pk, forgings.pk])
+        self.assertEqual(index.search('customers', 'forge bharat'), [forge.pk])
+        self.assertEqual(index.search('customers', 'ings'), [forgings.pk])
+        self.assertEqual(index.search('customers', 'aaaaa0002a', fields=['name']), [])
+        self.assertEqual(index.search('customers', 'aaaaa0002a', fields=['pan_number']), [forgings.pk])
+
+        forge.name = 'Bharat Castings'
+        forge.save()
+        self.assertEqual(index.search('customers', 'forg'), [forgings.pk])
+        forgings.delete()
+        self.assertEqual(index.search('customers', 'forg'), [])
+        self.assertFalse(SearchGram.objects.filter(object_id=forgings.pk, kind='customers').exists())
+
+    def test_search_filter(self):
+        preforge = self.customer('Preforge Works', 'AAAAA0001A')
+        forge = self.customer('Forge India', 'AAAAA0002A')
+        customers = CustomerMaster.objects.order_by('pk')
+        self.assertEqual(index.search_filter(customers, 'customers', ' '), customers)
+        self.assertEqual(list(index.search_filter(customers, 'customers', 'forg', fields=['name'])), [preforge, forge])
+        self.assertEqual(list(index.search_filter(customers, 'customers', 'india forge')), [forge])
+
+    def test_grams_spread_over_words_do_not_match(self):
+        # 'acmx xcme' has every gram of 'acme', in two different words.
+        self.customer('Acmx Xcme', 'AAAAA0001A')
+        acme = self.customer('Acme Security', 'AAAAA0002A')
+        customers = CustomerMaster.objects.all()
+        self.assertEqual(list(index.search_filter(customers, 'customers', 'acme')), [acme])
+        self.assertEqual(index.search('customers', 'acme'), [acme.pk])
+        # Rechecked before the cut, so the false match does not take the only place.
+        self.assertEqual(index.search('customers', 'acme', limit=1), [acme.pk])
+
+    def test_search_filter_is_not_capped(self):
+        matches = [self.customer(f'Forge {n}', f'AAAAA000{n}A') for n in range(3)]
+        self.customer('Tata Motors', 'AAAAA0009A')
+        customers = CustomerMaster.objects.order_by('pk')
+        with self.settings(SEARCH_MAX_RESULTS=1):
+            self.assertEqual(len(index.search('customers', 'forge')), 1)
+            self.assertEqual(list(index.search_filter(customers, 'customers', 'forge')), matches)
+
+    def test_enquiries_follow_their_customer(self):
+        customer = self.customer('Bharat Forge', 'AAAAA0001A')
+        enquiry = Enquiry.objects.create(customer=customer, required_by_date=date(2026, 1, 1), email='a@b.com',
+                                         phone='1', subject='Guards', description='-', created_by=self.user)
+        self.assertEqual(index.search('enquiries', 'bharat'), [enquiry.pk])
+
+        customer.name = 'Kalyani Steels'
+        with self.captureOnCommitCallbacks(execute=True):
+            customer.save()
+        self.assertEqual(index.search('enquiries', 'bharat'), [])
+        self.assertEqual(index.search('enquiries', 'kalyani guards'), [enquiry.pk])
+
+    def test_rebuild(self):
+        customer = self.customer('Bharat Forge', 'AAAAA0001A')
+        SearchGram.objects.all().delete()
+        self.assertEqual(index.rebuild('customers'), 1)
+        self.assertEqual(index.search('customers', 'bharat'), [customer.pk])
+
+    def test_api(self):
+        customer = self.customer('Bharat Forge', 'AAAAA0001A')
+        self.client.force_login(self.user)
+        response = self.client.get('/search/customers/', {'q': 'bhar'})
+        self.assertEqual(response.json()['results'], [
+            {'id': customer.pk, 'text': str(customer), 'url': f'/cms/customers/{customer.pk}/'},
+        ])
+        self.assertEqual(self.client.get('/search/nothing/', {'q': 'bhar'}).status_code, 404)
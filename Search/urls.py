@@ -0,0 +1,9 @@
+# urls.py
+from django.urls import path
+from . import views
+
+app_name = 'search'
+
+urlpatterns = [
+    path('<str:kind>/', views.search_api, name='search'),
+]
@@ -0,0 +1,34 @@
+from django.conf import settings
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
+from django.urls import NoReverseMatch, reverse
+from django.views.decorators.http import require_GET
+
+from .index import indexes, search
+
+
+@login_required
+@require_GET
+def search_api(request, kind):
+    """Ranked matches of ?q= in one SEARCH_INDEXES kind, for search boxes."""
+    if kind not in indexes():
+        return JsonResponse({'success': False, 'message': f'Unknown search {kind!r}.'}, status=404)
+    try:
+        limit = min(max(int(request.GET.get('limit', 20)), 1), 100)
+    except ValueError:
+        limit = 20
+    model = indexes()[kind][0]
+    pks = search(kind, request.GET.get('q', ''), limit=limit)
+    objects = model._default_manager.in_bulk(pks)
+    url_name = settings.SEARCH_INDEXES[kind].get('url')
+    results = []
+    for pk in pks:
+        obj = objects.get(pk)
+        if obj is None:
+            continue
+        try:
+            url = reverse(url_name, args=[pk]) if url_name else obj.get_absolute_url()
+        except (AttributeError, NoReverseMatch):
+            url = None
+        results.append({'id': pk, 'text': str(obj), 'url': url})
+    return JsonResponse({'success': True, 'results': results})
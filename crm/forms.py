@@ -2,7 +2,8 @@ from django import forms
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from .models import *
-from CMS.models import CustomerMaster, CustomerConcernPerson,StateUTMaster,DivisionMaster
+from CMS.models import CustomerMaster, CustomerConcernPerson
+from Masters import refdata
 
 class EnquiryForm(forms.ModelForm):
     required_by_date = forms.DateField(
@@ -356,6 +357,7 @@ class SalesOrderItemForm(forms.ModelForm):
 class ProjectForm(forms.ModelForm):
     class Meta:
         model = Project
+        formfield_callback = refdata.formfield
         fields = ['name', 'project_id', 'customer', 'division', 'description', 'status', 'is_active', 'start_date', 'end_date']
         widgets = {
             'name': forms.TextInput(attrs={
@@ -393,12 +395,11 @@ class ProjectForm(forms.ModelForm):
                 'type': 'date'
             }),
         }
-from CMS.models import DivisionMaster, CustomerMaster
 
 class SiteForm(forms.ModelForm):
     # Custom fields for Division and Customer from CMS app
-    division = forms.ModelChoiceField(
-        queryset=DivisionMaster.objects.filter(is_active=True),
+    division = refdata.RefDataChoiceField(
+        'division',
         widget=forms.Select(attrs={
             'class': 'form-select',
             'id': 'id_division'
@@ -417,6 +418,7 @@ class SiteForm(forms.ModelForm):
 
     class Meta:
         model = Site
+        formfield_callback = refdata.formfield
         fields = [
             'division', 'customer', 'name', 'site_id', 'project', 'site_type', 'is_active', 
             'region', 'state', 'address', 'site_location', 'pin_code',
@@ -523,10 +525,10 @@ class SiteSearchForm(forms.Form):
     project = forms.ModelChoiceField(queryset=Project.objects.all(), required=False, widget=forms.Select(attrs={
         'class': 'form-select'
     }))
-    region = forms.ModelChoiceField(queryset=Region.objects.all(), required=False, widget=forms.Select(attrs={
+    region = refdata.RefDataChoiceField('region', active_only=False, required=False, widget=forms.Select(attrs={
         'class': 'form-select'
     }))
-    state = forms.ModelChoiceField(queryset=StateUTMaster.objects.all(), required=False, widget=forms.Select(attrs={
+    state = refdata.RefDataChoiceField('state', active_only=False, required=False, widget=forms.Select(attrs={
         'class': 'form-select'
     }))
     is_active = forms.ChoiceField(
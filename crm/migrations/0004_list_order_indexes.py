@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0003_alter_enquiry_attachment_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='enquiry',
+            index=models.Index(fields=['-enquiry_date', '-created_date', '-id'], name='crm_enquiry_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='quotation',
+            index=models.Index(fields=['-quotation_date', '-created_date', '-id'], name='crm_quotation_list_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='salesorder',
+            index=models.Index(fields=['-order_date', '-created_date', '-id'], name='crm_order_list_idx'),
+        ),
+    ]
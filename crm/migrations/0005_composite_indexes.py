@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0004_list_order_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='enquiry',
+            name='crm_enquiry_status_2fcbe8_idx',
+        ),
+        migrations.AddIndex(
+            model_name='enquiry',
+            index=models.Index(fields=['status', 'priority'], name='crm_enquiry_status_prio_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='site',
+            index=models.Index(fields=['project', 'is_active'], name='crm_site_project_active_idx'),
+        ),
+    ]
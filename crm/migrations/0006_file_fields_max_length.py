@@ -0,0 +1,29 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:05
+
+import DMS.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('crm', '0005_composite_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='enquiry',
+            name='attachment',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=DMS.storage.document_storage, upload_to='enquiry_attachments/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='salesorder',
+            name='customer_po_file',
+            field=models.FileField(blank=True, max_length=255, null=True, storage=DMS.storage.document_storage, upload_to='customer_po/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='sitedocument',
+            name='file',
+            field=models.FileField(max_length=255, storage=DMS.storage.document_storage, upload_to='site_documents/'),
+        ),
+    ]
@@ -1,9 +1,32 @@
 from django.db import models
+from django.db.models import Count, DecimalField, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
 from django.core.validators import MinValueValidator, RegexValidator
 from django.utils import timezone
 from decimal import Decimal, ROUND_HALF_UP
 from CMS.models import CustomerMaster, CustomerConcernPerson
 from Account.models import CustomUser
+from DMS.storage import document_storage
+
+class ItemStatsQuerySet(models.QuerySet):
+    """Queryset for documents with line items (the reverse relation `items`)."""
+
+    def _items(self):
+        relation = self.model._meta.get_field('items')
+        return (relation.related_model.objects.filter(**{relation.field.name: OuterRef('pk')})
+                .order_by().values(relation.field.name))
+
+    def with_item_stats(self):
+        """Annotate n_items and items_quantity from correlated subqueries, so a list page stays one query."""
+        items = self._items()
+        return self.annotate(
+            n_items=Coalesce(Subquery(items.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), 0),
+            items_quantity=Coalesce(
+                Subquery(items.annotate(total=Sum('quantity')).values('total')),
+                Value(0), output_field=DecimalField(max_digits=12, decimal_places=2),
+            ),
+        )
+
 
 class Enquiry(models.Model):
     ENQUIRY_TYPE = (
@@ -79,19 +102,24 @@ class Enquiry(models.Model):
     
     # System Fields
     notes = models.TextField(blank=True)
-    attachment = models.FileField(upload_to='enquiry_attachments/%Y/%m/', blank=True, null=True)
+    attachment = models.FileField(max_length=255, upload_to='enquiry_attachments/%Y/%m/', storage=document_storage, blank=True, null=True)
     created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='created_enquiries')
     created_date = models.DateTimeField(auto_now_add=True)
     last_modified = models.DateTimeField(auto_now=True)
     modified_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='modified_enquiries')
 
+    objects = ItemStatsQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Enquiry"
         verbose_name_plural = "Enquiries"
         ordering = ['-enquiry_date', '-created_date']
         indexes = [
             models.Index(fields=['enquiry_number']),
-            models.Index(fields=['status']),
+            # List order (-enquiry_date, -created_date), for keyset pages.
+            models.Index(fields=['-enquiry_date', '-created_date', '-id'], name='crm_enquiry_list_idx'),
+            # Also serves status alone (leading column).
+            models.Index(fields=['status', 'priority'], name='crm_enquiry_status_prio_idx'),
             models.Index(fields=['customer']),
             models.Index(fields=['enquiry_date']),
         ]
@@ -119,10 +147,14 @@ class Enquiry(models.Model):
 
     @property
     def item_count(self):
+        if hasattr(self, 'n_items'):
+            return self.n_items
         return self.items.count()
 
     @property
     def total_quantity(self):
+        if hasattr(self, 'items_quantity'):
+            return self.items_quantity
         return self.items.aggregate(total=models.Sum('quantity'))['total'] or 0
 
     @property
@@ -267,12 +299,16 @@ class Quotation(models.Model):
     last_modified = models.DateTimeField(auto_now=True)
     modified_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='modified_quotations')
 
+    objects = ItemStatsQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Quotation"
         verbose_name_plural = "Quotations"
         ordering = ['-quotation_date', '-created_date']
         indexes = [
             models.Index(fields=['quotation_number']),
+            # List order (-quotation_date, -created_date), for keyset pages.
+            models.Index(fields=['-quotation_date', '-created_date', '-id'], name='crm_quotation_list_idx'),
             models.Index(fields=['status']),
             models.Index(fields=['customer']),
             models.Index(fields=['expiry_date']),
@@ -309,6 +345,8 @@ class Quotation(models.Model):
 
     @property
     def item_count(self):
+        if hasattr(self, 'n_items'):
+            return self.n_items
         return self.items.count()
 
     @property
@@ -403,7 +441,7 @@ class SalesOrder(models.Model):
     contact_person = models.ForeignKey(CustomerConcernPerson, on_delete=models.SET_NULL, null=True, blank=True)
     customer_po_number = models.CharField(max_length=100)
     customer_po_date = models.DateField(null=True, blank=True)
-    customer_po_file = models.FileField(upload_to='customer_po/%Y/%m/', blank=True, null=True)
+    customer_po_file = models.FileField(max_length=255, upload_to='customer_po/%Y/%m/', storage=document_storage, blank=True, null=True)
     
     # Delivery Information
     delivery_address = models.TextField()
@@ -437,12 +475,16 @@ class SalesOrder(models.Model):
     last_modified = models.DateTimeField(auto_now=True)
     modified_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='modified_sales_orders')
 
+    objects = ItemStatsQuerySet.as_manager()
+
     class Meta:
         verbose_name = "Sales Order"
         verbose_name_plural = "Sales Orders"
         ordering = ['-order_date', '-created_date']
         indexes = [
             models.Index(fields=['order_number']),
+            # List order (-order_date, -created_date), for keyset pages.
+            models.Index(fields=['-order_date', '-created_date', '-id'], name='crm_order_list_idx'),
             models.Index(fields=['status']),
             models.Index(fields=['customer']),
             models.Index(fields=['expected_delivery_date']),
@@ -475,6 +517,8 @@ class SalesOrder(models.Model):
 
     @property
     def item_count(self):
+        if hasattr(self, 'n_items'):
+            return self.n_items
         return self.items.count()
 
     @property
@@ -651,6 +695,9 @@ class Site(models.Model):
         verbose_name = "Site"
         verbose_name_plural = "Sites"
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['project', 'is_active'], name='crm_site_project_active_idx'),
+        ]
 
 
 class SiteEmployee(models.Model):
@@ -683,7 +730,7 @@ class SiteEmployee(models.Model):
 class SiteDocument(models.Model):
     site = models.ForeignKey(Site, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=100)
-    file = models.FileField(upload_to='site_documents/')
+    file = models.FileField(max_length=255, upload_to='site_documents/', storage=document_storage)
     description = models.TextField(blank=True)
     uploaded_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
@@ -30,6 +30,10 @@ urlpatterns = [
     path('sales-orders/<int:pk>/delete/', views.SalesOrderDeleteView.as_view(), name='sales_order_delete'),
     path('sales-orders/<int:pk>/update-status/', views.update_order_status, name='sales_order_update_status'),
     
+    # List APIs (cursor pagination)
+    path('api/enquiries/', views.EnquiryListApiView.as_view(), name='enquiry_list_api'),
+    path('api/sales-orders/', views.SalesOrderListApiView.as_view(), name='sales_order_list_api'),
+
     # AJAX URLs
     path('ajax/get-contact-persons/', views.get_contact_persons, name='get_contact_persons'),
     path('ajax/get-enquiry-items/', views.get_enquiry_items, name='get_enquiry_items'),
@@ -15,8 +15,14 @@ from .forms import *
 from CMS.models import CustomerMaster, CustomerConcernPerson,StateUTMaster,DivisionMaster
 from Account.models import CustomUser
 from django.contrib.auth.decorators import login_required
+from Account.decorators import ais_authenticated, async_login_required
+from CRLBM.db_router import use_replica
+from CRLBM.pagination import KeysetPaginationMixin, page_json
+from Search.index import search_filter
+from django.utils.decorators import method_decorator
 
 # Dashboard View
+@method_decorator(use_replica, name='dispatch')
 class DashboardView(LoginRequiredMixin, TemplateView):
     template_name = 'crm/dashboard.html'
     
@@ -51,14 +57,14 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         return context
 
 # Enquiry Views
-class EnquiryListView(LoginRequiredMixin, ListView):
+class EnquiryListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Enquiry
     template_name = 'crm/enquiry_list.html'
     context_object_name = 'enquiries'
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Enquiry.objects.select_related('customer', 'contact_person', 'created_by').prefetch_related('items')
+        queryset = Enquiry.objects.select_related('customer', 'contact_person', 'created_by').with_item_stats()
         
         # Filtering
         status_filter = self.request.GET.get('status')
@@ -73,12 +79,7 @@ class EnquiryListView(LoginRequiredMixin, ListView):
         if type_filter:
             queryset = queryset.filter(enquiry_type=type_filter)
         if search_query:
-            queryset = queryset.filter(
-                Q(enquiry_number__icontains=search_query) |
-                Q(customer__name__icontains=search_query) |
-                Q(subject__icontains=search_query) |
-                Q(contact_person__concern_person__icontains=search_query)
-            )
+            queryset = search_filter(queryset, 'enquiries', search_query)
         
         return queryset.order_by('-enquiry_date', '-created_date')
     
@@ -191,15 +192,30 @@ class EnquiryDeleteView(LoginRequiredMixin, DeleteView):
         messages.success(request, f'Enquiry {enquiry.enquiry_number} deleted successfully!')
         return super().delete(request, *args, **kwargs)
 
+class EnquiryListApiView(EnquiryListView):
+    """GET: one page of the filtered enquiry list as JSON, with next/previous cursors."""
+
+    def get(self, request, *args, **kwargs):
+        paginator, page, enquiries, _ = self.paginate_queryset(self.get_queryset(), self.paginate_by)
+        return page_json(page, [{
+            'id': enquiry.pk,
+            'enquiry_number': enquiry.enquiry_number,
+            'enquiry_date': enquiry.enquiry_date,
+            'customer': enquiry.customer.name,
+            'subject': enquiry.subject,
+            'status': enquiry.status,
+            'priority': enquiry.priority,
+        } for enquiry in enquiries])
+
 # Quotation Views
-class QuotationListView(LoginRequiredMixin, ListView):
+class QuotationListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = Quotation
     template_name = 'crm/quotation_list.html'
     context_object_name = 'quotations'
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = Quotation.objects.select_related('enquiry', 'customer', 'contact_person', 'created_by').prefetch_related('items')
+        queryset = Quotation.objects.select_related('enquiry', 'customer', 'contact_person', 'created_by').with_item_stats()
         
         # Filtering
         status_filter = self.request.GET.get('status')
@@ -373,14 +389,14 @@ class QuotationDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 # Sales Order Views
-class SalesOrderListView(LoginRequiredMixin, ListView):
+class SalesOrderListView(LoginRequiredMixin, KeysetPaginationMixin, ListView):
     model = SalesOrder
     template_name = 'crm/sales_order_list.html'
     context_object_name = 'sales_orders'
     paginate_by = 20
     
     def get_queryset(self):
-        queryset = SalesOrder.objects.select_related('quotation', 'customer', 'contact_person', 'project_manager', 'created_by').prefetch_related('items')
+        queryset = SalesOrder.objects.select_related('quotation', 'customer', 'contact_person', 'project_manager', 'created_by').with_item_stats()
         
         # Filtering
         status_filter = self.request.GET.get('status')
@@ -416,6 +432,21 @@ class SalesOrderListView(LoginRequiredMixin, ListView):
         
         return context
 
+class SalesOrderListApiView(SalesOrderListView):
+    """GET: one page of the filtered sales order list as JSON, with next/previous cursors."""
+
+    def get(self, request, *args, **kwargs):
+        paginator, page, orders, _ = self.paginate_queryset(self.get_queryset(), self.paginate_by)
+        return page_json(page, [{
+            'id': order.pk,
+            'order_number': order.order_number,
+            'order_date': order.order_date,
+            'customer': order.customer.name,
+            'customer_po_number': order.customer_po_number,
+            'status': order.status,
+            'total_amount': order.total_amount,
+        } for order in orders])
+
 class SalesOrderCreateView(LoginRequiredMixin, CreateView):
     model = SalesOrder
     form_class = SalesOrderForm
@@ -549,8 +580,8 @@ class SalesOrderDeleteView(LoginRequiredMixin, DeleteView):
         return super().delete(request, *args, **kwargs)
 
 # AJAX Views
-def get_contact_persons(request):
-    if not request.user.is_authenticated:
+async def get_contact_persons(request):
+    if not await ais_authenticated(request):
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
     customer_id = request.GET.get('customer_id')
@@ -559,11 +590,11 @@ def get_contact_persons(request):
             customer_id=customer_id, is_active=True
         ).values('id', 'concern_person', 'designation', 'mobile_1', 'email_company')
         
-        return JsonResponse(list(contact_persons), safe=False)
+        return JsonResponse([row async for row in contact_persons], safe=False)
     return JsonResponse([], safe=False)
 
-def get_enquiry_items(request):
-    if not request.user.is_authenticated:
+async def get_enquiry_items(request):
+    if not await ais_authenticated(request):
         return JsonResponse({'error': 'Authentication required'}, status=401)
     
     enquiry_id = request.GET.get('enquiry_id')
@@ -572,7 +603,7 @@ def get_enquiry_items(request):
             'id', 'service_description', 'quantity', 'unit', 'target_price', 'service_category'
         )
         
-        return JsonResponse(list(items), safe=False)
+        return JsonResponse([row async for row in items], safe=False)
     return JsonResponse([], safe=False)
 
 def update_quotation_status(request, pk):
@@ -674,7 +705,7 @@ def site_list(request):
         is_active = search_form.cleaned_data.get('is_active')
         
         if name:
-            sites = sites.filter(name__icontains=name)
+            sites = search_filter(sites, 'sites', name, fields=['name'])
         if project:
             sites = sites.filter(project=project)
         if region:
@@ -824,17 +855,18 @@ def remove_site_employee(request, site_pk, employee_pk):
     return redirect('site_detail', pk=site.pk)
 
 
-@login_required
-def load_projects(request):
+@async_login_required
+async def load_projects(request):
     """AJAX view to load projects based on customer"""
     customer_id = request.GET.get('customer_id')
     if customer_id:
         projects = Project.objects.filter(customer_id=customer_id, is_active=True)
-        return JsonResponse(list(projects.values('id', 'name', 'project_id')), safe=False)
+        return JsonResponse([row async for row in projects.values('id', 'name', 'project_id')], safe=False)
     return JsonResponse([], safe=False)
 
 
 @login_required
+@use_replica
 def site_dashboard(request):
     """Site management dashboard"""
     total_sites = Site.objects.count()
@@ -869,8 +901,8 @@ def ajax_load_customers(request):
         return JsonResponse(list(customers), safe=False)
     return JsonResponse([], safe=False)
 
-@login_required
-def ajax_load_projects(request):
+@async_login_required
+async def ajax_load_projects(request):
     """AJAX view to load projects based on customer"""
     customer_id = request.GET.get('customer_id')
     if customer_id:
@@ -878,5 +910,5 @@ def ajax_load_projects(request):
             customer_id=customer_id, 
             is_active=True
         ).values('id', 'name', 'project_id')
-        return JsonResponse(list(projects), safe=False)
+        return JsonResponse([row async for row in projects], safe=False)
     return JsonResponse([], safe=False)
\ No newline at end of file
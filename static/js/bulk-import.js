@@ -0,0 +1,84 @@
+/*
+ * Bulk spreadsheet imports (Masters/imports.py).
+ *
+ * BulkImport.bind(form) posts the form (kind, file and importer options) to
+ * /imports/, then polls the batch status and shows the progress and the first
+ * row errors in the form's .bulk-import-status element.
+ */
+(function (window) {
+    'use strict';
+
+    var POLL_MS = 2000;
+
+    function csrfToken(form) {
+        var input = form.querySelector('input[name="csrfmiddlewaretoken"]');
+        return input ? input.value : '';
+    }
+
+    function number(value) {
+        return (value || 0).toLocaleString();
+    }
+
+    function escape(text) {
+        var div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    function render(target, batch) {
+        var total = batch.total_rows ? ' / ' + number(batch.total_rows) : '';
+        var html = '<div>' + escape(batch.status) + ': ' + number(batch.processed_rows) + total + ' rows, ' +
+            number(batch.inserted_rows) + ' loaded, ' + number(batch.error_rows) + ' with errors</div>';
+        if (batch.message) html += '<div>' + escape(batch.message) + '</div>';
+        if (batch.errors && batch.errors.length) {
+            html += '<ul class="small text-danger mb-1">' + batch.errors.slice(0, 10).map(function (e) {
+                return '<li>Row ' + e.row + (e.column ? ' (' + escape(e.column) + ')' : '') + ': ' + escape(e.message) + '</li>';
+            }).join('') + '</ul>';
+        }
+        if (batch.errors_url) html += '<a href="' + batch.errors_url + '">Download all errors</a>';
+        target.innerHTML = html;
+    }
+
+    function poll(url, target, done) {
+        fetch(url, {credentials: 'same-origin'})
+            .then(function (response) { return response.json(); })
+            .then(function (batch) {
+                render(target, batch);
+                if (batch.status === 'queued' || batch.status === 'running') {
+                    setTimeout(function () { poll(url, target, done); }, POLL_MS);
+                } else if (done) {
+                    done(batch);
+                }
+            });
+    }
+
+    function bind(form, done) {
+        var target = form.querySelector('.bulk-import-status');
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+            var button = form.querySelector('[type="submit"]');
+            if (button) button.disabled = true;
+            target.textContent = 'Uploading...';
+            fetch(form.action, {
+                method: 'POST',
+                body: new FormData(form),
+                headers: {'X-CSRFToken': csrfToken(form), 'X-Requested-With': 'XMLHttpRequest'},
+                credentials: 'same-origin'
+            })
+                .then(function (response) { return response.json(); })
+                .then(function (result) {
+                    if (!result.success) throw new Error(result.message);
+                    poll(result.status_url, target, function (batch) {
+                        if (button) button.disabled = false;
+                        if (done) done(batch);
+                    });
+                })
+                .catch(function (error) {
+                    if (button) button.disabled = false;
+                    target.textContent = error.message;
+                });
+        });
+    }
+
+    window.BulkImport = {bind: bind};
+})(window);
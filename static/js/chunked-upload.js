@@ -0,0 +1,109 @@
+/*
+ * Chunked, resumable document uploads (DMS/uploads.py).
+ *
+ * ChunkedUpload.prepare(form) uploads the file of every
+ * <input type="file" data-chunked-upload> in the form in chunks, then swaps
+ * the file input for a hidden upload_id field, so the form posts only the
+ * other fields. After a network error the upload resumes from the offset the
+ * server reports.
+ */
+(function (window) {
+    'use strict';
+
+    var UPLOAD_URL = '/documents/uploads/';
+    var MAX_RETRIES = 5;
+
+    function csrfToken(form) {
+        var input = form && form.querySelector('input[name="csrfmiddlewaretoken"]');
+        if (input) return input.value;
+        var match = document.cookie.match(/(?:^|;\s*)csrftoken=([^;]+)/);
+        return match ? decodeURIComponent(match[1]) : '';
+    }
+
+    function request(method, url, token, body, contentType) {
+        var headers = {'X-CSRFToken': token, 'X-Requested-With': 'XMLHttpRequest'};
+        if (contentType) headers['Content-Type'] = contentType;
+        return fetch(url, {method: method, headers: headers, body: body, credentials: 'same-origin'})
+            .then(function (response) {
+                return response.json().then(function (data) {
+                    data.status_code = response.status;
+                    return data;
+                });
+            });
+    }
+
+    function wait(ms) {
+        return new Promise(function (resolve) { setTimeout(resolve, ms); });
+    }
+
+    function upload(file, options) {
+        options = options || {};
+        var token = options.csrfToken || csrfToken();
+        var onProgress = options.onProgress || function () {};
+        var retries = 0;
+
+        return request('POST', UPLOAD_URL, token, JSON.stringify({filename: file.name, size: file.size}), 'application/json')
+            .then(function (session) {
+                if (!session.success) throw new Error(session.message);
+                var base = UPLOAD_URL + session.upload_id + '/';
+
+                function send(offset) {
+                    onProgress(offset / file.size);
+                    if (offset >= file.size) {
+                        return request('POST', base + 'finalize', token).then(function (result) {
+                            if (!result.success) throw new Error(result.message);
+                            return result.upload_id;
+                        });
+                    }
+                    var chunk = file.slice(offset, offset + session.chunk_size);
+                    return request('POST', base + 'chunk?offset=' + offset, token, chunk, 'application/octet-stream')
+                        .then(function (result) {
+                            if (result.success) {
+                                retries = 0;
+                                return send(result.offset);
+                            }
+                            if (result.status_code === 409) return send(result.offset);
+                            throw new Error(result.message);
+                        }, function () {
+                            // Connection dropped: ask where the server got to and carry on.
+                            if (++retries > MAX_RETRIES) throw new Error('Upload failed, please try again.');
+                            return wait(1000 * retries).then(function () {
+                                return request('GET', base, token);
+                            }).then(function (status) {
+                                return send(status.offset);
+                            }, function () {
+                                return send(offset);
+                            });
+                        });
+                }
+
+                return send(session.offset);
+            });
+    }
+
+    function prepare(form) {
+        var inputs = Array.prototype.slice.call(form.querySelectorAll('input[type="file"][data-chunked-upload]'));
+        var progress = form.querySelector('.chunked-upload-progress');
+        return inputs.reduce(function (done, input) {
+            return done.then(function () {
+                if (!input.files || !input.files.length) return;
+                return upload(input.files[0], {
+                    csrfToken: csrfToken(form),
+                    onProgress: function (fraction) {
+                        if (progress) progress.textContent = Math.round(fraction * 100) + '%';
+                    }
+                }).then(function (uploadId) {
+                    var hidden = document.createElement('input');
+                    hidden.type = 'hidden';
+                    hidden.name = 'upload_id';
+                    hidden.value = uploadId;
+                    form.appendChild(hidden);
+                    // Disabled inputs are left out of the POST.
+                    input.disabled = true;
+                });
+            });
+        }, Promise.resolve());
+    }
+
+    window.ChunkedUpload = {upload: upload, prepare: prepare};
+})(window);
@@ -0,0 +1,93 @@
+/*
+ * Topbar typeahead (Masters/typeahead.py).
+ *
+ * Asks the input's data-suggest-url for the best pages matching what has been
+ * typed, at most one request in flight (a newer keystroke aborts the older
+ * one), and lists them in #search-dropdown. Up/Down move through the list,
+ * Enter opens the highlighted page; without a highlight the form submits to
+ * the full results page.
+ */
+(function (window, document) {
+    'use strict';
+
+    var DEBOUNCE_MS = 60;
+
+    function escape(text) {
+        var div = document.createElement('div');
+        div.textContent = text == null ? '' : String(text);
+        return div.innerHTML;
+    }
+
+    function bind(input, dropdown) {
+        var timer = null;
+        var pending = null;
+        var active = -1;
+
+        function items() {
+            return dropdown.querySelectorAll('a.dropdown-item');
+        }
+
+        function highlight(index) {
+            var links = items();
+            if (!links.length) return;
+            active = (index + links.length) % links.length;
+            links.forEach(function (link, i) { link.classList.toggle('active', i === active); });
+        }
+
+        function render(query, results) {
+            active = -1;
+            if (!query) {
+                dropdown.innerHTML = '';
+                return;
+            }
+            if (!results.length) {
+                dropdown.innerHTML = '<div class="dropdown-header noti-title"><h6 class="text-overflow mb-0">No matching pages</h6></div>';
+                return;
+            }
+            dropdown.innerHTML = results.map(function (r) {
+                return '<a href="' + escape(r.href) + '" class="dropdown-item notify-item">' +
+                    '<span class="d-block">' + escape(r.name) + '</span>' +
+                    (r.description ? '<small class="text-muted text-overflow d-block">' + escape(r.description) + '</small>' : '') +
+                    '</a>';
+            }).join('');
+        }
+
+        function fetchSuggestions() {
+            var query = input.value.trim();
+            if (pending) pending.abort();
+            if (!query) {
+                render('', []);
+                return;
+            }
+            pending = new AbortController();
+            var url = input.dataset.suggestUrl + '?q=' + encodeURIComponent(query);
+            fetch(url, { headers: { 'X-Requested-With': 'XMLHttpRequest' }, signal: pending.signal })
+                .then(function (response) { return response.json(); })
+                .then(function (data) {
+                    if (input.value.trim() === query) render(query, data.results || []);
+                })
+                .catch(function () { /* aborted by a newer keystroke */ });
+        }
+
+        input.addEventListener('input', function () {
+            clearTimeout(timer);
+            timer = setTimeout(fetchSuggestions, DEBOUNCE_MS);
+        });
+
+        input.addEventListener('keydown', function (event) {
+            if (event.key === 'ArrowDown' || event.key === 'ArrowUp') {
+                event.preventDefault();
+                highlight(active + (event.key === 'ArrowDown' ? 1 : -1));
+            } else if (event.key === 'Enter' && active >= 0) {
+                event.preventDefault();
+                window.location.href = items()[active].getAttribute('href');
+            }
+        });
+    }
+
+    document.addEventListener('DOMContentLoaded', function () {
+        var input = document.getElementById('top-search');
+        var dropdown = document.getElementById('search-dropdown');
+        if (input && dropdown && input.dataset.suggestUrl) bind(input, dropdown);
+    });
+})(window, document);
@@ -1,5 +1,6 @@
 from django import forms
 from .models import *
+from Masters import refdata
 from django.core.validators import FileExtensionValidator
 import re
 from django.core.exceptions import ValidationError
@@ -15,6 +16,7 @@ class VendorBasicForm(forms.ModelForm):
     
     class Meta:
         model = Vendor
+        formfield_callback = refdata.formfield
         fields = [
             'country', 'company_type', 'company_name', 'display_name', 
             'create_ledger', 'vendor_types', 'work_description', 'category'
@@ -161,6 +163,7 @@ class VendorSisterConcernForm(forms.ModelForm):
 class VendorContactForm(forms.ModelForm):
     class Meta:
         model = VendorContact
+        formfield_callback = refdata.formfield
         fields = '__all__'
         exclude = ['vendor', 'created_at']
         widgets = {
@@ -436,7 +439,8 @@ class VendorDocumentForm(forms.ModelForm):
         validators=[FileExtensionValidator(['pdf', 'jpg', 'jpeg', 'png', 'doc', 'docx'])],
         widget=forms.FileInput(attrs={
             'class': 'form-control',
-            'accept': '.pdf,.jpg,.jpeg,.png,.doc,.docx'
+            'accept': '.pdf,.jpg,.jpeg,.png,.doc,.docx',
+            'data-chunked-upload': '',
         })
     )
     
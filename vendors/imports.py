@@ -0,0 +1,338 @@
+# vendors/imports.py
+#
+# Bulk vendor import (settings.IMPORTERS['vendors'], see Masters/imports.py).
+# One spreadsheet row is a vendor with its primary contact address, bank
+# account, concern person, one year of financials, statutory details and
+# documents. Documents come in the same upload: a .zip holding the workbook
+# and the files its document columns name.
+#
+# Registering through vendor_wizard saves every step separately, counts the
+# year's vendors for each vendor_code and lets the post_save signal write an
+# approval log row and send a mail per vendor. Here each chunk gets one block
+# of vendor codes and a fixed number of bulk INSERTs (the signal does not run
+# for bulk_create); the approval log rows are written in the same batched
+# way and one summary mail is sent at the end.
+
+import os
+
+from django.core.files import File
+from django.db import transaction
+from django.utils import timezone
+
+from CMS.models import CountryMaster, StateUTMaster
+from DMS.pipeline import enqueue
+from DMS.storage import document_storage, parse_blob_name
+from Masters.imports import (
+    EMAIL_RE, GST_RE, PAN_RE, BaseImporter, ImportAbort, cell, cell_text, lookup,
+)
+from Masters.models import import_batch
+from Search.index import update_index
+
+from .models import (
+    Vendor, VendorApprovalLog, VendorBankDetail, VendorCategory, VendorConcernPerson, VendorContact,
+    VendorDocument, VendorFinancialInfo, VendorStatutory,
+)
+from .signals import notify_vendor_admins
+
+PINCODE_RE = r'[1-9]\d{5}'
+PHONE_RE = r'\d{10,12}'
+MOBILE_RE = r'[6-9]\d{9}'
+IFSC_RE = r'[A-Z]{4}0\d{6}'
+MICR_RE = r'\d{9}'
+YEAR_RE = r'\d{4}'
+
+VENDOR_COLUMNS = (
+    'company_name', 'display_name', 'company_type', 'country', 'pan_number', 'vendor_types',
+    'work_description', 'category', 'msme_type', 'msme_number', 'msme_validity', 'establishment_date',
+    'commencement_date', 'payment_preference', 'vendor_group', 'status',
+)
+CONTACT_COLUMNS = (
+    'contact_type', 'address', 'state', 'gst_number', 'pincode', 'location', 'telephone',
+)
+BANK_COLUMNS = ('bank_name', 'bank_branch', 'bank_city', 'account_number', 'account_type', 'ifsc_code', 'micr_code')
+CONCERN_COLUMNS = ('concern_person', 'concern_for', 'concern_branch', 'designation', 'mobile', 'concern_email')
+FINANCIAL_COLUMNS = ('financial_year', 'share_capital_reserves', 'sales_turnover', 'cash_profit')
+STATUTORY_COLUMNS = ('pf_reg_no', 'vat_reg_no', 'service_tax_reg_no', 'statutory_gst_number')
+# Sheet column -> the CharField it is written to. bulk_create skips field
+# validation, so every one is length-checked against its model field.
+TEXT_FIELDS = {
+    'company_name': (Vendor, 'company_name'),
+    'display_name': (Vendor, 'display_name'),
+    'pan_number': (Vendor, 'pan_number'),
+    'msme_number': (Vendor, 'msme_number'),
+    'vendor_group': (Vendor, 'vendor_group'),
+    'gst_number': (VendorContact, 'gst_number'),
+    'pincode': (VendorContact, 'pincode'),
+    'location': (VendorContact, 'location'),
+    'telephone': (VendorContact, 'telephone'),
+    'bank_name': (VendorBankDetail, 'bank_name'),
+    'bank_branch': (VendorBankDetail, 'branch_name'),
+    'bank_city': (VendorBankDetail, 'city'),
+    'account_number': (VendorBankDetail, 'account_number'),
+    'ifsc_code': (VendorBankDetail, 'ifsc_code'),
+    'micr_code': (VendorBankDetail, 'micr_code'),
+    'concern_person': (VendorConcernPerson, 'name'),
+    'concern_branch': (VendorConcernPerson, 'branch'),
+    'designation': (VendorConcernPerson, 'designation'),
+    'mobile': (VendorConcernPerson, 'mobile_1'),
+    'concern_email': (VendorConcernPerson, 'company_email'),
+    'financial_year': (VendorFinancialInfo, 'year'),
+    'pf_reg_no': (VendorStatutory, 'pf_reg_no'),
+    'vat_reg_no': (VendorStatutory, 'vat_reg_no'),
+    'service_tax_reg_no': (VendorStatutory, 'service_tax_reg_no'),
+    'statutory_gst_number': (VendorStatutory, 'gst_number'),
+}
+# Column -> VendorDocument.document_type
+DOCUMENT_COLUMNS = {
+    'pan_document': 'pan',
+    'gst_document': 'gst',
+    'msme_document': 'msme',
+    'bank_document': 'bank',
+    'incorporation_document': 'incorporation',
+    'quality_document': 'quality',
+    'other_document': 'other',
+}
+
+
+def choices(options):
+    """{upper-cased key or label: key} for a model's choices."""
+    known = {key.upper(): key for key, _ in options}
+    known.update({str(label).upper(): key for key, label in options})
+    return known
+
+
+class VendorImporter(BaseImporter):
+    title = "Vendors"
+    columns = (VENDOR_COLUMNS + CONTACT_COLUMNS + BANK_COLUMNS + CONCERN_COLUMNS + FINANCIAL_COLUMNS
+               + STATUTORY_COLUMNS + tuple(DOCUMENT_COLUMNS))
+    accepts_bundle = True
+
+    def __init__(self, batch):
+        super().__init__(batch)
+        if batch.created_by_id is None:
+            raise ImportAbort("Vendor imports need a user (run_imports --user).")
+        self.user = batch.created_by_id
+        self.pans = set()
+        self.documents_stored = 0
+
+    def prepare(self, columns):
+        self.countries = lookup(CountryMaster.objects.filter(is_active=True), 'name', 'code')
+        self.states = lookup(StateUTMaster.objects.filter(is_active=True), 'name', 'code')
+        self.categories = lookup(VendorCategory.objects.all(), 'name')
+        self.company_types = choices(Vendor.COMPANY_TYPES)
+        self.vendor_types = choices(Vendor.VENDOR_TYPES)
+        self.work_descriptions = choices(Vendor.WORK_DESCRIPTIONS)
+        self.payment_preferences = choices(Vendor.PAYMENT_PREFERENCES)
+        self.statuses = choices(Vendor.STATUS_CHOICES)
+        self.msme_types = choices(Vendor._meta.get_field('msme_type').choices)
+        self.contact_types = choices(VendorContact.CONTACT_TYPES)
+        self.account_types = choices(VendorBankDetail.ACCOUNT_TYPES)
+        self.concern_for = choices(VendorConcernPerson.CONCERN_FOR)
+
+    def validate(self, frame, checks):
+        for column, (model, field) in TEXT_FIELDS.items():
+            checks.max_length(column, model._meta.get_field(field).max_length)
+        checks.required('company_name', 'company_type', 'country', 'pan_number')
+        checks.exists('company_type', self.company_types)
+        checks.exists('country', self.countries)
+        checks.matches('pan_number', PAN_RE, "Enter a valid PAN number", upper=True)
+        checks.unique('pan_number', self.pans)
+        pans = checks.text('pan_number').str.upper()
+        taken = set(Vendor.objects.filter(pan_number__in=[p for p in pans.unique() if p])
+                    .values_list('pan_number', flat=True))
+        checks.fail(pans.isin(taken), 'pan_number', "A vendor with this PAN number already exists")
+        unknown = checks.text('vendor_types').map(lambda v: any(t not in self.vendor_types for t in _split(v)))
+        checks.fail(unknown, 'vendor_types', "Unknown vendor type")
+        checks.exists('work_description', self.work_descriptions)
+        checks.exists('category', self.categories)
+        checks.exists('msme_type', self.msme_types)
+        checks.exists('payment_preference', self.payment_preferences)
+        checks.exists('status', self.statuses)
+        for column in ('msme_validity', 'establishment_date', 'commencement_date'):
+            frame[column] = checks.dates(column)
+
+        # A related record is imported when any of its columns is filled in.
+        checks.required_with(checks.filled(*CONTACT_COLUMNS),
+                             ('contact_type', 'address', 'state', 'gst_number', 'pincode', 'telephone'),
+                             "Required for the contact address")
+        checks.exists('contact_type', self.contact_types)
+        checks.exists('state', self.states)
+        checks.matches('gst_number', GST_RE, "Enter a valid GST number", upper=True)
+        checks.matches('pincode', PINCODE_RE, "Enter a valid pincode")
+        checks.matches('telephone', PHONE_RE, "Enter a valid telephone number")
+
+        checks.required_with(checks.filled(*BANK_COLUMNS),
+                             ('bank_name', 'bank_branch', 'bank_city', 'account_number', 'ifsc_code'),
+                             "Required for the bank account")
+        checks.exists('account_type', self.account_types)
+        checks.matches('ifsc_code', IFSC_RE, "Enter a valid IFSC code", upper=True)
+        checks.matches('micr_code', MICR_RE, "Enter a valid MICR code")
+
+        checks.required_with(checks.filled(*CONCERN_COLUMNS), ('concern_person', 'concern_for', 'mobile'),
+                             "Required for the concern person")
+        checks.exists('concern_for', self.concern_for)
+        checks.matches('mobile', MOBILE_RE, "Enter a valid mobile number")
+        checks.matches('concern_email', EMAIL_RE, "Invalid email")
+
+        checks.required_with(checks.filled(*FINANCIAL_COLUMNS), ('financial_year',), "Required for the financials")
+        checks.matches('financial_year', YEAR_RE, "Enter a valid year")
+        for column in FINANCIAL_COLUMNS[1:]:
+            frame[column] = checks.decimals(column)
+
+        checks.matches('statutory_gst_number', GST_RE, "Enter a valid GST number", upper=True)
+
+        for column in DOCUMENT_COLUMNS:
+            missing = checks.text(column).map(lambda v: bool(v) and self.bundle_member(v) is None)
+            checks.fail(missing, column, "File not in the uploaded .zip")
+
+    def load(self, frame):
+        records = [{k: cell(v) for k, v in record.items()} for record in frame.to_dict('records')]
+        now = timezone.now()
+        codes = Vendor.allocate_vendor_codes(len(records), now.year)
+
+        vendors = []
+        for code, row in zip(codes, records):
+            name = cell_text(row['company_name'])
+            vendors.append(Vendor(
+                vendor_code=code,
+                country_id=self.countries[cell_text(row['country']).upper()],
+                company_type=self.company_types[cell_text(row['company_type']).upper()],
+                company_name=name,
+                display_name=cell_text(row['display_name']) or name,
+                vendor_types=[self.vendor_types[t] for t in dict.fromkeys(_split(cell_text(row['vendor_types'])))],
+                work_description=self.work_descriptions.get(cell_text(row['work_description']).upper()),
+                category_id=self.categories.get(cell_text(row['category']).upper()),
+                pan_number=cell_text(row['pan_number']).upper(),
+                is_msme=bool(row['msme_number'] or row['msme_type']),
+                msme_type=self.msme_types.get(cell_text(row['msme_type']).upper()),
+                msme_number=cell_text(row['msme_number']) or None,
+                msme_validity=row['msme_validity'],
+                establishment_date=row['establishment_date'],
+                commencement_date=row['commencement_date'],
+                payment_preference=self.payment_preferences.get(cell_text(row['payment_preference']).upper()),
+                vendor_group=cell_text(row['vendor_group']),
+                status=self.statuses.get(cell_text(row['status']).upper(), 'draft'),
+                created_by_id=self.user,
+            ))
+        Vendor.objects.bulk_create(vendors, batch_size=1000)
+        # MySQL does not return the new primary keys from a multi-row INSERT.
+        pks = dict(Vendor.objects.filter(vendor_code__in=codes).values_list('vendor_code', 'pk'))
+
+        contacts, banks, concerns, financials, statutory, documents, logs = [], [], [], [], [], [], []
+        stored = {}
+        for code, row in zip(codes, records):
+            vendor = pks[code]
+            if row['address']:
+                contacts.append(VendorContact(
+                    vendor_id=vendor,
+                    contact_type=self.contact_types[cell_text(row['contact_type']).upper()],
+                    address=cell_text(row['address']),
+                    state_id=self.states[cell_text(row['state']).upper()],
+                    gst_number=cell_text(row['gst_number']).upper(),
+                    pincode=cell_text(row['pincode']),
+                    location=cell_text(row['location']) or None,
+                    telephone=cell_text(row['telephone']),
+                    is_primary=True,
+                ))
+            if row['account_number']:
+                banks.append(VendorBankDetail(
+                    vendor_id=vendor,
+                    company_name=cell_text(row['company_name']),
+                    bank_name=cell_text(row['bank_name']),
+                    branch_name=cell_text(row['bank_branch']),
+                    city=cell_text(row['bank_city']),
+                    account_number=cell_text(row['account_number']),
+                    account_type=self.account_types.get(cell_text(row['account_type']).upper()),
+                    ifsc_code=cell_text(row['ifsc_code']).upper(),
+                    micr_code=cell_text(row['micr_code']) or None,
+                    is_primary=True,
+                ))
+            if row['concern_person']:
+                concerns.append(VendorConcernPerson(
+                    vendor_id=vendor,
+                    branch=cell_text(row['concern_branch']) or 'Head Office',
+                    concern_for=self.concern_for[cell_text(row['concern_for']).upper()],
+                    name=cell_text(row['concern_person']),
+                    designation=cell_text(row['designation']) or None,
+                    mobile_1=cell_text(row['mobile']),
+                    company_email=cell_text(row['concern_email']) or None,
+                    is_primary=True,
+                ))
+            if row['financial_year']:
+                financials.append(VendorFinancialInfo(
+                    vendor_id=vendor,
+                    year=cell_text(row['financial_year']),
+                    share_capital_reserves=row['share_capital_reserves'],
+                    sales_turnover=row['sales_turnover'],
+                    cash_profit=row['cash_profit'],
+                ))
+            if any(row[column] for column in STATUTORY_COLUMNS):
+                statutory.append(VendorStatutory(
+                    vendor_id=vendor,
+                    pf_reg_no=cell_text(row['pf_reg_no']) or None,
+                    vat_reg_no=cell_text(row['vat_reg_no']) or None,
+                    service_tax_reg_no=cell_text(row['service_tax_reg_no']) or None,
+                    gst_number=cell_text(row['statutory_gst_number']).upper() or None,
+                ))
+            for column, document_type in DOCUMENT_COLUMNS.items():
+                if row[column]:
+                    documents.append(VendorDocument(
+                        vendor_id=vendor,
+                        document_type=document_type,
+                        file=self.store(self.bundle_member(row[column]), stored),
+                        description=f"Imported from {self.batch.file_name}",
+                    ))
+            logs.append(VendorApprovalLog(
+                vendor_id=vendor,
+                action='created',
+                performed_by_id=self.user,
+                notes=f'Vendor registration imported (import #{self.batch.pk})',
+            ))
+
+        VendorContact.objects.bulk_create(contacts, batch_size=1000)
+        VendorBankDetail.objects.bulk_create(banks, batch_size=1000)
+        VendorConcernPerson.objects.bulk_create(concerns, batch_size=1000)
+        VendorFinancialInfo.objects.bulk_create(financials, batch_size=1000)
+        VendorStatutory.objects.bulk_create(statutory, batch_size=1000)
+        VendorDocument.objects.bulk_create(documents, batch_size=1000)
+        VendorApprovalLog.objects.bulk_create(logs, batch_size=1000)
+        update_index(Vendor, pks.values())
+        if documents:
+            # bulk_create skips DMS.signals.queue_text_extraction.
+            names = [document.file.name for document in documents]
+            transaction.on_commit(lambda: enqueue(*names))
+            self.documents_stored += len(documents)
+        return len(vendors)
+
+    def store(self, member, stored):
+        """
+        Copy a bundle file into the document storage; returns the name for the
+        FileField. A file named by several rows of the chunk is copied once and
+        referenced again. If the chunk rolls back, the references go with it and
+        blob_gc removes the copied bytes.
+        """
+        storage = document_storage()
+        if member.filename in stored:
+            name = stored[member.filename]
+            storage.add_reference(parse_blob_name(name)[0])
+            return name
+        with self.bundle.open(member) as f:
+            name = storage.save(os.path.basename(member.filename), File(f),
+                                max_length=VendorDocument._meta.get_field('file').max_length)
+        stored[member.filename] = name
+        return name
+
+    def finish(self):
+        inserted = import_batch.objects.values_list('inserted_rows', flat=True).get(pk=self.batch.pk)
+        if inserted:
+            notify_vendor_admins(
+                f'Vendor Import: {inserted} vendors registered',
+                f'{inserted} vendors were registered from {self.batch.file_name} '
+                f'(import #{self.batch.pk}) with {self.documents_stored} documents.',
+            )
+        return f"{inserted} vendors imported with {self.documents_stored} documents."
+
+
+def _split(value):
+    """Comma- or semicolon-separated choices, upper-cased."""
+    return [v.strip().upper() for v in str(value or '').replace(';', ',').split(',') if v.strip()]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-19 07:45
+
+import DMS.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0008_alter_vendordocument_file'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='vendor',
+            name='msme_certificate',
+            field=models.FileField(blank=True, null=True, storage=DMS.storage.document_storage, upload_to='vendor_docs/msme/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='vendor',
+            name='pan_copy',
+            field=models.FileField(blank=True, null=True, storage=DMS.storage.document_storage, upload_to='vendor_docs/pan/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='vendorbankdetail',
+            name='bank_proof',
+            field=models.FileField(blank=True, null=True, storage=DMS.storage.document_storage, upload_to='vendor_docs/bank/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='vendorcontact',
+            name='gst_certificate',
+            field=models.FileField(blank=True, null=True, storage=DMS.storage.document_storage, upload_to='vendor_docs/gst/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='vendordocument',
+            name='file',
+            field=models.FileField(blank=True, null=True, storage=DMS.storage.document_storage, upload_to='vendor_docs/%Y/%m/'),
+        ),
+        migrations.AlterField(
+            model_name='vendorqualitysystem',
+            name='certificate_file',
+            field=models.FileField(blank=True, null=True, storage=DMS.storage.document_storage, upload_to='vendor_docs/quality/%Y/%m/'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 4.2.7 on 2026-10-19 08:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('vendors', '0009_alter_vendor_msme_certificate_alter_vendor_pan_copy_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='vendor',
+            index=models.Index(fields=['status', 'current_assigned_to', 'company_name'], name='vendor_status_assignee_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorapprovallog',
+            index=models.Index(fields=['vendor', '-performed_at'], name='vendor_log_vendor_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vendorapprovallog',
+            index=models.Index(fields=['-performed_at'], name='vendor_log_time_idx'),
+        ),
+    ]
@@ -1,9 +1,12 @@
 from django.db import models
+from django.db.models.functions import Length
 from django.core.validators import MinValueValidator, MaxValueValidator, RegexValidator
 from django.contrib.auth.models import User
 from django.urls import reverse
 from django.utils import timezone
 from datetime import datetime, timedelta
+from DMS.storage import document_storage
+from Masters.models import id_sequence
 
 
 class VendorCategory(models.Model):
@@ -82,7 +85,7 @@ class Vendor(models.Model):
         unique=True,
         validators=[RegexValidator(r'^[A-Z]{5}[0-9]{4}[A-Z]{1}$', 'Enter a valid PAN number')]
     )
-    pan_copy = models.FileField(upload_to='vendor_docs/pan/%Y/%m/', blank=True, null=True)
+    pan_copy = models.FileField(max_length=255, upload_to='vendor_docs/pan/%Y/%m/', storage=document_storage, blank=True, null=True)
 
     # MSME Details
     is_msme = models.BooleanField(default=False)
@@ -94,7 +97,7 @@ class Vendor(models.Model):
         blank=True, null=True
     )
     msme_number = models.CharField(max_length=50, blank=True, null=True)
-    msme_certificate = models.FileField(upload_to='vendor_docs/msme/%Y/%m/', blank=True, null=True)
+    msme_certificate = models.FileField(max_length=255, upload_to='vendor_docs/msme/%Y/%m/', storage=document_storage, blank=True, null=True)
     msme_validity = models.DateField(null=True, blank=True)
 
     # Dates
@@ -136,6 +139,10 @@ class Vendor(models.Model):
 
     class Meta:
         ordering = ['company_name']
+        indexes = [
+            # Workflow dashboard: status, optionally the assignee, by name.
+            models.Index(fields=['status', 'current_assigned_to', 'company_name'], name='vendor_status_assignee_idx'),
+        ]
         permissions = [
             ('can_submit_vendor', 'Can submit vendor for approval'),
             ('can_review_vendor', 'Can review vendor registration'),
@@ -147,13 +154,27 @@ class Vendor(models.Model):
     def __str__(self):
         return f"{self.company_name} ({self.vendor_code})"
     
+    @classmethod
+    def allocate_vendor_codes(cls, count, year):
+        """`count` consecutive V<year>#### codes from the year's sequence, shared by the wizard and the import."""
+        start = id_sequence.reserve(f'vendor_code:{year}', count, lambda: cls._first_vendor_number(year))
+        return [f"V{year}{n:04d}" for n in range(start, start + count)]
+
+    @classmethod
+    def _first_vendor_number(cls, year):
+        # Seeds the year's sequence once, above the codes issued before it existed.
+        prefix = f"V{year}"
+        existing = cls.objects.filter(created_at__year=year).count()
+        last_code = (cls.objects.filter(vendor_code__regex=rf'^{prefix}[0-9]+$')
+                     .order_by(Length('vendor_code').desc(), '-vendor_code')
+                     .values_list('vendor_code', flat=True).first())
+        return max(existing, int(last_code[len(prefix):]) if last_code else 0) + 1
+
     def save(self, *args, **kwargs):
         if not self.vendor_code:
             # Generate vendor code: V + year + sequential number
-            from django.db.models import Count
             year = self.created_at.year if self.created_at else timezone.now().year
-            count = Vendor.objects.filter(created_at__year=year).count() + 1
-            self.vendor_code = f"V{year}{count:04d}"
+            self.vendor_code = self.allocate_vendor_codes(1, year)[0]
         super().save(*args, **kwargs)
     
     def get_absolute_url(self):
@@ -232,7 +253,7 @@ class VendorContact(models.Model):
     weekly_holidays = models.JSONField(default=list, null=True)
     
     # GST Certificate
-    gst_certificate = models.FileField(upload_to='vendor_docs/gst/%Y/%m/', blank=True, null=True)
+    gst_certificate = models.FileField(max_length=255, upload_to='vendor_docs/gst/%Y/%m/', storage=document_storage, blank=True, null=True)
     
     is_primary = models.BooleanField(default=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -273,7 +294,7 @@ class VendorBankDetail(models.Model):
     swift_code = models.CharField(max_length=11, blank=True, null=True)
     iban_code = models.CharField(max_length=34, blank=True, null=True)
     bankers_details = models.TextField(blank=True, null=True)
-    bank_proof = models.FileField(upload_to='vendor_docs/bank/%Y/%m/', blank=True, null=True)
+    bank_proof = models.FileField(max_length=255, upload_to='vendor_docs/bank/%Y/%m/', storage=document_storage, blank=True, null=True)
     is_active = models.BooleanField(default=True)
     is_primary = models.BooleanField(default=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -340,7 +361,7 @@ class VendorQualitySystem(models.Model):
     system_name = models.CharField(max_length=200)
     certificate_number = models.CharField(max_length=100)
     valid_upto = models.DateField()
-    certificate_file = models.FileField(upload_to='vendor_docs/quality/%Y/%m/', blank=True, null=True)
+    certificate_file = models.FileField(max_length=255, upload_to='vendor_docs/quality/%Y/%m/', storage=document_storage, blank=True, null=True)
     
     class Meta:
         ordering = ['-valid_upto']
@@ -472,7 +493,7 @@ class VendorDocument(models.Model):
     
     vendor = models.ForeignKey(Vendor, on_delete=models.CASCADE, related_name='documents')
     document_type = models.CharField(max_length=20, choices=DOCUMENT_TYPES)
-    file = models.FileField(upload_to='vendor_docs/%Y/%m/',blank=True, null=True)
+    file = models.FileField(max_length=255, upload_to='vendor_docs/%Y/%m/', storage=document_storage,blank=True, null=True)
     uploaded_at = models.DateTimeField(auto_now_add=True)
     description = models.TextField(blank=True, null=True)
     is_verified = models.BooleanField(default=False, null=True)
@@ -494,4 +515,8 @@ class VendorApprovalLog(models.Model):
     notes = models.TextField(blank=True, null=True)
     
     class Meta:
-        ordering = ['-performed_at']
\ No newline at end of file
+        ordering = ['-performed_at']
+        indexes = [
+            models.Index(fields=['vendor', '-performed_at'], name='vendor_log_vendor_time_idx'),
+            models.Index(fields=['-performed_at'], name='vendor_log_time_idx'),
+        ]
\ No newline at end of file
@@ -4,6 +4,18 @@ from django.core.mail import send_mail
 from django.conf import settings
 from .models import Vendor, VendorApprovalLog
 
+
+def notify_vendor_admins(subject, message):
+    """Mail the vendor administrators (in production)."""
+    if not settings.DEBUG:
+        send_mail(
+            subject,
+            message,
+            settings.DEFAULT_FROM_EMAIL,
+            ['admin@company.com'],  # Replace with actual admin email
+            fail_silently=True,
+        )
+
 @receiver(post_save, sender=Vendor)
 def handle_vendor_status_change(sender, instance, created, **kwargs):
     """
@@ -18,15 +30,10 @@ def handle_vendor_status_change(sender, instance, created, **kwargs):
             notes='Vendor registration created'
         )
         
-        # Send notification email (in production)
-        if not settings.DEBUG:
-            send_mail(
-                f'New Vendor Registration: {instance.company_name}',
-                f'A new vendor {instance.company_name} has been registered in the system.',
-                settings.DEFAULT_FROM_EMAIL,
-                ['admin@company.com'],  # Replace with actual admin email
-                fail_silently=True,
-            )
+        notify_vendor_admins(
+            f'New Vendor Registration: {instance.company_name}',
+            f'A new vendor {instance.company_name} has been registered in the system.',
+        )
 
 @receiver(post_save, sender=Vendor)
 def handle_vendor_blacklist(sender, instance, **kwargs):
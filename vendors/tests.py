@@ -1,3 +1,163 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import zipfile
+from io import BytesIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from CMS.models import CountryMaster, StateUTMaster
+from DMS.models import StoredBlob
+from Masters import imports
+from Masters.testing import workbook_bytes
+
+from .imports import VendorImporter
+from .models import Vendor, VendorApprovalLog, VendorBankDetail, VendorContact, VendorDocument
+
+
+def bundle(rows, files):
+    data = BytesIO()
+    with zipfile.ZipFile(data, 'w') as zf:
+        zf.writestr('import/vendors.xlsx', workbook_bytes(VendorImporter.columns, rows))
+        for name, content in files.items():
+            zf.writestr(f'import/documents/{name}', content)
+    return SimpleUploadedFile('vendors.zip', data.getvalue())
+
+
+@override_settings(IMPORT_CHUNK_ROWS=10)
+class VendorImportTests(TestCase):
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        override = override_settings(MEDIA_ROOT=self.media_root)
+        override.enable()
+        self.addCleanup(override.disable)
+        self.user = get_user_model().objects.create_user(email='importer@example.com', password='x')
+        self.india = CountryMaster.objects.create(name='India', code='IN', currency='Rupee', currency_code='INR')
+        StateUTMaster.objects.create(name='Maharashtra', code='MH')
+
+    def row(self, n, **values):
+        return {
+            'company_name': f'Vendor {n}', 'company_type': 'Private Limited Company', 'country': 'IN',
+            'pan_number': f'ABCDE{n:04d}F', 'vendor_types': 'msme, Trader', 'contact_type': 'head_office',
+            'address': f'{n} Ring Road', 'state': 'Maharashtra', 'gst_number': f'27ABCDE{n:04d}F1Z5',
+            'pincode': '411001', 'telephone': '2026000000', 'bank_name': 'SBI', 'bank_branch': 'Camp',
+            'bank_city': 'Pune', 'account_number': 1000 + n, 'ifsc_code': 'SBIN0001234',
+            'financial_year': 2024, 'sales_turnover': '1,50,000', 'pan_document': f'pan-{n}.pdf',
+            'bank_document': 'cancelled-cheque.pdf', **values,
+        }
+
+    def test_bundle_is_imported_with_documents(self):
+        Vendor.objects.create(country=self.india, company_type='llp', company_name='Existing',
+                              display_name='Existing', pan_number='ABCDE0099F', created_by=self.user)
+        rows = [self.row(n) for n in range(12)]
+        rows[2]['pan_number'] = 'ABCDE0099F'
+        rows[4]['ifsc_code'] = 'SBIN000123X'
+        rows[6]['pan_document'] = 'missing.pdf'
+        rows[8] = {'company_name': 'Vendor 8', 'company_type': 'llp', 'country': 'India', 'pan_number': 'ABCDE0008F'}
+        files = {f'pan-{n}.pdf': f'%PDF pan {n}'.encode() for n in range(12)}
+        files['cancelled-cheque.pdf'] = b'%PDF cheque'
+        mail.outbox = []
+
+        imports.create_batch('vendors', bundle(rows, files), self.user)
+        batch = imports.run_import(imports.claim())
+
+        self.assertEqual(batch.status, 'done', batch.message)
+        self.assertEqual((batch.inserted_rows, batch.error_rows), (9, 3))
+        self.assertEqual(
+            list(batch.errors.values_list('row_number', 'column_name')),
+            [(4, 'pan_number'), (6, 'ifsc_code'), (8, 'pan_document')],
+        )
+        vendor = Vendor.objects.get(pan_number='ABCDE0000F')
+        self.assertEqual(vendor.company_type, 'private_limited')
+        self.assertEqual(vendor.vendor_types, ['msme', 'trader'])
+        self.assertEqual(vendor.display_name, 'Vendor 0')
+        self.assertEqual(vendor.financial_info.get().sales_turnover, 150000)
+        self.assertEqual(VendorContact.objects.count(), 8)
+        self.assertEqual(VendorBankDetail.objects.count(), 8)
+
+        # Vendor codes follow on from the vendor saved through the model.
+        year = timezone.now().year
+        codes = sorted(Vendor.objects.exclude(company_name='Existing').values_list('vendor_code', flat=True))
+        self.assertEqual(codes, [f'V{year}{n:04d}' for n in range(2, 11)])
+
+        # The cheque is stored once and referenced by every bank document.
+        self.assertEqual(VendorDocument.objects.filter(document_type='pan').count(), 8)
+        cheques = VendorDocument.objects.filter(document_type='bank')
+        self.assertEqual(cheques.count(), 8)
+        self.assertEqual(len({d.file.name for d in cheques}), 1)
+        self.assertEqual(StoredBlob.objects.get(sha256=cheques[0].file.name.split('/')[3]).ref_count, 8)
+        with vendor.documents.get(document_type='pan').file.open('rb') as f:
+            self.assertEqual(f.read(), b'%PDF pan 0')
+
+        # One approval log row per vendor, one mail for the whole import.
+        self.assertEqual(VendorApprovalLog.objects.filter(notes__contains=f'import #{batch.pk}').count(), 9)
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('9 vendors', mail.outbox[0].subject)
+
+    def test_over_long_cells_are_row_errors(self):
+        rows = [self.row(n, pan_document=None, bank_document=None) for n in range(3)]
+        rows[1]['vendor_group'] = 'Group ' * 20
+        rows[2]['designation'] = 'Manager ' * 40
+        rows[2]['concern_person'], rows[2]['concern_for'], rows[2]['mobile'] = 'A Person', 'billing', '9800000000'
+        imports.create_batch('vendors', bundle(rows, {}), self.user)
+        batch = imports.run_import(imports.claim())
+        self.assertEqual(batch.status, 'done', batch.message)
+        self.assertEqual((batch.inserted_rows, batch.error_rows), (1, 2))
+        self.assertEqual(list(batch.errors.values_list('row_number', 'column_name', 'message')),
+                         [(3, 'vendor_group', 'At most 100 characters'), (4, 'designation', 'At most 240 characters')])
+
+    def test_documents_need_a_bundle(self):
+        imports.create_batch('vendors', SimpleUploadedFile('vendors.xlsx', workbook_bytes(VendorImporter.columns, [self.row(1)])), self.user)
+        batch = imports.run_import(imports.claim())
+        self.assertEqual(list(batch.errors.values_list('column_name', flat=True)), ['pan_document', 'bank_document'])
+        self.assertFalse(Vendor.objects.exists())
+
+    def test_zip_without_workbook_fails(self):
+        data = BytesIO()
+        with zipfile.ZipFile(data, 'w') as zf:
+            zf.writestr('pan.pdf', b'%PDF')
+        imports.create_batch('vendors', SimpleUploadedFile('vendors.zip', data.getvalue()), self.user)
+        batch = imports.run_import(imports.claim())
+        self.assertEqual(batch.status, 'failed')
+        self.assertIn('exactly one .xlsx', batch.message)
+
+
+class VendorExportTests(TestCase):
+
+    def test_export_applies_the_list_filters(self):
+        user = get_user_model().objects.create_user(email='export@example.com', password='x')
+        india = CountryMaster.objects.create(name='India', code='IN', currency='Rupee', currency_code='INR')
+        for n, company_type in enumerate(['llp', 'private_limited', 'llp']):
+            Vendor.objects.create(country=india, company_type=company_type, company_name=f'Vendor {n}',
+                                  display_name=f'Vendor {n}', pan_number=f'ABCDE{n:04d}F', created_by=user)
+        self.client.force_login(user)
+        response = self.client.get('/vendors/export/', {'company_type': 'llp'})
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual([line.split(',')[1] for line in lines[1:]], ['Vendor 2', 'Vendor 0'])
+        self.assertEqual(lines[1].split(',')[4], 'Limited Liability Partnership')
+
+
+class VendorCodeTests(TestCase):
+
+    def test_codes_continue_above_gaps(self):
+        user = get_user_model().objects.create_user(email='codes@example.com', password='x')
+        india = CountryMaster.objects.create(name='India', code='IN', currency='Rupee', currency_code='INR')
+
+        def vendor(n):
+            return Vendor.objects.create(country=india, company_type='llp', company_name=f'Vendor {n}',
+                                         display_name=f'Vendor {n}', pan_number=f'ABCDE{n:04d}F', created_by=user)
+
+        first = vendor(1)
+        vendor(2)
+        third = vendor(3)
+        first.delete()
+        year = timezone.now().year
+        self.assertEqual(third.vendor_code, f'V{year}0003')
+        # Two vendors left, highest code 0003: the wizard must not reissue 0003.
+        self.assertEqual(vendor(4).vendor_code, f'V{year}0004')
+        self.assertEqual(Vendor.allocate_vendor_codes(2, year), [f'V{year}0005', f'V{year}0006'])
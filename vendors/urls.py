@@ -12,6 +12,7 @@ urlpatterns = [
     path('', views.vendor_dashboard, name='vendor_dashboard'),
     path('list/', views.vendor_list, name='vendor_list'),
     path('export/', views.vendor_export, name='vendor_export'),
+    path('import-template/', views.vendor_import_template, name='vendor_import_template'),
     
     # Vendor Wizard Registration
     path('new/', views.vendor_wizard_start, name='vendor_wizard_start'),
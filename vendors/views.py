@@ -9,12 +9,23 @@ from django.http import JsonResponse, HttpResponse
 from django.core.paginator import Paginator
 from django.utils import timezone
 
-from CMS.models import StateUTMaster
+from asgiref.sync import sync_to_async
+from Account.decorators import async_login_required
+from CRLBM.request_context import current_role_id
+from CRLBM.db_router import use_replica
+from CRLBM.exports import Column, as_date, choice_label, stream_export
+from CRLBM.pagination import FastCountPaginator
+from DMS.pipeline import attach_document_text
+from DMS.uploads import claim_upload, use_chunked_upload
+from Masters import refdata
+from Search.index import search_filter
+from django.core.exceptions import ValidationError
 from .models import *
 from .forms import *
 import json
 
 @login_required
+@use_replica
 def vendor_dashboard(request):
     # Dashboard statistics
     total_vendors = Vendor.objects.count()
@@ -48,12 +59,44 @@ def vendor_dashboard(request):
 from django.db.models import Q
 from django.views.generic import ListView
 
+def filtered_vendors(request):
+    """The vendors matching the list filters in request.GET, and the bound search form."""
+    vendors = Vendor.objects.all()
+    search_form = VendorSearchForm(request.GET or None)
+    if search_form.is_valid():
+        search = search_form.cleaned_data.get('search')
+        company_type = search_form.cleaned_data.get('company_type')
+        status = search_form.cleaned_data.get('status')
+        is_active = search_form.cleaned_data.get('is_active')
+
+        if search:
+            vendors = search_filter(vendors, 'vendors', search)
+        if company_type:
+            vendors = vendors.filter(company_type=company_type)
+        if status:
+            vendors = vendors.filter(status=status)
+        if is_active:
+            vendors = vendors.filter(is_active=is_active == 'true')
+    return vendors, search_form
+
 def vendor_list(request):
-    # Fetch all vendors from DB (you can add filters later)
-    vendors = Vendor.objects.all().order_by('-id')
-    
-    # Pass the vendors to the template
-    return render(request, 'vendors/vendor_list.html', {'vendors': vendors})
+    vendors, search_form = filtered_vendors(request)
+    vendors = vendors.order_by('-id')
+
+    paginator = FastCountPaginator(vendors, 25)
+    page_obj = paginator.get_page(request.GET.get('page'))
+    total_count = paginator.count
+    if not paginator.count_is_exact:
+        total_count = f'{total_count:,}+'
+
+    context = {
+        'vendors': page_obj,
+        'page_obj': page_obj,
+        'is_paginated': page_obj.has_other_pages(),
+        'search_form': search_form,
+        'total_count': total_count,
+    }
+    return render(request, 'vendors/vendor_list.html', context)
 
 @login_required
 def vendor_wizard(request, step=1, vendor_id=None):
@@ -207,10 +250,7 @@ def _build_wizard_context(current_step, steps, form, vendor, request):
         {"number": num, "title": name}
         for num, (name, form) in steps.items()
     ]
-    if request.user.is_authenticated ==True:                
-                global user,role_id
-                user = request.user.id    
-                role_id = request.user.role_id 
+    role_id = current_role_id()
     context = {
         'current_step': current_step,
         'total_steps': len(steps),
@@ -227,7 +267,7 @@ def _build_wizard_context(current_step, steps, form, vendor, request):
         context.update({
             'contacts': vendor.contacts.all(),
             'contact_form': VendorContactForm(),
-            'states': StateUTMaster.objects.all(),
+            'states': refdata.rows('state'),
         })
         
     elif current_step == 5 and vendor:
@@ -552,16 +592,24 @@ def add_document(request, vendor_id):
     vendor = get_object_or_404(Vendor, id=vendor_id)
     if request.method == 'POST':
         form = VendorDocumentForm(request.POST, request.FILES)
+        # Large files arrive through the chunked upload API (DMS/uploads.py)
+        upload_id = use_chunked_upload(request, form, 'file')
         if form.is_valid():
             document = form.save(commit=False)
             document.vendor = vendor
-            document.save()
-            messages.success(request, 'Document uploaded successfully')
+            try:
+                with transaction.atomic():
+                    if upload_id:
+                        document.file.name = claim_upload(request.user, upload_id)
+                    document.save()
+                messages.success(request, 'Document uploaded successfully')
+            except ValidationError as e:
+                messages.error(request, ' '.join(e.messages))
         else:
             for error in form.errors:
                 messages.error(request, f'Error in {error}: {form.errors[error]}')
     
-    return redirect('vendor_wizard_step', step=10, vendor_id=vendor.id)
+    return redirect('vendors:vendor_wizard_step', step=14, vendor_id=vendor.id)
 
 @login_required
 def delete_document(request, document_id):
@@ -571,6 +619,15 @@ def delete_document(request, document_id):
     messages.success(request, 'Document deleted successfully')
     return redirect('vendor_wizard_step', step=10, vendor_id=vendor_id)
 
+def vendor_documents(vendor):
+    """Documents with their preview and the PAN/GST numbers read from them."""
+    return attach_document_text(
+        vendor.documents.all(), 'file',
+        pan_numbers=[vendor.pan_number],
+        gst_numbers=[contact.gst_number for contact in vendor.contacts.all()]
+        + [statutory.gst_number for statutory in vendor.statutory_details.all()],
+    )
+
 @login_required
 @permission_required('vendors.can_review_vendor')
 def vendor_review(request, pk):
@@ -631,6 +688,7 @@ def vendor_review(request, pk):
     context = {
         'vendor': vendor,
         'approval_logs': vendor.approval_logs.all(),
+        'documents': vendor_documents(vendor),
     }
     return render(request, 'vendors/vendor_review.html', context)
 
@@ -698,7 +756,7 @@ class VendorDetailView(DetailView):
             'customer_references': vendor.customer_references.all(),
             'dealerships': vendor.dealerships.all(),
             'concern_persons': vendor.concern_persons.all(),
-            'documents': vendor.documents.all(),
+            'documents': vendor_documents(vendor),
             'approval_logs': vendor.approval_logs.all(),
             'statutory_details': vendor.statutory_details.first(),
             'manpower_details': vendor.manpower.first(),
@@ -707,40 +765,51 @@ class VendorDetailView(DetailView):
         
         return context
 
+VENDOR_EXPORT_COLUMNS = [
+    Column('Vendor Code', 'vendor_code'),
+    Column('Company Name', 'company_name'),
+    Column('PAN', 'pan_number'),
+    Column('Status', 'status', choice_label(Vendor, 'status')),
+    Column('Company Type', 'company_type', choice_label(Vendor, 'company_type')),
+    Column('Created Date', 'created_at', as_date),
+]
+
 @login_required
+@use_replica
 def vendor_export(request):
-    # Basic export functionality - can be enhanced with libraries like pandas
-    vendors = Vendor.objects.all()
-    
-    # This is a simple example - in production, use libraries like reportlab or weasyprint
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="vendors.csv"'
-    
-    # Simple CSV export implementation
-    import csv
-    writer = csv.writer(response)
-    writer.writerow(['Vendor Code', 'Company Name', 'PAN', 'Status', 'Company Type', 'Created Date'])
-    
-    for vendor in vendors:
-        writer.writerow([
-            vendor.vendor_code,
-            vendor.company_name,
-            vendor.pan_number,
-            vendor.get_status_display(),
-            vendor.get_company_type_display(),
-            vendor.created_at.strftime('%Y-%m-%d')
-        ])
-    
+    """The filtered vendor list, streamed as CSV (or XLSX with ?format=xlsx)."""
+    vendors, _ = filtered_vendors(request)
+    return stream_export(request, vendors, VENDOR_EXPORT_COLUMNS, 'vendors')
+
+@login_required
+def vendor_import_template(request):
+    """Blank workbook with the columns vendors.imports.VendorImporter reads."""
+    import openpyxl
+    from openpyxl.styles import Font
+    from .imports import VendorImporter
+
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.title = 'Vendors'
+    sheet.append([column.replace('_', ' ').title() for column in VendorImporter.columns])
+    for cell in sheet[1]:
+        cell.font = Font(bold=True)
+        sheet.column_dimensions[cell.column_letter].width = len(str(cell.value)) + 4
+
+    response = HttpResponse(content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet')
+    response['Content-Disposition'] = 'attachment; filename="Vendor Import Template.xlsx"'
+    workbook.save(response)
     return response
 
 # API Views for AJAX functionality
-@login_required
-def get_states(request, country_id):
-    states = StateUTMaster.objects.values('id', 'name')
-    return JsonResponse(list(states), safe=False)
+@async_login_required
+async def get_states(request, country_id):
+    # A reload of the tables queries the database, so it runs off the event loop.
+    states = await sync_to_async(refdata.rows)('state')
+    return JsonResponse([{'id': state.id, 'name': state.name} for state in states], safe=False)
 
-@login_required
-def validate_pan(request):
+@async_login_required
+async def validate_pan(request):
     pan_number = request.GET.get('pan_number', '')
     vendor_id = request.GET.get('vendor_id')
     
@@ -749,18 +818,20 @@ def validate_pan(request):
     if vendor_id:
         queryset = queryset.exclude(id=vendor_id)
     
-    exists = queryset.exists()
+    exists = await queryset.aexists()
     
     return JsonResponse({'exists': exists, 'valid': len(pan_number) == 10})
 
-@login_required
-def vendor_quick_stats(request):
-    stats = {
-        'total': Vendor.objects.count(),
-        'active': Vendor.objects.filter(is_active=True).count(),
-        'pending_review': Vendor.objects.filter(status='submitted').count(),
-        'approved': Vendor.objects.filter(status='approved').count(),
-    }
+@async_login_required
+@use_replica
+async def vendor_quick_stats(request):
+    # One aggregate round trip instead of four COUNT queries
+    stats = await Vendor.objects.aaggregate(
+        total=Count('id'),
+        active=Count('id', filter=Q(is_active=True)),
+        pending_review=Count('id', filter=Q(status='submitted')),
+        approved=Count('id', filter=Q(status='approved')),
+    )
     return JsonResponse(stats)
 
 